@@ -0,0 +1,519 @@
+from Manejo_archivo import *
+from Manejo_archivo import _normalizar_texto, _resumen_vacio, _sumar_al_resumen, _nombre_y_calorias
+import json
+import os
+import sqlite3
+import threading
+
+# --- Motor de almacenamiento SQLite --- #
+# Alternativa al árbol categoria/tipo/procesamiento/items.csv para bases
+# grandes: un único archivo SQLite con las mismas operaciones (alta, lista
+# completa, recorrido filtrado por jerarquía, reescritura de una hoja,
+# modificación, baja y resumen de calorías) y con índices sobre el nombre
+# normalizado, la jerarquía y las calorías.
+#
+# Cada hoja del árbol es una fila de 'hojas' (con los nombres de carpeta y los
+# encabezados de su items.csv) y cada alimento una fila de 'alimentos'. Las
+# calorías se guardan dos veces: el texto tal cual estaba en el CSV (para que
+# exportar devuelva lo mismo) y como número, que es lo que se indexa. Las
+# columnas que no son nombre ni calorias_100g van en 'extra' como JSON.
+#
+# importar_arbol y exportar_arbol convierten entre los dos formatos, así que
+# se puede pasar de uno al otro en cualquier momento.
+# Con ALIMENTOS_ALMACEN=sqlite (o usar_almacen('sqlite')), las operaciones de
+# Manejo_archivo sobre la base usan el AlmacenSQLite de almacen_de_datos().
+VERSION_ESQUEMA_SQLITE = 1
+# Filas que se insertan por transacción al importar un árbol.
+TAMANO_LOTE_SQLITE = 50_000
+# Modo 'synchronous' de SQLite para cada política de durabilidad de Manejo_archivo
+# (con WAL, NORMAL puede perder las últimas transacciones ante un corte de luz, pero no corrompe la base).
+SINCRONIZACION_SQLITE = {'siempre': 'FULL', 'agrupada': 'NORMAL', 'nunca': 'OFF'}
+
+ESQUEMA_SQLITE = """
+CREATE TABLE IF NOT EXISTS hojas (
+    id INTEGER PRIMARY KEY,
+    categoria TEXT NOT NULL,
+    tipo TEXT NOT NULL,
+    procesamiento TEXT NOT NULL,
+    clave_categoria TEXT NOT NULL,
+    clave_tipo TEXT NOT NULL,
+    clave_procesamiento TEXT NOT NULL,
+    encabezados TEXT NOT NULL,
+    UNIQUE (categoria, tipo, procesamiento)
+);
+CREATE INDEX IF NOT EXISTS hojas_jerarquia ON hojas (clave_categoria, clave_tipo, clave_procesamiento);
+CREATE TABLE IF NOT EXISTS alimentos (
+    id INTEGER PRIMARY KEY,
+    hoja INTEGER NOT NULL REFERENCES hojas (id),
+    nombre TEXT NOT NULL,
+    nombre_normalizado TEXT NOT NULL,
+    calorias_100g TEXT,
+    calorias REAL,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS alimentos_hoja ON alimentos (hoja, id);
+CREATE INDEX IF NOT EXISTS alimentos_nombre ON alimentos (nombre_normalizado);
+CREATE INDEX IF NOT EXISTS alimentos_calorias ON alimentos (calorias);
+"""
+
+# Columnas que se leen para armar cada alimento, en el orden de la base.
+_COLUMNAS_ALIMENTO = ("a.id, a.hoja, a.nombre, a.calorias_100g, a.extra "
+                      "FROM alimentos a JOIN hojas h ON h.id = a.hoja")
+_ORDEN_BASE = "h.categoria, h.tipo, h.procesamiento, a.id"
+
+
+def _calorias_como_numero(valor):
+    """(Función auxiliar) Calorías como float para el índice, o None si no son un número finito."""
+    try:
+        calorias = float(valor)
+    except (ValueError, TypeError):
+        return None
+    # SQLite guarda NaN como NULL; infinito sí se puede comparar.
+    return None if calorias != calorias else calorias
+
+
+class AlmacenSQLite:
+    """
+    Base de alimentos guardada en un archivo SQLite.
+
+    Los alimentos se devuelven como diccionarios iguales a los de
+    crear_lista_desde_csv (las columnas de su items.csv más categoria, tipo y
+    procesamiento), con una clave 'id' adicional que identifica la fila para
+    modificarla o eliminarla. El orden de la base es el mismo que el de la
+    carga desde CSV: hojas en orden alfabético de carpeta y, dentro de cada
+    una, en el orden en que se agregaron.
+
+    Se puede usar desde varios hilos: las operaciones se serializan con un candado.
+    """
+
+    def __init__(self, ruta_db: str):
+        self.ruta_db = os.path.abspath(ruta_db)
+        self._candado = threading.RLock()
+        self._conexion = sqlite3.connect(self.ruta_db, check_same_thread=False)
+        self._conexion.execute("PRAGMA journal_mode = WAL")
+        self._conexion.execute(f"PRAGMA synchronous = {SINCRONIZACION_SQLITE[politica_durabilidad()]}")
+        self._conexion.execute("PRAGMA foreign_keys = ON")
+        version = self._conexion.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, VERSION_ESQUEMA_SQLITE):
+            self._conexion.close()
+            raise ValueError(f"'{ruta_db}' tiene un esquema de versión {version} (se esperaba {VERSION_ESQUEMA_SQLITE})")
+        with self._conexion:
+            self._conexion.executescript(ESQUEMA_SQLITE)
+            self._conexion.execute(f"PRAGMA user_version = {VERSION_ESQUEMA_SQLITE}")
+        # (categoria, tipo, procesamiento) -> id de la hoja, e id -> (jerarquía, encabezados).
+        self._ids_hojas = {}
+        self._hojas = {}
+        self._recargar_hojas()
+
+    def cerrar(self):
+        with self._candado:
+            self._conexion.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.cerrar()
+
+    def __len__(self):
+        with self._candado:
+            return self._conexion.execute("SELECT COUNT(*) FROM alimentos").fetchone()[0]
+
+    # --- Conversión entre filas y diccionarios --- #
+
+    def _id_hoja(self, categoria, tipo, procesamiento, encabezados) -> int:
+        """
+        (Función auxiliar) Devuelve el id de la hoja, creándola con 'encabezados'
+        si no existe. Si la hoja ya existe y faltan columnas, se agregan al
+        final de sus encabezados. Debe llamarse dentro de una transacción.
+        """
+        jerarquia = (categoria, tipo, procesamiento)
+        id_hoja = self._ids_hojas.get(jerarquia)
+        if id_hoja is None:
+            encabezados = list(encabezados)
+            id_hoja = self._conexion.execute(
+                "INSERT INTO hojas (categoria, tipo, procesamiento, clave_categoria, clave_tipo, "
+                "clave_procesamiento, encabezados) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (*jerarquia, *(normalizar_texto_para_ruta(nivel) for nivel in jerarquia),
+                 json.dumps(encabezados, ensure_ascii=False)),
+            ).lastrowid
+            self._ids_hojas[jerarquia] = id_hoja
+            self._hojas[id_hoja] = (jerarquia, encabezados)
+            return id_hoja
+
+        actuales = self._hojas[id_hoja][1]
+        nuevas = [campo for campo in encabezados if campo not in actuales]
+        if nuevas:
+            actuales = actuales + nuevas
+            self._conexion.execute("UPDATE hojas SET encabezados = ? WHERE id = ?",
+                                   (json.dumps(actuales, ensure_ascii=False), id_hoja))
+            self._hojas[id_hoja] = (jerarquia, actuales)
+        return id_hoja
+
+    @staticmethod
+    def _valores_fila(id_hoja: int, fila: dict) -> tuple:
+        """(Función auxiliar) Valores de una fila para insertarla en 'alimentos'."""
+        nombre = fila.get('nombre') or ''
+        calorias = fila.get('calorias_100g')
+        extra = {campo: valor for campo, valor in fila.items()
+                 if isinstance(campo, str) and campo not in ('nombre', 'calorias_100g')}
+        return (id_hoja, nombre, _normalizar_texto(nombre), None if calorias is None else str(calorias),
+                _calorias_como_numero(calorias), json.dumps(extra, ensure_ascii=False) if extra else None)
+
+    def _fila_a_diccionario(self, id_alimento, id_hoja, nombre, calorias, extra) -> dict:
+        """(Función auxiliar) Arma el diccionario de un alimento, con las columnas de su hoja."""
+        (categoria, tipo, procesamiento), encabezados = self._hojas[id_hoja]
+        valores = json.loads(extra) if extra else {}
+        valores['nombre'] = nombre
+        valores['calorias_100g'] = calorias
+        fila = {campo: valores.get(campo, '') for campo in encabezados}
+        fila['categoria'] = categoria
+        fila['tipo'] = tipo
+        fila['procesamiento'] = procesamiento
+        fila['id'] = id_alimento
+        return fila
+
+    def _consultar(self, condiciones: str = "", parametros=(), orden: str = _ORDEN_BASE, limite: int = None) -> list:
+        """(Función auxiliar) Ejecuta un SELECT de alimentos y devuelve los diccionarios."""
+        consulta = f"SELECT {_COLUMNAS_ALIMENTO}"
+        if condiciones:
+            consulta += f" WHERE {condiciones}"
+        consulta += f" ORDER BY {orden}"
+        if limite is not None:
+            consulta += f" LIMIT {int(limite)}"
+        with self._candado:
+            return [self._fila_a_diccionario(*fila) for fila in self._conexion.execute(consulta, parametros)]
+
+    @staticmethod
+    def _condiciones_jerarquia(categoria=None, tipo=None, procesamiento=None) -> tuple:
+        """(Función auxiliar) Condiciones sobre las claves normalizadas de la jerarquía (usan el índice)."""
+        condiciones, parametros = [], []
+        for columna, valor in (('h.clave_categoria', categoria), ('h.clave_tipo', tipo),
+                               ('h.clave_procesamiento', procesamiento)):
+            if valor is not None:
+                condiciones.append(f"{columna} = ?")
+                parametros.append(normalizar_texto_para_ruta(valor))
+        return condiciones, parametros
+
+    # --- Escritura --- #
+
+    @medido
+    def alta_nuevo_item(self, categoria, tipo, procesamiento, nuevo_item: dict) -> bool:
+        """
+        Da de alta un ítem, igual que alta_nuevo_item sobre el árbol de CSV.
+
+        Returns:
+            bool: True si se guardó, False en caso de error.
+        """
+        return self.altas_en_lote([(categoria, tipo, procesamiento, nuevo_item)]) == 1
+
+    @medido
+    def altas_en_lote(self, altas) -> int:
+        """
+        Da de alta varios ítems en una única transacción.
+
+        Args:
+            altas: Iterable de (categoria, tipo, procesamiento, diccionario del ítem).
+
+        Returns:
+            int: Cantidad de ítems guardados (0 si la transacción falló).
+        """
+        try:
+            with self._candado, self._conexion:
+                valores = [self._valores_fila(self._id_hoja(categoria, tipo, procesamiento, item.keys()), item)
+                           for categoria, tipo, procesamiento, item in altas]
+                self._conexion.executemany(
+                    "INSERT INTO alimentos (hoja, nombre, nombre_normalizado, calorias_100g, calorias, extra) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", valores)
+            return len(valores)
+        except sqlite3.Error as e:
+            self._recargar_hojas()
+            print(f"ERROR CRÍTICO: No se pudo escribir en la base SQLite. Detalles: {e}")
+            return 0
+
+    @medido
+    def sobrescribir_hoja(self, categoria, tipo, procesamiento, encabezados: list, filas: list) -> bool:
+        """
+        Reemplaza todas las filas de una hoja, como sobrescribir_csv sobre su items.csv.
+
+        Returns:
+            bool: True si la escritura fue exitosa, False en caso de error.
+        """
+        try:
+            with self._candado, self._conexion:
+                id_hoja = self._ids_hojas.get((categoria, tipo, procesamiento))
+                if id_hoja is not None:
+                    self._conexion.execute("DELETE FROM alimentos WHERE hoja = ?", (id_hoja,))
+                    self._conexion.execute("UPDATE hojas SET encabezados = ? WHERE id = ?",
+                                           (json.dumps(list(encabezados), ensure_ascii=False), id_hoja))
+                    self._hojas[id_hoja] = ((categoria, tipo, procesamiento), list(encabezados))
+                else:
+                    id_hoja = self._id_hoja(categoria, tipo, procesamiento, encabezados)
+                self._conexion.executemany(
+                    "INSERT INTO alimentos (hoja, nombre, nombre_normalizado, calorias_100g, calorias, extra) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", (self._valores_fila(id_hoja, fila) for fila in filas))
+            return True
+        except sqlite3.Error as e:
+            self._recargar_hojas()
+            print(f"ERROR CRÍTICO al intentar reescribir la hoja en la base SQLite: {e}")
+            return False
+
+    @medido
+    def modificar(self, id_alimento: int, campos: dict) -> bool:
+        """
+        Cambia campos de un alimento (por ejemplo nombre y calorias_100g).
+
+        Returns:
+            bool: True si el alimento existía y se modificó.
+        """
+        with self._candado:
+            actual = self.obtener(id_alimento)
+            if actual is None:
+                return False
+            for clave in ('categoria', 'tipo', 'procesamiento', 'id'):
+                actual.pop(clave)
+            actual.update(campos)
+            try:
+                with self._conexion:
+                    id_hoja = self._conexion.execute("SELECT hoja FROM alimentos WHERE id = ?",
+                                                     (id_alimento,)).fetchone()[0]
+                    (categoria, tipo, procesamiento), _ = self._hojas[id_hoja]
+                    self._id_hoja(categoria, tipo, procesamiento, actual.keys())
+                    _, nombre, normalizado, calorias_texto, calorias, extra = self._valores_fila(id_hoja, actual)
+                    self._conexion.execute(
+                        "UPDATE alimentos SET nombre = ?, nombre_normalizado = ?, calorias_100g = ?, "
+                        "calorias = ?, extra = ? WHERE id = ?",
+                        (nombre, normalizado, calorias_texto, calorias, extra, id_alimento))
+                return True
+            except sqlite3.Error as e:
+                self._recargar_hojas()
+                print(f"ERROR CRÍTICO: No se pudo modificar el ítem en la base SQLite. Detalles: {e}")
+                return False
+
+    @medido
+    def eliminar(self, id_alimento: int) -> bool:
+        """
+        Elimina un alimento.
+
+        Returns:
+            bool: True si el alimento existía y se eliminó.
+        """
+        try:
+            with self._candado, self._conexion:
+                return self._conexion.execute("DELETE FROM alimentos WHERE id = ?", (id_alimento,)).rowcount == 1
+        except sqlite3.Error as e:
+            print(f"ERROR CRÍTICO: No se pudo eliminar el ítem de la base SQLite. Detalles: {e}")
+            return False
+
+    def _recargar_hojas(self):
+        """
+        (Función auxiliar) Lee las hojas de la base. Se llama al abrirla y tras
+        una transacción fallida, que pudo dejar en memoria hojas que no se guardaron.
+        """
+        with self._candado:
+            self._ids_hojas.clear()
+            self._hojas.clear()
+            for id_hoja, categoria, tipo, procesamiento, encabezados in self._conexion.execute(
+                    "SELECT id, categoria, tipo, procesamiento, encabezados FROM hojas"):
+                self._ids_hojas[(categoria, tipo, procesamiento)] = id_hoja
+                self._hojas[id_hoja] = ((categoria, tipo, procesamiento), json.loads(encabezados))
+
+    # --- Lectura --- #
+
+    def obtener(self, id_alimento: int):
+        """Devuelve el alimento con ese id, o None si no existe."""
+        filas = self._consultar("a.id = ?", (id_alimento,))
+        return filas[0] if filas else None
+
+    @medido
+    def crear_lista(self) -> list:
+        """Devuelve todos los alimentos, como crear_lista_desde_csv."""
+        return self._consultar()
+
+    def iter_alimentos(self, categoria=None, tipo=None, procesamiento=None, predicate=None):
+        """
+        Recorre los alimentos que coinciden con la jerarquía (resuelta con el
+        índice de las hojas) y con 'predicate', como iter_alimentos.
+
+        Yields:
+            dict: Cada alimento, en el orden de la base.
+        """
+        condiciones, parametros = self._condiciones_jerarquia(categoria, tipo, procesamiento)
+        for fila in self._consultar(" AND ".join(condiciones), parametros):
+            if predicate is None or predicate(fila):
+                yield fila
+
+    def nombre_existe_en_hoja(self, categoria, tipo, procesamiento, nombre: str) -> bool:
+        """Indica si la hoja ya tiene un ítem con ese nombre (sin distinguir mayúsculas ni acentos)."""
+        id_hoja = self._ids_hojas.get((categoria, tipo, procesamiento))
+        if id_hoja is None:
+            return False
+        with self._candado:
+            return self._conexion.execute(
+                "SELECT 1 FROM alimentos WHERE nombre_normalizado = ? AND hoja = ? LIMIT 1",
+                (_normalizar_texto(nombre), id_hoja)).fetchone() is not None
+
+    def buscar_por_nombre(self, nombre: str) -> list:
+        """Alimentos con ese nombre, sin distinguir mayúsculas ni acentos."""
+        return self._consultar("a.nombre_normalizado = ?", (_normalizar_texto(nombre),))
+
+    def filtrar_por_calorias(self, minimo=None, maximo=None) -> list:
+        """Alimentos con calorías en [minimo, maximo], de menor a mayor."""
+        return self.consultar(min_cal=minimo, max_cal=maximo)
+
+    def top_calorias(self, n: int) -> list:
+        """Los 'n' alimentos más calóricos, de mayor a menor."""
+        return self.consultar(top=n)
+
+    @medido
+    def consultar(self, categoria=None, tipo=None, procesamiento=None, nombre=None,
+                  min_cal=None, max_cal=None, top=None) -> list:
+        """
+        Resuelve una consulta con los mismos filtros y el mismo orden que
+        Comandos.consultar sobre el catálogo: con rango de calorías, de menor a
+        mayor; con 'top', de mayor a menor; si no, en el orden de la base.
+        """
+        condiciones, parametros = self._condiciones_jerarquia(categoria, tipo, procesamiento)
+        if nombre is not None:
+            condiciones.append("a.nombre_normalizado = ?")
+            parametros.append(_normalizar_texto(nombre))
+        hay_rango = min_cal is not None or max_cal is not None
+        if hay_rango or top is not None:
+            condiciones.append("a.calorias IS NOT NULL")
+        if min_cal is not None:
+            condiciones.append("a.calorias >= ?")
+            parametros.append(min_cal)
+        if max_cal is not None:
+            condiciones.append("a.calorias <= ?")
+            parametros.append(max_cal)
+
+        if top is not None:
+            orden = f"a.calorias DESC, {_ORDEN_BASE}"
+        elif hay_rango and nombre is None:
+            orden = f"a.calorias, {_ORDEN_BASE}"
+        else:
+            orden = _ORDEN_BASE
+        return self._consultar(" AND ".join(condiciones), parametros, orden, top)
+
+    @medido
+    def resumen_calorias(self) -> dict:
+        """
+        Devuelve los resúmenes de calorías por nivel, con la misma forma y los
+        mismos valores que resumen_calorias sobre el árbol de CSV.
+        """
+        por_hoja = {}
+        with self._candado:
+            for id_hoja, nombre, calorias in self._conexion.execute(
+                    "SELECT hoja, nombre, calorias_100g FROM alimentos ORDER BY hoja, id"):
+                resumen = por_hoja.get(id_hoja)
+                if resumen is None:
+                    resumen = por_hoja[id_hoja] = _resumen_vacio()
+                _sumar_al_resumen(resumen, *_nombre_y_calorias({'nombre': nombre, 'calorias_100g': calorias}))
+            hojas = sorted(self._hojas.items(), key=lambda par: par[1][0])
+
+        por_categoria, por_tipo, todas = {}, {}, []
+        for id_hoja, ((categoria, tipo, _), _) in hojas:
+            resumen = por_hoja.get(id_hoja, _resumen_vacio())
+            todas.append(resumen)
+            por_categoria.setdefault(categoria, []).append(resumen)
+            por_tipo.setdefault((categoria, tipo), []).append(resumen)
+        return {
+            'total': combinar_resumenes(todas),
+            'categorias': {cat: combinar_resumenes(lista) for cat, lista in por_categoria.items()},
+            'tipos': {clave: combinar_resumenes(lista) for clave, lista in por_tipo.items()},
+        }
+
+    # --- Conversión desde y hacia el árbol de CSV --- #
+
+    @medido
+    def importar_arbol(self, ruta_base=RUTA_BASE_DATOS, nombre_archivo="items.csv") -> dict:
+        """
+        Reemplaza el contenido de la base SQLite por el del árbol de CSV
+        (aplicando los registros de cambios de cada hoja). Todo se hace en una
+        única transacción, insertando de a TAMANO_LOTE_SQLITE filas: si algo
+        falla, la base queda como estaba.
+
+        Returns:
+            dict: {'hojas', 'filas', 'omitidas'}, donde 'omitidas' son las hojas
+                que no están a tres niveles de la raíz (no tienen jerarquía).
+        """
+        ruta_base = os.path.abspath(ruta_base)
+        hojas = filas_totales = 0
+        omitidas = []
+        lote = []
+        with self._candado:
+            try:
+                with self._conexion:
+                    self._conexion.execute("DELETE FROM alimentos")
+                    self._conexion.execute("DELETE FROM hojas")
+                    self._ids_hojas.clear()
+                    self._hojas.clear()
+                    rutas_csv = obtener_rutas_csv(ruta_base, nombre_archivo)
+                    for ruta_archivo, leido, error in leer_hojas_en_paralelo(rutas_csv, leer_hoja):
+                        jerarquia = os.path.relpath(os.path.dirname(ruta_archivo), ruta_base).split(os.sep)
+                        if error is not None:
+                            raise OSError(f"No se pudo leer {ruta_archivo}: {error}")
+                        if len(jerarquia) != 3:
+                            omitidas.append(ruta_archivo)
+                            continue
+                        encabezados, filas, _ = leido
+                        id_hoja = self._id_hoja(*jerarquia, encabezados or ['nombre', 'calorias_100g'])
+                        lote.extend(self._valores_fila(id_hoja, fila) for _, fila in filas)
+                        hojas += 1
+                        filas_totales += len(filas)
+                        if len(lote) >= TAMANO_LOTE_SQLITE:
+                            self._insertar_lote(lote)
+                    self._insertar_lote(lote)
+            except (sqlite3.Error, OSError) as e:
+                self._recargar_hojas()
+                raise OSError(f"No se pudo importar el árbol a la base SQLite: {e}") from e
+        guardar_manifiesto(ruta_base)
+        for ruta_archivo in omitidas:
+            print(f"ADVERTENCIA: Se omitió {ruta_archivo}: no está en una carpeta categoria/tipo/procesamiento.")
+        return {'hojas': hojas, 'filas': filas_totales, 'omitidas': omitidas}
+
+    def _insertar_lote(self, lote: list):
+        """(Función auxiliar) Inserta las filas acumuladas y vacía el lote."""
+        self._conexion.executemany(
+            "INSERT INTO alimentos (hoja, nombre, nombre_normalizado, calorias_100g, calorias, extra) "
+            "VALUES (?, ?, ?, ?, ?, ?)", lote)
+        lote.clear()
+
+    @medido
+    def exportar_arbol(self, ruta_base=RUTA_BASE_DATOS, nombre_archivo="items.csv") -> dict:
+        """
+        Escribe cada hoja de la base SQLite como
+        ruta_base/categoria/tipo/procesamiento/items.csv con sobrescribir_archivo_csv
+        (con los encabezados y el orden de filas originales). Las hojas que ya
+        existen en el árbol se reemplazan; las que no están en la base no se tocan.
+        Cada hoja se reemplaza de forma atómica, y el fsync se hace una sola vez
+        para todas al terminar (salvo con la política 'nunca').
+
+        Returns:
+            dict: {'hojas', 'filas', 'fallidas'} con las rutas que no se pudieron escribir.
+        """
+        ruta_base = os.path.abspath(ruta_base)
+        hojas = filas_totales = 0
+        fallidas = []
+        with self._candado, durabilidad('nunca' if politica_durabilidad() == 'nunca' else 'agrupada'):
+            por_hoja = {}
+            for fila in self._consultar():
+                por_hoja.setdefault((fila.pop('categoria'), fila.pop('tipo'), fila.pop('procesamiento')), []).append(fila)
+                del fila['id']
+            for jerarquia, encabezados in sorted(self._hojas.values()):
+                ruta_directorio = os.path.join(ruta_base, *jerarquia)
+                ruta_archivo = os.path.join(ruta_directorio, nombre_archivo)
+                filas = por_hoja.get(jerarquia, [])
+                try:
+                    os.makedirs(ruta_directorio, exist_ok=True)
+                except OSError as e:
+                    print(f"ERROR CRÍTICO: No se pudo crear {ruta_directorio}. Detalles: {e}")
+                    fallidas.append(ruta_archivo)
+                    continue
+                if not sobrescribir_archivo_csv(ruta_archivo, encabezados, filas):
+                    fallidas.append(ruta_archivo)
+                    continue
+                hojas += 1
+                filas_totales += len(filas)
+        guardar_manifiesto(ruta_base)
+        return {'hojas': hojas, 'filas': filas_totales, 'fallidas': fallidas}
@@ -0,0 +1,1234 @@
+from Manejo_archivo import *
+from Manejo_archivo import _registrar_filas_leidas, _normalizar_texto
+from array import array
+import atexit, json, mmap, struct, sys
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+from itertools import compress
+import math
+import os, csv
+
+# Columnas de la jerarquía que se reconstruyen a partir de la ruta de la hoja.
+CAMPOS_JERARQUIA = ('categoria', 'tipo', 'procesamiento')
+
+# Cómo se reconstruye el texto original de 'calorias_100g' a partir del float.
+_FORMATO_REPR = 0      # "137.0" -> repr(137.0)
+_FORMATO_ENTERO = 1    # "121"   -> str(int(121.0))
+_FORMATO_LITERAL = 2   # cualquier otro texto, guardado aparte
+
+# Firma de una hoja que el catálogo conocía y ya no existe (sus filas se dieron de baja).
+HOJA_QUITADA = ()
+
+# Búsqueda aproximada de nombres (IndiceBusqueda).
+SIMILITUD_MINIMA = 0.3         # parecido mínimo (trigramas en común / trigramas en total)
+MAX_CANDIDATOS_PARECIDOS = 2000  # candidatos a los que se les calcula el parecido exacto
+MAX_IDS_PARECIDOS = 200_000      # ids de las listas de trigramas que se cuentan por consulta
+
+
+class TablaCadenas:
+    """
+    Tabla de strings internados: cada valor distinto se guarda una sola vez
+    y las filas solo guardan su código entero.
+    """
+    def __init__(self):
+        self.valores = []
+        self._codigos = {}
+
+    def codigo(self, valor: str) -> int:
+        """Devuelve el código de 'valor', agregándolo a la tabla si es nuevo."""
+        codigo = self._codigos.get(valor)
+        if codigo is None:
+            codigo = len(self.valores)
+            self.valores.append(valor)
+            self._codigos[valor] = codigo
+        return codigo
+
+    def buscar(self, valor: str):
+        """Devuelve el código de 'valor' o None si no está en la tabla."""
+        return self._codigos.get(valor)
+
+    @classmethod
+    def desde_lista(cls, valores: list):
+        """Arma una tabla con los valores dados, en ese orden de códigos."""
+        tabla = cls()
+        tabla.valores = list(valores)
+        tabla._codigos = {valor: codigo for codigo, valor in enumerate(tabla.valores)}
+        return tabla
+
+    def __getitem__(self, codigo: int) -> str:
+        return self.valores[codigo]
+
+    def __len__(self):
+        return len(self.valores)
+
+
+def _trigramas(clave: str) -> set:
+    """(Función auxiliar) Trigramas de una clave, con bordes para que pesen el comienzo y el final."""
+    texto = f"  {clave} "
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+class IndiceBusqueda:
+    """
+    Índice de nombres normalizados para buscar por prefijo y por parecido
+    (tolerando errores de tipeo).
+
+    - Prefijos: las claves se guardan en una lista ordenada y un prefijo se
+      resuelve con bisect, igual que un trie (O(log n) más los resultados) pero
+      sin un diccionario por nodo.
+    - Parecido: cada trigrama apunta a un array('I') con los ids de las claves
+      que lo contienen. Los candidatos salen de las listas más cortas de los
+      trigramas consultados, así que los trigramas muy comunes no se recorren.
+
+    Se arma recién en la primera búsqueda aproximada; con millones de nombres
+    eso lleva unos segundos, y después cada consulta tarda milisegundos.
+
+    Las claves que se quitan dejan de existir en el índice, pero sus ids se
+    filtran de las listas de trigramas recién al consultar.
+    """
+    def __init__(self, claves=()):
+        self._ids = {}      # clave -> id
+        self._claves = []   # id -> clave (None si se quitó)
+        self._trigramas = {}  # trigrama -> array('I') de ids
+        for clave in claves:
+            self._registrar(clave)
+        self._ordenadas = sorted(self._ids)
+
+    def _registrar(self, clave: str):
+        id_clave = len(self._claves)
+        self._ids[clave] = id_clave
+        self._claves.append(clave)
+        for trigrama in _trigramas(clave):
+            lista = self._trigramas.get(trigrama)
+            if lista is None:
+                lista = self._trigramas[trigrama] = array('I')
+            lista.append(id_clave)
+
+    def agregar(self, clave: str):
+        if clave not in self._ids:
+            self._registrar(clave)
+            insort(self._ordenadas, clave)
+
+    def quitar(self, clave: str):
+        id_clave = self._ids.pop(clave, None)
+        if id_clave is None:
+            return
+        self._claves[id_clave] = None
+        lugar = bisect_left(self._ordenadas, clave)
+        if lugar < len(self._ordenadas) and self._ordenadas[lugar] == clave:
+            del self._ordenadas[lugar]
+
+    def __len__(self):
+        return len(self._ids)
+
+    def por_prefijo(self, prefijo: str, limite: int = 10) -> list:
+        """Claves que empiezan con 'prefijo', en orden alfabético."""
+        desde = bisect_left(self._ordenadas, prefijo)
+        resultado = []
+        for clave in self._ordenadas[desde:desde + limite]:
+            if not clave.startswith(prefijo):
+                break
+            resultado.append(clave)
+        return resultado
+
+    def parecidas(self, texto: str, limite: int = 10, minimo: float = SIMILITUD_MINIMA) -> list:
+        """
+        Claves parecidas a 'texto', de la más a la menos parecida.
+
+        Returns:
+            list: Tuplas (parecido, clave) con parecido entre 0 y 1.
+        """
+        consulta = _trigramas(texto)
+        # Una clave con parecido >= minimo comparte al menos 'necesarios'
+        # trigramas con la consulta, así que aparece en alguna de las
+        # len(consulta) - necesarios + 1 listas más cortas.
+        necesarios = max(1, math.ceil(minimo * len(consulta)))
+        listas = sorted((self._trigramas[t] for t in consulta if t in self._trigramas), key=len)
+        coincidencias = Counter()
+        contados = 0
+        for lista in listas[:len(consulta) - necesarios + 1]:
+            # En bases enormes con trigramas muy repetidos se corta antes, para
+            # que la consulta siga tardando milisegundos (a costa de algún candidato).
+            if contados and contados + len(lista) > MAX_IDS_PARECIDOS:
+                break
+            coincidencias.update(lista)
+            contados += len(lista)
+
+        resultado = []
+        for id_clave, _ in coincidencias.most_common(MAX_CANDIDATOS_PARECIDOS):
+            clave = self._claves[id_clave]
+            if clave is None:
+                continue
+            trigramas = _trigramas(clave)
+            comunes = len(consulta & trigramas)
+            parecido = comunes / (len(consulta) + len(trigramas) - comunes)
+            if parecido >= minimo:
+                resultado.append((parecido, clave))
+        resultado.sort(key=lambda par: (-par[0], par[1]))
+        return resultado[:limite]
+
+
+class FilaCatalogo:
+    """
+    Vista liviana de una fila del catálogo. Se comporta como el diccionario
+    que devuelve crear_lista_desde_csv (get, [], in, copy), pero no guarda
+    datos propios: lee las columnas del catálogo al vuelo.
+    """
+    __slots__ = ('_catalogo', 'indice')
+
+    def __init__(self, catalogo, indice: int):
+        self._catalogo = catalogo
+        self.indice = indice
+
+    def __getitem__(self, clave):
+        return self._catalogo.valor(self.indice, clave)
+
+    def get(self, clave, defecto=None):
+        try:
+            return self._catalogo.valor(self.indice, clave)
+        except KeyError:
+            return defecto
+
+    def __contains__(self, clave):
+        return clave in self.keys()
+
+    def keys(self):
+        return self._catalogo.columnas(self.indice)
+
+    def items(self):
+        return [(clave, self[clave]) for clave in self.keys()]
+
+    def copy(self) -> dict:
+        """Devuelve un diccionario común con los datos de la fila."""
+        return dict(self.items())
+
+    @property
+    def calorias(self) -> float:
+        """Calorías como float (NaN si el valor del CSV no era numérico)."""
+        return self._catalogo.calorias[self.indice]
+
+    @property
+    def ruta_hoja(self) -> str:
+        """Ruta del 'items.csv' del que proviene la fila."""
+        return self._catalogo.ruta_hoja(self.indice)
+
+    @property
+    def firma(self):
+        """Firma de la hoja con la que coincide 'posicion' (None si se desconoce)."""
+        return self._catalogo.firma(self.indice)
+
+    @property
+    def posicion(self) -> int:
+        """Posición de la fila dentro de su 'items.csv' base (0 = primera fila de datos)."""
+        return self._catalogo.posicion[self.indice]
+
+    def __eq__(self, otra):
+        if isinstance(otra, FilaCatalogo):
+            return otra._catalogo is self._catalogo and otra.indice == self.indice
+        return NotImplemented
+
+    def __hash__(self):
+        return hash((id(self._catalogo), self.indice))
+
+    def __repr__(self):
+        return f"FilaCatalogo({self.copy()!r})"
+
+
+class CatalogoColumnar:
+    """
+    Catálogo de alimentos guardado por columnas en lugar de un diccionario
+    por fila:
+
+    - calorias: array('d') con el valor numérico (NaN si no era numérico).
+    - categoria/tipo/procesamiento: tablas de strings internados más un
+      array de códigos enteros por fila.
+    - nombre: todos los nombres codificados en UTF-8 dentro de un único
+      bytearray, con arrays de inicio y largo por fila.
+    - hoja/posicion: de qué 'items.csv' viene cada fila y en qué posición.
+
+    Ofrece las mismas operaciones de lectura que usan Sub_Menus y Utilidades
+    sobre la lista de diccionarios (len, iteración, item.get(...)) y algunos
+    filtros directos sobre las columnas.
+
+    Las filas eliminadas no se borran de las columnas: se marcan como muertas
+    en 'vivo' y todas las consultas las saltean. Así los índices de las demás
+    filas no cambian. Las posiciones son las del CSV base, que tampoco cambian
+    con las bajas (van al registro de cambios) hasta que la hoja se compacta.
+
+    Además mantiene un índice de nombres normalizados (con las mismas reglas
+    que normalizar_texto_para_ruta) que permite buscar un ítem por nombre sin
+    recorrer todo el catálogo.
+    """
+    def __init__(self):
+        self.categorias = TablaCadenas()
+        self.tipos = TablaCadenas()
+        self.procesamientos = TablaCadenas()
+        self.cod_categoria = array('I')
+        self.cod_tipo = array('I')
+        self.cod_procesamiento = array('I')
+        self.calorias = array('d')
+        self._nombres = bytearray()
+        self._nombre_inicio = array('Q')
+        self._nombre_largo = array('I')
+        self._formato_calorias = bytearray()
+        self._calorias_literales = {}  # indice -> texto original
+        self._extras = {}  # indice -> dict con columnas adicionales del CSV
+        self.hojas = TablaCadenas()
+        self.cod_hoja = array('I')
+        self.posicion = array('I')
+        self.vivo = bytearray()
+        self._filas_por_hoja = {}  # cod_hoja -> set de índices vivos (None: se arma al usarlo)
+        self._siguiente_posicion = {}  # cod_hoja -> cantidad de filas del CSV base
+        self._firmas = {}  # cod_hoja -> firma_hoja() con la que coinciden las posiciones
+        self._indice_nombres = {}  # nombre normalizado -> lista de índices (None: se arma al usarlo)
+        self._busqueda = None  # IndiceBusqueda sobre las claves de _indice_nombres (se arma al usarlo)
+        # Índice ordenado de calorías: valores y sus índices de fila, ordenados
+        # por (calorías, índice). Solo filas vivas con calorías numéricas. Se
+        # arma recién en la primera consulta que lo necesita (None hasta entonces).
+        self._orden_valores = None
+        self._orden_indices = None
+        self._cantidad_vivos = 0
+
+    # --- Escritura --- #
+
+    def agregar(self, nombre: str, calorias_100g, categoria: str, tipo: str, procesamiento: str,
+                extras: dict = None, ruta_hoja: str = None, firma_anterior=None, firma_nueva=None) -> int:
+        """
+        Agrega una fila al catálogo. Si se indica 'ruta_hoja', la fila queda
+        registrada como la última de ese 'items.csv'.
+
+        Args:
+            firma_anterior (tuple, optional): Firma de la hoja antes de escribir
+                el alta (firma_hoja_si_existe, con el candado de la hoja tomado),
+                o None si la hoja no existía.
+            firma_nueva (tuple, optional): Firma de la hoja después del alta, si
+                ya se leyó con el candado tomado. Si no se indica, se lee acá:
+                en ese caso hay que llamar con el candado de la hoja tomado.
+
+        Returns:
+            int: El índice de la nueva fila.
+        """
+        if ruta_hoja is None:
+            ruta_hoja = os.path.join(RUTA_BASE_DATOS, categoria, tipo, procesamiento, "items.csv")
+        cod_hoja = self.hojas.codigo(ruta_hoja)
+        vigente = self._firma_vigente(cod_hoja, firma_anterior)
+        indice = self._agregar_con_codigos(
+            nombre, calorias_100g,
+            self.categorias.codigo(categoria),
+            self.tipos.codigo(tipo),
+            self.procesamientos.codigo(procesamiento),
+            cod_hoja,
+            extras,
+        )
+        self._anotar_alta(cod_hoja, ruta_hoja, vigente, firma_nueva)
+        return indice
+
+    def _firma_vigente(self, cod_hoja: int, firma_anterior) -> bool:
+        """
+        (Función auxiliar) Indica si las posiciones que el catálogo conoce de
+        una hoja coincidían con el archivo antes de escribirle un alta, cuya
+        firma de entonces era 'firma_anterior' (None si la hoja no existía).
+        """
+        conocida = self._firmas.get(cod_hoja, HOJA_QUITADA)
+        if conocida == HOJA_QUITADA:
+            # Hoja sin filas en el catálogo: vale solo si el archivo tampoco existía.
+            return firma_anterior is None
+        return conocida is not None and conocida == firma_anterior
+
+    def _anotar_alta(self, cod_hoja: int, ruta_hoja: str, vigente: bool, firma_nueva=None):
+        """
+        (Función auxiliar) Si el catálogo estaba al día con la hoja, el alta que
+        acabamos de registrar es su único cambio y se anota la firma nueva para
+        seguir confiando en las posiciones. Si no, otro proceso cambió la hoja
+        y las posiciones (también la de las filas nuevas) pueden estar corridas:
+        se olvida la firma, y la próxima edición ubica la fila leyendo el
+        archivo y la próxima actualización vuelve a leer la hoja.
+        """
+        if not vigente:
+            self._firmas[cod_hoja] = None
+            return
+        try:
+            self._firmas[cod_hoja] = firma_nueva if firma_nueva is not None else firma_hoja(ruta_hoja)
+        except OSError:
+            self._firmas[cod_hoja] = None
+
+    def _agregar_con_codigos(self, nombre, calorias_100g, cod_cat, cod_tipo, cod_proc, cod_hoja, extras=None, posicion=None) -> int:
+        indice = len(self.calorias)
+        nombre = nombre if nombre is not None else ""
+        self._guardar_nombre(nombre)
+        self._guardar_calorias(calorias_100g)
+        self.cod_categoria.append(cod_cat)
+        self.cod_tipo.append(cod_tipo)
+        self.cod_procesamiento.append(cod_proc)
+        if extras:
+            self._extras[indice] = extras
+
+        if posicion is None:
+            posicion = self._siguiente_posicion.get(cod_hoja, 0)
+        self._siguiente_posicion[cod_hoja] = max(self._siguiente_posicion.get(cod_hoja, 0), posicion + 1)
+        self.cod_hoja.append(cod_hoja)
+        self.posicion.append(posicion)
+        if self._filas_por_hoja is not None:
+            self._filas_por_hoja.setdefault(cod_hoja, set()).add(indice)
+        self.vivo.append(1)
+        self._cantidad_vivos += 1
+        self._indexar_nombre(indice, nombre)
+        self._indexar_calorias(indice)
+        return indice
+
+    def agregar_lote(self, ruta_hoja: str, categoria: str, tipo: str, procesamiento: str, filas: list,
+                     firma_anterior=None):
+        """
+        Agrega de una vez muchas filas recién escritas al final de una hoja.
+        Debe llamarse con el candado de la hoja tomado, justo después de escribir.
+
+        Args:
+            filas (list): Lista de tuplas (nombre, calorias_100g).
+            firma_anterior (tuple, optional): Firma de la hoja antes de escribir
+                las filas, o None si la hoja no existía (ver agregar).
+        """
+        codigos = (self.categorias.codigo(categoria), self.tipos.codigo(tipo), self.procesamientos.codigo(procesamiento))
+        cod_hoja = self.hojas.codigo(ruta_hoja)
+        vigente = self._firma_vigente(cod_hoja, firma_anterior)
+        if self._orden_indices is not None and len(filas) > len(self._orden_indices) // 16:
+            # Para lotes grandes sale más barato volver a ordenar todo en la próxima consulta.
+            self._orden_valores = self._orden_indices = None
+        for nombre, calorias in filas:
+            self._agregar_con_codigos(nombre, calorias, *codigos, cod_hoja)
+        self._anotar_alta(cod_hoja, ruta_hoja, vigente)
+
+    def modificar(self, indice: int, nombre: str = None, calorias_100g=None):
+        """Actualiza el nombre y/o las calorías de una fila, manteniendo el índice de nombres."""
+        if nombre is not None:
+            self._quitar_de_indice_nombres(indice)
+            self._guardar_nombre(nombre, indice)
+            self._indexar_nombre(indice, nombre)
+        if calorias_100g is not None:
+            self._desindexar_calorias(indice)
+            self._guardar_calorias(calorias_100g, indice)
+            self._indexar_calorias(indice)
+
+    def eliminar(self, indice: int):
+        """Marca una fila como eliminada."""
+        if not self.vivo[indice]:
+            return
+        self._desindexar_calorias(indice)
+        self.vivo[indice] = 0
+        self._cantidad_vivos -= 1
+        self._quitar_de_indice_nombres(indice)
+        if self._filas_por_hoja is not None:
+            self._filas_por_hoja[self.cod_hoja[indice]].discard(indice)
+
+    def _indexar_nombre(self, indice: int, nombre: str):
+        if self._indice_nombres is None:
+            return
+        clave = _normalizar_texto(nombre)
+        indices = self._indice_nombres.get(clave)
+        if indices is not None:
+            indices.append(indice)
+            return
+        self._indice_nombres[clave] = [indice]
+        if self._busqueda is not None:
+            self._busqueda.agregar(clave)
+
+    def _quitar_de_indice_nombres(self, indice: int):
+        if self._indice_nombres is None:
+            return
+        clave = normalizar_texto_para_ruta(self.nombre(indice))
+        indices = self._indice_nombres.get(clave)
+        if indices is not None:
+            indices.remove(indice)
+            if not indices:
+                del self._indice_nombres[clave]
+                if self._busqueda is not None:
+                    self._busqueda.quitar(clave)
+
+    def _nombres_indexados(self) -> dict:
+        """Devuelve el índice de nombres normalizados, armándolo la primera vez."""
+        if self._indice_nombres is None:
+            self._indice_nombres = {}
+            for indice in self._indices_vivos():
+                self._indice_nombres.setdefault(_normalizar_texto(self.nombre(indice)), []).append(indice)
+        return self._indice_nombres
+
+    def _indice_calorias(self):
+        """
+        Devuelve (valores, índices) del índice ordenado de calorías,
+        armándolo la primera vez con un único ordenamiento.
+        """
+        if self._orden_indices is None:
+            validos = [i for i in self._indices_vivos() if not math.isnan(self.calorias[i])]
+            # El ordenamiento es estable: a igual calorías quedan por índice.
+            validos.sort(key=self.calorias.__getitem__)
+            self._orden_indices = array('I', validos)
+            self._orden_valores = array('d', (self.calorias[i] for i in validos))
+        return self._orden_valores, self._orden_indices
+
+    def _posicion_en_indice(self, indice: int) -> int:
+        """Lugar que ocupa (u ocuparía) 'indice' dentro del índice de calorías."""
+        valor = self.calorias[indice]
+        desde = bisect_left(self._orden_valores, valor)
+        hasta = bisect_right(self._orden_valores, valor, desde)
+        return bisect_left(self._orden_indices, indice, desde, hasta)
+
+    def _indexar_calorias(self, indice: int):
+        if self._orden_indices is None or not self.vivo[indice] or math.isnan(self.calorias[indice]):
+            return
+        lugar = self._posicion_en_indice(indice)
+        self._orden_valores.insert(lugar, self.calorias[indice])
+        self._orden_indices.insert(lugar, indice)
+
+    def _desindexar_calorias(self, indice: int):
+        if self._orden_indices is None or not self.vivo[indice] or math.isnan(self.calorias[indice]):
+            return
+        lugar = self._posicion_en_indice(indice)
+        del self._orden_valores[lugar]
+        del self._orden_indices[lugar]
+
+    @medido
+    def buscar_por_nombre(self, nombre: str) -> list:
+        """
+        Devuelve las filas cuyo nombre normalizado coincide con 'nombre'.
+        Es una búsqueda en un diccionario, no un recorrido del catálogo.
+        """
+        indices = self._nombres_indexados().get(normalizar_texto_para_ruta(nombre), [])
+        return [FilaCatalogo(self, i) for i in indices]
+
+    def nombre_en_hoja(self, nombre: str, ruta_hoja: str):
+        """
+        Indica si la hoja ya tiene un ítem con ese nombre (normalizado), con
+        una búsqueda en el índice de nombres.
+
+        Returns:
+            bool | None: None si el catálogo no puede responder sin leer la
+                hoja: el índice de nombres no está armado o la hoja cambió por
+                fuera de este catálogo (su firma no coincide).
+        """
+        if self._indice_nombres is None:
+            return None
+        cod_hoja = self.hojas.buscar(ruta_hoja)
+        try:
+            firma = firma_hoja(ruta_hoja)
+        except FileNotFoundError:
+            return False
+        if cod_hoja is None or self._firmas.get(cod_hoja) != firma:
+            return None
+        indices = self._indice_nombres.get(normalizar_texto_para_ruta(nombre), ())
+        return any(self.cod_hoja[i] == cod_hoja for i in indices)
+
+    @medido
+    def buscar_aproximado(self, nombre: str, limite: int = 10) -> list:
+        """
+        Devuelve hasta 'limite' filas cuyo nombre se parece a 'nombre': primero
+        las que coinciden exactamente, después las que empiezan con él y por
+        último las que se parecen (errores de tipeo, palabras cambiadas de
+        lugar), de la más a la menos parecida. Todo se compara normalizado.
+        """
+        nombres = self._nombres_indexados()
+        if self._busqueda is None:
+            self._busqueda = IndiceBusqueda(nombres)
+        consulta = normalizar_texto_para_ruta(nombre)
+        if not consulta:
+            return []
+        claves = [consulta] if consulta in nombres else []
+        claves += self._busqueda.por_prefijo(consulta, limite)
+        claves += [clave for _, clave in self._busqueda.parecidas(consulta, limite)]
+
+        filas, vistas = [], set()
+        for clave in claves:
+            if clave in vistas:
+                continue
+            vistas.add(clave)
+            for indice in nombres.get(clave, ()):
+                filas.append(FilaCatalogo(self, indice))
+                if len(filas) == limite:
+                    return filas
+        return filas
+
+    def ruta_hoja(self, indice: int) -> str:
+        return self.hojas[self.cod_hoja[indice]]
+
+    # --- Sincronización con el registro de cambios --- #
+
+    def firma(self, indice: int):
+        """Firma de la hoja de una fila con la que coinciden las posiciones (None si se desconoce)."""
+        return self._firmas.get(self.cod_hoja[indice])
+
+    def registrar_firma(self, ruta_hoja: str, firma):
+        """Anota la firma de una hoja después de que este proceso la modificó."""
+        cod_hoja = self.hojas.buscar(ruta_hoja)
+        if cod_hoja is not None:
+            self._firmas[cod_hoja] = firma
+
+    def aplicar_compactacion(self, ruta_hoja: str, mapeo: dict, firma_anterior, firma_nueva):
+        """
+        Renumera las posiciones de una hoja que fue compactada. Solo se aplica
+        si el catálogo estaba al día con la hoja; si no, se olvida la firma y la
+        próxima edición ubicará la fila leyendo el archivo.
+        """
+        cod_hoja = self.hojas.buscar(ruta_hoja)
+        if cod_hoja is None:
+            return
+        if self._firmas.get(cod_hoja) != firma_anterior:
+            self._firmas[cod_hoja] = None
+            return
+        for indice in self._filas_de_hoja(cod_hoja):
+            nueva = mapeo.get(self.posicion[indice])
+            if nueva is None:
+                self._firmas[cod_hoja] = None
+                return
+            self.posicion[indice] = nueva
+        self._siguiente_posicion[cod_hoja] = len(mapeo)
+        self._firmas[cod_hoja] = firma_nueva
+
+    def _filas_de_hoja(self, cod_hoja: int) -> set:
+        """(Función auxiliar) Índices vivos de una hoja (arma el índice por hoja si hace falta)."""
+        if self._filas_por_hoja is None:
+            self._filas_por_hoja = {}
+            for indice in self._indices_vivos():
+                self._filas_por_hoja.setdefault(self.cod_hoja[indice], set()).add(indice)
+        return self._filas_por_hoja.get(cod_hoja, set())
+
+    def actualizar_hoja(self, ruta_hoja: str, hoja_leida: tuple) -> int:
+        """
+        Deja las filas de una hoja iguales a 'hoja_leida' (lo que devuelve
+        _leer_hoja_cruda) tocando solo lo que cambió: las filas de cada
+        posición que ya estaba se modifican en su lugar (no cambian de índice
+        ni de orden), las posiciones nuevas se agregan al final y las que ya no
+        están se dan de baja.
+
+        Returns:
+            int: Cantidad de filas agregadas, modificadas o eliminadas.
+        """
+        firma, filas, total = hoja_leida
+        cod_hoja = self.hojas.codigo(ruta_hoja)
+        anteriores, sobrantes = {}, []
+        for indice in self._filas_de_hoja(cod_hoja):
+            if self.posicion[indice] in anteriores:
+                sobrantes.append(indice)
+            else:
+                anteriores[self.posicion[indice]] = indice
+        if self._orden_indices is not None and len(filas) - len(anteriores) > len(self._orden_indices) // 16:
+            # Igual que en agregar_lote: con muchas filas nuevas conviene reordenar todo después.
+            self._orden_valores = self._orden_indices = None
+
+        codigos = None
+        cambios = 0
+        for posicion, nombre, calorias, extras in filas:
+            nombre = nombre if nombre is not None else ""
+            calorias = str(calorias) if calorias is not None else ""
+            indice = anteriores.pop(posicion, None)
+            if indice is None:
+                if codigos is None:
+                    categoria, tipo, procesamiento = _jerarquia_de_ruta(ruta_hoja)
+                    codigos = (self.categorias.codigo(categoria), self.tipos.codigo(tipo),
+                               self.procesamientos.codigo(procesamiento))
+                self._agregar_con_codigos(nombre, calorias, *codigos, cod_hoja, extras, posicion)
+                cambios += 1
+                continue
+            distinta = False
+            if self.nombre(indice) != nombre:
+                self.modificar(indice, nombre=nombre)
+                distinta = True
+            if self.calorias_texto(indice) != calorias:
+                self.modificar(indice, calorias_100g=calorias)
+                distinta = True
+            if (self._extras.get(indice) or None) != (extras or None):
+                if extras:
+                    self._extras[indice] = extras
+                else:
+                    self._extras.pop(indice, None)
+                distinta = True
+            cambios += distinta
+        for indice in [*anteriores.values(), *sobrantes]:
+            self.eliminar(indice)
+            cambios += 1
+        self._siguiente_posicion[cod_hoja] = total
+        self._firmas[cod_hoja] = firma
+        return cambios
+
+    def quitar_hoja(self, ruta_hoja: str) -> int:
+        """
+        Da de baja todas las filas de una hoja que ya no existe. La hoja queda
+        con la firma HOJA_QUITADA.
+
+        Returns:
+            int: Cantidad de filas eliminadas.
+        """
+        cod_hoja = self.hojas.buscar(ruta_hoja)
+        if cod_hoja is None:
+            return 0
+        indices = list(self._filas_de_hoja(cod_hoja))
+        for indice in indices:
+            self.eliminar(indice)
+        self._firmas[cod_hoja] = HOJA_QUITADA
+        self._siguiente_posicion[cod_hoja] = 0
+        return len(indices)
+
+    def _guardar_nombre(self, nombre: str, indice: int = None):
+        datos = nombre.encode('utf-8')
+        inicio = len(self._nombres)
+        self._nombres += datos
+        if indice is None:
+            self._nombre_inicio.append(inicio)
+            self._nombre_largo.append(len(datos))
+        else:
+            # Al renombrar, el texto viejo queda sin referencia dentro del bytearray.
+            self._nombre_inicio[indice] = inicio
+            self._nombre_largo[indice] = len(datos)
+
+    def _guardar_calorias(self, calorias_100g, indice: int = None):
+        texto = str(calorias_100g) if calorias_100g is not None else ""
+        try:
+            valor = float(texto)
+        except ValueError:
+            valor = math.nan
+        if texto == repr(valor):
+            formato = _FORMATO_REPR
+        elif valor.is_integer() and texto == str(int(valor)):
+            formato = _FORMATO_ENTERO
+        else:
+            formato = _FORMATO_LITERAL
+
+        if indice is None:
+            indice = len(self.calorias)
+            self.calorias.append(valor)
+            self._formato_calorias.append(formato)
+        else:
+            self.calorias[indice] = valor
+            self._formato_calorias[indice] = formato
+            self._calorias_literales.pop(indice, None)
+        if formato == _FORMATO_LITERAL:
+            self._calorias_literales[indice] = texto
+
+    # --- Lectura por fila --- #
+
+    def nombre(self, indice: int) -> str:
+        inicio = self._nombre_inicio[indice]
+        return self._nombres[inicio:inicio + self._nombre_largo[indice]].decode('utf-8')
+
+    def calorias_texto(self, indice: int) -> str:
+        """Devuelve 'calorias_100g' tal como estaba escrito en el CSV."""
+        formato = self._formato_calorias[indice]
+        if formato == _FORMATO_REPR:
+            return repr(self.calorias[indice])
+        if formato == _FORMATO_ENTERO:
+            return str(int(self.calorias[indice]))
+        return self._calorias_literales[indice]
+
+    def valor(self, indice: int, clave: str):
+        if clave == 'nombre':
+            return self.nombre(indice)
+        if clave == 'calorias_100g':
+            return self.calorias_texto(indice)
+        if clave == 'categoria':
+            return self.categorias[self.cod_categoria[indice]]
+        if clave == 'tipo':
+            return self.tipos[self.cod_tipo[indice]]
+        if clave == 'procesamiento':
+            return self.procesamientos[self.cod_procesamiento[indice]]
+        extras = self._extras.get(indice)
+        if extras is not None and clave in extras:
+            return extras[clave]
+        raise KeyError(clave)
+
+    def columnas(self, indice: int) -> tuple:
+        base = ('nombre', 'calorias_100g') + CAMPOS_JERARQUIA
+        extras = self._extras.get(indice)
+        return base + tuple(extras) if extras else base
+
+    # --- Interfaz de secuencia (compatible con la lista de diccionarios) --- #
+
+    def __len__(self):
+        return self._cantidad_vivos
+
+    def __bool__(self):
+        return self._cantidad_vivos > 0
+
+    def fila(self, indice: int) -> FilaCatalogo:
+        """Devuelve la fila con ese índice interno (estable aunque se eliminen otras)."""
+        if not 0 <= indice < len(self.vivo) or not self.vivo[indice]:
+            raise IndexError(indice)
+        return FilaCatalogo(self, indice)
+
+    def _indices_vivos(self):
+        return compress(range(len(self.vivo)), self.vivo)
+
+    def __iter__(self):
+        for indice in self._indices_vivos():
+            yield FilaCatalogo(self, indice)
+
+    def append(self, item: dict):
+        """Agrega un diccionario con el mismo formato que crear_lista_desde_csv."""
+        extras = {k: v for k, v in item.items() if k not in ('nombre', 'calorias_100g') + CAMPOS_JERARQUIA}
+        self.agregar(item.get('nombre', ''), item.get('calorias_100g'), item.get('categoria', ''),
+                     item.get('tipo', ''), item.get('procesamiento', ''), extras or None, item.get('ruta_hoja'))
+
+    # --- Consultas sobre columnas --- #
+
+    def lista_categorias(self) -> list:
+        """Categorías presentes en el catálogo, ordenadas."""
+        presentes = set(compress(self.cod_categoria, self.vivo))
+        return sorted(self.categorias[c] for c in presentes)
+
+    def lista_tipos(self, categoria: str) -> list:
+        """Tipos presentes dentro de una categoría, ordenados."""
+        cod_cat = self.categorias.buscar(categoria)
+        if cod_cat is None:
+            return []
+        presentes = {t for c, t in compress(zip(self.cod_categoria, self.cod_tipo), self.vivo) if c == cod_cat}
+        return sorted(self.tipos[t] for t in presentes)
+
+    def lista_procesamientos(self, categoria: str, tipo: str) -> list:
+        """Procesamientos presentes dentro de una categoría y tipo, ordenados."""
+        cod_cat = self.categorias.buscar(categoria)
+        cod_tipo = self.tipos.buscar(tipo)
+        if cod_cat is None or cod_tipo is None:
+            return []
+        presentes = {
+            p for c, t, p in compress(zip(self.cod_categoria, self.cod_tipo, self.cod_procesamiento), self.vivo)
+            if c == cod_cat and t == cod_tipo
+        }
+        return sorted(self.procesamientos[p] for p in presentes)
+
+    @medido
+    def filtrar(self, categoria: str = None, tipo: str = None, procesamiento: str = None) -> list:
+        """
+        Devuelve las filas que coinciden con los niveles de jerarquía indicados.
+        Los niveles en None no filtran.
+        """
+        condiciones = []
+        for valor, tabla, codigos in (
+            (categoria, self.categorias, self.cod_categoria),
+            (tipo, self.tipos, self.cod_tipo),
+            (procesamiento, self.procesamientos, self.cod_procesamiento),
+        ):
+            if valor is None:
+                continue
+            codigo = tabla.buscar(valor)
+            if codigo is None:
+                return []
+            condiciones.append((codigos, codigo))
+
+        return [
+            FilaCatalogo(self, i) for i in self._indices_vivos()
+            if all(codigos[i] == codigo for codigos, codigo in condiciones)
+        ]
+
+    @medido
+    def filtrar_por_calorias(self, minimo: float, maximo: float) -> list:
+        """
+        Filas con calorías numéricas dentro de [minimo, maximo], de menor a
+        mayor. Con el índice ordenado cuesta O(log n + k) para k resultados.
+        """
+        valores, indices = self._indice_calorias()
+        desde = bisect_left(valores, minimo)
+        hasta = bisect_right(valores, maximo, desde)
+        return [FilaCatalogo(self, i) for i in indices[desde:hasta]]
+
+    @medido
+    def top_calorias(self, n: int) -> list:
+        """
+        Las 'n' filas con más calorías (se ignoran las no numéricas). Se toman
+        del final del índice ordenado, sin copiar ni ordenar el catálogo; a
+        igual calorías quedan en el orden del catálogo.
+        """
+        valores, indices = self._indice_calorias()
+        elegidos = []
+        hasta = len(indices)
+        while hasta > 0 and len(elegidos) < n:
+            desde = bisect_left(valores, valores[hasta - 1], 0, hasta)
+            elegidos.extend(indices[desde:hasta])
+            hasta = desde
+        return [FilaCatalogo(self, i) for i in elegidos[:n]]
+
+
+@medido
+def crear_catalogo_desde_csv(ruta_base, nombre_archivo="items.csv", hilos=None, procesos=None) -> CatalogoColumnar:
+    """
+    Versión columnar de crear_lista_desde_csv: lee todas las hojas y arma un
+    CatalogoColumnar en lugar de una lista de diccionarios.
+
+    Args:
+        ruta_base (str): El directorio raíz donde buscar.
+        hilos (int, optional): Hilos de lectura (por defecto HILOS_CARGA).
+        procesos (int, optional): Procesos para parsear hojas grandes (por defecto PROCESOS_CARGA).
+
+    Returns:
+        CatalogoColumnar: El catálogo (vacío si no hay datos).
+    """
+    catalogo = CatalogoColumnar()
+    rutas_csv = obtener_rutas_csv(ruta_base, nombre_archivo)
+    if not rutas_csv:
+        print(f"ADVERTENCIA: No se encontraron archivos '{nombre_archivo}' en '{ruta_base}'.")
+        return catalogo
+
+    # Las hojas se leen (en paralelo si se pidió) y se agregan en orden.
+    for ruta_archivo, hoja_leida, error in leer_hojas_en_paralelo(rutas_csv, _leer_hoja_cruda, hilos, procesos):
+        if error is not None:
+            print(f"ADVERTENCIA: No se pudo leer el archivo {ruta_archivo}. Detalles: {error}")
+            continue
+        cantidad_antes = len(catalogo)
+        _agregar_hoja_leida(catalogo, ruta_archivo, hoja_leida)
+        _registrar_filas_leidas(ruta_base, ruta_archivo, len(catalogo) - cantidad_antes)
+
+    guardar_manifiesto(ruta_base)
+    return catalogo
+
+@medido
+def _leer_hoja_cruda(ruta_archivo: str) -> tuple:
+    """
+    (Función auxiliar) Lee un 'items.csv' aplicando su registro de cambios,
+    sin tocar ningún catálogo (así puede correr en otro hilo o proceso).
+
+    Returns:
+        tuple: (firma, filas, total) con filas = [(posición, nombre, calorías, extras), ...]
+    """
+    filas = []
+    # El candado evita leer un CSV recién compactado con un registro viejo.
+    with candado_hoja(ruta_archivo), open(ruta_archivo, 'r', encoding='utf-8', newline='') as f:
+        cambios = leer_registro_cambios(ruta_archivo)
+        firma = firma_hoja(ruta_archivo)
+        lector = csv.reader(f)
+        encabezados = next(lector, None)
+        if not encabezados:
+            return firma, filas, 0
+        pos_nombre = encabezados.index('nombre') if 'nombre' in encabezados else None
+        pos_calorias = encabezados.index('calorias_100g') if 'calorias_100g' in encabezados else None
+        otras = [(i, c) for i, c in enumerate(encabezados) if i not in (pos_nombre, pos_calorias)]
+
+        posicion = -1
+        for fila in lector:
+            if not fila:
+                continue # csv.DictReader también saltea las líneas vacías
+            posicion += 1
+            largo = len(fila)
+            nombre = fila[pos_nombre] if pos_nombre is not None and pos_nombre < largo else None
+            calorias = fila[pos_calorias] if pos_calorias is not None and pos_calorias < largo else None
+            extras = {c: fila[i] for i, c in otras if i < largo} if otras else None
+            if posicion in cambios:
+                # Aplicamos el registro de cambios: baja o modificación.
+                if cambios[posicion] is None:
+                    continue
+                campos = cambios[posicion]
+                nombre = campos.get('nombre', nombre)
+                calorias = campos.get('calorias_100g', calorias)
+                if extras is not None:
+                    extras.update({c: v for c, v in campos.items() if c in extras})
+            filas.append((posicion, nombre, calorias, extras))
+    if INSTRUMENTACION_ACTIVA:
+        contar(archivos_abiertos=1, bytes_leidos=firma[0], filas_leidas=posicion + 1)
+    return firma, filas, posicion + 1
+
+def _jerarquia_de_ruta(ruta_archivo: str) -> tuple:
+    """(Función auxiliar) (categoría, tipo, procesamiento) de una hoja, tomados de sus carpetas."""
+    partes_ruta = os.path.dirname(ruta_archivo).split(os.sep)
+    if len(partes_ruta) >= 4: # Asumiendo base/cat/tipo/proc
+        return (partes_ruta[-3], partes_ruta[-2], partes_ruta[-1])
+    return ("", "", "")
+
+def _agregar_hoja_leida(catalogo: CatalogoColumnar, ruta_archivo: str, hoja_leida: tuple):
+    """
+    (Función auxiliar) Agrega al catálogo las filas de una hoja ya leída. Los
+    códigos de jerarquía se calculan una sola vez por archivo.
+    """
+    jerarquia = _jerarquia_de_ruta(ruta_archivo)
+    cod_cat = catalogo.categorias.codigo(jerarquia[0])
+    cod_tipo = catalogo.tipos.codigo(jerarquia[1])
+    cod_proc = catalogo.procesamientos.codigo(jerarquia[2])
+    cod_hoja = catalogo.hojas.codigo(ruta_archivo)
+
+    firma, filas, total = hoja_leida
+    catalogo._firmas[cod_hoja] = firma
+    for posicion, nombre, calorias, extras in filas:
+        catalogo._agregar_con_codigos(nombre, calorias, cod_cat, cod_tipo, cod_proc, cod_hoja, extras, posicion)
+    catalogo._siguiente_posicion[cod_hoja] = total
+
+
+# --- Instantánea binaria --- #
+# Para arrancar sin parsear todos los CSV se guarda el catálogo en un archivo
+# binario en la raíz de la base (NOMBRE_INSTANTANEA). Tiene una cabecera fija,
+# un bloque JSON con las tablas de strings y la firma de cada hoja, y después
+# las columnas del catálogo una detrás de otra, cada una de ancho fijo por
+# fila, para copiarlas tal cual desde un mmap. Los CSV siguen siendo la fuente
+# de verdad: la instantánea solo se usa si la firma de todas las hojas coincide.
+NOMBRE_INSTANTANEA = ".catalogo.snap"
+MAGIA_INSTANTANEA = b"ALIMSNAP"
+VERSION_INSTANTANEA = 1
+_CABECERA_INSTANTANEA = struct.Struct("<8sIIQ")  # magia, versión, reservado, largo del JSON
+
+# (atributo del catálogo, tipo del array) en el orden en que se escriben.
+_COLUMNAS_INSTANTANEA = (
+    ('calorias', 'd'),
+    ('cod_categoria', 'I'),
+    ('cod_tipo', 'I'),
+    ('cod_procesamiento', 'I'),
+    ('cod_hoja', 'I'),
+    ('posicion', 'I'),
+    ('_nombre_inicio', 'Q'),
+    ('_nombre_largo', 'I'),
+)
+
+_firmas_instantanea = {}  # ruta_base -> {ruta de hoja: firma} de la última instantánea escrita o leída
+
+def _firmas_del_catalogo(catalogo: CatalogoColumnar):
+    """(Función auxiliar) {ruta de hoja: firma} del catálogo, o None si alguna hoja no está al día."""
+    firmas = {}
+    for cod_hoja, ruta_hoja in enumerate(catalogo.hojas.valores):
+        firma = catalogo._firmas.get(cod_hoja)
+        if firma is None:
+            return None
+        firmas[ruta_hoja] = tuple(firma)
+    return firmas
+
+@medido
+def guardar_instantanea(catalogo: CatalogoColumnar, ruta_base=RUTA_BASE_DATOS) -> bool:
+    """
+    Escribe la instantánea binaria de un catálogo. Solo se escribe si el
+    catálogo está al día con todas sus hojas (conoce la firma de cada una).
+
+    Returns:
+        bool: True si se escribió la instantánea.
+    """
+    ruta_base = os.path.abspath(ruta_base)
+    firmas = _firmas_del_catalogo(catalogo)
+    if firmas is None or not os.path.isdir(ruta_base):
+        return False
+    orden_hojas = {ruta_hoja: orden for orden, ruta_hoja in enumerate(obtener_rutas_csv(ruta_base))}
+    if set(orden_hojas) != {ruta_hoja for ruta_hoja, firma in firmas.items() if firma != HOJA_QUITADA}:
+        return False # El catálogo no cubre exactamente las hojas que hay en disco.
+
+    # Solo se guardan las filas vivas, en el orden en que las leería
+    # crear_catalogo_desde_csv (hoja por hoja y por posición), y con los
+    # nombres en un bloque sin huecos.
+    # Las hojas quitadas no tienen filas vivas: su orden no importa.
+    orden_por_codigo = [orden_hojas.get(ruta_hoja, -1) for ruta_hoja in catalogo.hojas.valores]
+    vivos = sorted(catalogo._indices_vivos(),
+                   key=lambda i: (orden_por_codigo[catalogo.cod_hoja[i]], catalogo.posicion[i]))
+    columnas = {}
+    if (len(vivos) == len(catalogo.vivo) and all(i == indice for i, indice in enumerate(vivos))
+            and len(catalogo._nombres) == sum(catalogo._nombre_largo)):
+        columnas = {atributo: getattr(catalogo, atributo) for atributo, _ in _COLUMNAS_INSTANTANEA}
+        nombres = catalogo._nombres
+        formatos = catalogo._formato_calorias
+        literales, extras = catalogo._calorias_literales, catalogo._extras
+    else:
+        for atributo, tipo in _COLUMNAS_INSTANTANEA[:-2]:
+            origen = getattr(catalogo, atributo)
+            columnas[atributo] = array(tipo, (origen[i] for i in vivos))
+        nombres = b"".join(catalogo._nombres[catalogo._nombre_inicio[i]:catalogo._nombre_inicio[i] + catalogo._nombre_largo[i]]
+                           for i in vivos)
+        columnas['_nombre_largo'] = array('I', (catalogo._nombre_largo[i] for i in vivos))
+        columnas['_nombre_inicio'] = inicios = array('Q', bytes(8 * len(vivos)))
+        inicio = 0
+        for nuevo, largo in enumerate(columnas['_nombre_largo']):
+            inicios[nuevo] = inicio
+            inicio += largo
+        formatos = bytes(catalogo._formato_calorias[i] for i in vivos)
+        nuevo_indice = {viejo: nuevo for nuevo, viejo in enumerate(vivos)
+                        if viejo in catalogo._calorias_literales or viejo in catalogo._extras}
+        literales = {nuevo_indice[i]: texto for i, texto in catalogo._calorias_literales.items() if i in nuevo_indice}
+        extras = {nuevo_indice[i]: datos for i, datos in catalogo._extras.items() if i in nuevo_indice}
+
+    hojas = [[os.path.relpath(ruta_hoja, ruta_base), list(firmas[ruta_hoja]),
+              catalogo._siguiente_posicion.get(cod_hoja, 0)]
+             for cod_hoja, ruta_hoja in enumerate(catalogo.hojas.valores)]
+    cuerpo = [columnas[atributo].tobytes() for atributo, _ in _COLUMNAS_INSTANTANEA] + [bytes(formatos), bytes(nombres)]
+    encabezado = json.dumps({
+        'filas': len(vivos),
+        'orden_bytes': sys.byteorder,
+        'categorias': catalogo.categorias.valores,
+        'tipos': catalogo.tipos.valores,
+        'procesamientos': catalogo.procesamientos.valores,
+        'hojas': hojas,
+        'literales': literales,
+        'extras': extras,
+        'largos': [len(parte) for parte in cuerpo],
+    }, ensure_ascii=False).encode('utf-8')
+    # El JSON se rellena para que las columnas queden alineadas a 8 bytes.
+    encabezado += b" " * (-(len(encabezado) + _CABECERA_INSTANTANEA.size) % 8)
+
+    ruta_instantanea = os.path.join(ruta_base, NOMBRE_INSTANTANEA)
+    try:
+        with open(ruta_instantanea + ".tmp", 'wb') as f:
+            f.write(_CABECERA_INSTANTANEA.pack(MAGIA_INSTANTANEA, VERSION_INSTANTANEA, 0, len(encabezado)))
+            f.write(encabezado)
+            for parte in cuerpo:
+                f.write(parte)
+            if INSTRUMENTACION_ACTIVA:
+                contar(archivos_abiertos=1, bytes_escritos=f.tell())
+        os.replace(ruta_instantanea + ".tmp", ruta_instantanea)
+    except OSError as e:
+        print(f"ADVERTENCIA: No se pudo guardar la instantánea en {ruta_instantanea}. Detalles: {e}")
+        return False
+    _firmas_instantanea[ruta_base] = firmas
+    return True
+
+@medido
+def cargar_instantanea(ruta_base=RUTA_BASE_DATOS, nombre_archivo="items.csv"):
+    """
+    Carga el catálogo desde la instantánea binaria, si existe y sigue siendo
+    válida: mismas hojas y misma firma (tamaño y mtime) en cada una.
+
+    Returns:
+        CatalogoColumnar | None: El catálogo, o None si hay que leer los CSV.
+    """
+    ruta_base = os.path.abspath(ruta_base)
+    ruta_instantanea = os.path.join(ruta_base, NOMBRE_INSTANTANEA)
+    try:
+        with open(ruta_instantanea, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+            if INSTRUMENTACION_ACTIVA:
+                contar(archivos_abiertos=1, bytes_leidos=len(mapa))
+            magia, version, _, largo_json = _CABECERA_INSTANTANEA.unpack_from(mapa, 0)
+            if magia != MAGIA_INSTANTANEA or version != VERSION_INSTANTANEA:
+                return None
+            inicio = _CABECERA_INSTANTANEA.size
+            datos = json.loads(mapa[inicio:inicio + largo_json].decode('utf-8'))
+            if datos['orden_bytes'] != sys.byteorder:
+                return None
+
+            # Validación: el conjunto de hojas y la firma de cada una tienen que coincidir.
+            rutas_csv = obtener_rutas_csv(ruta_base, nombre_archivo)
+            if len(rutas_csv) > len(datos['hojas']):
+                return None
+            firmas = {}
+            for relativa, firma, _ in datos['hojas']:
+                ruta_hoja = os.path.join(ruta_base, relativa)
+                # Una hoja quitada (ya no existía al guardar) no tiene filas que validar.
+                if tuple(firma) != HOJA_QUITADA and tuple(firma) != firma_hoja(ruta_hoja):
+                    return None
+                firmas[ruta_hoja] = tuple(firma)
+            if set(rutas_csv) != {ruta_hoja for ruta_hoja, firma in firmas.items() if firma != HOJA_QUITADA}:
+                return None
+
+            catalogo = CatalogoColumnar()
+            catalogo.categorias = TablaCadenas.desde_lista(datos['categorias'])
+            catalogo.tipos = TablaCadenas.desde_lista(datos['tipos'])
+            catalogo.procesamientos = TablaCadenas.desde_lista(datos['procesamientos'])
+            catalogo.hojas = TablaCadenas.desde_lista([os.path.join(ruta_base, relativa) for relativa, _, _ in datos['hojas']])
+            for cod_hoja, (_, firma, siguiente) in enumerate(datos['hojas']):
+                catalogo._firmas[cod_hoja] = tuple(firma)
+                catalogo._siguiente_posicion[cod_hoja] = siguiente
+
+            # Cada columna se copia de un solo golpe desde el mapa.
+            desplazamiento = inicio + largo_json
+            largos = datos['largos']
+            with memoryview(mapa) as vista:
+                for (atributo, tipo), largo in zip(_COLUMNAS_INSTANTANEA, largos):
+                    columna = array(tipo)
+                    columna.frombytes(vista[desplazamiento:desplazamiento + largo])
+                    setattr(catalogo, atributo, columna)
+                    desplazamiento += largo
+                largo_formatos, largo_nombres = largos[-2:]
+                catalogo._formato_calorias = bytearray(vista[desplazamiento:desplazamiento + largo_formatos])
+                desplazamiento += largo_formatos
+                catalogo._nombres = bytearray(vista[desplazamiento:desplazamiento + largo_nombres])
+    except (OSError, ValueError, KeyError, struct.error):
+        return None
+
+    filas = datos['filas']
+    catalogo._calorias_literales = {int(i): texto for i, texto in datos['literales'].items()}
+    catalogo._extras = {int(i): extras for i, extras in datos['extras'].items()}
+    catalogo.vivo = bytearray(b"\x01") * filas
+    catalogo._cantidad_vivos = filas
+    # Los índices por nombre y por hoja se arman recién cuando se necesitan.
+    catalogo._indice_nombres = None
+    catalogo._filas_por_hoja = None
+    _firmas_instantanea[ruta_base] = firmas
+    return catalogo
+
+@atexit.register
+def _actualizar_instantaneas():
+    """
+    Al salir, reescribe la instantánea de los catálogos residentes que
+    cambiaron desde la última vez (altas, bajas, compactaciones...).
+    """
+    for ruta_base, catalogo in list(_catalogos.items()):
+        firmas = _firmas_del_catalogo(catalogo)
+        if firmas is not None and firmas != _firmas_instantanea.get(ruta_base):
+            guardar_instantanea(catalogo, ruta_base)
+
+
+# --- Catálogo residente --- #
+# Se guarda el último catálogo cargado para que modificar/eliminar no tengan
+# que releer toda la base en cada operación.
+_catalogos = {}  # ruta_base -> CatalogoColumnar
+
+def _al_compactar_hoja(ruta_archivo, mapeo, firma_anterior, firma_nueva):
+    """(Función auxiliar) Mantiene las posiciones de los catálogos residentes tras una compactación."""
+    for catalogo in list(_catalogos.values()):
+        catalogo.aplicar_compactacion(ruta_archivo, mapeo, firma_anterior, firma_nueva)
+
+registrar_observador_compactacion(_al_compactar_hoja)
+
+def catalogo_cargado(ruta_base=RUTA_BASE_DATOS):
+    """Devuelve el catálogo residente de 'ruta_base' sin cargarlo (None si no hay)."""
+    return _catalogos.get(os.path.abspath(ruta_base))
+
+@medido
+def actualizar_catalogo(catalogo: CatalogoColumnar, ruta_base=RUTA_BASE_DATOS, nombre_archivo="items.csv") -> int:
+    """
+    Pone al día un catálogo ya cargado con lo que hay en disco, sin volver a
+    cargarlo entero.
+
+    Recorre la base con el manifiesto (solo se listan los directorios cuyo
+    mtime cambió) y compara la firma de cada hoja (tamaño, mtime e inodo del
+    CSV y de su registro de cambios) con la que conoce el catálogo. Solo se
+    vuelven a leer las hojas nuevas o cambiadas, y se aplican al catálogo en
+    su lugar con actualizar_hoja; las filas de las hojas que desaparecieron se
+    dan de baja.
+
+    Returns:
+        int: Cantidad de hojas que se volvieron a leer o se quitaron.
+    """
+    ruta_base = os.path.abspath(ruta_base)
+    rutas_csv = obtener_rutas_csv(ruta_base, nombre_archivo)
+    cambiadas = []
+    for ruta_archivo in rutas_csv:
+        cod_hoja = catalogo.hojas.buscar(ruta_archivo)
+        conocida = catalogo._firmas.get(cod_hoja) if cod_hoja is not None else None
+        try:
+            if conocida is not None and conocida == firma_hoja(ruta_archivo):
+                continue
+        except OSError:
+            pass # Se borró recién: la lectura falla y se quita abajo.
+        cambiadas.append(ruta_archivo)
+
+    presentes = set(rutas_csv)
+    quitadas = [ruta_hoja for cod_hoja, ruta_hoja in enumerate(catalogo.hojas.valores)
+                if ruta_hoja not in presentes and catalogo._firmas.get(cod_hoja) != HOJA_QUITADA]
+    for ruta_archivo, hoja_leida, error in leer_hojas_en_paralelo(cambiadas, _leer_hoja_cruda):
+        if error is None:
+            catalogo.actualizar_hoja(ruta_archivo, hoja_leida)
+            _registrar_filas_leidas(ruta_base, ruta_archivo, len(hoja_leida[1]))
+        elif isinstance(error, FileNotFoundError):
+            quitadas.append(ruta_archivo)
+        else:
+            print(f"ADVERTENCIA: No se pudo leer el archivo {ruta_archivo}. Detalles: {error}")
+    for ruta_hoja in quitadas:
+        catalogo.quitar_hoja(ruta_hoja)
+
+    if cambiadas:
+        guardar_manifiesto(ruta_base)
+    return len(cambiadas) + len(quitadas)
+
+@medido
+def obtener_catalogo(ruta_base=RUTA_BASE_DATOS, recargar=False, refrescar=False) -> CatalogoColumnar:
+    """
+    Devuelve el catálogo residente de 'ruta_base', cargándolo si todavía no
+    existe o si se pide 'recargar'. Con 'refrescar', un catálogo ya cargado
+    se pone al día releyendo solo las hojas que cambiaron (actualizar_catalogo).
+    """
+    ruta_base = os.path.abspath(ruta_base)
+    catalogo = _catalogos.get(ruta_base)
+    if catalogo is not None and refrescar and not recargar:
+        actualizar_catalogo(catalogo, ruta_base)
+    elif catalogo is None or recargar:
+        # Primero se intenta la instantánea binaria; si no es válida se leen
+        # los CSV y se deja una instantánea nueva para el próximo arranque.
+        catalogo = cargar_instantanea(ruta_base)
+        if catalogo is None:
+            catalogo = crear_catalogo_desde_csv(ruta_base)
+            guardar_instantanea(catalogo, ruta_base)
+        _catalogos[ruta_base] = catalogo
+    return catalogo
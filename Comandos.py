@@ -0,0 +1,364 @@
+from Manejo_archivo import *
+from Catalogo import obtener_catalogo
+from Utilidades import mostrar_tabla_alimentos
+from AlmacenSQLite import AlmacenSQLite
+import argparse
+import contextlib
+import csv
+import heapq
+import json
+import math
+import os
+import shlex
+import sqlite3
+import sys
+
+# Formatos de salida de los comandos.
+FORMATOS_SALIDA = ('tabla', 'jsonl', 'csv')
+# Columnas que se escriben en las salidas 'jsonl' y 'csv' de una consulta.
+CAMPOS_CONSULTA = ('nombre', 'calorias_100g', 'categoria', 'tipo', 'procesamiento')
+# Columnas de la salida de 'stats'.
+CAMPOS_ESTADISTICAS = ('categoria', 'tipo', 'cantidad', 'con_calorias', 'promedio',
+                       'max_nombre', 'max_calorias', 'min_nombre', 'min_calorias')
+
+
+class _ErrorDeUso(Exception):
+    """Error en los argumentos de un comando (argparse no debe cortar el modo batch)."""
+
+
+class _Parser(argparse.ArgumentParser):
+    def error(self, message):
+        raise _ErrorDeUso(f"{self.prog}: {message}")
+
+
+def construir_parser() -> argparse.ArgumentParser:
+    """
+    Arma el parser de los comandos no interactivos: 'query', 'stats', 'serve',
+    'batch' y las conversiones 'to-sqlite' y 'from-sqlite'.
+    """
+    parser = _Parser(
+        prog="Integrador_recursividad.py",
+        description="Consultas sobre la base de alimentos sin pasar por los menús.",
+    )
+    parser.add_argument('--base', default=RUTA_BASE_DATOS, help="Raíz de la base de datos.")
+    parser.add_argument('--db', dest='ruta_db',
+                        help="Consultar una base SQLite (creada con 'to-sqlite') en lugar del árbol de CSV.")
+    comandos = parser.add_subparsers(dest='comando', required=True, parser_class=_Parser)
+
+    query = comandos.add_parser('query', help="Lista los alimentos que cumplen los filtros.")
+    query.add_argument('--categoria')
+    query.add_argument('--tipo')
+    query.add_argument('--procesamiento')
+    query.add_argument('--nombre', help="Nombre exacto (sin distinguir mayúsculas ni acentos).")
+    query.add_argument('--min-cal', type=float, dest='min_cal')
+    query.add_argument('--max-cal', type=float, dest='max_cal')
+    query.add_argument('--top', type=int, help="Solo los N más calóricos, de mayor a menor.")
+    query.add_argument('--format', choices=FORMATOS_SALIDA, dest='formato')
+
+    stats = comandos.add_parser('stats', help="Estadísticas de calorías por categoría (o por tipo).")
+    stats.add_argument('--categoria', help="Detalla los tipos de esta categoría.")
+    stats.add_argument('--format', choices=FORMATOS_SALIDA, dest='formato')
+
+    serve = comandos.add_parser('serve', help="Servidor local que mantiene el catálogo en memoria (JSON por línea).")
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--puerto', type=int, default=8765)
+    serve.add_argument('--unix', dest='socket_unix', help="Escuchar en este socket Unix en lugar de TCP.")
+
+    a_sqlite = comandos.add_parser('to-sqlite', help="Copia el árbol de CSV (--base) a una base SQLite.")
+    a_sqlite.add_argument('destino', help="Archivo SQLite (se reemplaza su contenido).")
+
+    desde_sqlite = comandos.add_parser('from-sqlite', help="Escribe las hojas de una base SQLite en el árbol de CSV (--base).")
+    desde_sqlite.add_argument('origen', help="Archivo SQLite creado con 'to-sqlite'.")
+
+    batch = comandos.add_parser('batch', help="Lee un comando por línea de la entrada estándar.")
+    batch.add_argument('--format', choices=FORMATOS_SALIDA, dest='formato', default='tabla',
+                       help="Formato de los comandos que no indican uno.")
+    return parser
+
+
+# --- Comando 'query' --- #
+
+def _filtrar_jerarquia(catalogo, filas, categoria, tipo, procesamiento):
+    """
+    (Función auxiliar) Filtra filas del catálogo por los códigos de jerarquía,
+    sin armar los textos de cada fila. Si algún nivel no existe, no queda ninguna.
+    """
+    condiciones = []
+    for valor, tabla, codigos in (
+        (categoria, catalogo.categorias, catalogo.cod_categoria),
+        (tipo, catalogo.tipos, catalogo.cod_tipo),
+        (procesamiento, catalogo.procesamientos, catalogo.cod_procesamiento),
+    ):
+        if valor is None:
+            continue
+        codigo = tabla.buscar(valor)
+        if codigo is None:
+            return []
+        condiciones.append((codigos, codigo))
+    if not condiciones:
+        return filas
+    return [fila for fila in filas if all(codigos[fila.indice] == codigo for codigos, codigo in condiciones)]
+
+def consultar(catalogo, categoria=None, tipo=None, procesamiento=None, nombre=None,
+              min_cal=None, max_cal=None, top=None) -> list:
+    """
+    Resuelve una consulta contra el catálogo con el índice que más conviene:
+    el de nombres si se da un nombre, el de calorías si hay un rango o solo se
+    pide un top, y las columnas de jerarquía en el resto de los casos.
+
+    Returns:
+        list: Filas del catálogo. Con rango de calorías quedan de menor a mayor;
+            con 'top', de mayor a menor; si no, en el orden del catálogo.
+    """
+    categoria, tipo, procesamiento = (
+        normalizar_texto_para_ruta(v) if v is not None else None for v in (categoria, tipo, procesamiento)
+    )
+    hay_rango = min_cal is not None or max_cal is not None
+    minimo = min_cal if min_cal is not None else -math.inf
+    maximo = max_cal if max_cal is not None else math.inf
+
+    if nombre is not None:
+        filas = catalogo.buscar_por_nombre(nombre)
+        if hay_rango or top is not None:
+            filas = [fila for fila in filas if minimo <= fila.calorias <= maximo]
+    elif top is not None and not hay_rango and categoria is tipo is procesamiento is None:
+        return catalogo.top_calorias(top)
+    elif hay_rango or top is not None:
+        filas = catalogo.filtrar_por_calorias(minimo, maximo)
+    else:
+        return catalogo.filtrar(categoria, tipo, procesamiento)
+
+    filas = _filtrar_jerarquia(catalogo, filas, categoria, tipo, procesamiento)
+    if top is not None:
+        # nlargest es estable: a igual calorías se respeta el orden de entrada.
+        filas = heapq.nlargest(top, filas, key=lambda fila: fila.calorias)
+    return filas
+
+def _escribir_filas(filas, formato: str, salida):
+    """(Función auxiliar) Escribe el resultado de una consulta en el formato pedido."""
+    if formato == 'tabla':
+        mostrar_tabla_alimentos(filas, salida=salida)
+    elif formato == 'jsonl':
+        salida.writelines(
+            json.dumps({campo: fila.get(campo) for campo in CAMPOS_CONSULTA}, ensure_ascii=False) + "\n"
+            for fila in filas
+        )
+    else:
+        escritor = csv.DictWriter(salida, fieldnames=CAMPOS_CONSULTA, extrasaction='ignore', lineterminator="\n")
+        escritor.writeheader()
+        escritor.writerows(filas)
+
+
+# --- Comando 'stats' --- #
+
+def _fila_estadisticas(categoria, tipo, resumen: dict) -> dict:
+    """(Función auxiliar) Pasa un resumen de calorías a una fila de salida."""
+    max_nombre, max_calorias = resumen['max'] or (None, None)
+    min_nombre, min_calorias = resumen['min'] or (None, None)
+    return {
+        'categoria': categoria,
+        'tipo': tipo,
+        'cantidad': resumen['cantidad'],
+        'con_calorias': resumen['con_calorias'],
+        'promedio': resumen['suma'] / resumen['con_calorias'] if resumen['con_calorias'] else None,
+        'max_nombre': max_nombre,
+        'max_calorias': max_calorias,
+        'min_nombre': min_nombre,
+        'min_calorias': min_calorias,
+    }
+
+def estadisticas(resumen: dict, categoria: str = None) -> list:
+    """
+    Arma las filas de 'stats' a partir de resumen_calorias: el total y una
+    fila por categoría o, si se indica 'categoria', esa categoría y sus tipos.
+    """
+    if categoria is None:
+        filas = [_fila_estadisticas(None, None, resumen['total'])]
+        filas.extend(_fila_estadisticas(cat, None, datos) for cat, datos in resumen['categorias'].items())
+        return filas
+    categoria = normalizar_texto_para_ruta(categoria)
+    if categoria not in resumen['categorias']:
+        return []
+    filas = [_fila_estadisticas(categoria, None, resumen['categorias'][categoria])]
+    filas.extend(
+        _fila_estadisticas(cat, tipo, datos) for (cat, tipo), datos in resumen['tipos'].items() if cat == categoria
+    )
+    return filas
+
+def _escribir_estadisticas(filas: list, formato: str, salida):
+    """(Función auxiliar) Escribe las filas de 'stats' en el formato pedido."""
+    if formato == 'jsonl':
+        salida.writelines(json.dumps(fila, ensure_ascii=False) + "\n" for fila in filas)
+    elif formato == 'csv':
+        escritor = csv.DictWriter(salida, fieldnames=CAMPOS_ESTADISTICAS, lineterminator="\n")
+        escritor.writeheader()
+        escritor.writerows(filas)
+    elif not filas:
+        salida.write("No hay datos para esa categoría.\n")
+    else:
+        for fila in filas:
+            if fila['categoria'] is None:
+                titulo = "Total"
+            elif fila['tipo'] is None:
+                titulo = fila['categoria']
+            else:
+                titulo = f"{fila['categoria']} > {fila['tipo']}"
+            salida.write(f"{titulo}: {fila['cantidad']} ítems")
+            if fila['promedio'] is not None:
+                salida.write(
+                    f", promedio {fila['promedio']:.2f} cal"
+                    f", máximo {fila['max_nombre']} ({fila['max_calorias']:.1f} cal)"
+                    f", mínimo {fila['min_nombre']} ({fila['min_calorias']:.1f} cal)"
+                )
+            salida.write("\n")
+
+
+# --- Conversión con SQLite --- #
+
+def _convertir_sqlite(args) -> int:
+    """
+    (Función auxiliar) Ejecuta 'to-sqlite' (árbol de CSV -> SQLite) o
+    'from-sqlite' (SQLite -> árbol de CSV). Los avisos van a stderr.
+    """
+    ruta_db = args.destino if args.comando == 'to-sqlite' else args.origen
+    if args.comando == 'from-sqlite' and not os.path.isfile(ruta_db):
+        print(f"ERROR: No existe la base SQLite {ruta_db}.", file=sys.stderr)
+        return 1
+    try:
+        with contextlib.redirect_stdout(sys.stderr), AlmacenSQLite(ruta_db) as almacen:
+            if args.comando == 'to-sqlite':
+                resultado = almacen.importar_arbol(args.base)
+            else:
+                resultado = almacen.exportar_arbol(args.base)
+    except (OSError, sqlite3.Error, ValueError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+    print(f"{resultado['filas']} alimentos en {resultado['hojas']} hojas copiados "
+          f"{'a' if args.comando == 'to-sqlite' else 'desde'} {ruta_db}.", file=sys.stderr)
+    return 1 if resultado.get('fallidas') else 0
+
+
+# --- Ejecución --- #
+
+def _ejecutar(args, contexto: dict, salida, formato_por_defecto: str = 'tabla'):
+    """
+    (Función auxiliar) Ejecuta un comando 'query' o 'stats' ya parseado. El
+    catálogo y el resumen se guardan en 'contexto', así que en modo batch se
+    cargan una sola vez para todos los comandos. Con --db se consulta la base
+    SQLite, que se abre una sola vez.
+    """
+    formato = args.formato or formato_por_defecto
+    if contexto.get('ruta_db') is not None:
+        if contexto.get('almacen') is None:
+            contexto['almacen'] = AlmacenSQLite(contexto['ruta_db'])
+        almacen = contexto['almacen']
+        if args.comando == 'query':
+            filas = almacen.consultar(
+                args.categoria, args.tipo, args.procesamiento,
+                args.nombre, args.min_cal, args.max_cal, args.top,
+            )
+            _escribir_filas(filas, formato, salida)
+        else:
+            _escribir_estadisticas(estadisticas(almacen.resumen_calorias(), args.categoria), formato, salida)
+    elif args.comando == 'query':
+        if contexto.get('catalogo') is None:
+            # Los avisos de la carga van a stderr para no mezclarse con la salida.
+            with contextlib.redirect_stdout(sys.stderr):
+                contexto['catalogo'] = obtener_catalogo(contexto['ruta_base'])
+        filas = consultar(
+            contexto['catalogo'], args.categoria, args.tipo, args.procesamiento,
+            args.nombre, args.min_cal, args.max_cal, args.top,
+        )
+        _escribir_filas(filas, formato, salida)
+    else:
+        if contexto.get('resumen') is None:
+            with contextlib.redirect_stdout(sys.stderr):
+                contexto['resumen'] = resumen_calorias(contexto['ruta_base'])
+        _escribir_estadisticas(estadisticas(contexto['resumen'], args.categoria), formato, salida)
+
+def ejecutar_batch(parser, contexto: dict, entrada, salida, formato_por_defecto: str = 'tabla') -> int:
+    """
+    Ejecuta los comandos de 'entrada', uno por línea (por ejemplo
+    "query --categoria carne --top 5"). Las líneas vacías y las que empiezan
+    con '#' se ignoran. La salida de cada comando termina con una línea vacía.
+    Un comando con error se informa por stderr y no corta el resto.
+
+    Returns:
+        int: 0 si todos los comandos anduvieron, 1 si alguno falló.
+    """
+    fallidos = 0
+    for numero, linea in enumerate(entrada, start=1):
+        linea = linea.strip()
+        if not linea or linea.startswith('#'):
+            continue
+        try:
+            # La base de cada línea es la de 'batch', salvo que la línea indique otra.
+            args = parser.parse_args(shlex.split(linea), argparse.Namespace(base=contexto['ruta_base'],
+                                                                            ruta_db=contexto['ruta_db']))
+            if args.comando not in ('query', 'stats'):
+                raise _ErrorDeUso(f"'{args.comando}' no se puede usar dentro de 'batch'")
+            if args.base != contexto['ruta_base'] or args.ruta_db != contexto['ruta_db']:
+                raise _ErrorDeUso("--base y --db solo pueden indicarse al lanzar 'batch'")
+            _ejecutar(args, contexto, salida, formato_por_defecto)
+        except (_ErrorDeUso, ValueError) as e:
+            print(f"ERROR (línea {numero}): {e}", file=sys.stderr)
+            fallidos += 1
+        salida.write("\n")
+        salida.flush()
+    return 1 if fallidos else 0
+
+def ejecutar_comando(argumentos: list, entrada=None, salida=None) -> int:
+    """
+    Punto de entrada del modo no interactivo.
+
+    Args:
+        argumentos (list): Argumentos de línea de comandos (sin el nombre del programa).
+        entrada (file, optional): De dónde lee 'batch' (por defecto, stdin).
+        salida (file, optional): Dónde se escriben los resultados (por defecto, stdout).
+
+    Returns:
+        int: Código de salida (0 si todo anduvo bien).
+    """
+    entrada = entrada if entrada is not None else sys.stdin
+    salida = salida if salida is not None else sys.stdout
+    parser = construir_parser()
+    try:
+        args = parser.parse_args(argumentos)
+    except _ErrorDeUso as e:
+        parser.print_usage(sys.stderr)
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 2
+
+    contexto = {'ruta_base': args.base, 'ruta_db': args.ruta_db}
+    if args.comando in ('to-sqlite', 'from-sqlite'):
+        return _convertir_sqlite(args)
+    if args.comando == 'serve':
+        if args.ruta_db is not None:
+            print("ERROR: el servidor trabaja sobre el árbol de CSV (--db no se admite con 'serve').", file=sys.stderr)
+            return 2
+        if os.path.abspath(args.base) != os.path.abspath(RUTA_BASE_DATOS):
+            print("ERROR: el servidor trabaja siempre sobre la base por defecto (--base no se admite con 'serve').",
+                  file=sys.stderr)
+            return 2
+        # Import tardío: Servidor importa este módulo.
+        from Servidor import iniciar_servidor
+        return iniciar_servidor(args.host, args.puerto, args.socket_unix)
+    if args.ruta_db is not None:
+        try:
+            contexto['almacen'] = AlmacenSQLite(args.ruta_db)
+        except (sqlite3.Error, ValueError) as e:
+            print(f"ERROR: No se pudo abrir la base SQLite {args.ruta_db}. Detalles: {e}", file=sys.stderr)
+            return 1
+    try:
+        if args.comando == 'batch':
+            return ejecutar_batch(parser, contexto, entrada, salida, args.formato)
+        _ejecutar(args, contexto, salida)
+        return 0
+    except sqlite3.Error as e:
+        if args.ruta_db is None:
+            raise
+        print(f"ERROR: Falló la consulta a la base SQLite {args.ruta_db}. Detalles: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if contexto.get('almacen') is not None:
+            contexto['almacen'].cerrar()
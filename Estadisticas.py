@@ -0,0 +1,247 @@
+from Catalogo import CatalogoColumnar, CAMPOS_JERARQUIA
+from Instrumentacion import medido
+from array import array
+from itertools import compress, repeat
+import math
+try:
+    import numpy
+except ImportError: # Sin NumPy se calcula con el módulo array y bucles de Python.
+    numpy = None
+
+# --- Estadísticas de calorías sobre las columnas del catálogo --- #
+# Se trabaja directamente con los arrays del CatalogoColumnar (calorías y
+# códigos de categoría/tipo/procesamiento), sin armar un diccionario por fila.
+# Todos los grupos del nivel pedido se calculan juntos: cada fila recibe el
+# código de su grupo, se ordena una sola vez por (grupo, calorías) y cada grupo
+# queda como un tramo contiguo del que salen mediana, percentiles y extremos.
+#
+# Con NumPy las cuentas son vectorizadas (bincount, lexsort); sin NumPy se
+# agrupa en una pasada sobre los arrays y se ordena cada grupo. Los dos caminos
+# dan los mismos resultados (salvo redondeos en el último decimal de la media y
+# el desvío).
+NIVELES_ESTADISTICAS = ('total',) + CAMPOS_JERARQUIA
+PERCENTILES_ESTADISTICAS = (10, 25, 50, 75, 90)
+CUBETAS_HISTOGRAMA = 10
+EXTREMOS_ESTADISTICAS = 3   # alimentos más y menos calóricos que se guardan por grupo
+
+
+def _codigos_por_nivel(catalogo: CatalogoColumnar, nivel: str) -> list:
+    """(Función auxiliar) (códigos, tabla) de cada nivel de la jerarquía hasta 'nivel' inclusive."""
+    columnas = [(catalogo.cod_categoria, catalogo.categorias), (catalogo.cod_tipo, catalogo.tipos),
+                (catalogo.cod_procesamiento, catalogo.procesamientos)]
+    return columnas[:NIVELES_ESTADISTICAS.index(nivel)]
+
+def _bordes_histograma(minimo: float, maximo: float, cubetas: int) -> tuple:
+    """(Función auxiliar) Ancho de las cubetas y sus bordes, comunes a todos los grupos."""
+    ancho = (maximo - minimo) / cubetas
+    bordes = [minimo + ancho * k for k in range(cubetas)] + [maximo]
+    return ancho, bordes
+
+def _percentil(ordenados: list, fraccion: float) -> float:
+    """(Función auxiliar) Percentil con interpolación lineal entre los dos valores vecinos."""
+    posicion = (len(ordenados) - 1) * fraccion
+    abajo = int(posicion)
+    arriba = min(abajo + 1, len(ordenados) - 1)
+    a, b = ordenados[abajo], ordenados[arriba]
+    return a + (b - a) * (posicion - abajo)
+
+def _grupo_vacio(cantidad: int, percentiles) -> dict:
+    return {'cantidad': cantidad, 'con_calorias': 0, 'media': None, 'desvio': None, 'minimo': None,
+            'maximo': None, 'mediana': None, 'percentiles': dict.fromkeys(percentiles), 'histograma': [],
+            'menores': [], 'mayores': []}
+
+def _calcular_con_array(catalogo, niveles, filtro, percentiles, cubetas, extremos) -> tuple:
+    """
+    (Función auxiliar) Camino sin NumPy: una pasada por las filas vivas que
+    reparte las calorías en un array('d') por grupo, y después cada grupo se
+    ordena y se resume.
+
+    Returns:
+        tuple: (dict de clave de códigos -> resumen del grupo, índice de una fila de cada grupo, bordes)
+    """
+    vivas = catalogo.vivo
+    if filtro is not None:
+        vivas = bytearray(viva and codigo == filtro for viva, codigo in zip(vivas, catalogo.cod_categoria))
+    # Las columnas se recorren juntas con compress/zip en lugar de indexarlas fila por fila.
+    claves = zip(*(compress(codigos, vivas) for codigos, _ in niveles)) if niveles else repeat(())
+    acumulados = {}  # clave de códigos -> [cantidad, valores, índices, primera fila]
+    for indice, clave, valor in zip(compress(range(len(vivas)), vivas), claves, compress(catalogo.calorias, vivas)):
+        acumulado = acumulados.get(clave)
+        if acumulado is None:
+            acumulado = acumulados[clave] = [0, array('d'), array('Q'), indice]
+        acumulado[0] += 1
+        if valor == valor: # Descarta NaN (calorías no numéricas).
+            acumulado[1].append(valor)
+            acumulado[2].append(indice)
+
+    # A igual calorías quedan en el orden del catálogo (sorted es estable).
+    ordenados = {}
+    for clave, (_, valores, indices, _) in acumulados.items():
+        orden = sorted(range(len(valores)), key=valores.__getitem__)
+        ordenados[clave] = ([valores[k] for k in orden], [indices[k] for k in orden])
+    con_valores = [valores for valores, _ in ordenados.values() if valores]
+    bordes = []
+    if con_valores:
+        minimo = min(valores[0] for valores in con_valores)
+        maximo = max(valores[-1] for valores in con_valores)
+        ancho, bordes = _bordes_histograma(minimo, maximo, cubetas)
+
+    grupos, primeras = {}, {}
+    for clave, (cantidad, _, _, primera) in acumulados.items():
+        primeras[clave] = primera
+        valores, indices = ordenados[clave]
+        if not valores:
+            grupos[clave] = _grupo_vacio(cantidad, percentiles)
+            continue
+        n = len(valores)
+        media = math.fsum(valores) / n
+        histograma = [0] * cubetas
+        for valor in valores:
+            cubeta = int((valor - minimo) / ancho) if ancho > 0 else 0
+            histograma[min(cubeta, cubetas - 1)] += 1
+        grupos[clave] = {
+            'cantidad': cantidad,
+            'con_calorias': n,
+            'media': media,
+            'desvio': math.sqrt(math.fsum((valor - media) ** 2 for valor in valores) / n),
+            'minimo': valores[0],
+            'maximo': valores[-1],
+            'mediana': _percentil(valores, 0.5),
+            'percentiles': {p: _percentil(valores, p / 100) for p in percentiles},
+            'histograma': histograma,
+            'menores': indices[:extremos],
+            'mayores': indices[:-extremos - 1:-1] if extremos else [],
+        }
+    return grupos, primeras, bordes
+
+def _calcular_con_numpy(catalogo, niveles, filtro, percentiles, cubetas, extremos) -> tuple:
+    """
+    (Función auxiliar) Camino con NumPy: los mismos cálculos que
+    _calcular_con_array, pero para todos los grupos a la vez.
+    """
+    # frombuffer no copia; indexar con 'filas' sí, así que no queda ninguna
+    # vista sobre los arrays del catálogo (que no podrían crecer mientras exista).
+    vivas = numpy.frombuffer(catalogo.vivo, dtype=numpy.uint8).astype(bool)
+    if filtro is not None:
+        vivas &= numpy.frombuffer(catalogo.cod_categoria, dtype=catalogo.cod_categoria.typecode) == filtro
+    filas = numpy.flatnonzero(vivas)
+    if len(filas) == 0:
+        return {}, {}, []
+
+    clave = numpy.zeros(len(filas), dtype=numpy.int64)
+    for codigos, tabla in niveles:
+        clave = clave * len(tabla) + numpy.frombuffer(codigos, dtype=codigos.typecode)[filas]
+    claves, primera, grupo = numpy.unique(clave, return_index=True, return_inverse=True)
+    cantidad_grupos = len(claves)
+    cantidades = numpy.bincount(grupo, minlength=cantidad_grupos)
+
+    calorias = numpy.frombuffer(catalogo.calorias, dtype='d')[filas]
+    validas = ~numpy.isnan(calorias)
+    grupo, calorias, filas_validas = grupo[validas], calorias[validas], filas[validas]
+    # lexsort ordena por la última clave primero: grupo, después calorías, después índice.
+    orden = numpy.lexsort((filas_validas, calorias, grupo))
+    ordenadas, indices = calorias[orden], filas_validas[orden]
+
+    con_calorias = numpy.bincount(grupo, minlength=cantidad_grupos)
+    fines = numpy.cumsum(con_calorias)
+    inicios = fines - con_calorias
+    divisor = numpy.maximum(con_calorias, 1)
+    medias = numpy.bincount(grupo, weights=calorias, minlength=cantidad_grupos) / divisor
+    desvios = numpy.sqrt(numpy.bincount(grupo, weights=(calorias - medias[grupo]) ** 2,
+                                        minlength=cantidad_grupos) / divisor)
+
+    def percentil(fraccion):
+        # Los grupos sin calorías apuntan a cualquier valor válido; su resultado no se usa.
+        posicion = (divisor - 1) * fraccion
+        abajo = posicion.astype(numpy.int64)
+        arriba = numpy.minimum(abajo + 1, divisor - 1)
+        a = ordenadas[numpy.minimum(inicios + abajo, len(ordenadas) - 1)]
+        b = ordenadas[numpy.minimum(inicios + arriba, len(ordenadas) - 1)]
+        return a + (b - a) * (posicion - abajo)
+
+    bordes, histogramas = [], None
+    if len(ordenadas):
+        minimo, maximo = float(ordenadas.min()), float(ordenadas.max())
+        ancho, bordes = _bordes_histograma(minimo, maximo, cubetas)
+        cubeta = ((calorias - minimo) / ancho).astype(numpy.int64) if ancho > 0 else numpy.zeros(len(calorias), numpy.int64)
+        cubeta = numpy.minimum(cubeta, cubetas - 1)
+        histogramas = numpy.bincount(grupo * cubetas + cubeta, minlength=cantidad_grupos * cubetas)
+        histogramas = histogramas.reshape(cantidad_grupos, cubetas)
+        medianas = percentil(0.5)
+        por_percentil = {p: percentil(p / 100) for p in percentiles}
+
+    grupos, primeras = {}, {}
+    for g in range(cantidad_grupos):
+        fila = int(filas[primera[g]])
+        clave_grupo = tuple(codigos[fila] for codigos, _ in niveles)
+        primeras[clave_grupo] = fila
+        n = int(con_calorias[g])
+        if n == 0:
+            grupos[clave_grupo] = _grupo_vacio(int(cantidades[g]), percentiles)
+            continue
+        inicio, fin = int(inicios[g]), int(fines[g])
+        grupos[clave_grupo] = {
+            'cantidad': int(cantidades[g]),
+            'con_calorias': n,
+            'media': float(medias[g]),
+            'desvio': float(desvios[g]),
+            'minimo': float(ordenadas[inicio]),
+            'maximo': float(ordenadas[fin - 1]),
+            'mediana': float(medianas[g]),
+            'percentiles': {p: float(valores[g]) for p, valores in por_percentil.items()},
+            'histograma': histogramas[g].tolist(),
+            'menores': indices[inicio:min(inicio + extremos, fin)].tolist(),
+            'mayores': indices[max(fin - extremos, inicio):fin][::-1].tolist(),
+        }
+    return grupos, primeras, bordes
+
+@medido
+def estadisticas_calorias(catalogo: CatalogoColumnar, nivel: str = 'categoria', categoria: str = None,
+                          percentiles=PERCENTILES_ESTADISTICAS, cubetas: int = CUBETAS_HISTOGRAMA,
+                          extremos: int = EXTREMOS_ESTADISTICAS, usar_numpy: bool = None) -> dict:
+    """
+    Calcula la distribución de calorías de cada grupo de un nivel de la jerarquía.
+
+    Args:
+        catalogo (CatalogoColumnar): Catálogo sobre el que se calcula.
+        nivel (str): 'total' (un solo grupo), 'categoria', 'tipo' o 'procesamiento'.
+            Los grupos de 'tipo' son (categoria, tipo) y los de 'procesamiento'
+            (categoria, tipo, procesamiento).
+        categoria (str, optional): Si se indica, solo cuentan los alimentos de esa categoría.
+        percentiles: Percentiles (de 0 a 100) a calcular, con interpolación lineal.
+        cubetas (int): Cubetas del histograma. Los bordes son los mismos para
+            todos los grupos, así que los histogramas se pueden comparar.
+        extremos (int): Cantidad de alimentos más y menos calóricos que se guardan por grupo.
+        usar_numpy (bool, optional): Por defecto se usa NumPy si está instalado.
+
+    Returns:
+        dict: {'nivel', 'motor' ('numpy' o 'array'), 'bordes' (los del
+            histograma), 'grupos'}. 'grupos' va de la tupla con los nombres del
+            grupo (() para 'total') a {'cantidad', 'con_calorias', 'media',
+            'desvio' (poblacional), 'minimo', 'maximo', 'mediana',
+            'percentiles', 'histograma', 'menores', 'mayores'}, ordenados por
+            nombre. 'menores' y 'mayores' son índices de filas del catálogo
+            (catalogo.fila(i)), del extremo hacia adentro. Un grupo sin
+            calorías numéricas tiene None en las medidas.
+    """
+    if nivel not in NIVELES_ESTADISTICAS:
+        raise ValueError(f"Nivel desconocido: {nivel!r}. Use uno de {', '.join(NIVELES_ESTADISTICAS)}.")
+    if cubetas < 1:
+        raise ValueError("El histograma necesita al menos una cubeta.")
+    con_numpy = numpy is not None if usar_numpy is None else usar_numpy
+    if con_numpy and numpy is None:
+        raise ValueError("NumPy no está instalado.")
+
+    resultado = {'nivel': nivel, 'motor': 'numpy' if con_numpy else 'array', 'bordes': [], 'grupos': {}}
+    filtro = None
+    if categoria is not None:
+        filtro = catalogo.categorias.buscar(categoria)
+        if filtro is None:
+            return resultado
+
+    niveles = _codigos_por_nivel(catalogo, nivel)
+    calcular = _calcular_con_numpy if con_numpy else _calcular_con_array
+    grupos, primeras, resultado['bordes'] = calcular(catalogo, niveles, filtro, percentiles, cubetas, extremos)
+    nombres = {clave: tuple(tabla[codigos[fila]] for codigos, tabla in niveles) for clave, fila in primeras.items()}
+    resultado['grupos'] = {nombres[clave]: grupos[clave] for clave in sorted(grupos, key=nombres.__getitem__)}
+    return resultado
@@ -0,0 +1,208 @@
+from Manejo_archivo import *
+from Manejo_archivo import (_registrar_hoja, _falta_salto_final, _actualizar_resumen_hoja, _normalizar_texto,
+                            _asegurar_en_disco, _asegurar_directorio)
+import os, csv, json, time
+
+# Columnas que debe traer cada fila del archivo de origen.
+CAMPOS_IMPORTACION = ('categoria', 'tipo', 'procesamiento', 'nombre', 'calorias_100g')
+# Cantidad de filas aceptadas que se acumulan en memoria antes de escribirlas.
+TAMANO_LOTE_IMPORTACION = 100_000
+
+
+def _leer_origen(ruta_origen: str, formato: str):
+    """
+    (Función auxiliar) Recorre el archivo de origen fila por fila, sin
+    cargarlo entero en memoria.
+
+    Yields:
+        tuple: (número de línea, diccionario con la fila o None si no se pudo leer)
+    """
+    with open(ruta_origen, 'r', encoding='utf-8', newline='') as f:
+        if formato == 'jsonl':
+            for numero, linea in enumerate(f, start=1):
+                if not linea.strip():
+                    continue
+                try:
+                    fila = json.loads(linea)
+                except ValueError:
+                    fila = None
+                yield numero, fila if isinstance(fila, dict) else None
+        else:
+            lector = csv.DictReader(f)
+            for fila in lector:
+                yield lector.line_num, fila
+
+def _validar_fila(fila):
+    """
+    (Función auxiliar) Valida y normaliza una fila con las mismas reglas que el
+    alta interactiva.
+
+    Returns:
+        tuple: ((categoria, tipo, procesamiento), nombre, calorias) o (None, motivo, None).
+    """
+    if fila is None:
+        return None, "línea con formato inválido", None
+    faltantes = [campo for campo in CAMPOS_IMPORTACION if not str(fila.get(campo) or '').strip()]
+    if faltantes:
+        return None, f"faltan campos: {', '.join(faltantes)}", None
+
+    hoja = tuple(normalizar_texto_para_ruta(str(fila[campo])) for campo in CAMPOS_IMPORTACION[:3])
+    if not all(hoja):
+        return None, "la jerarquía queda vacía al normalizarla", None
+    try:
+        calorias = float(fila['calorias_100g'])
+    except (ValueError, TypeError):
+        return None, "calorías no numéricas", None
+    if not calorias > 0:
+        return None, "las calorías deben ser un número positivo mayor a cero", None
+    return hoja, str(fila['nombre']).strip(), calorias
+
+def _nombres_existentes(ruta_archivo: str):
+    """
+    (Función auxiliar) Devuelve (encabezados, set de nombres normalizados) de una
+    hoja, o (None, set()) si todavía no existe.
+    """
+    if not os.path.exists(ruta_archivo):
+        return None, set()
+    encabezados, _, (nombres,), _ = leer_columnas_hoja(ruta_archivo, ['nombre'])
+    return encabezados, set(map(_normalizar_texto, nombres))
+
+@medido
+def _escribir_lote(ruta_base, lotes: dict, encabezados_hojas: dict, catalogo=None) -> int:
+    """
+    (Función auxiliar) Escribe las filas acumuladas: un único open y un único
+    writerows por hoja.
+
+    Returns:
+        int: Cantidad de filas escritas.
+    """
+    escritas = 0
+    for hoja, filas in lotes.items():
+        if not filas:
+            continue
+        ruta_directorio = os.path.join(ruta_base, *hoja)
+        ruta_archivo = os.path.join(ruta_directorio, "items.csv")
+        os.makedirs(ruta_directorio, exist_ok=True)
+
+        with candado_hoja(ruta_archivo):
+            encabezados = encabezados_hojas.get(hoja)
+            escribir_encabezado = encabezados is None or not os.path.exists(ruta_archivo)
+            if escribir_encabezado:
+                encabezados = ['nombre', 'calorias_100g']
+                encabezados_hojas[hoja] = encabezados
+            falta_salto_final = not escribir_encabezado and _falta_salto_final(ruta_archivo)
+            firma_anterior = None if escribir_encabezado else firma_hoja(ruta_archivo)
+
+            # Un buffer grande para que cada hoja se escriba en pocos write() del sistema.
+            with open(ruta_archivo, 'a', encoding='utf-8', newline='', buffering=1024 * 1024) as f:
+                escritor = csv.DictWriter(f, fieldnames=encabezados, restval='')
+                if falta_salto_final:
+                    f.write("\n")
+                if escribir_encabezado:
+                    escritor.writeheader()
+                escritor.writerows({'nombre': nombre, 'calorias_100g': calorias} for nombre, calorias in filas)
+                _asegurar_en_disco(f, ruta_archivo)
+            if escribir_encabezado:
+                _asegurar_directorio(ruta_directorio)
+            if INSTRUMENTACION_ACTIVA:
+                contar(archivos_abiertos=1,
+                       bytes_escritos=os.path.getsize(ruta_archivo) - (firma_anterior[0] if firma_anterior else 0))
+
+            _registrar_hoja(ruta_archivo, filas=len(filas) if escribir_encabezado else None, filas_agregadas=len(filas),
+                            firma_anterior=firma_anterior)
+            _actualizar_resumen_hoja(ruta_archivo, firma_anterior, agregadas=filas)
+            if catalogo is not None:
+                catalogo.agregar_lote(ruta_archivo, hoja[0], hoja[1], hoja[2], filas, firma_anterior)
+        escritas += len(filas)
+    return escritas
+
+@medido
+def importar_masivo(ruta_origen: str, formato: str = None, ruta_base=RUTA_BASE_DATOS, catalogo=None) -> dict:
+    """
+    Importa alimentos desde un archivo CSV o JSONL (una fila por alimento con
+    las columnas categoria, tipo, procesamiento, nombre y calorias_100g).
+
+    El archivo se lee en streaming, la jerarquía se normaliza con
+    normalizar_texto_para_ruta y las filas se agrupan por hoja. Cada hoja se
+    abre una sola vez por lote y se escribe con un único writerows. Se
+    rechazan las filas inválidas y los nombres que ya existen en su hoja (o
+    que se repiten dentro del mismo archivo).
+
+    Args:
+        ruta_origen (str): Archivo a importar.
+        formato (str, optional): 'csv' o 'jsonl'. Si no se indica, se deduce de la extensión.
+        ruta_base (str): Raíz de la base de datos.
+        catalogo (CatalogoColumnar, optional): Catálogo residente a mantener al día.
+
+    Returns:
+        dict: Resumen con filas leídas, importadas, rechazadas (con motivo),
+            hojas tocadas, segundos y filas por segundo.
+    """
+    if formato is None:
+        formato = 'jsonl' if ruta_origen.lower().endswith(('.jsonl', '.json')) else 'csv'
+    # No se hace un fsync por hoja y por lote: lo escrito se sincroniza junto
+    # cada INTERVALO_DURABILIDAD_S segundos y al terminar (salvo con 'nunca').
+    with durabilidad('nunca' if politica_durabilidad() == 'nunca' else 'agrupada'):
+        return _importar(ruta_origen, formato, ruta_base, catalogo)
+
+def _importar(ruta_origen: str, formato: str, ruta_base, catalogo) -> dict:
+    """(Función auxiliar) Cuerpo de importar_masivo, con la política de durabilidad ya elegida."""
+    inicio = time.perf_counter()
+    nombres_por_hoja = {}    # hoja -> set de nombres normalizados (existentes + importados)
+    encabezados_hojas = {}   # hoja -> encabezados del items.csv existente
+    lotes = {}               # hoja -> [(nombre, calorias), ...] pendientes de escribir
+    pendientes = 0
+    leidas = importadas = 0
+    rechazadas = []
+
+    for numero, fila in _leer_origen(ruta_origen, formato):
+        leidas += 1
+        hoja, nombre, calorias = _validar_fila(fila)
+        if hoja is None:
+            rechazadas.append((numero, nombre))
+            continue
+
+        nombres = nombres_por_hoja.get(hoja)
+        if nombres is None:
+            encabezados, nombres = _nombres_existentes(os.path.join(ruta_base, *hoja, "items.csv"))
+            nombres_por_hoja[hoja] = nombres
+            if encabezados is not None:
+                encabezados_hojas[hoja] = encabezados
+
+        clave = _normalizar_texto(nombre)
+        if clave in nombres:
+            rechazadas.append((numero, f"'{nombre}' ya existe en {' > '.join(hoja)}"))
+            continue
+        nombres.add(clave)
+        lotes.setdefault(hoja, []).append((nombre, calorias))
+        pendientes += 1
+
+        if pendientes >= TAMANO_LOTE_IMPORTACION:
+            importadas += _escribir_lote(ruta_base, lotes, encabezados_hojas, catalogo)
+            lotes.clear()
+            pendientes = 0
+
+    importadas += _escribir_lote(ruta_base, lotes, encabezados_hojas, catalogo)
+    guardar_manifiesto(ruta_base)
+
+    segundos = time.perf_counter() - inicio
+    return {
+        'leidas': leidas,
+        'importadas': importadas,
+        'rechazadas': rechazadas,
+        'hojas': len(nombres_por_hoja),
+        'segundos': segundos,
+        'filas_por_segundo': leidas / segundos if segundos > 0 else 0.0,
+    }
+
+def imprimir_resumen_importacion(resumen: dict, max_rechazos: int = 20):
+    """Muestra por consola el resultado de importar_masivo."""
+    print("\n--- Resumen de la Importación ---")
+    print(f"- Filas leídas: {resumen['leidas']}")
+    print(f"- Filas importadas: {resumen['importadas']} (en {resumen['hojas']} hojas)")
+    print(f"- Filas rechazadas: {len(resumen['rechazadas'])}")
+    print(f"- Tiempo: {resumen['segundos']:.2f} s ({resumen['filas_por_segundo']:.0f} filas/s)")
+    for numero, motivo in resumen['rechazadas'][:max_rechazos]:
+        print(f"    Línea {numero}: {motivo}")
+    if len(resumen['rechazadas']) > max_rechazos:
+        print(f"    ... y {len(resumen['rechazadas']) - max_rechazos} rechazos más.")
@@ -0,0 +1,208 @@
+import atexit
+import json
+import os
+import random
+import threading
+import time
+from functools import wraps
+
+# --- Instrumentación de los caminos calientes --- #
+# Se activa con la variable de entorno ALIMENTOS_INSTRUMENTACION=1. Si además se
+# define ALIMENTOS_INSTRUMENTACION_JSON con una ruta, al salir del programa se
+# guarda ahí el reporte en JSON (y no hace falta la otra variable).
+#
+# Desactivada no cuesta nada: el decorador 'medido' devuelve la función original
+# sin envolverla, y los conteos de bytes y filas se hacen solo dentro de un
+# "if INSTRUMENTACION_ACTIVA:".
+#
+# Por cada función medida se guarda la cantidad de llamadas, el tiempo total, la
+# latencia p50/p99 y lo que se contó mientras se ejecutaba (archivos abiertos,
+# bytes leídos y escritos, filas leídas, directorios listados). Los conteos son
+# inclusivos: una hoja leída dentro de crear_lista_desde_csv suma tanto a
+# leer_hoja como a crear_lista_desde_csv. Las hojas que se parsean en otro
+# proceso (PROCESOS_CARGA) no suman a los contadores.
+RUTA_REPORTE_JSON = os.environ.get("ALIMENTOS_INSTRUMENTACION_JSON") or None
+INSTRUMENTACION_ACTIVA = (os.environ.get("ALIMENTOS_INSTRUMENTACION", "0") not in ("", "0")
+                          or RUTA_REPORTE_JSON is not None)
+
+CONTADORES = ('archivos_abiertos', 'bytes_leidos', 'bytes_escritos', 'filas_leidas', 'directorios_listados')
+# Duraciones que se guardan por función para calcular percentiles. Pasado este
+# límite se reemplazan al azar (muestreo de reservorio), así que la memoria no crece.
+MAX_MUESTRAS = 10_000
+
+_metricas = {}  # nombre -> _Metrica
+_totales = dict.fromkeys(CONTADORES, 0)
+_candado = threading.Lock()
+_pila = threading.local()  # métricas en curso en cada hilo
+_azar = random.Random(0)
+_inicio = time.perf_counter()
+
+
+class _Metrica:
+    """Acumula las mediciones de una función."""
+    __slots__ = ('llamadas', 'segundos', 'muestras', 'contadores')
+
+    def __init__(self):
+        self.llamadas = 0
+        self.segundos = 0.0
+        self.muestras = []
+        self.contadores = dict.fromkeys(CONTADORES, 0)
+
+    def registrar(self, duracion: float):
+        self.llamadas += 1
+        self.segundos += duracion
+        if len(self.muestras) < MAX_MUESTRAS:
+            self.muestras.append(duracion)
+        else:
+            posicion = _azar.randrange(self.llamadas)
+            if posicion < MAX_MUESTRAS:
+                self.muestras[posicion] = duracion
+
+
+def _pila_actual() -> list:
+    """(Función auxiliar) Métricas de las funciones medidas que está ejecutando este hilo."""
+    pila = getattr(_pila, 'metricas', None)
+    if pila is None:
+        pila = _pila.metricas = []
+    return pila
+
+def medido(funcion=None, *, nombre: str = None):
+    """
+    Decorador que mide cada llamada a la función si la instrumentación está
+    activa. Se usa como @medido o como @medido(nombre="...").
+
+    Las llamadas recursivas (la función ya está en curso en el mismo hilo) no se
+    miden de nuevo: cuenta solo la llamada de afuera.
+    """
+    def decorar(funcion):
+        if not INSTRUMENTACION_ACTIVA:
+            return funcion
+        with _candado:
+            metrica = _metricas.setdefault(nombre or funcion.__qualname__, _Metrica())
+
+        @wraps(funcion)
+        def envoltura(*args, **kwargs):
+            pila = _pila_actual()
+            if metrica in pila:
+                return funcion(*args, **kwargs)
+            pila.append(metrica)
+            inicio = time.perf_counter()
+            try:
+                return funcion(*args, **kwargs)
+            finally:
+                duracion = time.perf_counter() - inicio
+                pila.pop()
+                with _candado:
+                    metrica.registrar(duracion)
+        return envoltura
+
+    return decorar if funcion is None else decorar(funcion)
+
+def contar(**cantidades):
+    """
+    Suma cantidades a los contadores (por ejemplo contar(archivos_abiertos=1,
+    bytes_leidos=n)), tanto al total como a cada función medida en curso.
+    Conviene llamarla dentro de "if INSTRUMENTACION_ACTIVA:" para no calcular
+    las cantidades cuando está desactivada.
+    """
+    if not INSTRUMENTACION_ACTIVA:
+        return
+    pila = _pila_actual()
+    with _candado:
+        for clave, cantidad in cantidades.items():
+            _totales[clave] += cantidad
+            for metrica in pila:
+                metrica.contadores[clave] += cantidad
+
+def _percentil(ordenadas: list, fraccion: float) -> float:
+    """(Función auxiliar) Percentil por el método del rango más cercano."""
+    if not ordenadas:
+        return 0.0
+    return ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * fraccion))]
+
+def reporte_instrumentacion() -> dict:
+    """
+    Devuelve lo medido hasta ahora.
+
+    Returns:
+        dict: {'activa', 'segundos_desde_inicio', 'totales', 'funciones'}, donde
+            'funciones' va de nombre a {'llamadas', 'total_s', 'media_ms',
+            'p50_ms', 'p99_ms'} más los contadores, ordenadas por tiempo total.
+    """
+    with _candado:
+        funciones = {}
+        for nombre, metrica in _metricas.items():
+            if metrica.llamadas == 0:
+                continue
+            ordenadas = sorted(metrica.muestras)
+            funciones[nombre] = {
+                'llamadas': metrica.llamadas,
+                'total_s': metrica.segundos,
+                'media_ms': metrica.segundos / metrica.llamadas * 1000,
+                'p50_ms': _percentil(ordenadas, 0.50) * 1000,
+                'p99_ms': _percentil(ordenadas, 0.99) * 1000,
+                **metrica.contadores,
+            }
+        totales = dict(_totales)
+    return {
+        'activa': INSTRUMENTACION_ACTIVA,
+        'segundos_desde_inicio': time.perf_counter() - _inicio,
+        'totales': totales,
+        'funciones': dict(sorted(funciones.items(), key=lambda par: par[1]['total_s'], reverse=True)),
+    }
+
+def _bytes_legibles(cantidad: int) -> str:
+    """(Función auxiliar) 1536 -> '1.5 KiB'."""
+    for unidad in ("B", "KiB", "MiB"):
+        if cantidad < 1024:
+            return f"{cantidad:.0f} {unidad}" if unidad == "B" else f"{cantidad:.1f} {unidad}"
+        cantidad /= 1024
+    return f"{cantidad:.1f} GiB"
+
+def imprimir_reporte_instrumentacion():
+    """Muestra el reporte como tabla, de la función más costosa a la menos costosa."""
+    if not INSTRUMENTACION_ACTIVA:
+        print("La instrumentación está desactivada. Inicie el programa con ALIMENTOS_INSTRUMENTACION=1.")
+        return
+    reporte = reporte_instrumentacion()
+    print("\n--- Reporte de Rendimiento ---")
+    if not reporte['funciones']:
+        print("Todavía no se midió ninguna llamada.")
+    else:
+        print(f"{'Función':<40} | {'Llamadas':>8} | {'Total (s)':>9} | {'p50 (ms)':>9} | {'p99 (ms)':>9} | "
+              f"{'Archivos':>8} | {'Filas':>9} | {'Leído':>10} | {'Escrito':>10}")
+        print("-" * 134)
+        for nombre, datos in reporte['funciones'].items():
+            print(f"{nombre[:40]:<40} | {datos['llamadas']:>8} | {datos['total_s']:>9.3f} | "
+                  f"{datos['p50_ms']:>9.3f} | {datos['p99_ms']:>9.3f} | {datos['archivos_abiertos']:>8} | "
+                  f"{datos['filas_leidas']:>9} | {_bytes_legibles(datos['bytes_leidos']):>10} | "
+                  f"{_bytes_legibles(datos['bytes_escritos']):>10}")
+    totales = reporte['totales']
+    print(f"\nTotales: {totales['archivos_abiertos']} archivos abiertos, {totales['directorios_listados']} "
+          f"directorios listados, {totales['filas_leidas']} filas leídas, "
+          f"{_bytes_legibles(totales['bytes_leidos'])} leídos, {_bytes_legibles(totales['bytes_escritos'])} escritos.")
+    print("(Los tiempos de los menús incluyen la espera de lo que escribe el usuario.)")
+
+def guardar_reporte_instrumentacion(ruta: str) -> bool:
+    """Guarda el reporte en 'ruta' como JSON. Devuelve True si se pudo escribir."""
+    try:
+        with open(ruta, 'w', encoding='utf-8') as f:
+            json.dump(reporte_instrumentacion(), f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        return True
+    except OSError as e:
+        print(f"ADVERTENCIA: No se pudo guardar el reporte de instrumentación en {ruta}. Detalles: {e}")
+        return False
+
+def _reiniciar_en_proceso_hijo():
+    """(Función auxiliar) Tras un fork el candado pudo quedar tomado por un hilo que no existe en el hijo."""
+    global _candado
+    _candado = threading.Lock()
+
+if INSTRUMENTACION_ACTIVA and hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reiniciar_en_proceso_hijo)
+
+# Se registra al importar el módulo (antes que los demás atexit de la
+# aplicación), así que corre al final e incluye el guardado de manifiestos e instantáneas.
+if RUTA_REPORTE_JSON is not None:
+    atexit.register(guardar_reporte_instrumentacion, RUTA_REPORTE_JSON)
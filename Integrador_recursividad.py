@@ -1,6 +1,9 @@
 from Manejo_archivo import *
 from Sub_Menus import *
 from Utilidades import *
+from Comandos import ejecutar_comando
+from Instrumentacion import imprimir_reporte_instrumentacion
+import sys
 
 def main():
     salir = False
@@ -10,8 +13,11 @@ def main():
             "Mostrar y Filtrar Alimentos",
             "Modificación de un Ítem",
             "Eliminación de un Ítem",
-            "Estadísticas y Ordenamiento"
+            "Estadísticas y Ordenamiento",
+            "Importación Masiva desde Archivo"
         ]
+        if INSTRUMENTACION_ACTIVA:
+            opciones_principales.append("Reporte de Rendimiento (instrumentación)")
         print("\n=========================================")
         imprimir_menu("GESTOR DE BASE DE DATOS DE ALIMENTOS", opciones_principales, "Salir")
         opc = input("Elija una opción: ").strip()
@@ -24,14 +30,14 @@ def main():
                 opcion_2_mostrar_y_filtrar()
             case "3":
                 #3) Modificacion de un item
-                nombre = input("Ingrese el nombre exacto del ítem que desea modificar: ")
+                nombre = input("Ingrese el nombre (no hace falta que sea exacto) del ítem que desea modificar: ")
                 if nombre:
                     modificar_item_por_nombre(nombre) # Llamada a la nueva función
                 else:
                     print("No ingresó un nombre. Volviendo al menú.")
             case "4":
                 #4) Eliminacion de un item/Busqueda multiples coincidencias
-                nombre = input("Ingrese el nombre exacto del ítem que desea eliminar: ")
+                nombre = input("Ingrese el nombre (no hace falta que sea exacto) del ítem que desea eliminar: ")
                 if nombre:
                     eliminar_item_por_nombre(nombre) # Llamada a la nueva función
                 else:
@@ -39,6 +45,12 @@ def main():
             case "5":
                 #5) Estadisticas y ordenamiento
                 opcion_5_estadisticas()
+            case "6":
+                #6) Importacion masiva desde CSV/JSONL
+                opcion_6_importacion_masiva()
+            case "7" if INSTRUMENTACION_ACTIVA:
+                #7) Reporte de la instrumentacion (solo con ALIMENTOS_INSTRUMENTACION=1)
+                imprimir_reporte_instrumentacion()
             case "0":
                 print("¡Gracias, vuelva pronto!")
                 salir = True
@@ -46,4 +58,7 @@ def main():
                 print("Opción no válida. Por favor, intente de nuevo.")
 
 if __name__ == "__main__":
+    # Con argumentos (query, stats o batch) se responde sin menús; sin argumentos, el menú interactivo.
+    if len(sys.argv) > 1:
+        sys.exit(ejecutar_comando(sys.argv[1:]))
     main()
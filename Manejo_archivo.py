@@ -1,24 +1,1482 @@
 import os
 import csv
+import json
+import atexit
+import io
+import mmap
+import re
+import threading
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import lru_cache
+from itertools import compress
+try:
+    import fcntl
+except ImportError: # Windows: los candados de hoja protegen solo entre hilos.
+    fcntl = None
+from Instrumentacion import medido, contar, INSTRUMENTACION_ACTIVA
 
 ruta_script = os.path.dirname(os.path.abspath(__file__))
-RUTA_BASE_DATOS = os.path.join(ruta_script, "base_de_datos_alimentos")
+# La variable de entorno ALIMENTOS_RUTA_BASE permite apuntar a otra base (por
+# ejemplo, un árbol sintético para medir rendimiento).
+RUTA_BASE_DATOS = os.environ.get("ALIMENTOS_RUTA_BASE") or os.path.join(ruta_script, "base_de_datos_alimentos")
 
+# --- Almacenamiento de la base --- #
+# La base puede guardarse como el árbol categoria/tipo/procesamiento/items.csv
+# ('csv', por defecto) o en un único archivo SQLite ('sqlite', ver
+# AlmacenSQLite.py). Con 'sqlite', alta_nuevo_item, nombre_existe_en_hoja,
+# crear_lista_desde_csv, iter_alimentos y sobrescribir_csv sobre una hoja de
+# RUTA_BASE_DATOS leen y escriben en el archivo RUTA_SQLITE en lugar del árbol.
+# Se elige con ALIMENTOS_ALMACEN y ALIMENTOS_SQLITE, o con usar_almacen().
+ALMACENES = ('csv', 'sqlite')
+ALMACEN_DATOS = os.environ.get("ALIMENTOS_ALMACEN", "csv")
+if ALMACEN_DATOS not in ALMACENES:
+    print(f"ADVERTENCIA: ALIMENTOS_ALMACEN='{ALMACEN_DATOS}' no es válido "
+          f"({', '.join(ALMACENES)}); se usa 'csv'.")
+    ALMACEN_DATOS = 'csv'
+RUTA_SQLITE = os.environ.get("ALIMENTOS_SQLITE") or os.path.normpath(RUTA_BASE_DATOS) + ".db"
 
+_almacen_sqlite = None   # AlmacenSQLite abierto sobre RUTA_SQLITE, si se usa
+_candado_almacen = threading.Lock()
+
+def almacen_de_datos():
+    """
+    Devuelve el AlmacenSQLite de la base si se guarda en SQLite (abriéndolo la
+    primera vez), o None si se guarda en el árbol de CSV.
+    """
+    global _almacen_sqlite
+    if ALMACEN_DATOS != 'sqlite':
+        return None
+    with _candado_almacen:
+        if _almacen_sqlite is None:
+            from AlmacenSQLite import AlmacenSQLite # Importa este módulo: no puede ir arriba.
+            _almacen_sqlite = AlmacenSQLite(RUTA_SQLITE)
+        return _almacen_sqlite
+
+def usar_almacen(almacen: str, ruta_db: str = None):
+    """
+    Cambia dónde se guarda la base ('csv' o 'sqlite') para todo el proceso.
+    Con 'sqlite', 'ruta_db' elige el archivo (por defecto, RUTA_SQLITE).
+    """
+    global ALMACEN_DATOS, RUTA_SQLITE, _almacen_sqlite
+    if almacen not in ALMACENES:
+        raise ValueError(f"almacenamiento desconocido: {almacen!r}")
+    with _candado_almacen:
+        if ruta_db is not None:
+            RUTA_SQLITE = ruta_db
+        if _almacen_sqlite is not None and (almacen != 'sqlite' or _almacen_sqlite.ruta_db != os.path.abspath(RUTA_SQLITE)):
+            _almacen_sqlite.cerrar()
+            _almacen_sqlite = None
+        ALMACEN_DATOS = almacen
+
+def _almacen_para_base(ruta_base, nombre_archivo="items.csv"):
+    """(Función auxiliar) El AlmacenSQLite si 'ruta_base' es la base y se guarda en SQLite; si no, None."""
+    if nombre_archivo != "items.csv" or os.path.abspath(ruta_base) != os.path.abspath(RUTA_BASE_DATOS):
+        return None
+    return almacen_de_datos()
+
+def _hoja_en_almacen(ruta_archivo):
+    """
+    (Función auxiliar) Si 'ruta_archivo' es una hoja de la base y la base se
+    guarda en SQLite, devuelve (almacen, (categoria, tipo, procesamiento)); si no, None.
+    """
+    if ALMACEN_DATOS != 'sqlite':
+        return None
+    relativa = os.path.relpath(os.path.abspath(ruta_archivo), os.path.abspath(RUTA_BASE_DATOS))
+    partes = relativa.split(os.sep)
+    if len(partes) != 4 or partes[-1] != "items.csv" or partes[0] == os.pardir:
+        return None
+    return almacen_de_datos(), tuple(partes[:3])
+
+# --- Manifiesto de hojas --- #
+# El manifiesto es un archivo JSON guardado en la raíz de la base de datos que
+# recuerda, para cada directorio, su mtime y sus subdirectorios, y para cada
+# 'items.csv' su tamaño, mtime y cantidad de filas. Es solo una caché: si algo
+# no coincide con lo que hay en disco, esa parte se vuelve a escanear.
+NOMBRE_MANIFIESTO = ".manifiesto.json"
+VERSION_MANIFIESTO = 1
+
+_manifiestos = {}  # ruta_base -> manifiesto cargado en memoria
+# Protege _manifiestos y todo su contenido: lo tocan a la vez los hilos de
+# escritura del servidor, la compactación en segundo plano y resumen_calorias.
+# Es reentrante porque las funciones de abajo se llaman entre sí.
+_candado_manifiestos = threading.RLock()
+
+
+def _manifiesto_vacio(nombre_archivo):
+    return {
+        'version': VERSION_MANIFIESTO,
+        'archivo': nombre_archivo,
+        'directorios': {},
+        'hojas': {},
+        'sucio': True,
+    }
+
+def _cargar_manifiesto(ruta_base, nombre_archivo="items.csv"):
+    """
+    (Función auxiliar) Devuelve el manifiesto de 'ruta_base', leyéndolo del
+    disco la primera vez. Si no existe o no es válido se empieza uno vacío.
+    """
+    ruta_base = os.path.abspath(ruta_base)
+    with _candado_manifiestos:
+        manifiesto = _manifiestos.get(ruta_base)
+        if manifiesto is not None and manifiesto['archivo'] == nombre_archivo:
+            return manifiesto
+
+        try:
+            with open(os.path.join(ruta_base, NOMBRE_MANIFIESTO), 'r', encoding='utf-8') as f:
+                manifiesto = json.load(f)
+                if INSTRUMENTACION_ACTIVA:
+                    contar(archivos_abiertos=1, bytes_leidos=f.tell())
+            if manifiesto.get('version') != VERSION_MANIFIESTO or manifiesto.get('archivo') != nombre_archivo:
+                manifiesto = _manifiesto_vacio(nombre_archivo)
+            else:
+                manifiesto['sucio'] = False
+        except (OSError, ValueError):
+            manifiesto = _manifiesto_vacio(nombre_archivo)
+
+        _manifiestos[ruta_base] = manifiesto
+        return manifiesto
+
+@medido
+def guardar_manifiesto(ruta_base):
+    """
+    Persiste el manifiesto de 'ruta_base' si tuvo cambios. Se escribe en un
+    archivo temporal y se reemplaza para no dejar nunca un JSON a medias.
+    Todo ocurre con el candado de los manifiestos tomado: el JSON es una foto
+    que ningún otro hilo modifica a mitad de camino, y dos hilos que guardan a
+    la vez no comparten el temporal.
+    """
+    ruta_base = os.path.abspath(ruta_base)
+    with _candado_manifiestos:
+        manifiesto = _manifiestos.get(ruta_base)
+        if manifiesto is None or not manifiesto['sucio'] or not os.path.isdir(ruta_base):
+            return
+        ruta_manifiesto = os.path.join(ruta_base, NOMBRE_MANIFIESTO)
+        datos = {clave: valor for clave, valor in manifiesto.items() if clave != 'sucio'}
+        texto = json.dumps(datos, separators=(',', ':'))
+        try:
+            with open(ruta_manifiesto + ".tmp", 'w', encoding='utf-8') as f:
+                f.write(texto)
+                if INSTRUMENTACION_ACTIVA:
+                    contar(archivos_abiertos=1, bytes_escritos=f.tell())
+            os.replace(ruta_manifiesto + ".tmp", ruta_manifiesto)
+            manifiesto['sucio'] = False
+        except OSError as e:
+            print(f"ADVERTENCIA: No se pudo guardar el manifiesto en {ruta_manifiesto}. Detalles: {e}")
+
+@atexit.register
+def _guardar_todos_los_manifiestos():
+    with _candado_manifiestos:
+        rutas_base = list(_manifiestos)
+    for ruta_base in rutas_base:
+        guardar_manifiesto(ruta_base)
+
+def _olvidar_directorio(manifiesto, relativa):
+    """(Función auxiliar) Quita del manifiesto un directorio y todo lo que cuelga de él."""
+    entrada = manifiesto['directorios'].pop(relativa, None)
+    if entrada is None:
+        return
+    for archivo in entrada['archivos']:
+        manifiesto['hojas'].pop(os.path.join(relativa, archivo), None)
+    for sub in entrada['subdirs']:
+        _olvidar_directorio(manifiesto, os.path.join(relativa, sub))
+    manifiesto['sucio'] = True
+
+def _validar_directorio(manifiesto, ruta_base, relativa):
+    """
+    (Función auxiliar) Compara el mtime de un directorio con el del manifiesto.
+    Solo si cambió se vuelve a listar su contenido con os.scandir.
+
+    Returns:
+        dict | None: La entrada actualizada del directorio, o None si ya no existe.
+    """
+    ruta_abs = os.path.join(ruta_base, relativa) if relativa else ruta_base
+    try:
+        mtime_ns = os.stat(ruta_abs).st_mtime_ns
+    except (FileNotFoundError, NotADirectoryError):
+        _olvidar_directorio(manifiesto, relativa)
+        _arboles.pop(ruta_base, None)
+        return None
+
+    entrada = manifiesto['directorios'].get(relativa)
+    if entrada is not None and entrada['mtime_ns'] == mtime_ns:
+        return entrada
+
+    nombre_archivo = manifiesto['archivo'].lower()
+    subdirs, archivos = [], []
+    if INSTRUMENTACION_ACTIVA:
+        contar(directorios_listados=1)
+    with os.scandir(ruta_abs) as elementos:
+        for elemento in elementos:
+            if elemento.is_dir():
+                subdirs.append(elemento.name)
+            elif elemento.is_file() and elemento.name.lower() == nombre_archivo:
+                archivos.append(elemento.name)
+
+    if entrada is not None:
+        # Olvidamos lo que desapareció desde la última vez.
+        for sub in set(entrada['subdirs']) - set(subdirs):
+            _olvidar_directorio(manifiesto, os.path.join(relativa, sub))
+        for archivo in set(entrada['archivos']) - set(archivos):
+            manifiesto['hojas'].pop(os.path.join(relativa, archivo), None)
+
+    entrada = {'mtime_ns': mtime_ns, 'subdirs': sorted(subdirs), 'archivos': sorted(archivos)}
+    manifiesto['directorios'][relativa] = entrada
+    # El directorio cambió: el árbol de la jerarquía se vuelve a armar al usarlo.
+    _arboles.pop(ruta_base, None)
+    manifiesto['sucio'] = True
+    return entrada
+
+def _validar_hoja(manifiesto, ruta_base, relativa):
+    """
+    (Función auxiliar) Actualiza tamaño y mtime de una hoja. Si el archivo
+    cambió por fuera, la cantidad de filas guardada deja de ser confiable.
+    """
+    st = os.stat(os.path.join(ruta_base, relativa))
+    hoja = manifiesto['hojas'].get(relativa)
+    if hoja is None or hoja['tamano'] != st.st_size or hoja['mtime_ns'] != st.st_mtime_ns:
+        manifiesto['hojas'][relativa] = {'tamano': st.st_size, 'mtime_ns': st.st_mtime_ns, 'filas': None}
+        manifiesto['sucio'] = True
+        _anotar_filas_arbol(ruta_base, relativa, None)
+
+def _recorrer_manifiesto(manifiesto, ruta_base, relativa, lista_rutas, filtros=()):
+    """
+    (Función auxiliar) Recorre el árbol usando el manifiesto y acumula las hojas.
+    'filtros' trae, por nivel, el nombre normalizado del subdirectorio a
+    seguir (o None para seguir todos); los demás ni se visitan.
+    """
+    entrada = _validar_directorio(manifiesto, ruta_base, relativa)
+    if entrada is None:
+        return
+    filtro, resto = (filtros[0], filtros[1:]) if filtros else (None, ())
+    # Un archivo a esta altura solo pertenece al filtro si no queda nivel por exigir.
+    archivos = entrada['archivos'] if not any(filtros) else []
+    for archivo in archivos:
+        relativa_hoja = os.path.join(relativa, archivo)
+        try:
+            _validar_hoja(manifiesto, ruta_base, relativa_hoja)
+        except FileNotFoundError:
+            manifiesto['hojas'].pop(relativa_hoja, None)
+            _arboles.pop(ruta_base, None)
+            continue
+        lista_rutas.append(os.path.join(ruta_base, relativa_hoja))
+    for sub in entrada['subdirs']:
+        if filtro is not None and normalizar_texto_para_ruta(sub) != filtro:
+            continue
+        _recorrer_manifiesto(manifiesto, ruta_base, os.path.join(relativa, sub), lista_rutas, resto)
+
+def _filtros_jerarquia(categoria=None, tipo=None, procesamiento=None):
+    """
+    (Función auxiliar) Arma la tupla de filtros por nivel (categoría, tipo,
+    procesamiento), normalizados igual que los nombres de carpeta.
+    """
+    filtros = tuple(None if valor is None else normalizar_texto_para_ruta(valor)
+                    for valor in (categoria, tipo, procesamiento))
+    # Se recortan los None del final para no exigir profundidad de más.
+    while filtros and filtros[-1] is None:
+        filtros = filtros[:-1]
+    return filtros
+
+@medido
+def obtener_rutas_csv(ruta_base, nombre_archivo="items.csv", categoria=None, tipo=None, procesamiento=None):
+    """
+    Devuelve las rutas de todos los archivos 'items.csv' bajo 'ruta_base'.
+
+    Usa el manifiesto persistente: los directorios cuyo mtime no cambió no se
+    vuelven a listar. Si el manifiesto no se puede usar, recurre al recorrido
+    recursivo completo.
+
+    Si se indica categoría, tipo o procesamiento, solo se desciende por los
+    subdirectorios que coinciden, sin tocar el resto del árbol.
+
+    Returns:
+        list: Rutas absolutas de las hojas, en orden alfabético de directorio.
+    """
+    ruta_base = os.path.abspath(ruta_base)
+    if not os.path.isdir(ruta_base):
+        return []
+    filtros = _filtros_jerarquia(categoria, tipo, procesamiento)
+    rutas_csv = []
+    try:
+        with _candado_manifiestos:
+            manifiesto = _cargar_manifiesto(ruta_base, nombre_archivo)
+            _recorrer_manifiesto(manifiesto, ruta_base, "", rutas_csv, filtros)
+    except OSError:
+        rutas_csv = []
+        _encontrar_rutas_csv_recursivo(ruta_base, rutas_csv, nombre_archivo)
+        if filtros:
+            rutas_csv = [ruta for ruta in rutas_csv if _coincide_jerarquia(ruta_base, ruta, filtros)]
+    return rutas_csv
+
+def _coincide_jerarquia(ruta_base, ruta_archivo, filtros):
+    """(Función auxiliar) Indica si una hoja cae dentro de los filtros por nivel."""
+    partes = os.path.relpath(os.path.dirname(ruta_archivo), ruta_base).split(os.sep)
+    if len(partes) < len(filtros):
+        return False
+    return all(filtro is None or normalizar_texto_para_ruta(parte) == filtro
+               for parte, filtro in zip(partes, filtros))
+
+def listar_jerarquia(ruta_base=RUTA_BASE_DATOS, categoria=None, tipo=None, nombre_archivo="items.csv"):
+    """
+    Lista el siguiente nivel de la jerarquía que tiene al menos una hoja: las
+    categorías, los tipos de una categoría o los procesamientos de un tipo.
+    Usa el árbol de la jerarquía, así que no lee ningún CSV.
+
+    Returns:
+        list: Nombres de carpeta ordenados alfabéticamente.
+    """
+    nodo = nodo_jerarquia(ruta_base, categoria, tipo if categoria is not None else None,
+                          nombre_archivo=nombre_archivo)
+    return sorted(nodo['hijos']) if nodo is not None else []
+
+# --- Árbol de la jerarquía --- #
+# Los menús que eligen categoría, tipo y procesamiento usan un árbol en memoria
+# armado con los nombres de las carpetas del manifiesto, con la cantidad de
+# alimentos de cada nodo tomada de las filas que el manifiesto ya conoce. Las
+# altas y bajas de este proceso lo actualizan al vuelo; si un recorrido
+# encuentra un directorio cambiado, el árbol se descarta y se vuelve a armar
+# en la próxima consulta. Como sale del manifiesto, también lo protege
+# _candado_manifiestos.
+_arboles = {}  # ruta_base -> (manifiesto con el que se armó, raíz)
+
+def _nodo_jerarquia():
+    return {'cantidad': 0, 'propias': 0, 'hijos': {}}
+
+def _partes_directorio(relativa):
+    """(Función auxiliar) Carpetas de la ruta relativa de una hoja: 'a/b/c/items.csv' -> ['a', 'b', 'c']."""
+    return [parte for parte in os.path.dirname(relativa).split(os.sep) if parte]
+
+def _sumar_nodo(nodo):
+    """
+    (Función auxiliar) Recalcula la cantidad de un nodo con sus filas propias
+    y las de sus hijos. Si alguna se desconoce, la cantidad es None.
+    """
+    cantidades = [nodo['propias']] + [hijo['cantidad'] for hijo in nodo['hijos'].values()]
+    nodo['cantidad'] = None if None in cantidades else sum(cantidades)
+
+def _sumar_arbol(nodo):
+    for hijo in nodo['hijos'].values():
+        _sumar_arbol(hijo)
+    _sumar_nodo(nodo)
+
+@medido
+def arbol_jerarquia(ruta_base=RUTA_BASE_DATOS, nombre_archivo="items.csv") -> dict:
+    """
+    Devuelve el árbol categoría -> tipo -> procesamiento de la base.
+
+    Cada nodo es un diccionario {'cantidad', 'propias', 'hijos'}: 'hijos' va
+    del nombre de cada subcarpeta a su nodo, 'propias' son las filas de la hoja
+    de esa carpeta (si tiene una) y 'cantidad' el total de alimentos debajo del
+    nodo (None si alguna hoja no se pudo contar). Solo aparecen las carpetas
+    que llevan a alguna hoja. Las cantidades salen del manifiesto; solo se lee
+    una hoja si el manifiesto no sabe cuántas filas tiene. El árbol se arma una
+    vez y se reutiliza: no debe modificarse.
+    """
+    ruta_base = os.path.abspath(ruta_base)
+    leidas = set()
+    while True:
+        # El árbol se arma con el candado tomado, así ninguna alta o baja de otro
+        # hilo cambia el manifiesto a mitad de camino ni se pierde al guardarlo.
+        with _candado_manifiestos:
+            guardado = _arboles.get(ruta_base)
+            if guardado is not None and guardado[0] is _manifiestos.get(ruta_base) and guardado[0]['archivo'] == nombre_archivo:
+                return guardado[1]
+
+            rutas_csv = obtener_rutas_csv(ruta_base, nombre_archivo)
+            manifiesto = _manifiestos.get(ruta_base)
+            raiz = _nodo_jerarquia()
+            sin_contar = []
+            for ruta_archivo in rutas_csv:
+                relativa = os.path.relpath(ruta_archivo, ruta_base)
+                nodo = raiz
+                for parte in _partes_directorio(relativa):
+                    nodo = nodo['hijos'].setdefault(parte, _nodo_jerarquia())
+                hoja = manifiesto['hojas'].get(relativa) if manifiesto is not None else None
+                filas = hoja['filas'] if hoja is not None else None
+                if filas is None and ruta_archivo not in leidas:
+                    sin_contar.append(ruta_archivo)
+                nodo['propias'] = None if filas is None or nodo['propias'] is None else nodo['propias'] + filas
+            if not sin_contar:
+                _sumar_arbol(raiz)
+                if manifiesto is not None:
+                    _arboles[ruta_base] = (manifiesto, raiz)
+                return raiz
+
+        # Hojas que cambiaron por fuera (o nunca se leyeron): se cuentan sus filas
+        # una vez y quedan en el manifiesto para las próximas sesiones. Se leen sin
+        # el candado del manifiesto, porque las escrituras toman primero el de la
+        # hoja y después el del manifiesto; luego se vuelve a armar el árbol.
+        for ruta_archivo in sin_contar:
+            leidas.add(ruta_archivo)
+            try:
+                filas = len(leer_columnas_hoja(ruta_archivo, ['nombre'])[1])
+                _registrar_filas_leidas(ruta_base, ruta_archivo, filas)
+            except (OSError, ValueError, csv.Error) as e:
+                print(f"ADVERTENCIA: No se pudo leer el archivo {ruta_archivo}. Detalles: {e}")
+
+def nodo_jerarquia(ruta_base=RUTA_BASE_DATOS, categoria=None, tipo=None, procesamiento=None,
+                   nombre_archivo="items.csv"):
+    """
+    Devuelve el nodo del árbol de la jerarquía para los niveles indicados (la
+    raíz si no se indica ninguno), o None si no existe. Los nombres se comparan
+    normalizados, igual que los filtros de obtener_rutas_csv.
+    """
+    nodo = arbol_jerarquia(ruta_base, nombre_archivo)
+    for valor in (categoria, tipo, procesamiento):
+        if valor is None:
+            break
+        hijo = nodo['hijos'].get(valor)
+        if hijo is None:
+            buscado = normalizar_texto_para_ruta(valor)
+            hijo = next((h for nombre, h in nodo['hijos'].items() if normalizar_texto_para_ruta(nombre) == buscado), None)
+            if hijo is None:
+                return None
+        nodo = hijo
+    return nodo
+
+def _anotar_filas_arbol(ruta_base, relativa, filas):
+    """
+    (Función auxiliar) Actualiza en el árbol en memoria las filas de una hoja
+    y las cantidades de sus ancestros. Si la hoja no está en el árbol (es
+    nueva) o ya no se sabe cuántas filas tiene, se descarta el árbol para
+    armarlo de nuevo (contándola) en la próxima consulta.
+    """
+    guardado = _arboles.get(ruta_base)
+    if guardado is None:
+        return
+    if filas is None:
+        _arboles.pop(ruta_base, None)
+        return
+    camino = [guardado[1]]
+    for parte in _partes_directorio(relativa):
+        nodo = camino[-1]['hijos'].get(parte)
+        if nodo is None:
+            _arboles.pop(ruta_base, None)
+            return
+        camino.append(nodo)
+    camino[-1]['propias'] = filas
+    for nodo in reversed(camino):
+        _sumar_nodo(nodo)
+
+def _manifiesto_de_archivo(ruta_archivo):
+    """
+    (Función auxiliar) Busca el manifiesto al que pertenece una hoja.
+
+    Returns:
+        tuple: (ruta_base, manifiesto, ruta relativa) o (None, None, None).
+    """
+    ruta_archivo = os.path.abspath(ruta_archivo)
+    nombre_archivo = os.path.basename(ruta_archivo)
+    with _candado_manifiestos:
+        candidatas = set(_manifiestos) | {os.path.abspath(RUTA_BASE_DATOS)}
+        for ruta_base in candidatas:
+            if not ruta_archivo.startswith(ruta_base + os.sep):
+                continue
+            manifiesto = _manifiestos.get(ruta_base)
+            if manifiesto is None:
+                manifiesto = _cargar_manifiesto(ruta_base, nombre_archivo)
+            if manifiesto['archivo'].lower() == nombre_archivo.lower():
+                return ruta_base, manifiesto, os.path.relpath(ruta_archivo, ruta_base)
+    return None, None, None
+
+def _registrar_filas_leidas(ruta_base, ruta_archivo, filas_leidas):
+    """
+    (Función auxiliar) Guarda en el manifiesto cuántas filas se leyeron de una
+    hoja que ya fue validada por obtener_rutas_csv.
+    """
+    ruta_base = os.path.abspath(ruta_base)
+    with _candado_manifiestos:
+        manifiesto = _manifiestos.get(ruta_base)
+        if manifiesto is None:
+            return
+        hoja = manifiesto['hojas'].get(os.path.relpath(ruta_archivo, ruta_base))
+        if hoja is not None and hoja['filas'] != filas_leidas:
+            hoja['filas'] = filas_leidas
+            manifiesto['sucio'] = True
+            _anotar_filas_arbol(ruta_base, os.path.relpath(ruta_archivo, ruta_base), filas_leidas)
+
+def _registrar_hoja(ruta_archivo, filas=None, filas_agregadas=0, firma_anterior=None):
+    """
+    (Función auxiliar) Actualiza en el manifiesto la entrada de una hoja que
+    acabamos de escribir, sin volver a recorrer el árbol.
+
+    Args:
+        ruta_archivo (str): Ruta del 'items.csv' escrito.
+        filas (int, optional): Cantidad total de filas, si se conoce.
+        filas_agregadas (int): Filas añadidas al final (para altas).
+        firma_anterior (tuple, optional): firma_hoja antes de agregarlas. Las
+            filas guardadas solo se suman si el manifiesto coincidía con esa
+            firma; si la hoja había cambiado por fuera, quedan desconocidas.
+    """
+    with _candado_manifiestos:
+        ruta_base, manifiesto, relativa = _manifiesto_de_archivo(ruta_archivo)
+        if manifiesto is None:
+            return
+        try:
+            # Los directorios recién creados se incorporan revisando solo la cadena
+            # de ancestros de la hoja, no el árbol completo.
+            relativa_dir = ""
+            if _validar_directorio(manifiesto, ruta_base, relativa_dir) is None:
+                return
+            for parte in os.path.dirname(relativa).split(os.sep):
+                if parte:
+                    relativa_dir = os.path.join(relativa_dir, parte)
+                    _validar_directorio(manifiesto, ruta_base, relativa_dir)
+
+            anterior = manifiesto['hojas'].get(relativa)
+            st = os.stat(ruta_archivo)
+            if (filas is None and anterior is not None and anterior['filas'] is not None and filas_agregadas
+                    and firma_anterior is not None
+                    and (anterior['tamano'], anterior['mtime_ns']) == firma_anterior[:2]):
+                filas = anterior['filas'] + filas_agregadas
+            manifiesto['hojas'][relativa] = {'tamano': st.st_size, 'mtime_ns': st.st_mtime_ns, 'filas': filas}
+            _anotar_filas_arbol(ruta_base, relativa, filas)
+            if anterior is not None and 'resumen' in anterior:
+                # El resumen trae su propia firma; quien escribió lo actualiza o se descarta al consultarlo.
+                manifiesto['hojas'][relativa]['resumen'] = anterior['resumen']
+            manifiesto['sucio'] = True
+        except OSError:
+            # El manifiesto es una caché; si falla, la próxima carga lo corrige.
+            pass
+
+# --- Durabilidad de las escrituras --- #
+# Toda escritura de datos (altas al final de una hoja, entradas del registro
+# de cambios, reescrituras completas) termina con _asegurar_en_disco, que
+# aplica la política de durabilidad vigente:
+#   'siempre'  : fsync del archivo (y del directorio si se creó o reemplazó un
+#                archivo) antes de devolver. Es la política por defecto.
+#   'agrupada' : los archivos escritos se anotan y se sincronizan todos juntos
+#                cada INTERVALO_DURABILIDAD_S segundos, al cerrar un bloque
+#                "with durabilidad('agrupada')" y al salir del programa.
+#   'nunca'    : sin fsync; el sistema operativo escribe cuando le parece.
+# Las reescrituras son siempre atómicas (temporal + os.replace), sea cual sea
+# la política: un corte deja la hoja vieja o la nueva, nunca una a medias. La
+# política solo decide cuándo lo escrito sobrevive también a un corte de luz.
+#
+# ALIMENTOS_DURABILIDAD fija la política del proceso; los trabajos masivos
+# (importación, exportación desde SQLite) usan 'agrupada' con durabilidad().
+POLITICAS_DURABILIDAD = ('siempre', 'agrupada', 'nunca')
+POLITICA_DURABILIDAD = os.environ.get("ALIMENTOS_DURABILIDAD", "siempre")
+if POLITICA_DURABILIDAD not in POLITICAS_DURABILIDAD:
+    print(f"ADVERTENCIA: ALIMENTOS_DURABILIDAD='{POLITICA_DURABILIDAD}' no es válida "
+          f"({', '.join(POLITICAS_DURABILIDAD)}); se usa 'siempre'.")
+    POLITICA_DURABILIDAD = 'siempre'
+INTERVALO_DURABILIDAD_S = float(os.environ.get("ALIMENTOS_INTERVALO_DURABILIDAD", "1.0"))
+SUFIJO_TEMPORAL = ".tmp"
+
+_durabilidad_local = threading.local()   # política elegida con durabilidad() en cada hilo
+_pendientes_sincronizar = set()          # (es_directorio, ruta) escritos sin fsync todavía
+_candado_durabilidad = threading.Lock()
+_ultima_sincronizacion = time.monotonic()
+
+def politica_durabilidad() -> str:
+    """Devuelve la política de durabilidad que se aplica en este hilo."""
+    return getattr(_durabilidad_local, 'politica', None) or POLITICA_DURABILIDAD
+
+class durabilidad:
+    """
+    Cambia la política de durabilidad del hilo actual dentro de un bloque
+    "with". Al salir del bloque se sincroniza lo pendiente, así que todo lo
+    escrito adentro queda en disco como un solo grupo:
+
+        with durabilidad('agrupada'):
+            importar_masivo(...)
+    """
+
+    def __init__(self, politica: str):
+        if politica not in POLITICAS_DURABILIDAD:
+            raise ValueError(f"política de durabilidad desconocida: {politica!r}")
+        self._politica = politica
+        self._anterior = None
+
+    def __enter__(self):
+        self._anterior = getattr(_durabilidad_local, 'politica', None)
+        _durabilidad_local.politica = self._politica
+        return self
+
+    def __exit__(self, *excepcion):
+        _durabilidad_local.politica = self._anterior
+        sincronizar_pendientes()
+
+def _fsync_ruta(ruta: str, es_directorio: bool):
+    """(Función auxiliar) Hace fsync de un archivo o directorio por su ruta."""
+    if es_directorio and os.name == 'nt':
+        return # En Windows no se pueden abrir directorios; el reemplazo ya es durable.
+    try:
+        descriptor = os.open(ruta, os.O_RDONLY)
+    except FileNotFoundError:
+        return # Se borró o se reemplazó después de escribirlo: no queda nada que sincronizar.
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+def _anotar_pendiente(ruta: str, es_directorio: bool):
+    """(Función auxiliar) Anota algo para el próximo fsync agrupado, o sincroniza si ya pasó el intervalo."""
+    with _candado_durabilidad:
+        _pendientes_sincronizar.add((es_directorio, ruta))
+        vencido = time.monotonic() - _ultima_sincronizacion >= INTERVALO_DURABILIDAD_S
+    if vencido:
+        sincronizar_pendientes()
+
+@medido
+def sincronizar_pendientes():
+    """
+    Hace fsync de todo lo que se escribió con la política 'agrupada' y todavía
+    no se sincronizó: primero los archivos y después sus directorios.
+    """
+    global _ultima_sincronizacion
+    with _candado_durabilidad:
+        pendientes = sorted(_pendientes_sincronizar)
+        _pendientes_sincronizar.clear()
+        _ultima_sincronizacion = time.monotonic()
+    for es_directorio, ruta in pendientes:
+        try:
+            _fsync_ruta(ruta, es_directorio)
+        except OSError as e:
+            print(f"ADVERTENCIA: No se pudo asegurar en disco {ruta}. Detalles: {e}")
+
+atexit.register(sincronizar_pendientes)
+
+def _asegurar_en_disco(f, ruta_archivo: str):
+    """
+    (Función auxiliar) Lleva al disco lo escrito en el archivo abierto 'f'
+    (cuyo destino final es 'ruta_archivo') según la política vigente. Un
+    error de fsync con la política 'siempre' se propaga como OSError.
+    """
+    f.flush()
+    politica = politica_durabilidad()
+    if politica == 'siempre':
+        os.fsync(f.fileno())
+    elif politica == 'agrupada':
+        _anotar_pendiente(os.path.abspath(ruta_archivo), False)
+
+def _asegurar_directorio(ruta_directorio: str):
+    """(Función auxiliar) Como _asegurar_en_disco, para la entrada de un archivo creado o reemplazado."""
+    politica = politica_durabilidad()
+    if politica == 'siempre':
+        _fsync_ruta(ruta_directorio, True)
+    elif politica == 'agrupada':
+        _anotar_pendiente(os.path.abspath(ruta_directorio), True)
+
+def _reescribir_atomico(ruta_archivo: str, escribir):
+    """
+    (Función auxiliar) Reemplaza 'ruta_archivo' sin que exista nunca una
+    versión a medias: escribir(f) vuelca el contenido completo en un temporal
+    del mismo directorio, que se asegura en disco según la política vigente y
+    recién entonces reemplaza al original con os.replace. Si algo falla (o el
+    proceso se corta), el original queda intacto. Debe llamarse con el
+    candado de la hoja tomado.
+    """
+    directorio, nombre = os.path.split(os.path.abspath(ruta_archivo))
+    temporal = os.path.join(directorio, f"{nombre}.{os.getpid()}.{threading.get_ident()}{SUFIJO_TEMPORAL}")
+    try:
+        with open(temporal, 'x', encoding='utf-8', newline='') as f:
+            try:
+                os.chmod(temporal, os.stat(ruta_archivo).st_mode & 0o7777)
+            except FileNotFoundError:
+                pass
+            escribir(f)
+            _asegurar_en_disco(f, ruta_archivo)
+        os.replace(temporal, ruta_archivo)
+    except BaseException:
+        try:
+            os.remove(temporal)
+        except OSError:
+            pass
+        raise
+    _asegurar_directorio(directorio)
+    # Con el candado tomado, los temporales de la hoja que hayan quedado de un corte son basura.
+    for entrada in os.listdir(directorio):
+        if entrada.startswith(nombre + ".") and entrada.endswith(SUFIJO_TEMPORAL):
+            try:
+                os.remove(os.path.join(directorio, entrada))
+            except OSError:
+                pass
+
+# --- Registro de cambios por hoja --- #
+# Las bajas y modificaciones no reescriben 'items.csv': se agregan como una
+# línea JSON al final de 'items.csv.cambios', indicando la posición de la fila
+# en el CSV base. Al leer la hoja se aplican esos cambios, y cuando el registro
+# crece demasiado se "compacta" (se reescribe el CSV y se borra el registro).
+# Las altas se siguen agregando al final del CSV, así que las posiciones de las
+# filas existentes no cambian hasta la próxima compactación.
+#
+# La primera línea del registro ({"op": "H", "ino": ...}) indica el inodo del
+# items.csv al que se refieren las posiciones. Una reescritura reemplaza el CSV
+# por otro archivo (otro inodo) y después borra el registro; si el proceso se
+# corta entre los dos pasos, el registro viejo ya no coincide con el inodo y se
+# ignora en lugar de aplicarse sobre las filas nuevas.
+SUFIJO_REGISTRO_CAMBIOS = ".cambios"
+UMBRAL_COMPACTACION_BYTES = 64 * 1024   # compactar si el registro supera este tamaño...
+PROPORCION_COMPACTACION = 0.5           # ...o si es más de la mitad del tamaño del CSV
+
+# Archivo vacío junto a cada hoja sobre el que se toma el candado entre procesos.
+SUFIJO_CANDADO = ".candado"
+
+_candados_hojas = {}
+_candado_global = threading.Lock()
+_usar_flock = fcntl is not None
+_compactaciones_en_curso = set()
+_observadores_compactacion = []
+
+class CandadoHoja:
+    """
+    Candado de una hoja, reentrante, que protege tanto entre hilos como entre
+    procesos: por dentro es un threading.RLock más un candado de fcntl.flock
+    sobre 'items.csv.candado'. El flock se toma al entrar la primera vez y se
+    suelta al salir la última, así que dos operadores o una importación en otro
+    proceso esperan su turno en lugar de pisarse.
+
+    Si fcntl no existe (Windows) o no se puede crear el archivo de candado
+    (por ejemplo, en una base de solo lectura), queda solo el candado entre hilos.
+    """
+
+    def __init__(self, ruta_archivo: str):
+        self._hilos = threading.RLock()
+        self._ruta_candado = ruta_archivo + SUFIJO_CANDADO
+        self._profundidad = 0
+        self._descriptor = None
+        self._dueno = None
+
+    def tomado_por_este_hilo(self) -> bool:
+        """Indica si el hilo actual ya tiene tomado este candado."""
+        return self._dueno == threading.get_ident()
+
+    def acquire(self):
+        self._hilos.acquire()
+        if self._profundidad == 0 and _usar_flock:
+            try:
+                # Bajo _candado_global para que un fork no ocurra entre abrir y anotar el descriptor.
+                with _candado_global:
+                    self._descriptor = os.open(self._ruta_candado, os.O_RDWR | os.O_CREAT, 0o666)
+            except OSError:
+                self._descriptor = None # Sin archivo de candado: solo protegemos entre hilos.
+            else:
+                try:
+                    fcntl.flock(self._descriptor, fcntl.LOCK_EX)
+                except BaseException:
+                    os.close(self._descriptor)
+                    self._descriptor = None
+                    self._hilos.release()
+                    raise
+        self._profundidad += 1
+        self._dueno = threading.get_ident()
+        return True
+
+    def release(self):
+        self._profundidad -= 1
+        if self._profundidad == 0:
+            self._dueno = None
+            if self._descriptor is not None:
+                # Cerrar el descriptor también suelta el flock.
+                os.close(self._descriptor)
+                self._descriptor = None
+        self._hilos.release()
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *excepcion):
+        self.release()
+
+def candado_hoja(ruta_archivo) -> CandadoHoja:
+    """
+    Devuelve el candado de una hoja. Todas las lecturas y escrituras de una
+    hoja lo toman, para que nadie lea un CSV recién compactado junto con un
+    registro de cambios viejo, ni dos escrituras (de este u otro proceso) se
+    mezclen.
+    """
+    ruta_archivo = os.path.abspath(ruta_archivo)
+    with _candado_global:
+        candado = _candados_hojas.get(ruta_archivo)
+        if candado is None:
+            candado = _candados_hojas[ruta_archivo] = CandadoHoja(ruta_archivo)
+        return candado
+
+def _reiniciar_candados_en_hijo():
+    """
+    (Función auxiliar) Un proceso creado con fork hereda los descriptores de
+    los candados que el padre tenía tomados, y un flock sigue tomado mientras
+    quede abierta alguna copia: si el hijo no cierra las suyas, la hoja queda
+    bloqueada para siempre aunque el padre la suelte. También se reemplazan los
+    candados entre hilos, que pudieron quedar tomados por hilos que en el hijo no existen.
+    """
+    global _candados_hojas, _candado_global, _candado_durabilidad, _candado_manifiestos
+    for candado in _candados_hojas.values():
+        if candado._descriptor is not None:
+            try:
+                os.close(candado._descriptor)
+            except OSError:
+                pass
+    _candados_hojas = {}
+    _candado_global = threading.Lock()
+    _candado_durabilidad = threading.Lock()
+    _candado_manifiestos = threading.RLock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(before=lambda: _candado_global.acquire(),
+                        after_in_parent=lambda: _candado_global.release(),
+                        after_in_child=_reiniciar_candados_en_hijo)
+
+def registrar_observador_compactacion(funcion):
+    """
+    Registra una función que se llama después de compactar una hoja con
+    (ruta_archivo, mapeo_posiciones, firma_anterior, firma_nueva). El mapeo
+    indica la nueva posición de cada fila que sobrevivió.
+    """
+    _observadores_compactacion.append(funcion)
+
+def firma_hoja(ruta_archivo) -> tuple:
+    """
+    Devuelve (tamaño, mtime) del CSV y de su registro de cambios, más el
+    inodo del CSV (un archivo reemplazado entero puede tener el mismo tamaño y
+    mtime). Si la firma no cambió, las posiciones que se conocían de la hoja
+    siguen siendo válidas.
+    """
+    st = os.stat(ruta_archivo)
+    try:
+        st_registro = os.stat(ruta_archivo + SUFIJO_REGISTRO_CAMBIOS)
+        registro = (st_registro.st_size, st_registro.st_mtime_ns)
+    except FileNotFoundError:
+        registro = (0, 0)
+    return (st.st_size, st.st_mtime_ns) + registro + (st.st_ino,)
+
+def firma_hoja_si_existe(ruta_archivo):
+    """
+    Igual que firma_hoja, pero devuelve None si la hoja todavía no existe. Las
+    altas la leen con el candado de la hoja tomado, antes de escribir, para que
+    el catálogo sepa si sus posiciones seguían valiendo (ver CatalogoColumnar.agregar).
+    """
+    try:
+        return firma_hoja(ruta_archivo)
+    except FileNotFoundError:
+        return None
+
+def leer_registro_cambios(ruta_archivo) -> dict:
+    """
+    Lee el registro de cambios de una hoja.
+
+    Returns:
+        dict: posición -> None si la fila fue dada de baja, o un diccionario con
+            los campos modificados. Vacío si no hay registro.
+    """
+    cambios = {}
+    try:
+        with open(ruta_archivo + SUFIJO_REGISTRO_CAMBIOS, 'r', encoding='utf-8') as f:
+            if INSTRUMENTACION_ACTIVA:
+                contar(archivos_abiertos=1, bytes_leidos=os.fstat(f.fileno()).st_size)
+            for linea in f:
+                try:
+                    entrada = json.loads(linea)
+                except ValueError:
+                    continue # Línea incompleta (por ejemplo, un corte a mitad de escritura).
+                posicion = entrada.get('pos')
+                if entrada.get('op') == 'H':
+                    if entrada.get('ino') != os.stat(ruta_archivo).st_ino:
+                        return {} # Registro de un items.csv que ya fue reemplazado.
+                elif entrada.get('op') == 'B':
+                    cambios[posicion] = None
+                elif entrada.get('op') == 'M' and cambios.get(posicion, {}) is not None:
+                    cambios.setdefault(posicion, {}).update(entrada.get('campos', {}))
+    except FileNotFoundError:
+        pass
+    return cambios
+
+@medido
+def leer_hoja(ruta_archivo):
+    """
+    Lee un 'items.csv' aplicando su registro de cambios.
+
+    Returns:
+        tuple: (encabezados, filas, total) donde 'filas' es una lista de
+            (posición en el CSV base, diccionario) solo con las filas vivas y
+            'total' es la cantidad de filas del CSV base (vivas o no).
+    """
+    with candado_hoja(ruta_archivo):
+        cambios = leer_registro_cambios(ruta_archivo)
+        filas = []
+        with open(ruta_archivo, 'r', encoding='utf-8', newline='') as f:
+            lector = csv.DictReader(f)
+            total = 0
+            for posicion, fila in enumerate(lector):
+                total = posicion + 1
+                if posicion in cambios:
+                    if cambios[posicion] is None:
+                        continue
+                    fila.update(cambios[posicion])
+                filas.append((posicion, fila))
+            if INSTRUMENTACION_ACTIVA:
+                contar(archivos_abiertos=1, bytes_leidos=os.fstat(f.fileno()).st_size, filas_leidas=total)
+            return lector.fieldnames, filas, total
+
+# --- Lectura por columnas con mmap --- #
+# Leer con csv.DictReader arma un str por línea y un dict por fila aunque solo
+# se necesite una columna, algo que en hojas grandes pesa. leer_columnas_hoja
+# mapea el archivo en memoria y lo recorre por bloques: en cada bloque sin comillas una
+# expresión regular compilada extrae solo las columnas pedidas directamente de
+# los bytes, y solo esas se decodifican. Los bloques con comillas o con filas
+# irregulares se leen con el módulo csv, así que el resultado es siempre el
+# mismo que con leer_hoja.
+TAMANO_BLOQUE_MMAP = 4 * 1024 * 1024   # bytes del mapa que se procesan por vez
+
+def _patron_columnas(cantidad_columnas: int, indices: list):
+    """
+    (Función auxiliar) Expresión regular que reconoce una fila sin comillas con
+    exactamente 'cantidad_columnas' campos y captura solo los de 'indices'.
+    """
+    campo = rb'[^,"\r\n]*'
+    partes = [(b'(' + campo + b')') if i in indices else campo for i in range(cantidad_columnas)]
+    return re.compile(b'^' + b','.join(partes) + rb'\r?$', re.MULTILINE)
+
+def _columnas_csv(lineas, indices: list, columnas: list) -> int:
+    """
+    (Función auxiliar) Lee con el módulo csv lo que el camino rápido no puede
+    resolver y agrega los valores a 'columnas'. Devuelve la cantidad de filas.
+    """
+    cantidad = 0
+    for fila in csv.reader(lineas):
+        if not fila:
+            continue # csv.DictReader también saltea las líneas vacías
+        cantidad += 1
+        largo = len(fila)
+        for columna, i in zip(columnas, indices):
+            columna.append(fila[i] if 0 <= i < largo else None)
+    return cantidad
+
+@medido
+def leer_columnas_hoja(ruta_archivo, campos=None) -> tuple:
+    """
+    Lee solo algunas columnas de un 'items.csv', aplicando su registro de cambios.
+
+    El resultado se devuelve por columnas (una lista de valores por campo) y
+    no por filas, para no crear una tupla o un diccionario por cada fila.
+
+    Args:
+        ruta_archivo (str): Ruta de la hoja.
+        campos (list, optional): Nombres de las columnas a leer (ej: ['nombre']).
+            Si no se indica, se leen todas, en el orden de los encabezados.
+
+    Returns:
+        tuple: (encabezados, posiciones, columnas, total). 'posiciones' tiene la
+            posición en el CSV base de cada fila viva y 'columnas' una lista de
+            valores por campo pedido, alineada con 'posiciones'. Un campo que no
+            existe en la hoja (o que falta en una fila corta) vale None.
+    """
+    with candado_hoja(ruta_archivo):
+        cambios = leer_registro_cambios(ruta_archivo)
+        with open(ruta_archivo, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return None, [], [[] for _ in campos or ()], 0
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+                largo = len(mapa)
+                fin_encabezado = mapa.find(b'\n')
+                fin_encabezado = largo if fin_encabezado < 0 else fin_encabezado + 1
+                encabezados = next(csv.reader([mapa[:fin_encabezado].decode('utf-8')]), None)
+                if not encabezados:
+                    return None, [], [[] for _ in campos or ()], 0
+                cantidad_columnas = len(encabezados)
+                if campos is None:
+                    campos = list(encabezados)
+                # Un campo que no está en los encabezados vale -1: nunca se toma de
+                # la fila, ni siquiera de los campos sobrantes de una fila larga.
+                indices = [encabezados.index(c) if c in encabezados else -1 for c in campos]
+                presentes = sorted(set(i for i in indices if i >= 0))
+                patron = _patron_columnas(cantidad_columnas, presentes)
+                columnas = [[] for _ in campos]
+                total = 0
+
+                inicio = fin_encabezado
+                while inicio < largo:
+                    # Los bloques terminan siempre en un salto de línea.
+                    fin = inicio + TAMANO_BLOQUE_MMAP
+                    if fin >= largo:
+                        fin = largo
+                    else:
+                        corte = mapa.rfind(b'\n', inicio, fin)
+                        if corte < 0:
+                            corte = mapa.find(b'\n', fin)
+                        fin = largo if corte < 0 else corte + 1
+                    bloque = mapa[inicio:fin]
+
+                    if b'"' in bloque:
+                        # Un campo entre comillas puede tener saltos de línea, así
+                        # que desde aquí hasta el final se lee con el módulo csv.
+                        with open(ruta_archivo, 'rb') as resto:
+                            resto.seek(inicio)
+                            total += _columnas_csv(io.TextIOWrapper(resto, encoding='utf-8', newline=''), indices, columnas)
+                        break
+
+                    lineas = bloque.count(b'\n') + (0 if bloque.endswith(b'\n') else 1)
+                    hay_lineas_vacias = bloque.startswith((b'\n', b'\r\n')) or b'\n\n' in bloque or b'\n\r\n' in bloque
+                    encontradas = patron.findall(bloque) if not hay_lineas_vacias else None
+                    if encontradas is None or len(encontradas) != lineas:
+                        total += _columnas_csv(io.StringIO(bloque.decode('utf-8'), newline=''), indices, columnas)
+                    else:
+                        # findall devuelve bytes sueltos con un grupo y tuplas con varios.
+                        if len(presentes) == 1:
+                            por_indice = {presentes[0]: encontradas}
+                        else:
+                            por_indice = dict(zip(presentes, zip(*encontradas)))
+                        for columna, i in zip(columnas, indices):
+                            if i in por_indice:
+                                columna.extend(map(bytes.decode, por_indice[i]))
+                            else:
+                                columna.extend([None] * len(encontradas))
+                        total += len(encontradas)
+                    inicio = fin
+            if INSTRUMENTACION_ACTIVA:
+                contar(archivos_abiertos=1, bytes_leidos=largo, filas_leidas=total)
+
+    if not cambios:
+        return encabezados, range(total), columnas, total
+
+    # Registro de cambios: las modificaciones se escriben en su lugar y las
+    # bajas se filtran de todas las columnas de una vez.
+    vivas = bytearray(b"\x01") * total
+    for posicion, cambio in cambios.items():
+        if not isinstance(posicion, int) or not 0 <= posicion < total:
+            continue
+        if cambio is None:
+            vivas[posicion] = 0
+            continue
+        for campo, columna in zip(campos, columnas):
+            if campo in cambio:
+                columna[posicion] = cambio[campo]
+    posiciones = list(compress(range(total), vivas))
+    columnas = [list(compress(columna, vivas)) for columna in columnas]
+    return encabezados, posiciones, columnas, total
+
+# --- Nombres normalizados por hoja --- #
+# Para detectar duplicados en el alta no hace falta releer la hoja en cada
+# intento: se guarda el set de nombres normalizados de cada hoja junto con su
+# firma. Si otro proceso cambió la hoja (cambia la firma) se vuelve a leer; las
+# altas de este proceso agregan sus nombres al set sin releer nada.
+_nombres_hojas = {}  # ruta absoluta -> (firma, set de nombres normalizados)
+
+def nombres_normalizados_hoja(ruta_archivo) -> set:
+    """
+    Devuelve el set de nombres normalizados (normalizar_texto_para_ruta) de las
+    filas vivas de una hoja. El set es compartido: no debe modificarse.
+    """
+    ruta_archivo = os.path.abspath(ruta_archivo)
+    with candado_hoja(ruta_archivo):
+        try:
+            firma = firma_hoja(ruta_archivo)
+        except FileNotFoundError:
+            _nombres_hojas.pop(ruta_archivo, None)
+            return set()
+        entrada = _nombres_hojas.get(ruta_archivo)
+        if entrada is not None and entrada[0] == firma:
+            return entrada[1]
+        _, _, (nombres,), _ = leer_columnas_hoja(ruta_archivo, ['nombre'])
+        nombres = set(map(_normalizar_texto, nombres))
+        _nombres_hojas[ruta_archivo] = (firma, nombres)
+        return nombres
+
+def nombre_existe_en_hoja(ruta_archivo, nombre: str) -> bool:
+    """Indica si la hoja ya tiene un ítem con ese nombre (sin distinguir mayúsculas ni acentos)."""
+    en_almacen = _hoja_en_almacen(ruta_archivo)
+    if en_almacen is not None:
+        almacen, jerarquia = en_almacen
+        return almacen.nombre_existe_en_hoja(*jerarquia, nombre)
+    return normalizar_texto_para_ruta(nombre) in nombres_normalizados_hoja(ruta_archivo)
+
+def _agregar_nombres_hoja(ruta_archivo, firma_anterior, nombres):
+    """
+    (Función auxiliar) Suma al set en caché los nombres recién escritos en una
+    hoja. Solo si el set estaba al día con la hoja antes de escribir (o la hoja
+    es nueva); si no, se descarta y se vuelve a leer cuando haga falta.
+    """
+    ruta_archivo = os.path.abspath(ruta_archivo)
+    entrada = _nombres_hojas.get(ruta_archivo)
+    if firma_anterior is None:
+        conocidos = set()
+    elif entrada is not None and entrada[0] == firma_anterior:
+        conocidos = entrada[1]
+    else:
+        _nombres_hojas.pop(ruta_archivo, None)
+        return
+    conocidos.update(map(_normalizar_texto, nombres))
+    _nombres_hojas[ruta_archivo] = (firma_hoja(ruta_archivo), conocidos)
+
+def _cabecera_registro(ruta_archivo):
+    """
+    (Función auxiliar) Devuelve la cabecera que hay que escribir antes de la
+    próxima entrada del registro de cambios, o None si el registro ya existe
+    y corresponde al items.csv actual. Un registro que quedó de un CSV
+    reemplazado se descarta y se empieza uno nuevo.
+    """
+    ruta_registro = ruta_archivo + SUFIJO_REGISTRO_CAMBIOS
+    inodo = os.stat(ruta_archivo).st_ino
+    try:
+        with open(ruta_registro, 'r', encoding='utf-8') as f:
+            primera = f.readline()
+    except FileNotFoundError:
+        primera = ""
+    if primera:
+        try:
+            entrada = json.loads(primera)
+        except ValueError:
+            entrada = {}
+        if entrada.get('op') != 'H' or entrada.get('ino') == inodo:
+            return None # Registro al día (o de antes de que hubiera cabeceras).
+        os.remove(ruta_registro)
+    return json.dumps({'op': 'H', 'ino': inodo}) + "\n"
+
+def _agregar_al_registro(ruta_archivo, entrada: dict) -> bool:
+    """(Función auxiliar) Agrega una entrada al registro de cambios de una hoja."""
+    try:
+        with candado_hoja(ruta_archivo):
+            cabecera = _cabecera_registro(ruta_archivo)
+            with open(ruta_archivo + SUFIJO_REGISTRO_CAMBIOS, 'a', encoding='utf-8') as f:
+                linea = json.dumps(entrada, ensure_ascii=False) + "\n"
+                if cabecera is not None:
+                    linea = cabecera + linea
+                f.write(linea)
+                _asegurar_en_disco(f, ruta_archivo + SUFIJO_REGISTRO_CAMBIOS)
+            if cabecera is not None:
+                _asegurar_directorio(os.path.dirname(os.path.abspath(ruta_archivo)))
+            if INSTRUMENTACION_ACTIVA:
+                contar(archivos_abiertos=1, bytes_escritos=len(linea.encode('utf-8')))
+        _compactar_si_corresponde(ruta_archivo)
+        return True
+    except OSError as e:
+        print(f"ERROR CRÍTICO al escribir el registro de cambios de {ruta_archivo}: {e}")
+        return False
+
+@medido
+def registrar_baja(ruta_archivo, posicion: int, fila=None) -> bool:
+    """
+    Da de baja la fila en 'posicion' del CSV base sin reescribir el archivo.
+
+    Args:
+        fila (dict, optional): La fila que se da de baja. Si se pasa, el
+            resumen de calorías de la hoja se actualiza sin volver a leerla.
+
+    Returns:
+        bool: True si la baja quedó registrada.
+    """
+    with candado_hoja(ruta_archivo):
+        firma_anterior = firma_hoja(ruta_archivo)
+        if not _agregar_al_registro(ruta_archivo, {'op': 'B', 'pos': posicion}):
+            return False
+        _ajustar_filas_manifiesto(ruta_archivo, -1)
+        _actualizar_resumen_hoja(ruta_archivo, firma_anterior,
+                                 quitadas=None if fila is None else [_nombre_y_calorias(fila)])
+        return True
+
+@medido
+def registrar_modificacion(ruta_archivo, posicion: int, campos: dict, fila_anterior=None) -> bool:
+    """
+    Cambia los campos indicados de la fila en 'posicion' sin reescribir el archivo.
+
+    Args:
+        fila_anterior (dict, optional): La fila antes del cambio, para
+            actualizar el resumen de calorías de la hoja sin volver a leerla.
+
+    Returns:
+        bool: True si la modificación quedó registrada.
+    """
+    campos = {clave: str(valor) for clave, valor in campos.items()}
+    with candado_hoja(ruta_archivo):
+        firma_anterior = firma_hoja(ruta_archivo)
+        if not _agregar_al_registro(ruta_archivo, {'op': 'M', 'pos': posicion, 'campos': campos}):
+            return False
+        if fila_anterior is None:
+            _actualizar_resumen_hoja(ruta_archivo, firma_anterior, quitadas=None)
+        else:
+            nombre, calorias = _nombre_y_calorias(fila_anterior)
+            nueva = {'nombre': campos.get('nombre', nombre),
+                     'calorias_100g': campos.get('calorias_100g', fila_anterior.get('calorias_100g'))}
+            _actualizar_resumen_hoja(ruta_archivo, firma_anterior, agregadas=[_nombre_y_calorias(nueva)],
+                                     quitadas=[(nombre, calorias)])
+        return True
+
+@medido
+def compactar_hoja(ruta_archivo) -> bool:
+    """
+    Aplica el registro de cambios sobre 'items.csv', lo reescribe y borra el
+    registro. Avisa a los observadores cómo cambiaron las posiciones.
+
+    Returns:
+        bool: True si se compactó la hoja.
+    """
+    try:
+        with candado_hoja(ruta_archivo):
+            if not os.path.exists(ruta_archivo + SUFIJO_REGISTRO_CAMBIOS):
+                return False
+            firma_anterior = firma_hoja(ruta_archivo)
+            encabezados, filas, _ = leer_hoja(ruta_archivo)
+            if not sobrescribir_archivo_csv(ruta_archivo, encabezados, [fila for _, fila in filas]):
+                return False
+            mapeo = {posicion: nueva for nueva, (posicion, _) in enumerate(filas)}
+            firma_nueva = firma_hoja(ruta_archivo)
+            # El contenido es el mismo: el resumen sigue valiendo con la firma nueva.
+            _actualizar_resumen_hoja(ruta_archivo, firma_anterior)
+            for observador in _observadores_compactacion:
+                observador(os.path.abspath(ruta_archivo), mapeo, firma_anterior, firma_nueva)
+        return True
+    except OSError as e:
+        print(f"ADVERTENCIA: No se pudo compactar {ruta_archivo}. Detalles: {e}")
+        return False
+    finally:
+        with _candado_global:
+            _compactaciones_en_curso.discard(os.path.abspath(ruta_archivo))
+
+def _compactar_si_corresponde(ruta_archivo):
+    """
+    (Función auxiliar) Si el registro de cambios pasó el umbral, lanza la
+    compactación en un hilo aparte para no demorar la edición.
+    """
+    try:
+        tamano_registro = os.path.getsize(ruta_archivo + SUFIJO_REGISTRO_CAMBIOS)
+        tamano_csv = os.path.getsize(ruta_archivo)
+    except OSError:
+        return
+    if tamano_registro < UMBRAL_COMPACTACION_BYTES and tamano_registro < PROPORCION_COMPACTACION * tamano_csv:
+        return
+    ruta_archivo = os.path.abspath(ruta_archivo)
+    with _candado_global:
+        if ruta_archivo in _compactaciones_en_curso:
+            return
+        _compactaciones_en_curso.add(ruta_archivo)
+    # No es un hilo 'daemon': al salir, Python espera a que termine de escribir.
+    threading.Thread(target=compactar_hoja, args=(ruta_archivo,), name=f"compactar:{ruta_archivo}").start()
+
+def _ajustar_filas_manifiesto(ruta_archivo, diferencia):
+    """(Función auxiliar) Suma 'diferencia' a la cantidad de filas vivas de una hoja en el manifiesto."""
+    with _candado_manifiestos:
+        ruta_base, manifiesto, relativa = _manifiesto_de_archivo(ruta_archivo)
+        if manifiesto is None:
+            return
+        hoja = manifiesto['hojas'].get(relativa)
+        if hoja is not None and hoja['filas'] is not None:
+            hoja['filas'] += diferencia
+            manifiesto['sucio'] = True
+            _anotar_filas_arbol(ruta_base, relativa, hoja['filas'])
+
+# --- Resumen de calorías por hoja --- #
+# Cada hoja guarda en su entrada del manifiesto un resumen: cantidad de filas,
+# cuántas tienen calorías numéricas, la suma y el alimento con más y con menos
+# calorías. Se actualiza en las altas, bajas y modificaciones, y se suma por
+# tipo y por categoría al consultarlo, así que las estadísticas generales no
+# necesitan leer ningún 'items.csv'. El resumen lleva la firma de la hoja con
+# la que se calculó; si no coincide, se recalcula solo esa hoja.
+
+def _resumen_vacio():
+    return {'cantidad': 0, 'con_calorias': 0, 'suma': 0.0, 'max': None, 'min': None}
+
+def _nombre_y_calorias(fila):
+    """(Función auxiliar) Devuelve (nombre, calorías como float o None) de una fila."""
+    try:
+        calorias = float(fila.get('calorias_100g'))
+    except (ValueError, TypeError):
+        calorias = None
+    return fila.get('nombre', ''), calorias
+
+def _sumar_al_resumen(resumen, nombre, calorias):
+    """(Función auxiliar) Agrega una fila al resumen."""
+    resumen['cantidad'] += 1
+    if calorias is None:
+        return
+    resumen['con_calorias'] += 1
+    resumen['suma'] += calorias
+    # Con comparación estricta se queda el primero, igual que max() y min().
+    if resumen['max'] is None or calorias > resumen['max'][1]:
+        resumen['max'] = [nombre, calorias]
+    if resumen['min'] is None or calorias < resumen['min'][1]:
+        resumen['min'] = [nombre, calorias]
+
+def combinar_resumenes(resumenes):
+    """
+    Suma varios resúmenes de hoja en uno solo (por ejemplo, los de una categoría).
+
+    Returns:
+        dict: Resumen con 'cantidad', 'con_calorias', 'suma', 'max' y 'min'
+            ('max' y 'min' son [nombre, calorías] o None).
+    """
+    total = _resumen_vacio()
+    for resumen in resumenes:
+        total['cantidad'] += resumen['cantidad']
+        total['con_calorias'] += resumen['con_calorias']
+        total['suma'] += resumen['suma']
+        if resumen['max'] is not None and (total['max'] is None or resumen['max'][1] > total['max'][1]):
+            total['max'] = resumen['max']
+        if resumen['min'] is not None and (total['min'] is None or resumen['min'][1] < total['min'][1]):
+            total['min'] = resumen['min']
+    return total
+
+def _calcular_resumen_hoja(ruta_archivo):
+    """(Función auxiliar) Lee una hoja y arma su resumen, con la firma leída."""
+    with candado_hoja(ruta_archivo):
+        firma = firma_hoja(ruta_archivo)
+        _, _, (nombres, calorias), _ = leer_columnas_hoja(ruta_archivo, ['nombre', 'calorias_100g'])
+    resumen = _resumen_vacio()
+    for nombre, valor in zip(nombres, calorias):
+        _sumar_al_resumen(resumen, *_nombre_y_calorias({'nombre': nombre, 'calorias_100g': valor}))
+    resumen['firma'] = list(firma)
+    return resumen
+
+def _actualizar_resumen_hoja(ruta_archivo, firma_anterior, agregadas=(), quitadas=()):
+    """
+    (Función auxiliar) Aplica un cambio recién escrito al resumen de una hoja.
+    Debe llamarse con el candado de la hoja tomado.
+
+    Args:
+        firma_anterior (tuple | None): Firma de la hoja antes de escribir, o
+            None si la hoja es nueva. Si el resumen no la tiene, se descarta.
+        agregadas: (nombre, calorías) de las filas agregadas.
+        quitadas: (nombre, calorías) de las filas quitadas, o None si no se
+            conocen (el resumen se descarta).
+    """
+    with _candado_manifiestos:
+        _, manifiesto, relativa = _manifiesto_de_archivo(ruta_archivo)
+        if manifiesto is None:
+            return
+        hoja = manifiesto['hojas'].get(relativa)
+        if hoja is None:
+            return
+
+        resumen = _resumen_vacio() if firma_anterior is None else hoja.get('resumen')
+        if resumen is None:
+            return
+        valido = quitadas is not None and (firma_anterior is None or resumen.get('firma') == list(firma_anterior))
+        for nombre, calorias in quitadas or ():
+            if not valido:
+                break
+            resumen['cantidad'] -= 1
+            if calorias is None:
+                continue
+            resumen['con_calorias'] -= 1
+            resumen['suma'] -= calorias
+            # Si se fue uno de los extremos no se sabe cuál es el siguiente sin leer la hoja.
+            if [nombre, calorias] in (resumen['max'], resumen['min']):
+                valido = False
+
+        if not valido:
+            hoja.pop('resumen', None)
+            manifiesto['sucio'] = True
+            return
+        for nombre, calorias in agregadas:
+            _sumar_al_resumen(resumen, nombre, calorias)
+        if resumen['con_calorias'] == 0:
+            resumen['suma'], resumen['max'], resumen['min'] = 0.0, None, None
+        try:
+            resumen['firma'] = list(firma_hoja(ruta_archivo))
+        except OSError:
+            hoja.pop('resumen', None)
+        else:
+            hoja['resumen'] = resumen
+        manifiesto['sucio'] = True
+
+@medido
+def resumen_calorias(ruta_base=RUTA_BASE_DATOS, nombre_archivo="items.csv"):
+    """
+    Devuelve los resúmenes de calorías de la base sumados por nivel, usando los
+    resúmenes por hoja del manifiesto. Solo se lee una hoja si su resumen falta
+    o quedó viejo (por ejemplo, porque se editó a mano).
+
+    Returns:
+        dict: {'total': resumen, 'categorias': {categoria: resumen},
+            'tipos': {(categoria, tipo): resumen}}, con las categorías en el
+            mismo orden en que se recorre la base.
+    """
+    por_categoria, por_tipo, todas = {}, {}, []
+    ruta_base = os.path.abspath(ruta_base)
+    for ruta_archivo in obtener_rutas_csv(ruta_base, nombre_archivo):
+        _, manifiesto, relativa = _manifiesto_de_archivo(ruta_archivo)
+        hoja = manifiesto['hojas'].get(relativa) if manifiesto is not None else None
+        try:
+            resumen = hoja.get('resumen') if hoja is not None else None
+            if resumen is None or resumen['firma'] != list(firma_hoja(ruta_archivo)):
+                resumen = _calcular_resumen_hoja(ruta_archivo)
+                if hoja is not None:
+                    with _candado_manifiestos:
+                        hoja['resumen'] = resumen
+                        manifiesto['sucio'] = True
+        except (OSError, csv.Error) as e:
+            print(f"ADVERTENCIA: No se pudo leer el archivo {ruta_archivo}. Detalles: {e}")
+            continue
+
+        todas.append(resumen)
+        partes_ruta = os.path.dirname(ruta_archivo).split(os.sep)
+        if len(partes_ruta) >= 4: # Igual que en crear_lista_desde_csv: base/cat/tipo/proc
+            categoria, tipo = partes_ruta[-3], partes_ruta[-2]
+            por_categoria.setdefault(categoria, []).append(resumen)
+            por_tipo.setdefault((categoria, tipo), []).append(resumen)
+
+    guardar_manifiesto(ruta_base)
+    return {
+        'total': combinar_resumenes(todas),
+        'categorias': {cat: combinar_resumenes(lista) for cat, lista in por_categoria.items()},
+        'tipos': {clave: combinar_resumenes(lista) for clave, lista in por_tipo.items()},
+    }
+
+
+def _normalizar_texto(texto) -> str:
+    """
+    (Función auxiliar) Igual que normalizar_texto_para_ruta pero sin memo. Es
+    lo que conviene para normalizar muchos textos distintos de una vez (los
+    nombres de una hoja o del catálogo), donde el memo casi nunca acierta.
+    """
+    if not isinstance(texto, str):
+        return ""
+
+    # 1. Quitar espacios y convertir a minúsculas
+    texto = texto.strip().lower()
+    # Un texto ASCII no tiene acentos que quitar: NFD no lo cambia.
+    if texto.isascii():
+        return texto
+
+    # 2. Quitar acentos (ej: "Cítricos" -> "citricos")
+    # 'NFD' (descomposición canónica) separa el caracter de su acento (ej: "é" -> "e" + "´")
+    # y al codificar a 'ascii' ignorando lo que no lo es se descartan los acentos.
+    return unicodedata.normalize('NFD', texto).encode('ascii', 'ignore').decode('ascii')
+
+# Cantidad de textos distintos que se recuerdan ya normalizados.
+TAMANO_MEMO_NORMALIZACION = 65536
+_normalizar_memo = lru_cache(maxsize=TAMANO_MEMO_NORMALIZACION)(_normalizar_texto)
+
+def normalizar_texto_para_ruta(texto: str) -> str:
+    """
+    Limpia y normaliza un texto para ser usado en nombres de carpetas.
+    Usa la librería estándar 'unicodedata' para quitar acentos.
+
+    Las categorías, tipos y procesamientos se repiten mucho, así que los
+    últimos resultados se recuerdan.
+    """
+    if not isinstance(texto, str):
+        return ""
+    return _normalizar_memo(texto)
+
+@medido
 def alta_nuevo_item(categoria, tipo, procesamiento, nuevo_item):
     """
     Da de alta un nuevo ítem en la base de datos.
 
     Crea la estructura de directorios necesaria y escribe (o añade)
-    el ítem en el archivo 'items.csv' correspondiente.
+    el ítem en el archivo 'items.csv' correspondiente. Si la base se guarda
+    en SQLite, el ítem se agrega a su hoja en el AlmacenSQLite.
 
     Args:
         categoria (str): La categoría del alimento (ej: "Frutas").
         tipo (str): El tipo de alimento (ej: "Cítricos").
         procesamiento (str): El tipo de procesamiento (ej: "Fresco").
         nuevo_item (dict): Un diccionario con los datos del alimento.
+
+    Returns:
+        bool: True si el ítem se escribió correctamente, False en caso de error.
     """
     print(f"Iniciando alta para: {nuevo_item.get('nombre', 'N/A')}...")
+    almacen = almacen_de_datos()
+    if almacen is not None:
+        if not almacen.alta_nuevo_item(categoria, tipo, procesamiento, nuevo_item):
+            return False
+        print(f"¡Éxito! Ítem agregado en {almacen.ruta_db}")
+        return True
     try:
         # 1. Construir la ruta del directorio de forma segura.
         # os.path.join se asegura de que la ruta sea correcta en cualquier
@@ -36,29 +1494,123 @@ def alta_nuevo_item(categoria, tipo, procesamiento, nuevo_item):
         ruta_archivo_csv = os.path.join(ruta_directorio, "items.csv")
 
         # 4. Escribir en el archivo CSV.
-        # Verificamos si el archivo es nuevo para saber si debemos escribir los encabezados.
-        escribir_encabezado = not os.path.exists(ruta_archivo_csv)
-
-        # Usamos 'with open' para que el archivo se cierre automáticamente.
-        # El modo 'a' (append) nos permite agregar nuevas filas sin borrar las anteriores.
-        with open(ruta_archivo_csv, 'a', encoding='utf-8', newline='') as f:
-            # Los nombres de los campos se toman de las claves del diccionario.
-            campos = nuevo_item.keys()
-            escritor = csv.DictWriter(f, fieldnames=campos)
-
-            if escribir_encabezado:
-                escritor.writeheader() # Escribe la primera línea con los nombres de las columnas.
-            
-            escritor.writerow(nuevo_item) # Escribe los datos del nuevo ítem.
+        # La fila se agrega al final con el candado de la hoja tomado (que también
+        # excluye a otros procesos). Si otras altas llegan a la misma hoja a la
+        # vez, se escriben todas juntas en un único write.
+        agregar_fila_agrupada(ruta_archivo_csv, nuevo_item)
         
         print(f"¡Éxito! Ítem agregado en {ruta_archivo_csv}")
+        return True
 
     # 3. Manejo de Excepciones
     except (OSError, PermissionError) as e:
         print(f"ERROR CRÍTICO: No se pudo escribir en el disco. Verifique los permisos. Detalles: {e}")
     except Exception as e:
         print(f"ERROR INESPERADO durante el alta: {e}")
+    return False
+
+def _falta_salto_final(ruta_archivo):
+    """(Función auxiliar) Indica si un archivo no vacío no termina en salto de línea."""
+    with open(ruta_archivo, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() == 0:
+            return False
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) != b"\n"
+
+# --- Altas agrupadas (group commit) --- #
+# Cuando varias altas llegan a la vez a la misma hoja (hilos del servidor, o
+# una importación y un operador en el mismo proceso), no se hace un write por
+# fila: la primera alta que llega toma el candado de la hoja y escribe de una
+# vez todas las filas que se encolaron mientras esperaba. Las demás solo
+# esperan a que termine y reciben el mismo resultado.
+_altas_pendientes = {}   # ruta de la hoja -> [_AltaPendiente, ...]
+_candado_altas = threading.Lock()
 
+class _AltaPendiente:
+    __slots__ = ('fila', 'lista', 'error')
+
+    def __init__(self, fila: dict):
+        self.fila = fila
+        self.lista = threading.Event()
+        self.error = None
+
+def agregar_fila_agrupada(ruta_archivo, fila: dict):
+    """
+    Agrega 'fila' al final de un 'items.csv' (con encabezado si es nuevo),
+    junto con las demás altas concurrentes a la misma hoja, y actualiza el
+    manifiesto y el resumen de calorías de la hoja.
+
+    Raises:
+        OSError: Si no se pudo escribir; lo reciben todas las altas del grupo.
+    """
+    ruta_archivo = os.path.abspath(ruta_archivo)
+    candado = candado_hoja(ruta_archivo)
+    if candado.tomado_por_este_hilo():
+        # Quien ya tiene el candado no puede esperar a otra alta que lo necesita.
+        _escribir_grupo_altas(ruta_archivo, [fila])
+        return
+
+    pendiente = _AltaPendiente(fila)
+    with _candado_altas:
+        grupo = _altas_pendientes.setdefault(ruta_archivo, [])
+        grupo.append(pendiente)
+        primera = len(grupo) == 1
+    if not primera:
+        pendiente.lista.wait()
+    else:
+        with candado:
+            # Mientras se esperaba el candado pudieron encolarse más altas.
+            with _candado_altas:
+                grupo = _altas_pendientes.pop(ruta_archivo)
+            try:
+                _escribir_grupo_altas(ruta_archivo, [p.fila for p in grupo])
+            except Exception as e:
+                for p in grupo:
+                    p.error = e
+        for p in grupo:
+            p.lista.set()
+    if pendiente.error is not None:
+        raise pendiente.error
+
+@medido
+def _escribir_grupo_altas(ruta_archivo, filas: list):
+    """
+    (Función auxiliar) Escribe varias filas al final de una hoja en un único
+    write, con el candado de la hoja tomado.
+    """
+    with candado_hoja(ruta_archivo):
+        # Verificamos si el archivo es nuevo para saber si debemos escribir los encabezados.
+        escribir_encabezado = not os.path.exists(ruta_archivo)
+        # Si el archivo no termina en salto de línea, la nueva fila quedaría
+        # pegada a la última y se corrompería la posición de las filas.
+        falta_salto_final = not escribir_encabezado and _falta_salto_final(ruta_archivo)
+        firma_anterior = None if escribir_encabezado else firma_hoja(ruta_archivo)
+
+        texto = io.StringIO()
+        if falta_salto_final:
+            texto.write("\n")
+        for numero, fila in enumerate(filas):
+            # Los nombres de los campos se toman de las claves de cada diccionario.
+            escritor = csv.DictWriter(texto, fieldnames=fila.keys())
+            if escribir_encabezado and numero == 0:
+                escritor.writeheader()
+            escritor.writerow(fila)
+        with open(ruta_archivo, 'a', encoding='utf-8', newline='') as f:
+            f.write(texto.getvalue())
+            _asegurar_en_disco(f, ruta_archivo)
+        if escribir_encabezado:
+            _asegurar_directorio(os.path.dirname(ruta_archivo))
+        if INSTRUMENTACION_ACTIVA:
+            contar(archivos_abiertos=1, bytes_escritos=len(texto.getvalue().encode('utf-8')))
+
+        # Actualizamos el manifiesto solo para esta hoja.
+        _registrar_hoja(ruta_archivo, filas=len(filas) if escribir_encabezado else None, filas_agregadas=len(filas),
+                        firma_anterior=firma_anterior)
+        _actualizar_resumen_hoja(ruta_archivo, firma_anterior, agregadas=[_nombre_y_calorias(fila) for fila in filas])
+        _agregar_nombres_hoja(ruta_archivo, firma_anterior, [fila.get('nombre') for fila in filas])
+
+@medido
 def _encontrar_rutas_csv_recursivo(ruta_actual, lista_rutas,nombre_archivo):
     """
     (Función auxiliar) Recorre recursivamente los directorios para encontrar
@@ -70,6 +1622,8 @@ def _encontrar_rutas_csv_recursivo(ruta_actual, lista_rutas,nombre_archivo):
     """
     try:
         elementos = os.listdir(ruta_actual)
+        if INSTRUMENTACION_ACTIVA:
+            contar(directorios_listados=1)
     except FileNotFoundError:
         # No se imprime advertencia aquí para no saturar la consola si la base no existe.
         # La función principal se encargará de notificar si no se encuentra nada.
@@ -82,48 +1636,200 @@ def _encontrar_rutas_csv_recursivo(ruta_actual, lista_rutas,nombre_archivo):
         elif os.path.isfile(ruta_completa) and elemento.lower() == nombre_archivo.lower():
             lista_rutas.append(ruta_completa)
 
-def crear_lista_desde_csv(ruta_base, nombre_archivo="items.csv"):
+# --- Carga en paralelo --- #
+# Por defecto las hojas se leen de a una. En volúmenes de red (NFS) conviene
+# subir HILOS_CARGA porque el tiempo se va en abrir archivos, no en CPU. Las
+# hojas de más de UMBRAL_HOJA_GRANDE_BYTES se pueden parsear en otro proceso
+# si PROCESOS_CARGA es mayor que cero.
+HILOS_CARGA = int(os.environ.get("ALIMENTOS_HILOS_CARGA", "1"))
+PROCESOS_CARGA = int(os.environ.get("ALIMENTOS_PROCESOS_CARGA", "0"))
+UMBRAL_HOJA_GRANDE_BYTES = 32 * 1024 * 1024
+
+def _inicializar_proceso_lector():
+    """
+    (Función auxiliar) El flock de la hoja que se le pide leer a un proceso
+    lector lo tiene el hilo del padre que espera el resultado, y otra apertura
+    del archivo de candado esperaría para siempre. El proceso lector, que solo
+    lee, se protege únicamente entre sus hilos. (Los candados heredados por el
+    fork ya los reinicia _reiniciar_candados_en_hijo.)
+    """
+    global _usar_flock
+    _usar_flock = False
+
+def leer_hojas_en_paralelo(rutas_csv, funcion_lectura, hilos=None, procesos=None):
+    """
+    Aplica 'funcion_lectura' a cada hoja, en paralelo si se pide, y entrega los
+    resultados en el mismo orden que 'rutas_csv'.
+
+    Args:
+        rutas_csv (list): Rutas de las hojas a leer.
+        funcion_lectura: Función de módulo (para poder usarse en otro proceso) que recibe una ruta.
+        hilos (int, optional): Cantidad de hilos de lectura. Por defecto HILOS_CARGA.
+        procesos (int, optional): Procesos para hojas grandes. Por defecto PROCESOS_CARGA.
+
+    Yields:
+        tuple: (ruta, resultado, error). Si la lectura falló, 'resultado' es
+            None y 'error' la excepción, para que quien llama avise por archivo.
+    """
+    hilos = HILOS_CARGA if hilos is None else hilos
+    procesos = PROCESOS_CARGA if procesos is None else procesos
+
+    def leer(ruta_archivo):
+        try:
+            return ruta_archivo, funcion_lectura(ruta_archivo), None
+        except Exception as e:
+            return ruta_archivo, None, e
+
+    if hilos <= 1 and procesos <= 0:
+        for ruta_archivo in rutas_csv:
+            yield leer(ruta_archivo)
+        return
+
+    pool_procesos = None
+    if procesos > 0:
+        pool_procesos = ProcessPoolExecutor(max_workers=procesos, initializer=_inicializar_proceso_lector)
+
+    def leer_en_paralelo(ruta_archivo):
+        try:
+            if pool_procesos is not None and os.path.getsize(ruta_archivo) >= UMBRAL_HOJA_GRANDE_BYTES:
+                # El hilo conserva el candado de la hoja mientras otro proceso la parsea.
+                with candado_hoja(ruta_archivo):
+                    return ruta_archivo, pool_procesos.submit(funcion_lectura, ruta_archivo).result(), None
+        except Exception as e:
+            return ruta_archivo, None, e
+        return leer(ruta_archivo)
+
+    try:
+        # ThreadPoolExecutor.map devuelve los resultados en el orden de entrada.
+        with ThreadPoolExecutor(max_workers=max(1, hilos)) as pool_hilos:
+            yield from pool_hilos.map(leer_en_paralelo, rutas_csv)
+    finally:
+        if pool_procesos is not None:
+            pool_procesos.shutdown()
+
+def _leer_hoja_como_lista(ruta_archivo):
+    """
+    (Función auxiliar) Lee una hoja (aplicando su registro de cambios) y
+    devuelve sus filas como diccionarios con la jerarquía incluida.
+    """
+    _, filas, _ = leer_hoja(ruta_archivo)
+    partes_ruta = os.path.dirname(ruta_archivo).split(os.sep)
+    lista = []
+    for _, fila in filas:
+        # Añadimos la jerarquía al diccionario para tener el contexto completo.
+        if len(partes_ruta) >= 4: # Asumiendo base/cat/tipo/proc
+            fila['procesamiento'] = partes_ruta[-1]
+            fila['tipo'] = partes_ruta[-2]
+            fila['categoria'] = partes_ruta[-3]
+        lista.append(fila)
+    return lista
+
+@medido
+def iter_alimentos(categoria=None, tipo=None, procesamiento=None, predicate=None,
+                   ruta_base=RUTA_BASE_DATOS, nombre_archivo="items.csv"):
+    """
+    Recorre los alimentos de forma perezosa, hoja por hoja.
+
+    Los filtros de jerarquía se resuelven con la estructura de directorios:
+    solo se abren las hojas de los subdirectorios que coinciden, así que
+    recorrer una categoría cuesta lo que pesa esa categoría y no la base
+    completa (si la base se guarda en SQLite, con el índice de sus hojas).
+    El resto de las condiciones se evalúa fila a fila.
+
+    Args:
+        categoria (str, optional): Categoría a recorrer.
+        tipo (str, optional): Tipo dentro de la categoría.
+        procesamiento (str, optional): Procesamiento dentro del tipo.
+        predicate (callable, optional): Función que recibe el diccionario de
+            la fila y devuelve True si se debe entregar.
+        ruta_base (str): Raíz de la base de datos.
+
+    Yields:
+        dict: Cada alimento, con su jerarquía incluida, igual que en crear_lista_desde_csv.
+    """
+    almacen = _almacen_para_base(ruta_base, nombre_archivo)
+    if almacen is not None:
+        yield from almacen.iter_alimentos(categoria, tipo, procesamiento, predicate)
+        return
+    for ruta_archivo in obtener_rutas_csv(ruta_base, nombre_archivo, categoria, tipo, procesamiento):
+        try:
+            filas = _leer_hoja_como_lista(ruta_archivo)
+        except Exception as e:
+            print(f"ADVERTENCIA: No se pudo leer el archivo {ruta_archivo}. Detalles: {e}")
+            continue
+        _registrar_filas_leidas(ruta_base, ruta_archivo, len(filas))
+        for fila in filas:
+            if predicate is None or predicate(fila):
+                yield fila
+
+@medido
+def crear_lista_desde_csv(ruta_base, nombre_archivo="items.csv", hilos=None, procesos=None):
     """
     Crea una lista consolidada de alimentos a partir de todos los
     archivos 'items.csv' encontrados en la estructura de directorios.
 
     Args:
         ruta_base (str): El directorio raíz donde buscar (ej: "base_de_datos_alimentos").
-
+        hilos (int, optional): Hilos para leer las hojas en paralelo (por defecto HILOS_CARGA).
+        procesos (int, optional): Procesos para parsear hojas grandes (por defecto PROCESOS_CARGA).
 
     Returns:
         list: Una lista de diccionarios, cada uno representando un alimento.
             Retorna una lista vacía si no se encuentran datos o el directorio no existe.
+            Si la base se guarda en SQLite, cada diccionario trae además su 'id'.
     """
-    rutas_csv = []
-    _encontrar_rutas_csv_recursivo(ruta_base, rutas_csv, nombre_archivo)
+    almacen = _almacen_para_base(ruta_base, nombre_archivo)
+    if almacen is not None:
+        return almacen.crear_lista()
+
+    rutas_csv = obtener_rutas_csv(ruta_base, nombre_archivo)
 
     if not rutas_csv:
         print(f"ADVERTENCIA: No se encontraron archivos '{nombre_archivo}' en '{ruta_base}'.")
         return []
 
     lista_global_alimentos = []
-    for ruta_archivo in rutas_csv:
-        try:
-            with open(ruta_archivo, 'r', encoding='utf-8', newline='') as f:
-                lector = csv.DictReader(f)
-                for fila in lector:
-                    # Añadimos la jerarquía al diccionario para tener el contexto completo.
-                    partes_ruta = os.path.dirname(ruta_archivo).split(os.sep)
-                    if len(partes_ruta) >= 4: # Asumiendo base/cat/tipo/proc
-                        fila['procesamiento'] = partes_ruta[-1]
-                        fila['tipo'] = partes_ruta[-2]
-                        fila['categoria'] = partes_ruta[-3]
-                    lista_global_alimentos.append(fila)
-        except Exception as e:
-            print(f"ADVERTENCIA: No se pudo leer el archivo {ruta_archivo}. Detalles: {e}")
+    # El orden del resultado es siempre el de rutas_csv, se lea en paralelo o no.
+    for ruta_archivo, filas, error in leer_hojas_en_paralelo(rutas_csv, _leer_hoja_como_lista, hilos, procesos):
+        if error is not None:
+            print(f"ADVERTENCIA: No se pudo leer el archivo {ruta_archivo}. Detalles: {error}")
+            continue
+        lista_global_alimentos.extend(filas)
+        _registrar_filas_leidas(ruta_base, ruta_archivo, len(filas))
 
+    guardar_manifiesto(ruta_base)
     return lista_global_alimentos
 
+@medido
 def sobrescribir_csv(ruta_archivo: str, encabezados: list, filas: list) -> bool:
+    """
+    (Función auxiliar) Sobrescribe una hoja con una nueva lista de filas. Si
+    es una hoja de la base y la base se guarda en SQLite, reemplaza sus filas
+    en el AlmacenSQLite; si no, reescribe el archivo con sobrescribir_archivo_csv.
+
+    Args:
+        ruta_archivo (str): La ruta completa al archivo CSV que se va a sobrescribir.
+        encabezados (list): Una lista de strings con los nombres de las columnas.
+        filas (list): Una lista de diccionarios, donde cada diccionario es una fila.
+
+    Returns:
+        bool: True si la escritura fue exitosa, False en caso de error.
+    """
+    en_almacen = _hoja_en_almacen(ruta_archivo)
+    if en_almacen is not None:
+        almacen, jerarquia = en_almacen
+        return almacen.sobrescribir_hoja(*jerarquia, encabezados, filas)
+    return sobrescribir_archivo_csv(ruta_archivo, encabezados, filas)
+
+def sobrescribir_archivo_csv(ruta_archivo: str, encabezados: list, filas: list) -> bool:
     """
     (Función auxiliar) Sobrescribe de forma segura un archivo CSV con una nueva lista de filas.
 
+    El contenido nuevo se escribe en un temporal que reemplaza al archivo
+    con os.replace: si el proceso se corta a mitad de camino, la hoja queda
+    como estaba. Como las filas recibidas ya son el contenido completo de la
+    hoja, se descarta su registro de cambios.
+
     Args:
         ruta_archivo (str): La ruta completa al archivo CSV que se va a sobrescribir.
         encabezados (list): Una lista de strings con los nombres de las columnas.
@@ -133,10 +1839,19 @@ def sobrescribir_csv(ruta_archivo: str, encabezados: list, filas: list) -> bool:
         bool: True si la escritura fue exitosa, False en caso de error.
     """
     try:
-        with open(ruta_archivo, 'w', encoding='utf-8', newline='') as f:
-            escritor = csv.DictWriter(f, fieldnames=encabezados)
-            escritor.writeheader()
-            escritor.writerows(filas)
+        with candado_hoja(ruta_archivo):
+            def escribir(f):
+                escritor = csv.DictWriter(f, fieldnames=encabezados)
+                escritor.writeheader()
+                escritor.writerows(filas)
+                if INSTRUMENTACION_ACTIVA:
+                    contar(archivos_abiertos=1, bytes_escritos=f.tell())
+            _reescribir_atomico(ruta_archivo, escribir)
+            try:
+                os.remove(ruta_archivo + SUFIJO_REGISTRO_CAMBIOS)
+            except FileNotFoundError:
+                pass
+            _registrar_hoja(ruta_archivo, filas=len(filas))
         return True
     except (IOError, FileNotFoundError) as e:
         print(f"ERROR CRÍTICO al intentar reescribir el archivo: {e}")
@@ -0,0 +1,118 @@
+"""
+Prueba de carga del servidor local (Servidor.py).
+
+Abre varias conexiones a la vez y manda pedidos de lectura (y, si se pide,
+algunas altas) lo más rápido posible. Al final informa pedidos por segundo y
+la latencia de los pedidos.
+
+Uso (con el servidor ya iniciado con "python Integrador_recursividad.py serve"):
+    python Prueba_carga.py --conexiones 16 --pedidos 2000
+    python Prueba_carga.py --unix /tmp/alimentos.sock --pedidos 5000 --altas 0.01
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+
+# Pedidos de lectura que se reparten al azar entre las conexiones.
+PEDIDOS_LECTURA = (
+    {'op': 'ping'},
+    {'op': 'top', 'n': 10},
+    {'op': 'query', 'min_cal': 50, 'max_cal': 150, 'limite': 20},
+    {'op': 'stats'},
+)
+
+
+async def _cliente(numero: int, args, categorias: list, latencias: list, errores: list):
+    """Una conexión que manda 'args.pedidos' pedidos, de a uno, y espera cada respuesta."""
+    if args.unix:
+        lector, escritor = await asyncio.open_unix_connection(args.unix, limit=2 ** 24)
+    else:
+        lector, escritor = await asyncio.open_connection(args.host, args.puerto, limit=2 ** 24)
+    azar = random.Random(numero)
+    try:
+        for i in range(args.pedidos):
+            if args.altas and azar.random() < args.altas:
+                pedido = {'op': 'alta', 'categoria': 'prueba', 'tipo': 'carga', 'procesamiento': f'conexion{numero}',
+                          'nombre': f'item {numero}-{i}-{time.time_ns()}', 'calorias_100g': azar.uniform(1, 900)}
+            elif categorias and azar.random() < 0.3:
+                pedido = {'op': 'query', 'categoria': azar.choice(categorias), 'limite': 20}
+            else:
+                pedido = azar.choice(PEDIDOS_LECTURA)
+            inicio = time.perf_counter()
+            escritor.write(json.dumps(pedido).encode('utf-8') + b"\n")
+            await escritor.drain()
+            respuesta = json.loads(await lector.readline())
+            latencias.append(time.perf_counter() - inicio)
+            if not respuesta.get('ok'):
+                errores.append(respuesta.get('error'))
+    finally:
+        escritor.close()
+        await escritor.wait_closed()
+
+async def _categorias(args) -> list:
+    """Pide 'stats' una vez para conocer las categorías de la base."""
+    if args.unix:
+        lector, escritor = await asyncio.open_unix_connection(args.unix, limit=2 ** 24)
+    else:
+        lector, escritor = await asyncio.open_connection(args.host, args.puerto, limit=2 ** 24)
+    escritor.write(b'{"op": "stats"}\n')
+    await escritor.drain()
+    respuesta = json.loads(await lector.readline())
+    escritor.close()
+    await escritor.wait_closed()
+    return [fila['categoria'] for fila in respuesta.get('resultados', []) if fila['categoria'] is not None]
+
+async def ejecutar_prueba(args) -> dict:
+    """Corre la prueba y devuelve el resumen."""
+    categorias = await _categorias(args)
+    latencias, errores = [], []
+    inicio = time.perf_counter()
+    await asyncio.gather(*(_cliente(n, args, categorias, latencias, errores) for n in range(args.conexiones)))
+    segundos = time.perf_counter() - inicio
+    latencias.sort()
+    return {
+        'conexiones': args.conexiones,
+        'pedidos': len(latencias),
+        'errores': len(errores),
+        'segundos': segundos,
+        'pedidos_por_segundo': len(latencias) / segundos if segundos > 0 else 0.0,
+        'latencia_media_ms': statistics.fmean(latencias) * 1000 if latencias else 0.0,
+        'latencia_p50_ms': latencias[len(latencias) // 2] * 1000 if latencias else 0.0,
+        'latencia_p99_ms': latencias[int(len(latencias) * 0.99)] * 1000 if latencias else 0.0,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga del servidor de alimentos.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--puerto', type=int, default=8765)
+    parser.add_argument('--unix', help="Conectarse por este socket Unix en lugar de TCP.")
+    parser.add_argument('--conexiones', type=int, default=8, help="Conexiones simultáneas.")
+    parser.add_argument('--pedidos', type=int, default=1000, help="Pedidos por conexión.")
+    parser.add_argument('--altas', type=float, default=0.0,
+                        help="Fracción de pedidos que son altas (se escriben en prueba/carga/*).")
+    parser.add_argument('--json', action='store_true', help="Imprimir el resumen como JSON.")
+    args = parser.parse_args()
+
+    try:
+        resumen = asyncio.run(ejecutar_prueba(args))
+    except OSError as e:
+        print(f"ERROR: No se pudo conectar con el servidor. Detalles: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.json:
+        print(json.dumps(resumen))
+        return
+    print("\n--- Resultado de la Prueba de Carga ---")
+    print(f"- Conexiones: {resumen['conexiones']}")
+    print(f"- Pedidos: {resumen['pedidos']} ({resumen['errores']} con error)")
+    print(f"- Tiempo: {resumen['segundos']:.2f} s")
+    print(f"- Pedidos por segundo: {resumen['pedidos_por_segundo']:.0f}")
+    print(f"- Latencia: media {resumen['latencia_media_ms']:.2f} ms, "
+          f"p50 {resumen['latencia_p50_ms']:.2f} ms, p99 {resumen['latencia_p99_ms']:.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Prueba de fallos de las reescrituras de hojas (sobrescribir_csv y compactar_hoja).
+
+Trabaja sobre una base temporal y mata el proceso (SIGKILL) en momentos al
+azar mientras reescribe una hoja. Después de cada corte la hoja tiene que
+leerse completa: con el contenido anterior o con el nuevo, nunca a medias.
+Al final mide cuánto tardan las altas con cada política de durabilidad.
+
+Los cortes en puntos fijos (antes de os.replace, entre el reemplazo y el
+borrado del registro de cambios) y el error de fsync son pruebas
+automáticas, en tests/test_fallos.py.
+
+Uso:
+    python Prueba_fallos.py --cortes 50 --filas 20000
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+import Manejo_archivo
+from Manejo_archivo import sobrescribir_csv, leer_hoja, alta_nuevo_item, durabilidad, POLITICAS_DURABILIDAD
+
+ENCABEZADOS = ['nombre', 'calorias_100g']
+
+
+def _filas(version: str, cantidad: int) -> list:
+    """Contenido de prueba: 'cantidad' filas cuyos nombres dicen a qué versión pertenecen."""
+    return [{'nombre': f"{version} {i}", 'calorias_100g': str(i % 900 + 1)} for i in range(cantidad)]
+
+def _contenido(ruta_hoja: str) -> list:
+    """Las filas vivas de la hoja, como las ve la aplicación."""
+    _, filas, _ = leer_hoja(ruta_hoja)
+    return [dict(fila) for _, fila in filas]
+
+def _temporales(ruta_hoja: str) -> list:
+    directorio, nombre = os.path.split(ruta_hoja)
+    return [e for e in os.listdir(directorio) if e.startswith(nombre + ".") and e.endswith(Manejo_archivo.SUFIJO_TEMPORAL)]
+
+
+# --- Procesos que se cortan --- #
+
+def _reescribir_sin_parar(ruta_hoja: str, cantidad: int):
+    """Reescribe la hoja una y otra vez, alternando dos versiones, hasta que lo maten."""
+    versiones = (_filas("A", cantidad), _filas("B", cantidad))
+    numero = 0
+    while True:
+        sobrescribir_csv(ruta_hoja, ENCABEZADOS, versiones[numero % 2])
+        numero += 1
+
+
+# --- Escenarios --- #
+
+def probar_cortes_al_azar(ruta_hoja: str, cortes: int, cantidad: int, azar: random.Random) -> list:
+    """Mata el proceso que reescribe en momentos al azar y verifica la hoja después de cada corte."""
+    errores = []
+    validas = (_filas("A", cantidad), _filas("B", cantidad))
+    sobrescribir_csv(ruta_hoja, ENCABEZADOS, validas[0])
+    inicio = time.perf_counter()
+    sobrescribir_csv(ruta_hoja, ENCABEZADOS, validas[0])
+    duracion = time.perf_counter() - inicio # Lo que tarda una reescritura, para repartir los cortes.
+
+    for numero in range(cortes):
+        proceso = multiprocessing.Process(target=_reescribir_sin_parar, args=(ruta_hoja, cantidad))
+        proceso.start()
+        time.sleep(azar.uniform(duracion, 4 * duracion))
+        proceso.kill()
+        proceso.join()
+        contenido = _contenido(ruta_hoja)
+        if contenido not in validas:
+            errores.append(f"corte {numero}: la hoja quedó a medias ({len(contenido)} filas)")
+    # La próxima reescritura borra los temporales que dejaron los cortes.
+    sobrescribir_csv(ruta_hoja, ENCABEZADOS, validas[0])
+    if _temporales(ruta_hoja):
+        errores.append(f"quedaron temporales después de reescribir: {_temporales(ruta_hoja)}")
+    return errores
+
+
+# --- Costo de cada política --- #
+
+def medir_politicas(ruta_base: str, altas: int) -> dict:
+    """Segundos que tardan 'altas' altas seguidas con cada política de durabilidad."""
+    tiempos = {}
+    ruta_original = Manejo_archivo.RUTA_BASE_DATOS
+    Manejo_archivo.RUTA_BASE_DATOS = ruta_base
+    try:
+        with open(os.devnull, 'w') as nulo:
+            salida, sys.stdout = sys.stdout, nulo
+            try:
+                for politica in POLITICAS_DURABILIDAD:
+                    inicio = time.perf_counter()
+                    with durabilidad(politica):
+                        for numero in range(altas):
+                            alta_nuevo_item("prueba", "durabilidad", politica,
+                                            {'nombre': f"item {numero}", 'calorias_100g': numero + 1})
+                    tiempos[politica] = time.perf_counter() - inicio
+            finally:
+                sys.stdout = salida
+    finally:
+        Manejo_archivo.RUTA_BASE_DATOS = ruta_original
+    return tiempos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de fallos de las reescrituras de hojas.")
+    parser.add_argument('--cortes', type=int, default=30, help="Cortes al azar durante las reescrituras.")
+    parser.add_argument('--filas', type=int, default=20000, help="Filas de la hoja de prueba.")
+    parser.add_argument('--altas', type=int, default=200, help="Altas para medir cada política (0 para no medir).")
+    parser.add_argument('--semilla', type=int, default=0)
+    args = parser.parse_args()
+
+    ruta_base = tempfile.mkdtemp(prefix="alimentos_fallos_")
+    ruta_hoja = os.path.join(ruta_base, "prueba", "fallos", "fresco", "items.csv")
+    os.makedirs(os.path.dirname(ruta_hoja))
+    azar = random.Random(args.semilla)
+    escenarios = [
+        (f"{args.cortes} cortes al azar durante la reescritura",
+         lambda: probar_cortes_al_azar(ruta_hoja, args.cortes, args.filas, azar)),
+    ]
+    fallidos = 0
+    try:
+        print("\n--- Prueba de Fallos ---")
+        for nombre, escenario in escenarios:
+            errores = escenario()
+            print(f"- {nombre}: {'OK' if not errores else 'FALLÓ'}")
+            for error in errores:
+                print(f"    {error}")
+            fallidos += bool(errores)
+        if args.altas:
+            print(f"\n--- Costo de cada política ({args.altas} altas) ---")
+            for politica, segundos in medir_politicas(ruta_base, args.altas).items():
+                print(f"- {politica}: {segundos:.3f} s ({args.altas / segundos:.0f} altas/s)")
+    finally:
+        shutil.rmtree(ruta_base, ignore_errors=True)
+    sys.exit(1 if fallidos else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+from Manejo_archivo import *
+from Catalogo import obtener_catalogo, CAMPOS_JERARQUIA, _leer_hoja_cruda
+from Comandos import consultar, estadisticas, CAMPOS_CONSULTA
+from Utilidades import _ubicar_fila_en_hoja
+import asyncio
+import contextlib
+import csv
+import json
+import os
+import signal
+import sys
+
+# Dirección por defecto del servidor (solo escucha en la máquina local).
+HOST_SERVIDOR = "127.0.0.1"
+PUERTO_SERVIDOR = 8765
+# Máximo de filas que devuelve una consulta si el pedido no indica 'limite'.
+LIMITE_RESULTADOS = 1000
+# Largo máximo de una línea de pedido (bytes).
+LARGO_MAXIMO_PEDIDO = 1024 * 1024
+
+
+class ErrorPedido(Exception):
+    """Pedido inválido: se responde con {'ok': false, 'error': ...} sin cortar la conexión."""
+
+
+class ServidorAlimentos:
+    """
+    Servidor local que mantiene el catálogo residente y responde pedidos JSON,
+    uno por línea, sobre TCP (solo localhost) o un socket Unix.
+
+    Cada pedido es un objeto con una clave 'op' ('query', 'listar', 'filtrar',
+    'top', 'stats', 'alta', 'modificar', 'eliminar' o 'ping') y sus parámetros.
+    La respuesta es otro objeto en una línea: {'ok': true, ...} o
+    {'ok': false, 'error': '...'}; si el pedido trae 'id', se devuelve igual.
+
+    Las lecturas se resuelven en el hilo del event loop contra el catálogo en
+    memoria, así que muchos clientes consultan a la vez sin esperar a nadie.
+    Las escrituras toman un asyncio.Lock por hoja (dos escrituras sobre la
+    misma hoja nunca se pisan), hacen el trabajo de disco en un hilo aparte y
+    vuelven al event loop para actualizar el catálogo.
+    """
+
+    def __init__(self):
+        self.catalogo = None
+        self._resumen = None      # resumen_calorias en caché; una escritura lo invalida
+        self._candados = {}       # ruta de hoja -> asyncio.Lock
+        self.pedidos_atendidos = 0
+
+    def _candado(self, ruta_hoja: str) -> asyncio.Lock:
+        candado = self._candados.get(ruta_hoja)
+        if candado is None:
+            candado = self._candados[ruta_hoja] = asyncio.Lock()
+        return candado
+
+    async def cargar(self):
+        """Carga el catálogo (instantánea o CSV) en un hilo, sin bloquear el event loop."""
+        self.catalogo = await asyncio.to_thread(obtener_catalogo, RUTA_BASE_DATOS)
+
+    # --- Lecturas --- #
+
+    def _op_query(self, pedido: dict) -> dict:
+        filas = consultar(
+            self.catalogo,
+            pedido.get('categoria'), pedido.get('tipo'), pedido.get('procesamiento'),
+            pedido.get('nombre'), _numero(pedido, 'min_cal'), _numero(pedido, 'max_cal'),
+            _entero(pedido, 'top'),
+        )
+        limite = _entero(pedido, 'limite')
+        limite = LIMITE_RESULTADOS if limite is None else limite
+        return {
+            'total': len(filas),
+            'resultados': [_fila_a_dict(fila) for fila in filas[:limite]],
+        }
+
+    async def _op_stats(self, pedido: dict) -> dict:
+        if self._resumen is None:
+            self._resumen = await asyncio.to_thread(resumen_calorias, RUTA_BASE_DATOS)
+        return {'resultados': estadisticas(self._resumen, pedido.get('categoria'))}
+
+    # --- Escrituras --- #
+
+    def _ubicar_unico(self, pedido: dict):
+        """
+        (Función auxiliar) Busca por nombre (y jerarquía, si se indica) el único
+        ítem al que apunta un pedido de modificación o baja.
+        """
+        nombre = pedido.get('nombre')
+        if not isinstance(nombre, str) or not nombre.strip():
+            raise ErrorPedido("falta 'nombre'")
+        candidatos = consultar(self.catalogo, pedido.get('categoria'), pedido.get('tipo'),
+                               pedido.get('procesamiento'), nombre)
+        if not candidatos:
+            raise ErrorPedido(f"no se encontró ningún ítem con el nombre '{nombre}'")
+        if len(candidatos) > 1:
+            raise ErrorPedido(
+                f"hay {len(candidatos)} ítems con el nombre '{nombre}'; indique categoria, tipo y procesamiento"
+            )
+        return candidatos[0]
+
+    async def _op_alta(self, pedido: dict) -> dict:
+        jerarquia = [normalizar_texto_para_ruta(pedido.get(campo)) for campo in CAMPOS_JERARQUIA]
+        if not all(jerarquia):
+            raise ErrorPedido("faltan categoria, tipo o procesamiento")
+        nombre = pedido.get('nombre')
+        if not isinstance(nombre, str) or not nombre.strip():
+            raise ErrorPedido("falta 'nombre'")
+        nombre = nombre.strip()
+        calorias = _calorias_validas(pedido)
+
+        ruta_hoja = os.path.join(RUTA_BASE_DATOS, *jerarquia, "items.csv")
+        async with self._candado(ruta_hoja):
+            existe = self.catalogo.nombre_en_hoja(nombre, ruta_hoja)
+            if existe is None:
+                # Otro proceso cambió la hoja: se consulta el archivo.
+                existe = await asyncio.to_thread(nombre_existe_en_hoja, ruta_hoja, nombre)
+            if existe:
+                raise ErrorPedido(f"el ítem '{nombre}' ya existe en esta jerarquía")
+            nuevo_item = {'nombre': nombre, 'calorias_100g': calorias}
+            firma_anterior, firma_nueva = await asyncio.to_thread(_escribir_alta, ruta_hoja, jerarquia, nuevo_item)
+            indice = self.catalogo.agregar(nombre, calorias, *jerarquia, ruta_hoja=ruta_hoja,
+                                           firma_anterior=firma_anterior, firma_nueva=firma_nueva)
+            self._resumen = None
+        return {'resultado': _fila_a_dict(self.catalogo.fila(indice))}
+
+    async def _op_modificar(self, pedido: dict) -> dict:
+        item = self._ubicar_unico(pedido)
+        nuevo_nombre = pedido.get('nuevo_nombre')
+        if nuevo_nombre is not None and (not isinstance(nuevo_nombre, str) or not nuevo_nombre.strip()):
+            raise ErrorPedido("'nuevo_nombre' no puede estar vacío")
+        nuevo_nombre = nuevo_nombre.strip() if nuevo_nombre is not None else item['nombre']
+        nuevas_calorias = _calorias_validas(pedido, 'nuevas_calorias') if 'nuevas_calorias' in pedido else item['calorias_100g']
+
+        ruta_hoja = item.ruta_hoja
+        async with self._candado(ruta_hoja):
+            if not item._catalogo.vivo[item.indice]:
+                raise ErrorPedido("el ítem fue eliminado mientras se procesaba el pedido")
+            campos = {'nombre': nuevo_nombre, 'calorias_100g': nuevas_calorias}
+            firma, hoja_leida = await asyncio.to_thread(_escribir_cambio, item, campos)
+            self.catalogo.modificar(item.indice, nuevo_nombre, nuevas_calorias)
+            resultado = _fila_a_dict(item)
+            self._anotar_cambio(ruta_hoja, firma, hoja_leida)
+        return {'resultado': resultado}
+
+    async def _op_eliminar(self, pedido: dict) -> dict:
+        item = self._ubicar_unico(pedido)
+        eliminado = _fila_a_dict(item)
+        ruta_hoja = item.ruta_hoja
+        async with self._candado(ruta_hoja):
+            if not item._catalogo.vivo[item.indice]:
+                raise ErrorPedido("el ítem fue eliminado mientras se procesaba el pedido")
+            firma, hoja_leida = await asyncio.to_thread(_escribir_cambio, item, None)
+            self.catalogo.eliminar(item.indice)
+            self._anotar_cambio(ruta_hoja, firma, hoja_leida)
+        return {'resultado': eliminado}
+
+    def _anotar_cambio(self, ruta_hoja: str, firma, hoja_leida):
+        """
+        (Función auxiliar) Deja el catálogo al día con la hoja después de una
+        modificación o baja: anota la firma nueva si la firma del catálogo
+        coincidía antes de escribir, o vuelca la hoja releída si había cambiado
+        por fuera (las demás filas también pueden haberse corrido).
+        """
+        if hoja_leida is None:
+            self.catalogo.registrar_firma(ruta_hoja, firma)
+        else:
+            self.catalogo.actualizar_hoja(ruta_hoja, hoja_leida)
+        self._resumen = None
+
+    # --- Protocolo --- #
+
+    async def responder(self, pedido) -> dict:
+        """Resuelve un pedido ya decodificado y arma la respuesta."""
+        if not isinstance(pedido, dict):
+            return {'ok': False, 'error': "el pedido debe ser un objeto JSON"}
+        try:
+            match pedido.get('op'):
+                case 'query' | 'filtrar':
+                    respuesta = self._op_query(pedido)
+                case 'listar':
+                    respuesta = self._op_query({'limite': pedido.get('limite')})
+                case 'top':
+                    if _entero(pedido, 'n') is None:
+                        raise ErrorPedido("falta 'n'")
+                    respuesta = self._op_query({**pedido, 'top': pedido['n']})
+                case 'stats':
+                    respuesta = await self._op_stats(pedido)
+                case 'alta':
+                    respuesta = await self._op_alta(pedido)
+                case 'modificar':
+                    respuesta = await self._op_modificar(pedido)
+                case 'eliminar':
+                    respuesta = await self._op_eliminar(pedido)
+                case 'ping':
+                    respuesta = {'alimentos': len(self.catalogo)}
+                case op:
+                    raise ErrorPedido(f"operación desconocida: {op!r}")
+            respuesta = {'ok': True, **respuesta}
+        except ErrorPedido as e:
+            respuesta = {'ok': False, 'error': str(e)}
+        except (OSError, csv.Error) as e:
+            respuesta = {'ok': False, 'error': f"error de disco: {e}"}
+        if 'id' in pedido:
+            respuesta['id'] = pedido['id']
+        self.pedidos_atendidos += 1
+        return respuesta
+
+    async def atender_conexion(self, lector: asyncio.StreamReader, escritor: asyncio.StreamWriter):
+        """Atiende los pedidos de una conexión, uno por línea, hasta que el cliente cierre."""
+        try:
+            while True:
+                try:
+                    linea = await lector.readline()
+                except ValueError:
+                    # La línea superó LARGO_MAXIMO_PEDIDO: no se puede seguir leyendo esta conexión.
+                    escritor.write(b'{"ok": false, "error": "pedido demasiado largo"}\n')
+                    break
+                if not linea:
+                    break
+                if not linea.strip():
+                    continue
+                try:
+                    pedido = json.loads(linea)
+                except ValueError:
+                    respuesta = {'ok': False, 'error': "JSON inválido"}
+                else:
+                    respuesta = await self.responder(pedido)
+                escritor.write(json.dumps(respuesta, ensure_ascii=False).encode('utf-8') + b"\n")
+                await escritor.drain()
+        except ConnectionError:
+            pass
+        finally:
+            escritor.close()
+            with contextlib.suppress(ConnectionError):
+                await escritor.wait_closed()
+
+    async def servir(self, host: str = HOST_SERVIDOR, puerto: int = PUERTO_SERVIDOR, socket_unix: str = None):
+        """Carga el catálogo y atiende conexiones hasta que se interrumpa el proceso."""
+        await self.cargar()
+        if socket_unix:
+            servidor = await asyncio.start_unix_server(self.atender_conexion, socket_unix, limit=LARGO_MAXIMO_PEDIDO)
+            direccion = socket_unix
+        else:
+            servidor = await asyncio.start_server(self.atender_conexion, host, puerto, limit=LARGO_MAXIMO_PEDIDO)
+            direccion = f"{host}:{puerto}"
+        print(f"Servidor escuchando en {direccion} ({len(self.catalogo)} alimentos en memoria). Ctrl+C para detener.",
+              file=sys.stderr)
+        # SIGTERM (por ejemplo, desde un gestor de servicios) detiene el servidor igual que Ctrl+C.
+        detener = asyncio.get_running_loop().create_future()
+        with contextlib.suppress(NotImplementedError, AttributeError):
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, detener.set_result, None)
+        async with servidor:
+            await servidor.start_serving()
+            await detener
+
+
+def _escribir_alta(ruta_hoja, jerarquia, nuevo_item):
+    """
+    (Función auxiliar) Escribe un alta al final de su hoja. Corre en un hilo aparte.
+
+    Returns:
+        tuple: (firma de la hoja antes del alta, o None si no existía; firma
+        después del alta), leídas con el candado de la hoja tomado.
+    """
+    with candado_hoja(ruta_hoja):
+        firma_anterior = firma_hoja_si_existe(ruta_hoja)
+        if not alta_nuevo_item(*jerarquia, nuevo_item):
+            raise ErrorPedido("no se pudo escribir el ítem (ver el registro del servidor)")
+        return firma_anterior, firma_hoja(ruta_hoja)
+
+def _escribir_cambio(item, campos):
+    """
+    (Función auxiliar) Registra en disco la modificación ('campos') o la baja
+    (campos=None) de un ítem del catálogo. Corre en un hilo aparte.
+
+    Returns:
+        tuple: (firma, None) con la firma de la hoja después del cambio si la
+        firma del catálogo estaba vigente; si la hoja había cambiado por fuera,
+        (None, hoja) con la hoja releída bajo el candado (ver _leer_hoja_cruda).
+    """
+    ruta_hoja = item.ruta_hoja
+    with candado_hoja(ruta_hoja):
+        posicion, firma_vigente = _ubicar_fila_en_hoja(item)
+        if posicion is None:
+            raise ErrorPedido("el ítem ya no se encuentra en el archivo; puede haber sido modificado por otro proceso")
+        if campos is None:
+            hecho = registrar_baja(ruta_hoja, posicion, fila=item)
+        else:
+            hecho = registrar_modificacion(ruta_hoja, posicion, campos, fila_anterior=item)
+        if not hecho:
+            raise ErrorPedido("no se pudo registrar el cambio (ver el registro del servidor)")
+        if firma_vigente:
+            return firma_hoja(ruta_hoja), None
+        return None, _leer_hoja_cruda(ruta_hoja)
+
+def _fila_a_dict(fila) -> dict:
+    """(Función auxiliar) Fila del catálogo -> diccionario para la respuesta."""
+    return {campo: fila.get(campo) for campo in CAMPOS_CONSULTA}
+
+def _numero(pedido: dict, clave: str):
+    """(Función auxiliar) Lee un parámetro numérico opcional del pedido."""
+    valor = pedido.get(clave)
+    if valor is None:
+        return None
+    try:
+        return float(valor)
+    except (ValueError, TypeError):
+        raise ErrorPedido(f"'{clave}' debe ser un número")
+
+def _entero(pedido: dict, clave: str):
+    """(Función auxiliar) Lee un parámetro entero opcional (no negativo) del pedido."""
+    valor = pedido.get(clave)
+    if valor is None:
+        return None
+    if isinstance(valor, bool) or not isinstance(valor, int) or valor < 0:
+        raise ErrorPedido(f"'{clave}' debe ser un entero no negativo")
+    return valor
+
+def _calorias_validas(pedido: dict, clave: str = 'calorias_100g') -> float:
+    """(Función auxiliar) Calorías obligatorias, con la misma regla que el alta interactiva."""
+    calorias = _numero(pedido, clave)
+    if calorias is None:
+        raise ErrorPedido(f"falta '{clave}'")
+    if not calorias > 0:
+        raise ErrorPedido("las calorías deben ser un número positivo mayor a cero")
+    return calorias
+
+def iniciar_servidor(host: str = HOST_SERVIDOR, puerto: int = PUERTO_SERVIDOR, socket_unix: str = None) -> int:
+    """
+    Arranca el servidor y bloquea hasta Ctrl+C.
+
+    Returns:
+        int: Código de salida.
+    """
+    servidor = ServidorAlimentos()
+    try:
+        asyncio.run(servidor.servir(host, puerto, socket_unix))
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f"ERROR CRÍTICO: No se pudo iniciar el servidor. Detalles: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if socket_unix:
+            with contextlib.suppress(OSError):
+                os.remove(socket_unix)
+    print(f"\nServidor detenido ({servidor.pedidos_atendidos} pedidos atendidos).", file=sys.stderr)
+    return 0
@@ -1,30 +1,19 @@
 from Manejo_archivo import *
-import unicodedata
 import os, csv
 from Utilidades import mostrar_tabla_alimentos, imprimir_menu
+from Catalogo import obtener_catalogo, catalogo_cargado
+from Importacion import importar_masivo, imprimir_resumen_importacion
+from Estadisticas import estadisticas_calorias, NIVELES_ESTADISTICAS
 
-def normalizar_texto_para_ruta(texto: str) -> str:
-    """
-    Limpia y normaliza un texto para ser usado en nombres de carpetas.
-    Usa la librería estándar 'unicodedata' para quitar acentos.
-    """
-    if not isinstance(texto, str):
-        return ""
-    
-    # 1. Quitar espacios y convertir a minúsculas
-    texto = texto.strip().lower()      
-    
-    # 2. Quitar acentos (ej: "Cítricos" -> "citricos")
-    # Normaliza a 'NFD' (descomposición canónica) 
-    # Esto separa el caracter de su acento (ej: "é" -> "e" + "´")
-    texto_normalizado = unicodedata.normalize('NFD', texto)
-    
-    # Codifica a 'ascii' ignorando los caracteres que no lo son (los acentos)
-    # y luego decodifica de vuelta a 'utf-8' para tener un string normal.
-    texto_sin_acentos = texto_normalizado.encode('ascii', 'ignore').decode('utf-8')
-    
-    return texto_sin_acentos
+def _texto_cantidad(cantidad) -> str:
+    """(Función auxiliar) La cantidad de alimentos de un nodo, o '?' si todavía no se contó."""
+    return "?" if cantidad is None else str(cantidad)
+
+def _con_cantidades(hijos: dict) -> str:
+    """(Función auxiliar) 'carne (12), frutas (7)' a partir de los hijos de un nodo del árbol de la jerarquía."""
+    return ", ".join(f"{nombre} ({_texto_cantidad(nodo['cantidad'])})" for nombre, nodo in sorted(hijos.items()))
 
+@medido
 def opcion_1_alta():
     print("\n====================================")
     print("       Alta de Nuevo Alimento       ")
@@ -46,42 +35,34 @@ def opcion_1_alta():
         print("Alta de ítems cancelada.")
         return
 
-    # Leemos la lista una sola vez al principio.
-    lista_completa_en_memoria = crear_lista_desde_csv(RUTA_BASE_DATOS)
+    # Tomamos el catálogo una sola vez al principio, releyendo solo las hojas que cambiaron.
+    lista_completa_en_memoria = obtener_catalogo(RUTA_BASE_DATOS, refrescar=True)
 
     for i in range(num_items_a_agregar):
         print(f"\n--- Agregando Ítem {i + 1} de {num_items_a_agregar} ---")
         
         # 1. Obtener y mostrar categorías existentes para guiar al usuario.
-        # Ahora usamos la lista en memoria, que es más rápida.
-        if lista_completa_en_memoria:
-            # Usamos un set para obtener categorías únicas y luego lo ordenamos.
-            categorias_existentes = sorted(list(set(item.get('categoria') for item in lista_completa_en_memoria if 'categoria' in item)))
-            if categorias_existentes:
-                print("\nCategorías existentes:", ", ".join(categorias_existentes))
+        # Salen del árbol de la jerarquía (nombres de carpeta y cantidades), sin recorrer los ítems.
+        nodo = nodo_jerarquia(RUTA_BASE_DATOS)
+        if nodo['hijos']:
+            print("\nCategorías existentes:", _con_cantidades(nodo['hijos']))
         
         # Pedir jerarquía
         # 1. Pedir Categoría y mostrar Tipos existentes
         categoria_input = input("Ingrese Categoría (ej: Frutas): ")
         categoria = normalizar_texto_para_ruta(categoria_input)
 
-        if lista_completa_en_memoria:
-            items_en_categoria = [item for item in lista_completa_en_memoria if item.get('categoria') == categoria]
-            if items_en_categoria:
-                tipos_existentes = sorted(list(set(item.get('tipo') for item in items_en_categoria if 'tipo' in item)))
-                if tipos_existentes:
-                    print(f" -> Tipos existentes en '{categoria}':", ", ".join(tipos_existentes))
+        nodo = nodo_jerarquia(RUTA_BASE_DATOS, categoria)
+        if nodo is not None and nodo['hijos']:
+            print(f" -> Tipos existentes en '{categoria}':", _con_cantidades(nodo['hijos']))
 
         # 2. Pedir Tipo y mostrar Procesamientos existentes
         tipo_input = input("Ingrese Tipo (ej: Cítricos): ")
         tipo = normalizar_texto_para_ruta(tipo_input)
 
-        if lista_completa_en_memoria:
-            items_en_tipo = [item for item in lista_completa_en_memoria if item.get('categoria') == categoria and item.get('tipo') == tipo]
-            if items_en_tipo:
-                procesamientos_existentes = sorted(list(set(item.get('procesamiento') for item in items_en_tipo if 'procesamiento' in item)))
-                if procesamientos_existentes:
-                    print(f" -> Procesamientos existentes en '{tipo}':", ", ".join(procesamientos_existentes))
+        nodo = nodo_jerarquia(RUTA_BASE_DATOS, categoria, tipo)
+        if nodo is not None and nodo['hijos']:
+            print(f" -> Procesamientos existentes en '{tipo}':", _con_cantidades(nodo['hijos']))
 
         procesamiento_input = input("Ingrese Procesamiento (ej: Fresco): ")
         procesamiento = normalizar_texto_para_ruta(procesamiento_input)
@@ -100,15 +81,12 @@ def opcion_1_alta():
 
             ruta_archivo_especifico = os.path.join(RUTA_BASE_DATOS, categoria, tipo, procesamiento, "items.csv")
             
-            item_existe = False
-            if os.path.exists(ruta_archivo_especifico):
-                with open(ruta_archivo_especifico, 'r', encoding='utf-8', newline='') as f:
-                    lector = csv.DictReader(f)
-                    for fila in lector:
-                        # Comparamos usando la misma normalización para ser insensibles a mayúsculas/acentos
-                        if normalizar_texto_para_ruta(fila.get('nombre', '')) == normalizar_texto_para_ruta(nombre):
-                            item_existe = True
-                            break
+            # Comparamos usando la misma normalización para ser insensibles a mayúsculas/acentos.
+            # Si el catálogo está al día con la hoja responde su índice de nombres;
+            # si no, el set de nombres de la hoja (que se lee una sola vez por sesión).
+            item_existe = lista_completa_en_memoria.nombre_en_hoja(nombre, ruta_archivo_especifico)
+            if item_existe is None:
+                item_existe = nombre_existe_en_hoja(ruta_archivo_especifico, nombre)
             
             if item_existe:
                 print(f"Error: El ítem '{nombre}' ya existe en esta jerarquía. Por favor, ingrese un nombre diferente.")
@@ -140,25 +118,36 @@ def opcion_1_alta():
             # ... otros campos que definas ...
         }
         
-        # Llamar a tu función de Fase 2
-        alta_nuevo_item(categoria, tipo, procesamiento, nuevo_item)
-        
-        # Actualización de datos si hay más de un alimento agregado
-        item_para_memoria = nuevo_item.copy()
-        item_para_memoria['categoria'] = categoria
-        item_para_memoria['tipo'] = tipo
-        item_para_memoria['procesamiento'] = procesamiento
-        lista_completa_en_memoria.append(item_para_memoria)
-
+        # Llamar a tu función de Fase 2. El candado de la hoja abarca la firma de
+        # antes, el alta y la actualización del catálogo, para que nadie escriba en el medio.
+        ruta_hoja = os.path.join(RUTA_BASE_DATOS, categoria, tipo, procesamiento, "items.csv")
+        with candado_hoja(ruta_hoja):
+            firma_anterior = firma_hoja_si_existe(ruta_hoja)
+            if alta_nuevo_item(categoria, tipo, procesamiento, nuevo_item):
+                # Actualización del catálogo (y de su índice de nombres) si el alta funcionó
+                lista_completa_en_memoria.agregar(
+                    nombre, calorias, categoria, tipo, procesamiento,
+                    ruta_hoja=ruta_hoja, firma_anterior=firma_anterior,
+                )
+
+@medido
 def opcion_2_mostrar_y_filtrar():
     """
     Menú para mostrar y filtrar la lista de alimentos.
     """
-    lista_completa = crear_lista_desde_csv(RUTA_BASE_DATOS)
-    if not lista_completa:
+    # Basta con encontrar un alimento para saber que la base no está vacía.
+    if next(iter_alimentos(), None) is None:
         print("La base de datos está vacía. No hay nada que mostrar.")
         return
 
+    # El catálogo completo solo se carga si se elige una opción que recorre
+    # toda la base; el filtro jerárquico lee únicamente las hojas elegidas.
+    # Cada vez que se usa se pone al día releyendo solo las hojas que
+    # cambiaron, así que no se muestran datos viejos aunque otro operador
+    # edite la base mientras el menú está abierto.
+    def catalogo_completo():
+        return obtener_catalogo(RUTA_BASE_DATOS, refrescar=True)
+
     while True:
         opciones_menu = [
             "Mostrar todos los alimentos",
@@ -172,14 +161,15 @@ def opcion_2_mostrar_y_filtrar():
         match opc:
             case "1": # Mostrar todo
                 print("\n--- Lista Completa de Alimentos ---")
-                mostrar_tabla_alimentos(lista_completa)
+                mostrar_tabla_alimentos(catalogo_completo())
 
             case "2": # Filtrado Jerárquico
                 # 1. Elegir Categoría
-                categorias = sorted(list(set(item['categoria'] for item in lista_completa if 'categoria' in item)))
+                raiz = nodo_jerarquia(RUTA_BASE_DATOS)
+                categorias = sorted(raiz['hijos'])
                 print("\n--- Filtrar por Jerarquía: Elija una Categoría ---")
                 for i, cat in enumerate(categorias):
-                    print(f"{i + 1}) {cat}")
+                    print(f"{i + 1}) {cat} ({_texto_cantidad(raiz['hijos'][cat]['cantidad'])})")
                 print("-------------------------------------------------")
                 print("0) Cancelar")
                 print("-------------------------------------------------")
@@ -191,13 +181,13 @@ def opcion_2_mostrar_y_filtrar():
 
                     if 0 <= opc_cat < len(categorias):
                         categoria_elegida = categorias[opc_cat]
-                        # 2. Filtrar por esa categoría y mostrar los Tipos disponibles
-                        items_en_categoria = [item for item in lista_completa if item.get('categoria') == categoria_elegida]
-                        tipos = sorted(list(set(item['tipo'] for item in items_en_categoria if 'tipo' in item)))
+                        # 2. Mostrar los Tipos disponibles (hijos del nodo de la categoría)
+                        nodo_categoria = raiz['hijos'][categoria_elegida]
+                        tipos = sorted(nodo_categoria['hijos'])
                         
                         print(f"\n--- Tipos en '{categoria_elegida}': Elija un Tipo ---")
                         for i, tipo in enumerate(tipos):
-                            print(f"{i + 1}) {tipo}")
+                            print(f"{i + 1}) {tipo} ({_texto_cantidad(nodo_categoria['hijos'][tipo]['cantidad'])})")
                         print("-------------------------------------------------")
                         print("0) Ver todos los alimentos de esta categoría")
                         print("-------------------------------------------------")
@@ -206,10 +196,10 @@ def opcion_2_mostrar_y_filtrar():
                         opc_tipo = int(opc_tipo_str) - 1
 
                         if opc_tipo == -1: # Opción 0
-                            mostrar_tabla_alimentos(items_en_categoria)
+                            mostrar_tabla_alimentos(iter_alimentos(categoria_elegida))
                         elif 0 <= opc_tipo < len(tipos):
                             tipo_elegido = tipos[opc_tipo]
-                            items_en_tipo = [item for item in items_en_categoria if item.get('tipo') == tipo_elegido]
+                            items_en_tipo = iter_alimentos(categoria_elegida, tipo_elegido)
                             mostrar_tabla_alimentos(items_en_tipo)
                         else:
                             print("Opción de tipo inválida.")
@@ -230,15 +220,8 @@ def opcion_2_mostrar_y_filtrar():
                         continue
                     
                     # Filtra solo los que tienen calorías y están en el rango
-                    filtrados = []
-                    for item in lista_completa:
-                        try:
-                            calorias = float(item.get('calorias_100g', -1))
-                            if min_cal <= calorias <= max_cal:
-                                filtrados.append(item)
-                        except (ValueError, TypeError):
-                            continue # Ignora items con calorías no numéricas
-                    
+                    # (las calorías no numéricas quedan como NaN y nunca entran).
+                    filtrados = catalogo_completo().filtrar_por_calorias(min_cal, max_cal)
                     mostrar_tabla_alimentos(filtrados)
                 except ValueError:
                     print("Error: Ingrese valores numéricos para las calorías.")
@@ -254,23 +237,9 @@ def opcion_2_mostrar_y_filtrar():
                         print("Debe ingresar un número positivo.")
                         continue
                     
-                    # Aquí está la solución a tu preocupación:
-                    # 1. Creamos una lista solo con items que tienen calorías válidas.
-                    items_con_calorias = []
-                    for item in lista_completa:
-                        try:
-                            # Intentamos convertir la caloría a float y la guardamos
-                            item_copy = item.copy()
-                            item_copy['calorias_100g_float'] = float(item.get('calorias_100g'))
-                            items_con_calorias.append(item_copy)
-                        except (ValueError, TypeError, AttributeError):
-                            continue # Ignoramos los que no tienen calorias o no son números
-
-                    # 2. Ordenamos esa lista limpia de mayor a menor
-                    items_ordenados = sorted(items_con_calorias, key=lambda x: x['calorias_100g_float'], reverse=True)
-
-                    # 3. Mostramos los primeros 'n' resultados
-                    mostrar_tabla_alimentos(items_ordenados[:n])
+                    # El catálogo mantiene un índice ordenado por calorías: el top
+                    # se toma de su final, sin copiar diccionarios ni ordenar todo.
+                    mostrar_tabla_alimentos(catalogo_completo().top_calorias(n))
 
                 except ValueError:
                     print("Error: Ingrese un número entero válido.")
@@ -280,59 +249,74 @@ def opcion_2_mostrar_y_filtrar():
             case _:
                 print("Opción no válida.")
 
+# Largo de la barra más larga del histograma, en caracteres.
+ANCHO_HISTOGRAMA = 40
+
+def _distribucion(nivel: str, categoria: str = None) -> dict:
+    """
+    (Función auxiliar) Estadísticas de distribución (mediana, percentiles,
+    desvío, histograma) sobre el catálogo residente, releyendo antes solo las
+    hojas que cambiaron.
+    """
+    return estadisticas_calorias(obtener_catalogo(RUTA_BASE_DATOS, refrescar=True), nivel, categoria)
+
+def _imprimir_histograma(bordes: list, histograma: list):
+    """(Función auxiliar) Dibuja el histograma con una barra de '#' por cubeta."""
+    mayor = max(histograma)
+    for k, cantidad in enumerate(histograma):
+        barra = "#" * round(cantidad / mayor * ANCHO_HISTOGRAMA) if mayor else ""
+        print(f"  {bordes[k]:>8.1f} - {bordes[k + 1]:>8.1f} | {cantidad:>7} {barra}")
+
+@medido
 def opcion_5_estadisticas():
     """
     Muestra un menú con diferentes estadísticas sobre la base de datos de alimentos.
     """
-    lista_completa = crear_lista_desde_csv(RUTA_BASE_DATOS)
-    if not lista_completa:
+    # --- Preparación de Datos ---
+    # Los totales salen de los resúmenes por hoja del manifiesto (cantidad, suma,
+    # máximo y mínimo), sumados por categoría: no hace falta leer cada alimento.
+    if resumen_calorias(RUTA_BASE_DATOS)['total']['cantidad'] == 0:
         print("La base de datos está vacía. No se pueden calcular estadísticas.")
         return
 
-    # --- Preparación de Datos ---
-    # Crear una lista solo con ítems que tienen calorías válidas para los cálculos.
-    # Esto hace que todas las operaciones sean robustas y seguras.
-    items_con_calorias = []
-    for item in lista_completa:
-        try:
-            item_copy = item.copy()
-            item_copy['calorias_float'] = float(item.get('calorias_100g'))
-            items_con_calorias.append(item_copy)
-        except (ValueError, TypeError, AttributeError):
-            continue # Ignora ítems sin calorías o con valores no numéricos.
-
     while True:
         opciones_menu = [
             "Resumen General de la Base de Datos",
             "Cantidad de Alimentos por Categoría",
             "Análisis Detallado por Categoría",
             "Ranking de Calorías Promedio por Categoría",
-            "Top 3 Más/Menos Calóricos por Categoría"
+            "Top 3 Más/Menos Calóricos por Categoría",
+            "Distribución de Calorías por Nivel de la Jerarquía",
+            "Histograma de Calorías"
         ]
         imprimir_menu("Menú de Estadísticas", opciones_menu, "Volver al menú principal")
         opc = input("Elija una opción: ").strip()
 
+        # Los resúmenes se vuelven a sumar en cada consulta para no mostrar
+        # datos viejos: solo se relee alguna hoja si su firma cambió.
+        resumen = resumen_calorias(RUTA_BASE_DATOS)
+        resumen_general = resumen['total']
+        # Solo cuentan para los cálculos las categorías con calorías válidas.
+        resumenes_categorias = {cat: datos for cat, datos in resumen['categorias'].items() if datos['con_calorias'] > 0}
+
         match opc:
             case "1": # Resumen General
                 print("\n--- Resumen General ---")
-                print(f"- Cantidad total de alimentos: {len(lista_completa)}")
-                if items_con_calorias:
-                    suma_calorias = sum(item['calorias_float'] for item in items_con_calorias)
-                    promedio_global = suma_calorias / len(items_con_calorias)
-                    max_item = max(items_con_calorias, key=lambda x: x['calorias_float'])
-                    min_item = min(items_con_calorias, key=lambda x: x['calorias_float'])
+                print(f"- Cantidad total de alimentos: {resumen_general['cantidad']}")
+                if resumen_general['con_calorias']:
+                    promedio_global = resumen_general['suma'] / resumen_general['con_calorias']
+                    max_nombre, max_cal = resumen_general['max']
+                    min_nombre, min_cal = resumen_general['min']
                     
                     print(f"- Promedio de calorías global: {promedio_global:.2f} cal")
-                    print(f"- Alimento con MÁS calorías: {max_item['nombre']} ({max_item['calorias_float']:.1f} cal)")
-                    print(f"- Alimento con MENOS calorías: {min_item['nombre']} ({min_item['calorias_float']:.1f} cal)")
+                    print(f"- Alimento con MÁS calorías: {max_nombre} ({max_cal:.1f} cal)")
+                    print(f"- Alimento con MENOS calorías: {min_nombre} ({min_cal:.1f} cal)")
                 else:
                     print("- No hay datos de calorías para calcular estadísticas.")
 
             case "2": # Distribución por Categoría
                 print("\n--- Distribución de Alimentos por Categoría ---")
-                from collections import Counter
-                # Counter es una forma muy eficiente de contar elementos
-                conteo_categorias = Counter(item['categoria'] for item in lista_completa if 'categoria' in item)
+                conteo_categorias = {cat: datos['cantidad'] for cat, datos in resumen['categorias'].items() if datos['cantidad']}
                 if conteo_categorias:
                     for categoria, cantidad in conteo_categorias.items():
                         print(f"- {categoria}: {cantidad} ítems")
@@ -341,7 +325,7 @@ def opcion_5_estadisticas():
 
             case "3": # Análisis Detallado por Categoría (Interactivo)
                 print("\n--- Análisis Detallado por Categoría ---")
-                categorias = sorted(list(set(item['categoria'] for item in items_con_calorias if 'categoria' in item)))
+                categorias = sorted(resumenes_categorias)
                 if not categorias:
                     print("No hay categorías con datos de calorías para analizar.")
                     continue
@@ -354,18 +338,20 @@ def opcion_5_estadisticas():
                     id_cat = int(id_cat_str)
                     if 0 <= id_cat < len(categorias):
                         categoria_elegida = categorias[id_cat]
-                        items_categoria = [item for item in items_con_calorias if item.get('categoria') == categoria_elegida]
+                        datos = resumenes_categorias[categoria_elegida]
+                        promedio_cat = datos['suma'] / datos['con_calorias']
+                        max_nombre, max_cal = datos['max']
+                        min_nombre, min_cal = datos['min']
                         
-                        if items_categoria:
-                            suma_cal = sum(item['calorias_float'] for item in items_categoria)
-                            promedio_cat = suma_cal / len(items_categoria)
-                            max_item_cat = max(items_categoria, key=lambda x: x['calorias_float'])
-                            min_item_cat = min(items_categoria, key=lambda x: x['calorias_float'])
-                            
-                            print(f"\nEstadísticas para la categoría '{categoria_elegida}':")
-                            print(f"- Promedio de calorías: {promedio_cat:.2f} cal")
-                            print(f"- Alimento MÁS calórico: {max_item_cat['nombre']} ({max_item_cat['calorias_float']:.1f} cal)")
-                            print(f"- Alimento MENOS calórico: {min_item_cat['nombre']} ({min_item_cat['calorias_float']:.1f} cal)")
+                        print(f"\nEstadísticas para la categoría '{categoria_elegida}':")
+                        print(f"- Promedio de calorías: {promedio_cat:.2f} cal")
+                        print(f"- Alimento MÁS calórico: {max_nombre} ({max_cal:.1f} cal)")
+                        print(f"- Alimento MENOS calórico: {min_nombre} ({min_cal:.1f} cal)")
+                        grupo = _distribucion('categoria', categoria_elegida)['grupos'].get((categoria_elegida,))
+                        if grupo and grupo['con_calorias']:
+                            print(f"- Mediana: {grupo['mediana']:.2f} cal")
+                            print(f"- Desvío estándar: {grupo['desvio']:.2f} cal")
+                            print("- Percentiles: " + ", ".join(f"p{p} {valor:.1f}" for p, valor in grupo['percentiles'].items()))
                     else:
                         print("ID de categoría inválido.")
                 except (ValueError, IndexError):
@@ -373,15 +359,10 @@ def opcion_5_estadisticas():
 
             case "4": # Ranking de Calorías Promedio por Categoría
                 print("\n--- Ranking de Calorías Promedio por Categoría ---")
-                categorias = sorted(list(set(item['categoria'] for item in items_con_calorias if 'categoria' in item)))
-                promedios_por_categoria = []
-
-                for cat in categorias:
-                    items_categoria = [item for item in items_con_calorias if item.get('categoria') == cat]
-                    if items_categoria:
-                        suma_cal = sum(item['calorias_float'] for item in items_categoria)
-                        promedio = suma_cal / len(items_categoria)
-                        promedios_por_categoria.append({'categoria': cat, 'promedio': promedio})
+                promedios_por_categoria = [
+                    {'categoria': cat, 'promedio': datos['suma'] / datos['con_calorias']}
+                    for cat, datos in sorted(resumenes_categorias.items())
+                ]
                 
                 # Ordenar la lista de promedios de mayor a menor
                 ranking = sorted(promedios_por_categoria, key=lambda x: x['promedio'], reverse=True)
@@ -394,7 +375,7 @@ def opcion_5_estadisticas():
 
             case "5": # Top 3 Más/Menos Calóricos por Categoría (Interactivo)
                 print("\n--- Top 3 Más/Menos Calóricos por Categoría ---")
-                categorias = sorted(list(set(item['categoria'] for item in items_con_calorias if 'categoria' in item)))
+                categorias = sorted(resumenes_categorias)
                 if not categorias:
                     print("No hay categorías con datos de calorías para analizar.")
                     continue
@@ -407,38 +388,99 @@ def opcion_5_estadisticas():
                     id_cat = int(id_cat_str)
                     if 0 <= id_cat < len(categorias):
                         categoria_elegida = categorias[id_cat]
-                        items_categoria = [item for item in items_con_calorias if item.get('categoria') == categoria_elegida]
-                        
-                        if len(items_categoria) < 1:
+                        # Los extremos salen del orden por calorías que arma el motor de estadísticas.
+                        catalogo = obtener_catalogo(RUTA_BASE_DATOS, refrescar=True)
+                        grupo = estadisticas_calorias(catalogo, 'categoria', categoria_elegida)['grupos'].get((categoria_elegida,))
+                        if not grupo or not grupo['con_calorias']:
                             print(f"No hay suficientes datos en la categoría '{categoria_elegida}'.")
                             continue
 
-                        # Ordenar la lista de ítems de la categoría por calorías
-                        items_ordenados = sorted(items_categoria, key=lambda x: x['calorias_float'])
-                        
                         print(f"\n--- Categoría: {categoria_elegida} ---")
-                        
-                        # Top 3 Más Calóricos (los últimos 3 de la lista ordenada)
-                        print("  Top 3 Más Calóricos:")
-                        top_mas = items_ordenados[-3:] # Tomamos los últimos 3
-                        top_mas.reverse() # Los invertimos para que el más alto quede primero
-                        if not top_mas: print("    No hay datos.")
-                        for i, item in enumerate(top_mas):
-                            print(f"    {i+1}. {item['nombre']} ({item['calorias_float']:.1f} cal)")
-
-                        # Top 3 Menos Calóricos (los primeros 3 de la lista ordenada)
-                        print("  Top 3 Menos Calóricos:")
-                        top_menos = items_ordenados[:3] # Tomamos los primeros 3
-                        if not top_menos: print("    No hay datos.")
-                        for i, item in enumerate(top_menos):
-                            print(f"    {i+1}. {item['nombre']} ({item['calorias_float']:.1f} cal)")
+                        for titulo, indices in (("Top 3 Más Calóricos", grupo['mayores']), ("Top 3 Menos Calóricos", grupo['menores'])):
+                            print(f"  {titulo}:")
+                            for i, indice in enumerate(indices):
+                                print(f"    {i+1}. {catalogo.nombre(indice)} ({catalogo.calorias[indice]:.1f} cal)")
 
                     else:
                         print("ID de categoría inválido.")
                 except (ValueError, IndexError):
                     print("Entrada no válida. Debe ingresar un número de ID.")
 
+            case "6": # Distribución por Nivel de la Jerarquía (Interactivo)
+                print("\n--- Distribución de Calorías por Nivel de la Jerarquía ---")
+                niveles = NIVELES_ESTADISTICAS[1:]
+                for i, etiqueta in enumerate(("Categoría", "Categoría / Tipo", "Categoría / Tipo / Procesamiento"), start=1):
+                    print(f"  {i}) {etiqueta}")
+                try:
+                    nivel = niveles[int(input(f"Elija el nivel (1-{len(niveles)}): ")) - 1]
+                except (ValueError, IndexError):
+                    print("Entrada no válida. Debe ingresar el número de un nivel.")
+                    continue
+
+                distribucion = _distribucion(nivel)
+                print(f"\n{'Grupo':<40} | {'Cant.':>6} | {'Media':>8} | {'Mediana':>8} | {'Desvío':>8} | {'P10':>8} | {'P90':>8}")
+                print("-" * 104)
+                for nombres, grupo in distribucion['grupos'].items():
+                    grupo_texto = " / ".join(nombres)[:40]
+                    if not grupo['con_calorias']:
+                        print(f"{grupo_texto:<40} | {grupo['cantidad']:>6} | {'sin datos de calorías':>53}")
+                        continue
+                    print(f"{grupo_texto:<40} | {grupo['cantidad']:>6} | {grupo['media']:>8.1f} | {grupo['mediana']:>8.1f} | "
+                          f"{grupo['desvio']:>8.1f} | {grupo['percentiles'][10]:>8.1f} | {grupo['percentiles'][90]:>8.1f}")
+
+            case "7": # Histograma de Calorías (Interactivo)
+                print("\n--- Histograma de Calorías ---")
+                categorias = sorted(resumenes_categorias)
+                if not categorias:
+                    print("No hay categorías con datos de calorías para analizar.")
+                    continue
+
+                for i, cat in enumerate(categorias):
+                    print(f"  ID {i}) {cat}")
+                id_cat_str = input(f"Ingrese el ID de la categoría (0-{len(categorias)-1}, vacío para toda la base): ").strip()
+                categoria_elegida = None
+                if id_cat_str:
+                    try:
+                        categoria_elegida = categorias[int(id_cat_str)]
+                    except (ValueError, IndexError):
+                        print("Entrada no válida. Debe ingresar un número de ID.")
+                        continue
+
+                distribucion = _distribucion('total', categoria_elegida)
+                grupo = distribucion['grupos'].get(())
+                if not grupo or not grupo['con_calorias']:
+                    print("No hay datos de calorías para el histograma.")
+                    continue
+                print(f"\nCalorías de {'la categoría ' + repr(categoria_elegida) if categoria_elegida else 'toda la base'} "
+                      f"({grupo['con_calorias']} alimentos):")
+                _imprimir_histograma(distribucion['bordes'], grupo['histograma'])
+
             case "0": # Volver
                 break
             case _:
                 print("Opción no válida.")
+
+@medido
+def opcion_6_importacion_masiva():
+    """
+    Importa muchos alimentos de una vez desde un archivo CSV o JSONL de proveedor.
+    """
+    print("\n====================================")
+    print("   Importación Masiva de Alimentos   ")
+    print("====================================")
+    print("El archivo debe tener las columnas: categoria, tipo, procesamiento, nombre, calorias_100g.")
+    ruta_origen = input("Ingrese la ruta del archivo (.csv o .jsonl, vacío para cancelar): ").strip()
+    if not ruta_origen:
+        print("Importación cancelada.")
+        return
+    if not os.path.isfile(ruta_origen):
+        print(f"Error: No se encontró el archivo '{ruta_origen}'.")
+        return
+
+    try:
+        # Si hay un catálogo residente, se actualiza con las filas importadas.
+        resumen = importar_masivo(ruta_origen, catalogo=catalogo_cargado(RUTA_BASE_DATOS))
+    except (OSError, UnicodeDecodeError) as e:
+        print(f"ERROR CRÍTICO durante la importación: {e}")
+        return
+    imprimir_resumen_importacion(resumen)
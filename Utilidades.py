@@ -1,24 +1,85 @@
 from Manejo_archivo import *
+from Catalogo import obtener_catalogo, _leer_hoja_cruda
 import csv
 import os
+import sys
+import shutil
+from itertools import chain, islice
 
+def _es_la_misma_fila(fila: dict, item) -> bool:
+    """
+    (Función auxiliar) Compara una fila leída del CSV con un ítem del catálogo
+    por nombre y por calorías (como números, para evitar errores de tipo).
+    """
+    if fila.get('nombre', '').strip().lower() != item['nombre'].strip().lower():
+        return False
+    try:
+        return float(fila.get('calorias_100g', 0)) == float(item.get('calorias_100g', -1))
+    except (ValueError, TypeError):
+        return fila.get('calorias_100g') == item.get('calorias_100g')
+
+def _ubicar_fila_en_hoja(item):
+    """
+    (Función auxiliar) Devuelve la posición de 'item' dentro del CSV base de su
+    hoja. Debe llamarse con el candado de la hoja tomado.
+
+    Si la hoja no cambió desde que el catálogo la conoce (misma firma), la
+    posición del índice de nombres es válida y no se lee nada. Si cambió por
+    fuera, se lee la hoja y se busca la fila por nombre y calorías.
+
+    Returns:
+        tuple: (posición encontrada o None si el ítem ya no está, True si la
+            firma coincidía y por lo tanto las posiciones del catálogo valen)
+    """
+    ruta_archivo = item.ruta_hoja
+    if item.firma is not None and item.firma == firma_hoja(ruta_archivo):
+        return item.posicion, True
+
+    _, posiciones, (nombres, calorias), _ = leer_columnas_hoja(ruta_archivo, ['nombre', 'calorias_100g'])
+    filas = [(posicion, {'nombre': nombre, 'calorias_100g': valor})
+             for posicion, nombre, valor in zip(posiciones, nombres, calorias)]
+    for posicion, fila in filas:
+        if posicion == item.posicion and _es_la_misma_fila(fila, item):
+            return posicion, False
+    for posicion, fila in filas:
+        if _es_la_misma_fila(fila, item):
+            return posicion, False
+    return None, False
+
+def _anotar_cambio_en_catalogo(catalogo, ruta_archivo, firma_vigente: bool):
+    """
+    (Función auxiliar) Pone al día el catálogo con la hoja después de escribir
+    una baja o modificación (con el candado de la hoja tomado). Si la firma
+    coincidía antes de escribir, las posiciones del catálogo siguen valiendo y
+    alcanza con anotar la firma nueva. Si no, la hoja cambió por fuera y las
+    demás filas también pueden haberse corrido: se vuelve a leer la hoja.
+    """
+    if firma_vigente:
+        catalogo.registrar_firma(ruta_archivo, firma_hoja(ruta_archivo))
+    else:
+        catalogo.actualizar_hoja(ruta_archivo, _leer_hoja_cruda(ruta_archivo))
+
+@medido
 def eliminar_item_por_nombre(nombre_item_a_eliminar: str) -> bool:
     """
     Busca ítems por su nombre. Si hay múltiples coincidencias, muestra un menú
-    interactivo para que el usuario elija cuál eliminar.
+    interactivo para que el usuario elija cuál eliminar. Si ningún nombre
+    coincide exactamente, el menú ofrece los que empiezan igual o se parecen.
     """
     print(f"Iniciando búsqueda para eliminar '{nombre_item_a_eliminar}'...")
     
-    lista_completa = crear_lista_desde_csv(RUTA_BASE_DATOS)
-    if not lista_completa:
+    catalogo = obtener_catalogo(RUTA_BASE_DATOS)
+    if not catalogo:
         print("La base de datos está vacía. No hay nada que eliminar.")
         return False
     
     # 1. Encontrar TODAS las coincidencias, no solo la primera.
-    items_encontrados = [
-        item for item in lista_completa 
-        if item.get('nombre', '').strip().lower() == nombre_item_a_eliminar.strip().lower()
-    ]
+    # El índice de nombres del catálogo resuelve la búsqueda sin recorrer la base.
+    items_encontrados = catalogo.buscar_por_nombre(nombre_item_a_eliminar)
+    aproximados = not items_encontrados
+    if aproximados:
+        # Sin coincidencia exacta se ofrecen los nombres que empiezan igual o se parecen.
+        items_encontrados = catalogo.buscar_aproximado(nombre_item_a_eliminar)
     
     if not items_encontrados:
         print(f"No se encontró ningún ítem con el nombre '{nombre_item_a_eliminar}'.")
@@ -27,9 +88,13 @@ def eliminar_item_por_nombre(nombre_item_a_eliminar: str) -> bool:
     item_a_eliminar = None
 
     # 2. Lógica del menú interactivo si hay más de una coincidencia.
-    if len(items_encontrados) > 1:
-        print("\n--- Múltiples Coincidencias Encontradas ---")
-        print(f"Se encontraron varios ítems con el nombre '{nombre_item_a_eliminar}'.")
+    if len(items_encontrados) > 1 or aproximados:
+        if aproximados:
+            print("\n--- Nombres Parecidos ---")
+            print(f"No hay ningún ítem llamado exactamente '{nombre_item_a_eliminar}'.")
+        else:
+            print("\n--- Múltiples Coincidencias Encontradas ---")
+            print(f"Se encontraron varios ítems con el nombre '{nombre_item_a_eliminar}'.")
         print("Por favor, elija cuál desea eliminar:")
         for i, item in enumerate(items_encontrados):
             # Mostramos la "ruta" completa para que el usuario pueda diferenciarlos.
@@ -65,61 +130,50 @@ def eliminar_item_por_nombre(nombre_item_a_eliminar: str) -> bool:
             return False
 
     # 3. Proceder con la eliminación del ítem seleccionado.
-    try:
-        ruta_archivo_especifico = os.path.join(
-            RUTA_BASE_DATOS,
-            item_a_eliminar['categoria'],
-            item_a_eliminar['tipo'],
-            item_a_eliminar['procesamiento'],
-            "items.csv"
-        )
-        print(f"Procediendo a eliminar de: {ruta_archivo_especifico}")
-    except KeyError:
-        print("ERROR: El ítem encontrado no tiene la información de ruta completa (categoría/tipo/procesamiento).")
-        return False
+    # El catálogo sabe de qué 'items.csv' viene el ítem y en qué posición está.
+    ruta_archivo_especifico = item_a_eliminar.ruta_hoja
+    print(f"Procediendo a eliminar de: {ruta_archivo_especifico}")
 
-    filas_a_mantener = []
-    encabezados = []
     try:
-        with open(ruta_archivo_especifico, 'r', encoding='utf-8', newline='') as f: # Leemos el CSV específico
-            lector = csv.DictReader(f)
-            encabezados = lector.fieldnames
-            for fila in lector:
-                # Comparamos no solo el nombre, sino también las calorías para ser más precisos
-                # en caso de que haya ítems con el mismo nombre en el MISMO archivo.
-                if not (fila.get('nombre', '').strip().lower() == item_a_eliminar['nombre'].strip().lower() and 
-                        fila.get('calorias_100g') == item_a_eliminar['calorias_100g']):
-                    filas_a_mantener.append(fila)
-        
-        # Llamamos a la función de sobrescritura que está en Manejo_archivo.py
-        if sobrescribir_csv(ruta_archivo_especifico, encabezados, filas_a_mantener):
-            print(f"¡Éxito! Ítem '{nombre_item_a_eliminar}' eliminado.")
-            return True
-        else:
-            print(f"Fallo al sobrescribir el archivo para eliminar el ítem.")
-            return False
+        # La baja se agrega al registro de cambios de la hoja: no se reescribe el CSV.
+        with candado_hoja(ruta_archivo_especifico):
+            posicion, firma_vigente = _ubicar_fila_en_hoja(item_a_eliminar)
+            if posicion is None:
+                print("ERROR: El ítem ya no se encuentra en el archivo. Puede haber sido modificado por otro proceso.")
+                return False
+
+            if registrar_baja(ruta_archivo_especifico, posicion, fila=item_a_eliminar):
+                catalogo.eliminar(item_a_eliminar.indice)
+                _anotar_cambio_en_catalogo(catalogo, ruta_archivo_especifico, firma_vigente)
+                print(f"¡Éxito! Ítem '{item_a_eliminar['nombre']}' eliminado.")
+                return True
+            else:
+                print(f"Fallo al registrar la baja del ítem.")
+                return False
     
     except (IOError, FileNotFoundError) as e:
         print(f"ERROR CRÍTICO al intentar leer el archivo para eliminar: {e}")
         return False
 
+@medido
 def modificar_item_por_nombre(nombre_item_a_modificar: str) -> bool:
     """
     Busca ítems por su nombre. Si hay múltiples coincidencias, muestra un menú
-    interactivo para que el usuario elija cuál modificar. Luego, pide los nuevos
-    valores y actualiza el archivo CSV correspondiente.
+    interactivo para que el usuario elija cuál modificar (o, si ningún nombre
+    coincide exactamente, los que empiezan igual o se parecen). Luego, pide los
+    nuevos valores y actualiza el archivo CSV correspondiente.
     """
     print(f"Iniciando búsqueda para modificar '{nombre_item_a_modificar}'...")
     
-    lista_completa = crear_lista_desde_csv(RUTA_BASE_DATOS)
-    if not lista_completa:
+    catalogo = obtener_catalogo(RUTA_BASE_DATOS)
+    if not catalogo:
         print("La base de datos está vacía. No hay nada que modificar.")
         return False
     
-    items_encontrados = [
-        item for item in lista_completa 
-        if item.get('nombre', '').strip().lower() == nombre_item_a_modificar.strip().lower()
-    ]
+    items_encontrados = catalogo.buscar_por_nombre(nombre_item_a_modificar)
+    aproximados = not items_encontrados
+    if aproximados:
+        items_encontrados = catalogo.buscar_aproximado(nombre_item_a_modificar)
     
     if not items_encontrados:
         print(f"No se encontró ningún ítem con el nombre '{nombre_item_a_modificar}'.")
@@ -127,9 +181,13 @@ def modificar_item_por_nombre(nombre_item_a_modificar: str) -> bool:
 
     item_a_modificar = None
 
-    if len(items_encontrados) > 1:
-        print("\n--- Múltiples Coincidencias Encontradas ---")
-        print(f"Se encontraron varios ítems con el nombre '{nombre_item_a_modificar}'.")
+    if len(items_encontrados) > 1 or aproximados:
+        if aproximados:
+            print("\n--- Nombres Parecidos ---")
+            print(f"No hay ningún ítem llamado exactamente '{nombre_item_a_modificar}'.")
+        else:
+            print("\n--- Múltiples Coincidencias Encontradas ---")
+            print(f"Se encontraron varios ítems con el nombre '{nombre_item_a_modificar}'.")
         print("Por favor, elija cuál desea modificar:")
         for i, item in enumerate(items_encontrados):
             ruta_display = f"{item.get('categoria', '?')} > {item.get('tipo', '?')} > {item.get('procesamiento', '?')}"
@@ -178,7 +236,8 @@ def modificar_item_por_nombre(nombre_item_a_modificar: str) -> bool:
             try:
                 nuevas_calorias = float(item_a_modificar['calorias_100g'])
             except (ValueError, TypeError):
-                print(f"ADVERTENCIA: No se pudo convertir el valor de calorías original '{item_a_modificar['calorias_100g']}' a número. Se mantendrá como está.")
+                print(f"ADVERTENCIA: No se pudo convertir el valor de calorías original "
+                      f"'{item_a_modificar['calorias_100g']}' a número. Se mantendrá como está.")
                 nuevas_calorias = item_a_modificar['calorias_100g']
             break
         try:
@@ -191,79 +250,163 @@ def modificar_item_por_nombre(nombre_item_a_modificar: str) -> bool:
         except ValueError:
             print("Error: Debe ingresar un valor numérico válido.")
 
-    item_modificado = item_a_modificar.copy()
-    item_modificado['nombre'] = nuevo_nombre
-    item_modificado['calorias_100g'] = nuevas_calorias
+    ruta_archivo_especifico = item_a_modificar.ruta_hoja
 
     try:
-        ruta_archivo_especifico = os.path.join(
-            RUTA_BASE_DATOS,
-            item_a_modificar['categoria'],
-            item_a_modificar['tipo'],
-            item_a_modificar['procesamiento'],
-            "items.csv"
-        )
-    except KeyError:
-        print("ERROR: El ítem encontrado no tiene la información de ruta completa (categoría/tipo/procesamiento).")
-        return False
+        # La modificación se agrega al registro de cambios de la hoja. Solo se
+        # guardan nombre y calorías; el resto de las columnas de la fila se conserva.
+        with candado_hoja(ruta_archivo_especifico):
+            posicion, firma_vigente = _ubicar_fila_en_hoja(item_a_modificar)
+            if posicion is None:
+                print("ERROR: El ítem ya no se encuentra en el archivo. Puede haber sido modificado por otro proceso.")
+                return False
 
-    filas_actualizadas = []
-    encabezados = []
-    try:
-        with open(ruta_archivo_especifico, 'r', encoding='utf-8', newline='') as f:
-            lector = csv.DictReader(f)
-            encabezados = lector.fieldnames
-            for fila in lector:
-                # CORRECCIÓN: Comparamos los valores de calorías como números (float) para evitar errores de tipo.
-                # El valor de 'calorias_100g' en 'fila' viene como string del CSV, y en 'item_a_modificar' también.
-                try:
-                    calorias_fila_float = float(fila.get('calorias_100g', 0))
-                    calorias_original_float = float(item_a_modificar.get('calorias_100g', -1))
-                except (ValueError, TypeError):
-                    calorias_fila_float, calorias_original_float = -2, -3 # Valores que no coincidirán
-
-                if (fila.get('nombre', '').strip().lower() == item_a_modificar['nombre'].strip().lower() and calorias_fila_float == calorias_original_float):
-                    # CORRECCIÓN: Se reemplaza la fila vieja por la nueva, pero antes se eliminan los campos extra
-                    # que no existen en el archivo CSV de destino ('categoria', 'tipo', 'procesamiento').
-                    item_limpio = item_modificado.copy()
-                    del item_limpio['categoria']
-                    del item_limpio['tipo']
-                    del item_limpio['procesamiento']
-                    filas_actualizadas.append(item_limpio) # Se añade la versión "limpia" en lugar de la original.
-                else:
-                    filas_actualizadas.append(fila) # Mantenemos la fila como estaba
-        
-        if sobrescribir_csv(ruta_archivo_especifico, encabezados, filas_actualizadas):
-            print(f"¡Éxito! Ítem modificado.")
-            return True
-        else:
-            print(f"Fallo al sobrescribir el archivo para modificar el ítem.")
-            return False
+            campos = {'nombre': nuevo_nombre, 'calorias_100g': nuevas_calorias}
+            if registrar_modificacion(ruta_archivo_especifico, posicion, campos, fila_anterior=item_a_modificar):
+                catalogo.modificar(item_a_modificar.indice, nuevo_nombre, nuevas_calorias)
+                _anotar_cambio_en_catalogo(catalogo, ruta_archivo_especifico, firma_vigente)
+                print(f"¡Éxito! Ítem modificado.")
+                return True
+            else:
+                print(f"Fallo al registrar la modificación del ítem.")
+                return False
     except (IOError, FileNotFoundError) as e:
         print(f"ERROR CRÍTICO al intentar leer/escribir el archivo para modificar: {e}")
         return False
 
-def mostrar_tabla_alimentos(lista_alimentos: list):
+# --- Tabla de alimentos --- #
+# Columnas de la tabla: (encabezado, clave del ítem, valor por defecto, ancho mínimo).
+COLUMNAS_TABLA = (
+    ('Nombre', 'nombre', 'N/A', 30),
+    ('Calorías (100g)', 'calorias_100g', 'N/A', 20),
+    ('Categoría', 'categoria', '?', 15),
+    ('Tipo', 'tipo', '?', 15),
+)
+# Filas que se formatean juntas en un único write cuando no se pagina.
+FILAS_POR_BLOQUE = 1000
+
+def _anchos_columnas(items) -> list:
+    """
+    (Función auxiliar) Ancho de cada columna para mostrar 'items': el del valor
+    más largo de la columna, nunca menor al mínimo.
+    """
+    anchos = [minimo for _, _, _, minimo in COLUMNAS_TABLA]
+    for item in items:
+        for c, (_, clave, defecto, _) in enumerate(COLUMNAS_TABLA):
+            largo = len(str(item.get(clave, defecto)))
+            if largo > anchos[c]:
+                anchos[c] = largo
+    return anchos
+
+def _formatear_bloque(items: list, anchos: list, con_encabezado: bool) -> str:
+    """(Función auxiliar) Arma el texto de un bloque de filas con los anchos de columna dados."""
+    lineas = []
+    if con_encabezado:
+        lineas.append(" | ".join(f"{encabezado:<{ancho}}" for (encabezado, _, _, _), ancho in zip(COLUMNAS_TABLA, anchos)))
+    for item in items:
+        lineas.append(" | ".join(f"{str(item.get(clave, defecto)):<{ancho}}"
+                                 for (_, clave, defecto, _), ancho in zip(COLUMNAS_TABLA, anchos)))
+    return "\n".join(lineas) + "\n"
+
+def _paginar_tabla(filas, total, filas_por_pagina: int):
+    """
+    (Función auxiliar) Muestra la tabla de a una página por vez. Las filas ya
+    vistas se guardan, así que volver atrás o saltar no repite la consulta.
+    """
+    vistas = []
+    agotado = False
+    pagina = 0
+    while True:
+        necesarias = (pagina + 1) * filas_por_pagina
+        if not agotado and len(vistas) < necesarias:
+            vistas.extend(islice(filas, necesarias - len(vistas)))
+            agotado = len(vistas) < necesarias
+        if agotado:
+            total = len(vistas)
+        paginas = -(-total // filas_por_pagina) if total is not None else None
+        if paginas is not None and pagina >= paginas:
+            pagina = max(0, paginas - 1)
+            continue
+
+        en_pagina = vistas[pagina * filas_por_pagina:necesarias]
+        texto_paginas = f"{pagina + 1}/{paginas}" if paginas is not None else f"{pagina + 1}"
+        desde = pagina * filas_por_pagina + 1
+        texto = _formatear_bloque(en_pagina, _anchos_columnas(en_pagina), True)
+        sys.stdout.write(
+            "\n" + texto
+            + f"--- Página {texto_paginas} (ítems {desde}-{desde + len(en_pagina) - 1}"
+            + (f" de {total}" if total is not None else "") + ") ---\n"
+        )
+        sys.stdout.flush()
+
+        opc = input("[Enter] siguiente | a) anterior | N° de página | q) salir: ").strip().lower()
+        if opc == 'q':
+            break
+        elif opc == 'a':
+            pagina = max(0, pagina - 1)
+        elif opc.isdigit() and int(opc) > 0:
+            pagina = int(opc) - 1
+        elif opc == '':
+            if paginas is not None and pagina + 1 >= paginas:
+                break
+            pagina += 1
+        else:
+            print("Opción no válida.")
+
+    print(f"Total de ítems mostrados: {total if total is not None else len(vistas)}\n")
+
+@medido
+def mostrar_tabla_alimentos(lista_alimentos, filas_por_pagina: int = None, salida=None):
     """
     Muestra una lista de alimentos en un formato de tabla bien alineado.
+
+    Las filas se formatean por bloques y cada bloque se escribe de una sola
+    vez. Si la salida es una terminal y el resultado no entra en una pantalla,
+    se pagina (siguiente, anterior o saltar a una página). Si la salida es un
+    archivo o una tubería, o se indica 'salida', se escribe todo de corrido.
+    Los anchos de las columnas salen de cada página o bloque, así que las filas
+    se consumen a medida que se escriben y nunca hace falta tener todo el
+    resultado en memoria.
+
+    Args:
+        lista_alimentos: Lista, catálogo o cualquier iterable de ítems.
+        filas_por_pagina (int, optional): Filas por página. Por defecto, el alto de la terminal.
+        salida (file, optional): Archivo abierto donde volcar la tabla sin paginar.
     """
-    if not lista_alimentos:
+    total = len(lista_alimentos) if hasattr(lista_alimentos, '__len__') else None
+    filas = iter(lista_alimentos)
+    primera = next(filas, None)
+    if primera is None:
         print("\nNo se encontraron alimentos que coincidan con los criterios.")
         return
+    filas = chain([primera], filas)
 
-    # Imprimir encabezados
-    print(f"{'Nombre':<30} | {'Calorías (100g)':<20} | {'Categoría':<15} | {'Tipo':<15}")
+    paginar = salida is None and sys.stdout.isatty() and sys.stdin.isatty()
+    if filas_por_pagina is None:
+        filas_por_pagina = max(10, shutil.get_terminal_size().lines - 4)
+    if paginar and total is None:
+        # Con un iterable sin len() se mira una página de más para saber si hace falta paginar.
+        primeras = list(islice(filas, filas_por_pagina + 1))
+        if len(primeras) <= filas_por_pagina:
+            total = len(primeras)
+        filas = chain(primeras, filas)
+    if paginar and (total is None or total > filas_por_pagina):
+        _paginar_tabla(filas, total, filas_por_pagina)
+        return
 
-    # Imprimir filas
-    for item in lista_alimentos:
-        nombre = item.get('nombre', 'N/A')
-        calorias = item.get('calorias_100g', 'N/A')
-        categoria = item.get('categoria', '?')
-        tipo = item.get('tipo', '?')
-        print(f"{nombre:<30} | {calorias:<20} | {categoria:<15} | {tipo:<15}")
-    
-    print("-" * 85)
-    print(f"Total de ítems mostrados: {len(lista_alimentos)}\n")
+    salida = salida if salida is not None else sys.stdout
+    escritas = 0
+    anchos = [minimo for _, _, _, minimo in COLUMNAS_TABLA]
+    while True:
+        bloque = list(islice(filas, FILAS_POR_BLOQUE))
+        if not bloque:
+            break
+        anchos = _anchos_columnas(bloque)
+        salida.write(_formatear_bloque(bloque, anchos, con_encabezado=escritas == 0))
+        escritas += len(bloque)
+    extra = sum(anchos) - sum(minimo for _, _, _, minimo in COLUMNAS_TABLA)
+    salida.write("-" * (85 + extra) + f"\nTotal de ítems mostrados: {escritas}\n\n")
+    salida.flush()
 
 def imprimir_menu(titulo: str, opciones: list, opcion_salida: str = None):
     """
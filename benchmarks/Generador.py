@@ -0,0 +1,95 @@
+from Manejo_archivo import normalizar_texto_para_ruta
+import csv
+import os
+import random
+
+# Nombres "de pantalla" de cada nivel, con acentos, eñes y mayúsculas: las
+# carpetas se crean con normalizar_texto_para_ruta, igual que en el alta.
+CATEGORIAS_BASE = [
+    "Frutas", "Verduras", "Carnes", "Lácteos", "Panificados", "Bebidas", "Cereales",
+    "Legumbres", "Pescados", "Dulces", "Condimentos", "Frutos Secos",
+]
+TIPOS_BASE = [
+    "Cítricos", "Tropicales", "De Hoja", "Raíces", "Rojas", "Blancas", "Quesos",
+    "Yogures", "Integrales", "Azúcares", "Infusiones", "Salsas", "Semillas", "Mariscos",
+]
+PROCESAMIENTOS_BASE = [
+    "Fresco", "Congelado", "Enlatado", "Deshidratado", "Cocido", "Ahumado",
+    "Fermentado", "En Conserva", "Pasteurizado", "Tostado",
+]
+NOMBRES_BASE = [
+    "Limón", "Ñame", "Jalapeño", "Açaí", "Café", "Piña", "Plátano", "Maní", "Crème Fraîche",
+    "Müsli", "Brócoli", "Jamón", "Azafrán", "Algarrobo", "Alcaparra", "Camarón", "Salmón",
+    "Espárrago", "Pimentón", "Té Verde", "Yogur Griego", "Pan de Maíz", "Dulce de Leche",
+    "Ajonjolí", "Guaraná", "Mandioca", "Berenjena", "Calabacín", "Durazno", "Frambuesa",
+]
+
+
+def _nombres_nivel(base: list, cantidad: int) -> list:
+    """
+    (Función auxiliar) Devuelve 'cantidad' nombres distintos (una vez
+    normalizados) para un nivel, repitiendo la lista base con un número.
+    """
+    nombres = []
+    vuelta = 0
+    while len(nombres) < cantidad:
+        for nombre in base:
+            nombres.append(nombre if vuelta == 0 else f"{nombre} {vuelta + 1}")
+            if len(nombres) == cantidad:
+                break
+        vuelta += 1
+    return nombres
+
+def generar_arbol(ruta_base: str, categorias: int = 5, tipos: int = 4, procesamientos: int = 3,
+                  filas_por_hoja: int = 100, semilla: int = 0) -> dict:
+    """
+    Genera un árbol sintético categoria/tipo/procesamiento/items.csv.
+
+    El resultado depende solo de los parámetros y de la semilla. Los nombres de
+    los alimentos llevan acentos y mayúsculas variadas, y son únicos en todo el
+    árbol (una vez normalizados), así que cada búsqueda por nombre encuentra un
+    solo ítem.
+
+    Args:
+        ruta_base (str): Directorio donde crear el árbol (no debe tener ya un árbol).
+        categorias, tipos, procesamientos (int): Cantidad de carpetas por nivel.
+        filas_por_hoja (int): Alimentos en cada items.csv.
+        semilla (int): Semilla del generador de números aleatorios.
+
+    Returns:
+        dict: Parámetros usados más la cantidad de hojas y de filas escritas.
+    """
+    azar = random.Random(semilla)
+    os.makedirs(ruta_base, exist_ok=True)
+    if any(not entrada.startswith('.') for entrada in os.listdir(ruta_base)):
+        raise FileExistsError(f"'{ruta_base}' no está vacío")
+
+    contador = 0
+    hojas = 0
+    for categoria in _nombres_nivel(CATEGORIAS_BASE, categorias):
+        for tipo in _nombres_nivel(TIPOS_BASE, tipos):
+            for procesamiento in _nombres_nivel(PROCESAMIENTOS_BASE, procesamientos):
+                ruta_directorio = os.path.join(
+                    ruta_base, *(normalizar_texto_para_ruta(nivel) for nivel in (categoria, tipo, procesamiento))
+                )
+                os.makedirs(ruta_directorio, exist_ok=True)
+                with open(os.path.join(ruta_directorio, "items.csv"), 'w', encoding='utf-8', newline='') as f:
+                    escritor = csv.writer(f)
+                    escritor.writerow(['nombre', 'calorias_100g'])
+                    for _ in range(filas_por_hoja):
+                        contador += 1
+                        nombre = f"{azar.choice(NOMBRES_BASE)} {contador}"
+                        if azar.random() < 0.2:
+                            nombre = nombre.upper()
+                        escritor.writerow([nombre, round(azar.uniform(1, 900), 1)])
+                hojas += 1
+
+    return {
+        'categorias': categorias,
+        'tipos': tipos,
+        'procesamientos': procesamientos,
+        'filas_por_hoja': filas_por_hoja,
+        'semilla': semilla,
+        'hojas': hojas,
+        'filas': contador,
+    }
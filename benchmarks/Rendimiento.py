@@ -0,0 +1,172 @@
+from Manejo_archivo import *
+from Catalogo import crear_catalogo_desde_csv, guardar_instantanea, cargar_instantanea, obtener_catalogo
+from Sub_Menus import opcion_5_estadisticas
+from Estadisticas import estadisticas_calorias
+import Estadisticas
+from Utilidades import modificar_item_por_nombre, eliminar_item_por_nombre
+import builtins
+import contextlib
+import os
+import random
+import statistics
+import threading
+import time
+
+# Respuestas para recorrer cada opción del menú de estadísticas (opcion_5).
+# Las opciones 3 y 5 piden además el ID de una categoría, la 6 el nivel de la
+# jerarquía y la 7 una categoría (vacío: toda la base).
+RESPUESTAS_ESTADISTICAS = {
+    'estadisticas_1_resumen_general': ["1", "0"],
+    'estadisticas_2_por_categoria': ["2", "0"],
+    'estadisticas_3_detalle_categoria': ["3", "0", "0"],
+    'estadisticas_4_ranking_promedios': ["4", "0"],
+    'estadisticas_5_top3_categoria': ["5", "0", "0"],
+    'estadisticas_6_distribucion_procesamiento': ["6", "3", "0"],
+    'estadisticas_7_histograma': ["7", "", "0"],
+}
+
+
+@contextlib.contextmanager
+def _respuestas(respuestas: list):
+    """(Función auxiliar) Reemplaza input() para contestar los menús con 'respuestas'."""
+    pendientes = iter(respuestas)
+    original = builtins.input
+    builtins.input = lambda *_: next(pendientes)
+    try:
+        yield
+    finally:
+        builtins.input = original
+
+def _tiempos(tiempos: list) -> dict:
+    """(Función auxiliar) Resume una lista de duraciones en segundos."""
+    return {
+        'repeticiones': len(tiempos),
+        'min_s': min(tiempos),
+        'mediana_s': statistics.median(tiempos),
+        'max_s': max(tiempos),
+        'total_s': sum(tiempos),
+    }
+
+def medir(funcion, repeticiones: int = 3, preparar=None) -> dict:
+    """
+    Ejecuta 'funcion' varias veces y devuelve el mínimo, la mediana y el
+    máximo. Si se indica 'preparar', se llama antes de cada repetición, fuera
+    del tiempo medido.
+    """
+    tiempos = []
+    for _ in range(repeticiones):
+        if preparar is not None:
+            preparar()
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return _tiempos(tiempos)
+
+def _esperar_compactaciones():
+    """(Función auxiliar) Espera a las compactaciones en segundo plano que estén en curso."""
+    for hilo in threading.enumerate():
+        if hilo.name.startswith("compactar:"):
+            hilo.join()
+
+def ejecutar_mediciones(repeticiones: int = 3, operaciones: int = 20, semilla: int = 0) -> dict:
+    """
+    Mide las operaciones principales sobre la base de RUTA_BASE_DATOS (que
+    debería ser un árbol sintético: las altas, modificaciones y bajas la cambian).
+
+    Args:
+        repeticiones (int): Veces que se repite cada medición de lectura.
+        operaciones (int): Cantidad de altas, modificaciones y bajas a medir (cada una).
+        semilla (int): Semilla para elegir qué ítems se modifican y eliminan.
+
+    Returns:
+        dict: nombre de la medición -> {'repeticiones', 'min_s', 'mediana_s', 'max_s', 'total_s'}.
+    """
+    ruta_base = RUTA_BASE_DATOS
+    azar = random.Random(semilla)
+    resultados = {}
+
+    # Todo lo que las funciones imprimen (tablas, mensajes) se descarta.
+    with open(os.devnull, 'w', encoding='utf-8') as nulo, contextlib.redirect_stdout(nulo):
+        # --- Carga --- #
+        resultados['carga_lista_diccionarios'] = medir(lambda: crear_lista_desde_csv(ruta_base), repeticiones)
+        resultados['carga_catalogo_csv'] = medir(lambda: crear_catalogo_desde_csv(ruta_base), repeticiones)
+        guardar_instantanea(crear_catalogo_desde_csv(ruta_base), ruta_base)
+        resultados['carga_instantanea'] = medir(lambda: cargar_instantanea(ruta_base), repeticiones)
+        catalogo = obtener_catalogo(ruta_base, recargar=True)
+
+        # --- Filtro jerárquico --- #
+        categoria = listar_jerarquia(ruta_base)[0]
+        tipo = listar_jerarquia(ruta_base, categoria)[0]
+        resultados['filtro_categoria_disco'] = medir(lambda: sum(1 for _ in iter_alimentos(categoria)), repeticiones)
+        resultados['filtro_categoria_tipo_disco'] = medir(
+            lambda: sum(1 for _ in iter_alimentos(categoria, tipo)), repeticiones)
+        resultados['filtro_categoria_catalogo'] = medir(lambda: catalogo.filtrar(categoria), repeticiones)
+
+        # --- Rango de calorías y top --- #
+        def sin_indice():
+            catalogo._orden_valores = catalogo._orden_indices = None
+        resultados['filtro_rango_con_indice_nuevo'] = medir(
+            lambda: catalogo.filtrar_por_calorias(100, 200), repeticiones, preparar=sin_indice)
+        resultados['filtro_rango'] = medir(lambda: catalogo.filtrar_por_calorias(100, 200), repeticiones)
+        resultados['top_10'] = medir(lambda: catalogo.top_calorias(10), repeticiones)
+        resultados['top_1000'] = medir(lambda: catalogo.top_calorias(1000), repeticiones)
+
+        # --- Estadísticas: cada opción del menú --- #
+        resultados['estadisticas_resumen_calorias'] = medir(lambda: resumen_calorias(ruta_base), repeticiones)
+        # El motor de distribución por sí solo, con y sin NumPy (si está instalado).
+        resultados['estadisticas_distribucion_array'] = medir(
+            lambda: estadisticas_calorias(catalogo, 'procesamiento', usar_numpy=False), repeticiones)
+        if Estadisticas.numpy is not None:
+            resultados['estadisticas_distribucion_numpy'] = medir(
+                lambda: estadisticas_calorias(catalogo, 'procesamiento', usar_numpy=True), repeticiones)
+        for nombre, respuestas in RESPUESTAS_ESTADISTICAS.items():
+            def opcion(respuestas=respuestas):
+                with _respuestas(respuestas):
+                    opcion_5_estadisticas()
+            resultados[nombre] = medir(opcion, repeticiones)
+
+        # --- Alta, modificación y baja (una medición por operación) --- #
+        hojas = [os.path.relpath(os.path.dirname(ruta), ruta_base).split(os.sep)
+                 for ruta in obtener_rutas_csv(ruta_base)]
+        tiempos = []
+        for numero in range(operaciones):
+            categoria_alta, tipo_alta, procesamiento_alta = azar.choice(hojas)
+            nombre = f"Medición Ñandú {numero}"
+            calorias = round(azar.uniform(1, 900), 1)
+            inicio = time.perf_counter()
+            # Igual que opcion_1_alta: se escribe la hoja y se actualiza el catálogo.
+            ruta_hoja = os.path.join(ruta_base, categoria_alta, tipo_alta, procesamiento_alta, "items.csv")
+            with candado_hoja(ruta_hoja):
+                firma_anterior = firma_hoja_si_existe(ruta_hoja)
+                if alta_nuevo_item(categoria_alta, tipo_alta, procesamiento_alta, {'nombre': nombre, 'calorias_100g': calorias}):
+                    catalogo.agregar(nombre, calorias, categoria_alta, tipo_alta, procesamiento_alta,
+                                     ruta_hoja=ruta_hoja, firma_anterior=firma_anterior)
+            tiempos.append(time.perf_counter() - inicio)
+        resultados['alta'] = _tiempos(tiempos)
+
+        # Se eligen nombres distintos para modificar y para eliminar.
+        elegidos = azar.sample(range(len(catalogo.vivo)), min(2 * operaciones, len(catalogo)))
+        nombres = [catalogo.nombre(i) for i in elegidos if catalogo.vivo[i]]
+        a_modificar, a_eliminar = nombres[:operaciones], nombres[operaciones:]
+
+        tiempos = []
+        for numero, nombre in enumerate(a_modificar):
+            with _respuestas(["s", f"{nombre} modificado", str(round(azar.uniform(1, 900), 1))]):
+                inicio = time.perf_counter()
+                modificar_item_por_nombre(nombre)
+                tiempos.append(time.perf_counter() - inicio)
+        if tiempos:
+            resultados['modificacion'] = _tiempos(tiempos)
+
+        tiempos = []
+        for nombre in a_eliminar:
+            with _respuestas(["s"]):
+                inicio = time.perf_counter()
+                eliminar_item_por_nombre(nombre)
+                tiempos.append(time.perf_counter() - inicio)
+        if tiempos:
+            resultados['baja'] = _tiempos(tiempos)
+
+        _esperar_compactaciones()
+        guardar_manifiesto(ruta_base)
+    return resultados
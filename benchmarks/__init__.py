@@ -0,0 +1,9 @@
+# Mediciones de rendimiento sobre árboles de alimentos sintéticos.
+#
+#   python -m benchmarks medir --categorias 8 --tipos 6 --procesamientos 4 --filas 500 --salida resultado.json
+#   python -m benchmarks comparar antes.json despues.json
+#
+# Generador.py arma el árbol (determinístico a partir de una semilla) y
+# Rendimiento.py mide las operaciones. Como los módulos de la aplicación leen
+# RUTA_BASE_DATOS al importarse, Rendimiento se importa recién después de fijar
+# ALIMENTOS_RUTA_BASE con la ruta del árbol generado.
@@ -0,0 +1,103 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+# Los módulos de la aplicación están en la carpeta de arriba.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _medir(args) -> int:
+    """Genera el árbol sintético, mide las operaciones y guarda el resultado en JSON."""
+    temporal = args.base is None
+    ruta_base = os.path.abspath(args.base) if args.base else tempfile.mkdtemp(prefix="alimentos_bench_")
+    # Antes de importar la aplicación: RUTA_BASE_DATOS se lee al importar Manejo_archivo.
+    os.environ["ALIMENTOS_RUTA_BASE"] = ruta_base
+    from benchmarks.Generador import generar_arbol
+    from benchmarks.Rendimiento import ejecutar_mediciones
+
+    try:
+        inicio = time.perf_counter()
+        arbol = generar_arbol(ruta_base, args.categorias, args.tipos, args.procesamientos, args.filas, args.semilla)
+        print(f"Árbol generado en {ruta_base}: {arbol['hojas']} hojas, {arbol['filas']} filas "
+              f"({time.perf_counter() - inicio:.1f} s).", file=sys.stderr)
+        resultados = ejecutar_mediciones(args.repeticiones, args.operaciones, args.semilla)
+    except FileExistsError as e:
+        print(f"ERROR: {e}. Indique una carpeta nueva con --base.", file=sys.stderr)
+        return 1
+    finally:
+        if temporal and not args.conservar:
+            shutil.rmtree(ruta_base, ignore_errors=True)
+
+    informe = {
+        'fecha': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'arbol': arbol,
+        'repeticiones': args.repeticiones,
+        'operaciones': args.operaciones,
+        'resultados': resultados,
+    }
+    texto = json.dumps(informe, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            f.write(texto + "\n")
+        print(f"Resultado guardado en {args.salida}", file=sys.stderr)
+    else:
+        print(texto)
+    return 0
+
+def _comparar(args) -> int:
+    """Muestra, medición por medición, la mediana de dos corridas y cuánto cambió."""
+    try:
+        with open(args.antes, encoding='utf-8') as f:
+            antes = json.load(f)
+        with open(args.despues, encoding='utf-8') as f:
+            despues = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"ERROR: No se pudo leer el resultado. Detalles: {e}", file=sys.stderr)
+        return 1
+
+    if antes.get('arbol') != despues.get('arbol'):
+        print("ADVERTENCIA: Las dos corridas usaron árboles distintos.", file=sys.stderr)
+    print(f"{'Medición':<36} | {'Antes (ms)':>12} | {'Después (ms)':>12} | {'Cambio':>8}")
+    print("-" * 78)
+    for nombre, medicion in antes['resultados'].items():
+        otra = despues['resultados'].get(nombre)
+        if otra is None:
+            continue
+        a, d = medicion['mediana_s'] * 1000, otra['mediana_s'] * 1000
+        cambio = f"{d / a:.2f}x" if a > 0 else "-"
+        print(f"{nombre:<36} | {a:>12.3f} | {d:>12.3f} | {cambio:>8}")
+    return 0
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks",
+                                     description="Mediciones de rendimiento sobre árboles sintéticos.")
+    comandos = parser.add_subparsers(dest='comando', required=True)
+
+    medir = comandos.add_parser('medir', help="Genera un árbol sintético y mide las operaciones.")
+    medir.add_argument('--categorias', type=int, default=5)
+    medir.add_argument('--tipos', type=int, default=4)
+    medir.add_argument('--procesamientos', type=int, default=3)
+    medir.add_argument('--filas', type=int, default=200, help="Filas por items.csv.")
+    medir.add_argument('--semilla', type=int, default=0)
+    medir.add_argument('--repeticiones', type=int, default=3)
+    medir.add_argument('--operaciones', type=int, default=20, help="Altas, modificaciones y bajas a medir.")
+    medir.add_argument('--base', help="Carpeta (nueva o vacía) donde generar el árbol. Por defecto, una temporal.")
+    medir.add_argument('--conservar', action='store_true', help="No borrar el árbol temporal al terminar.")
+    medir.add_argument('--salida', help="Archivo JSON donde guardar el resultado (por defecto, stdout).")
+
+    comparar = comandos.add_parser('comparar', help="Compara dos resultados JSON.")
+    comparar.add_argument('antes')
+    comparar.add_argument('despues')
+
+    args = parser.parse_args()
+    return _medir(args) if args.comando == 'medir' else _comparar(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
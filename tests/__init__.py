@@ -0,0 +1,81 @@
+import atexit
+import builtins
+import contextlib
+import io
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+# Las pruebas trabajan sobre una base temporal. RUTA_BASE_DATOS se lee al
+# importar Manejo_archivo, así que la variable tiene que quedar definida antes
+# de importar la aplicación. El borrado se registra primero para que corra
+# último, después de que la aplicación guarde sus manifiestos al salir.
+RUTA_BASE_PRUEBAS = tempfile.mkdtemp(prefix="alimentos_pruebas_")
+os.environ["ALIMENTOS_RUTA_BASE"] = RUTA_BASE_PRUEBAS
+atexit.register(shutil.rmtree, RUTA_BASE_PRUEBAS, ignore_errors=True)
+
+# Los módulos de la aplicación están en la carpeta de arriba.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@contextlib.contextmanager
+def respuestas(*valores):
+    """
+    Contesta los input() con 'valores', en orden, y descarta lo que se imprime.
+    Un valor puede ser una función: se llama en el momento de contestar.
+    """
+    pendientes = iter(valores)
+    original = builtins.input
+
+    def contestar(*_):
+        respuesta = next(pendientes)
+        return respuesta() if callable(respuesta) else respuesta
+
+    builtins.input = contestar
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        builtins.input = original
+
+
+def arbol_de_prueba(ruta_base: str, semilla: int = 0, hojas: int = 12, filas: int = 40) -> dict:
+    """
+    Escribe en 'ruta_base' un árbol categoria/tipo/procesamiento/items.csv al
+    azar (con 'semilla'): nombres con acentos y repetidos entre hojas, calorías
+    enteras, con decimales, vacías o no numéricas, y una columna extra en
+    algunas hojas. Devuelve {ruta del items.csv: (encabezados, filas)}.
+    """
+    # Import tardío: la aplicación se importa después de definir la base temporal.
+    from Manejo_archivo import sobrescribir_csv
+
+    azar = random.Random(semilla)
+    niveles = (["frutas", "Lácteos", "carne", "verduras de hoja"],
+               ["cítricos", "quesos", "ave", "Crudas"],
+               ["fresco", "congelado", "jugo"])
+    palabras = ["manzana", "Limón", "naranja", "queso", "pollo", "pechuga", "acelga", "ñoqui", "Crème", "sandía"]
+
+    def calorias():
+        return azar.choice([str(azar.randint(1, 900)), f"{azar.uniform(1, 900):.1f}", "47", "47.0", "",
+                            "sin dato", "1e2", "0"])
+
+    arbol = {}
+    while len(arbol) < hojas:
+        jerarquia = [azar.choice(nivel) for nivel in niveles]
+        ruta_hoja = os.path.join(ruta_base, *jerarquia, "items.csv")
+        if ruta_hoja in arbol:
+            continue
+        encabezados = ['nombre', 'calorias_100g'] + (['marca'] if azar.random() < 0.3 else [])
+        contenido = []
+        for i in range(azar.randint(0, filas)):
+            fila = {'nombre': f"{azar.choice(palabras)} {azar.randint(0, filas)}", 'calorias_100g': calorias()}
+            if 'marca' in encabezados:
+                fila['marca'] = azar.choice(["", "Ñandú", "La \"Vaca\", S.A."])
+            contenido.append(fila)
+        os.makedirs(os.path.dirname(ruta_hoja), exist_ok=True)
+        if not sobrescribir_csv(ruta_hoja, encabezados, contenido):
+            raise OSError(f"no se pudo escribir {ruta_hoja}")
+        arbol[ruta_hoja] = (encabezados, contenido)
+    return arbol
@@ -0,0 +1,239 @@
+import contextlib
+import filecmp
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+import tests  # noqa: F401  (prepara la base temporal antes de importar la aplicación)
+from Manejo_archivo import (sobrescribir_csv, leer_hoja, usar_almacen, almacen_de_datos, alta_nuevo_item,
+                            nombre_existe_en_hoja, crear_lista_desde_csv, iter_alimentos, RUTA_BASE_DATOS)
+from AlmacenSQLite import AlmacenSQLite
+
+# Base de ejemplo que viene con el repositorio.
+BASE_DE_EJEMPLO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "base_de_datos_alimentos")
+
+# Hojas del árbol de prueba: (categoria, tipo, procesamiento) -> (encabezados, filas).
+HOJAS = {
+    ("frutas", "cítricos", "fresco"): (
+        ['nombre', 'calorias_100g'],
+        [{'nombre': "Limón", 'calorias_100g': "29"}, {'nombre': "Naranja", 'calorias_100g': "47.0"},
+         {'nombre': "Pomelo rosado", 'calorias_100g': "42.5"}],
+    ),
+    ("frutas", "cítricos", "jugo"): (
+        ['nombre', 'calorias_100g', 'origen'],
+        [{'nombre': "Jugo de naranja, exprimido", 'calorias_100g': "45", 'origen': "Tucumán"},
+         {'nombre': 'Jugo "natural"', 'calorias_100g': "", 'origen': ""},
+         {'nombre': "Jugo de mandarina", 'calorias_100g': "sin dato", 'origen': "Entre Ríos"}],
+    ),
+    ("lácteos", "quesos", "duros"): (
+        ['calorias_100g', 'nombre', 'grasas', 'marca'],
+        [{'calorias_100g': "392", 'nombre': "Reggianito", 'grasas': "28", 'marca': "Ñandú"},
+         {'calorias_100g': "1e3", 'nombre': "Queso de prueba", 'grasas': "", 'marca': ""}],
+    ),
+    ("verduras", "hojas", "crudas"): (
+        ['nombre', 'calorias_100g'],
+        [],
+    ),
+}
+
+
+def _hojas_del_arbol(ruta_base: str) -> list:
+    """Rutas relativas de los items.csv del árbol, ordenadas."""
+    return sorted(os.path.relpath(os.path.join(directorio, "items.csv"), ruta_base)
+                  for directorio, _, archivos in os.walk(ruta_base) if "items.csv" in archivos)
+
+
+class IdaYVueltaEntreCsvYSqlite(unittest.TestCase):
+    """
+    Un árbol de CSV pasado a SQLite y de vuelta a CSV queda idéntico. Las hojas
+    escritas por la aplicación (con sobrescribir_csv) vuelven byte por byte; las
+    editadas a mano pueden volver con otro formato de CSV (por ejemplo, otros
+    fines de línea), como después de cualquier reescritura, pero con el mismo contenido.
+    """
+
+    def setUp(self):
+        # Carpetas aparte, fuera de RUTA_BASE_PRUEBAS, para que cada hoja tenga un solo manifiesto.
+        self.carpeta = tempfile.mkdtemp(prefix="alimentos_sqlite_")
+        self.addCleanup(shutil.rmtree, self.carpeta, ignore_errors=True)
+        self.original = os.path.join(self.carpeta, "original")
+        self.exportado = os.path.join(self.carpeta, "exportado")
+        for jerarquia, (encabezados, filas) in HOJAS.items():
+            ruta_hoja = os.path.join(self.original, *jerarquia, "items.csv")
+            os.makedirs(os.path.dirname(ruta_hoja))
+            self.assertTrue(sobrescribir_csv(ruta_hoja, encabezados, filas))
+
+    def _ida_y_vuelta(self, ruta_base: str) -> tuple:
+        with contextlib.redirect_stdout(io.StringIO()), \
+                AlmacenSQLite(os.path.join(self.carpeta, "base.db")) as almacen:
+            return almacen.importar_arbol(ruta_base), almacen.exportar_arbol(self.exportado)
+
+    def test_ida_y_vuelta(self):
+        importado, exportado = self._ida_y_vuelta(self.original)
+        filas = sum(len(filas) for _, filas in HOJAS.values())
+        self.assertEqual(importado, {'hojas': len(HOJAS), 'filas': filas, 'omitidas': []})
+        self.assertEqual(exportado, {'hojas': len(HOJAS), 'filas': filas, 'fallidas': []})
+
+        hojas = _hojas_del_arbol(self.original)
+        self.assertEqual(len(hojas), len(HOJAS))
+        self.assertEqual(_hojas_del_arbol(self.exportado), hojas)
+        for relativa in hojas:
+            self.assertTrue(filecmp.cmp(os.path.join(self.original, relativa),
+                                        os.path.join(self.exportado, relativa), shallow=False), relativa)
+
+    def test_base_de_ejemplo(self):
+        copia = os.path.join(self.carpeta, "ejemplo")
+        shutil.copytree(BASE_DE_EJEMPLO, copia)
+        importado, exportado = self._ida_y_vuelta(copia)
+        self.assertEqual(importado['omitidas'], [])
+        self.assertEqual(exportado['fallidas'], [])
+
+        hojas = _hojas_del_arbol(copia)
+        self.assertEqual(_hojas_del_arbol(self.exportado), hojas)
+        for relativa in hojas:
+            encabezados, filas, _ = leer_hoja(os.path.join(copia, relativa))
+            encabezados_exportados, filas_exportadas, _ = leer_hoja(os.path.join(self.exportado, relativa))
+            self.assertEqual(encabezados_exportados, encabezados, relativa)
+            self.assertEqual([fila for _, fila in filas_exportadas], [fila for _, fila in filas], relativa)
+
+
+class OperacionesDelAlmacen(unittest.TestCase):
+    """Altas, reescritura de una hoja, modificación, baja y filtros de AlmacenSQLite."""
+
+    def setUp(self):
+        carpeta = tempfile.mkdtemp(prefix="alimentos_sqlite_")
+        self.addCleanup(shutil.rmtree, carpeta, ignore_errors=True)
+        self.almacen = AlmacenSQLite(os.path.join(carpeta, "base.db"))
+        self.addCleanup(self.almacen.cerrar)
+
+    def _nombres(self, filas) -> list:
+        return [fila['nombre'] for fila in filas]
+
+    def test_altas(self):
+        self.assertTrue(self.almacen.alta_nuevo_item("Frutas", "Cítricos", "Fresco",
+                                                     {'nombre': "Limón", 'calorias_100g': 29}))
+        self.assertEqual(self.almacen.altas_en_lote([
+            ("Frutas", "Cítricos", "Fresco", {'nombre': "Naranja", 'calorias_100g': "47"}),
+            ("Frutas", "Cítricos", "Fresco", {'nombre': "Pomelo", 'calorias_100g': "42", 'origen': "Salta"}),
+            ("Lácteos", "Quesos", "Duros", {'nombre': "Reggianito", 'calorias_100g': "392"}),
+        ]), 3)
+        self.assertEqual(len(self.almacen), 4)
+        self.assertEqual(self._nombres(self.almacen.crear_lista()), ["Limón", "Naranja", "Pomelo", "Reggianito"])
+        # La columna nueva se agrega al final de los encabezados de la hoja.
+        limon, _, pomelo, _ = self.almacen.crear_lista()
+        self.assertEqual(limon, {'nombre': "Limón", 'calorias_100g': "29", 'origen': "", 'categoria': "Frutas",
+                                 'tipo': "Cítricos", 'procesamiento': "Fresco", 'id': limon['id']})
+        self.assertEqual(pomelo['origen'], "Salta")
+        self.assertTrue(self.almacen.nombre_existe_en_hoja("Frutas", "Cítricos", "Fresco", "  LIMON "))
+        self.assertFalse(self.almacen.nombre_existe_en_hoja("Lácteos", "Quesos", "Duros", "Limón"))
+
+    def test_sobrescribir_hoja(self):
+        self.almacen.alta_nuevo_item("Frutas", "Cítricos", "Fresco", {'nombre': "Limón", 'calorias_100g': "29"})
+        self.almacen.alta_nuevo_item("Frutas", "Tropicales", "Fresco", {'nombre': "Mango", 'calorias_100g': "60"})
+        self.assertTrue(self.almacen.sobrescribir_hoja("Frutas", "Cítricos", "Fresco", ['calorias_100g', 'nombre'],
+                                                       [{'calorias_100g': "47", 'nombre': "Naranja"},
+                                                        {'calorias_100g': "25", 'nombre': "Lima"}]))
+        self.assertEqual(self._nombres(self.almacen.crear_lista()), ["Naranja", "Lima", "Mango"])
+        self.assertEqual(list(self.almacen.crear_lista()[0]), ['calorias_100g', 'nombre', 'categoria',
+                                                                'tipo', 'procesamiento', 'id'])
+        self.assertFalse(self.almacen.nombre_existe_en_hoja("Frutas", "Cítricos", "Fresco", "Limón"))
+
+    def test_modificar_y_eliminar(self):
+        self.almacen.altas_en_lote([("Frutas", "Cítricos", "Fresco", {'nombre': nombre, 'calorias_100g': calorias})
+                                    for nombre, calorias in (("Limón", "29"), ("Naranja", "47"))])
+        limon, naranja = self.almacen.crear_lista()
+        self.assertTrue(self.almacen.modificar(limon['id'], {'nombre': "Limón sutil", 'calorias_100g': "30"}))
+        self.assertEqual(self.almacen.obtener(limon['id'])['nombre'], "Limón sutil")
+        self.assertEqual(self._nombres(self.almacen.buscar_por_nombre("limon sutil")), ["Limón sutil"])
+        self.assertEqual(self._nombres(self.almacen.buscar_por_nombre("Limón")), [])
+        self.assertEqual(self._nombres(self.almacen.filtrar_por_calorias(30, 40)), ["Limón sutil"])
+
+        self.assertTrue(self.almacen.eliminar(naranja['id']))
+        self.assertFalse(self.almacen.eliminar(naranja['id']))
+        self.assertFalse(self.almacen.modificar(naranja['id'], {'nombre': "Otra"}))
+        self.assertEqual(self._nombres(self.almacen.crear_lista()), ["Limón sutil"])
+
+    def test_filtros(self):
+        self.almacen.altas_en_lote([
+            ("Frutas", "Cítricos", "Fresco", {'nombre': "Limón", 'calorias_100g': "29"}),
+            ("Frutas", "Cítricos", "Jugo", {'nombre': "Jugo de naranja", 'calorias_100g': "45"}),
+            ("Frutas", "Tropicales", "Fresco", {'nombre': "Mango", 'calorias_100g': "60"}),
+            ("Lácteos", "Quesos", "Duros", {'nombre': "Reggianito", 'calorias_100g': "392"}),
+        ])
+        self.assertEqual(self._nombres(self.almacen.iter_alimentos("frutas")), ["Limón", "Jugo de naranja", "Mango"])
+        self.assertEqual(self._nombres(self.almacen.iter_alimentos("FRUTAS", "citricos")), ["Limón", "Jugo de naranja"])
+        self.assertEqual(self._nombres(self.almacen.iter_alimentos(procesamiento="fresco")), ["Limón", "Mango"])
+        self.assertEqual(self._nombres(self.almacen.iter_alimentos(
+            predicate=lambda fila: float(fila['calorias_100g']) > 50)), ["Mango", "Reggianito"])
+        self.assertEqual(self._nombres(self.almacen.top_calorias(2)), ["Reggianito", "Mango"])
+
+
+class BaseGuardadaEnSqlite(unittest.TestCase):
+    """
+    Con usar_almacen('sqlite'), las operaciones de Manejo_archivo sobre la
+    base van al archivo SQLite y no tocan el árbol de CSV.
+    """
+
+    def setUp(self):
+        carpeta = tempfile.mkdtemp(prefix="alimentos_sqlite_")
+        self.addCleanup(shutil.rmtree, carpeta, ignore_errors=True)
+        usar_almacen('sqlite', os.path.join(carpeta, "base.db"))
+        self.addCleanup(usar_almacen, 'csv')
+        # Las hojas viven en la base de las pruebas, pero con carpetas que ninguna otra prueba usa.
+        self.categoria = "almacen sqlite"
+        self.ruta_categoria = os.path.join(RUTA_BASE_DATOS, self.categoria)
+
+    def _alta(self, tipo, procesamiento, nombre, calorias):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertTrue(alta_nuevo_item(self.categoria, tipo, procesamiento,
+                                            {'nombre': nombre, 'calorias_100g': calorias}))
+
+    def _nombres(self, filas) -> list:
+        return [fila['nombre'] for fila in filas]
+
+    def test_altas_y_consultas(self):
+        self._alta("cítricos", "fresco", "Limón", "29")
+        self._alta("cítricos", "jugo", "Jugo de naranja", "45")
+        self._alta("tropicales", "fresco", "Mango", "60")
+        self.assertFalse(os.path.exists(self.ruta_categoria))
+        self.assertEqual(len(almacen_de_datos()), 3)
+
+        self.assertEqual(self._nombres(iter_alimentos(self.categoria)), ["Limón", "Jugo de naranja", "Mango"])
+        self.assertEqual(self._nombres(iter_alimentos(self.categoria, "citricos")), ["Limón", "Jugo de naranja"])
+        self.assertEqual(self._nombres(iter_alimentos(self.categoria, predicate=lambda fila: fila['nombre'] == "Mango")),
+                         ["Mango"])
+        self.assertEqual(self._nombres(crear_lista_desde_csv(RUTA_BASE_DATOS)), ["Limón", "Jugo de naranja", "Mango"])
+        ruta_hoja = os.path.join(self.ruta_categoria, "cítricos", "fresco", "items.csv")
+        self.assertTrue(nombre_existe_en_hoja(ruta_hoja, "limon"))
+        self.assertFalse(nombre_existe_en_hoja(ruta_hoja, "Mango"))
+
+    def test_sobrescribir_hoja_de_la_base(self):
+        self._alta("cítricos", "fresco", "Limón", "29")
+        self._alta("tropicales", "fresco", "Mango", "60")
+        ruta_hoja = os.path.join(self.ruta_categoria, "cítricos", "fresco", "items.csv")
+        self.assertTrue(sobrescribir_csv(ruta_hoja, ['nombre', 'calorias_100g'],
+                                         [{'nombre': "Naranja", 'calorias_100g': "47"},
+                                          {'nombre': "Lima", 'calorias_100g': "25"}]))
+        self.assertFalse(os.path.exists(self.ruta_categoria))
+        self.assertEqual(self._nombres(iter_alimentos(self.categoria)), ["Naranja", "Lima", "Mango"])
+
+    def test_fuera_de_la_base_sigue_en_csv(self):
+        # Un árbol que no es la base (por ejemplo, el destino de una exportación) se escribe en CSV.
+        otra_base = tempfile.mkdtemp(prefix="alimentos_sqlite_")
+        self.addCleanup(shutil.rmtree, otra_base, ignore_errors=True)
+        ruta_hoja = os.path.join(otra_base, "frutas", "cítricos", "fresco", "items.csv")
+        os.makedirs(os.path.dirname(ruta_hoja))
+        self.assertTrue(sobrescribir_csv(ruta_hoja, ['nombre', 'calorias_100g'], [{'nombre': "Limón", 'calorias_100g': "29"}]))
+        self.assertEqual(self._nombres(iter_alimentos(ruta_base=otra_base)), ["Limón"])
+        self.assertEqual(len(almacen_de_datos()), 0)
+
+    def test_volver_a_csv(self):
+        self._alta("cítricos", "fresco", "Limón", "29")
+        usar_almacen('csv')
+        self.assertIsNone(almacen_de_datos())
+        self.assertEqual(self._nombres(iter_alimentos(self.categoria)), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,419 @@
+import contextlib
+import io
+import math
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from tests import arbol_de_prueba
+from Manejo_archivo import (crear_lista_desde_csv, normalizar_texto_para_ruta, sobrescribir_csv, leer_hoja,
+                            registrar_baja)
+import Catalogo
+from Catalogo import (crear_catalogo_desde_csv, guardar_instantanea, cargar_instantanea, IndiceBusqueda,
+                      actualizar_catalogo, obtener_catalogo, NOMBRE_INSTANTANEA, SIMILITUD_MINIMA)
+
+
+class CatalogoIgualALaLista(unittest.TestCase):
+    """
+    El catálogo columnar responde lo mismo que la lista de diccionarios de
+    crear_lista_desde_csv: las mismas filas, en el mismo orden, y los mismos
+    valores en las listas de jerarquía y en los filtros.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        # Una base aparte, fuera de RUTA_BASE_PRUEBAS, para que cada hoja tenga un solo manifiesto.
+        cls.ruta_base = tempfile.mkdtemp(prefix="alimentos_catalogo_")
+        arbol_de_prueba(cls.ruta_base, semilla=2, hojas=20)
+        with contextlib.redirect_stdout(io.StringIO()):
+            cls.lista = crear_lista_desde_csv(cls.ruta_base)
+            cls.catalogo = crear_catalogo_desde_csv(cls.ruta_base)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.ruta_base, ignore_errors=True)
+
+    def test_mismas_filas(self):
+        self.assertGreater(len(self.lista), 100)
+        self.assertEqual(len(self.catalogo), len(self.lista))
+        self.assertEqual([fila.copy() for fila in self.catalogo], self.lista)
+        for fila, item in zip(self.catalogo, self.lista):
+            for clave in item:
+                self.assertEqual(fila.get(clave), item.get(clave))
+                self.assertEqual(fila[clave], item[clave])
+            self.assertIsNone(fila.get('no existe'))
+            self.assertEqual(set(fila.keys()), set(item.keys()))
+
+    def test_listas_de_jerarquia(self):
+        categorias = sorted({item['categoria'] for item in self.lista})
+        self.assertEqual(self.catalogo.lista_categorias(), categorias)
+        for categoria in categorias:
+            tipos = sorted({item['tipo'] for item in self.lista if item['categoria'] == categoria})
+            self.assertEqual(self.catalogo.lista_tipos(categoria), tipos)
+            for tipo in tipos:
+                self.assertEqual(self.catalogo.lista_procesamientos(categoria, tipo),
+                                 sorted({item['procesamiento'] for item in self.lista
+                                         if item['categoria'] == categoria and item['tipo'] == tipo}))
+        self.assertEqual(self.catalogo.lista_tipos("no existe"), [])
+
+    def test_filtrar(self):
+        niveles = {(item['categoria'], item['tipo'], item['procesamiento']) for item in self.lista}
+        consultas = {(categoria, None, None) for categoria, _, _ in niveles}
+        consultas |= {(categoria, tipo, None) for categoria, tipo, _ in niveles}
+        consultas |= niveles | {(None, tipo, None) for _, tipo, _ in niveles}
+        consultas |= {(None, None, None), ("no existe", None, None), ("frutas", "no existe", None)}
+        for categoria, tipo, procesamiento in consultas:
+            esperado = [item for item in self.lista
+                        if all(valor is None or item[clave] == valor for clave, valor in
+                               (('categoria', categoria), ('tipo', tipo), ('procesamiento', procesamiento)))]
+            obtenido = [fila.copy() for fila in self.catalogo.filtrar(categoria, tipo, procesamiento)]
+            self.assertEqual(obtenido, esperado, (categoria, tipo, procesamiento))
+
+    def test_bajas_y_altas(self):
+        catalogo = crear_catalogo_desde_csv(self.ruta_base)
+        lista = list(self.lista)
+        for indice in (0, 5, -1):
+            catalogo.eliminar(catalogo.filtrar()[indice].indice)
+            del lista[indice]
+        catalogo.append({'nombre': "Kiwi", 'calorias_100g': "61", 'categoria': "frutas",
+                         'tipo': "exóticas", 'procesamiento': "fresco"})
+        lista.append({'nombre': "Kiwi", 'calorias_100g': "61", 'categoria': "frutas",
+                      'tipo': "exóticas", 'procesamiento': "fresco"})
+        self.assertEqual(len(catalogo), len(lista))
+        self.assertEqual([fila.copy() for fila in catalogo], lista)
+        self.assertIn("exóticas", catalogo.lista_tipos("frutas"))
+
+
+class IndiceDeNombres(unittest.TestCase):
+    """
+    buscar_por_nombre encuentra lo mismo que recorrer la lista comparando los
+    nombres normalizados, y el índice sigue al día con altas, modificaciones y bajas.
+    """
+
+    def setUp(self):
+        self.ruta_base = tempfile.mkdtemp(prefix="alimentos_catalogo_")
+        self.addCleanup(shutil.rmtree, self.ruta_base, ignore_errors=True)
+        arbol_de_prueba(self.ruta_base, semilla=3, hojas=15)
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.catalogo = crear_catalogo_desde_csv(self.ruta_base)
+
+    def _por_recorrido(self, nombre: str) -> list:
+        buscado = normalizar_texto_para_ruta(nombre)
+        return [fila.indice for fila in self.catalogo if normalizar_texto_para_ruta(fila['nombre']) == buscado]
+
+    def _comparar(self, nombres):
+        for nombre in nombres:
+            self.assertEqual(sorted(fila.indice for fila in self.catalogo.buscar_por_nombre(nombre)),
+                             self._por_recorrido(nombre), nombre)
+
+    def test_igual_al_recorrido(self):
+        nombres = {fila['nombre'] for fila in self.catalogo}
+        self.assertTrue(any(len(self._por_recorrido(nombre)) > 1 for nombre in nombres))
+        self._comparar(nombres)
+        # Otra forma de escribir el mismo nombre: mayúsculas, acentos y espacios.
+        self._comparar({f"  {nombre.upper()} " for nombre in nombres} | {"limon 3", "LIMÓN 3", "no existe", ""})
+
+    def test_altas_modificaciones_y_bajas(self):
+        fila = next(iter(self.catalogo))
+        nombre_viejo = fila['nombre']
+        self.catalogo.modificar(fila.indice, nombre="Ñoqui de papa")
+        self.assertEqual([f.indice for f in self.catalogo.buscar_por_nombre("NOQUI DE PAPA")], [fila.indice])
+        self.assertNotIn(fila.indice, [f.indice for f in self.catalogo.buscar_por_nombre(nombre_viejo)])
+
+        indice = self.catalogo.agregar("Ñoquí de Papa", "130", "pastas", "frescas", "caseras")
+        self.assertEqual(sorted(f.indice for f in self.catalogo.buscar_por_nombre("noqui de papa")),
+                         [fila.indice, indice])
+        self.catalogo.eliminar(fila.indice)
+        self.assertEqual([f.indice for f in self.catalogo.buscar_por_nombre("noqui de papa")], [indice])
+        self._comparar({f['nombre'] for f in self.catalogo} | {nombre_viejo})
+
+
+class IndiceDeCalorias(unittest.TestCase):
+    """
+    filtrar_por_calorias y top_calorias devuelven lo mismo que ordenar la
+    lista por calorías (de forma estable, sin las no numéricas), también
+    después de modificar, agregar y eliminar filas.
+    """
+
+    def setUp(self):
+        self.ruta_base = tempfile.mkdtemp(prefix="alimentos_catalogo_")
+        self.addCleanup(shutil.rmtree, self.ruta_base, ignore_errors=True)
+        arbol_de_prueba(self.ruta_base, semilla=9, hojas=15)
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.catalogo = crear_catalogo_desde_csv(self.ruta_base)
+
+    def _ordenadas(self) -> list:
+        """(calorías, índice) de las filas numéricas, de menor a mayor y a igual calorías por índice."""
+        ordenadas = []
+        for fila in self.catalogo:
+            try:
+                calorias = float(fila['calorias_100g'])
+            except ValueError:
+                continue
+            if not math.isnan(calorias):
+                ordenadas.append((calorias, fila.indice))
+        ordenadas.sort(key=lambda par: par[0])
+        return ordenadas
+
+    def _comparar(self):
+        ordenadas = self._ordenadas()
+        valores = sorted({calorias for calorias, _ in ordenadas})
+        rangos = [(valores[0], valores[-1]), (valores[1], valores[-2]), (valores[3], valores[3]),
+                  (-1.0, 0.0), (50.0, 100.0), (1e9, 2e9), (100.0, 50.0)]
+        for minimo, maximo in rangos:
+            self.assertEqual([fila.indice for fila in self.catalogo.filtrar_por_calorias(minimo, maximo)],
+                             [indice for calorias, indice in ordenadas if minimo <= calorias <= maximo],
+                             (minimo, maximo))
+        # De mayor a menor, pero a igual calorías en el orden del catálogo.
+        descendente = sorted(ordenadas, key=lambda par: -par[0])
+        for n in (0, 1, 5, 17, len(ordenadas), len(ordenadas) + 10):
+            self.assertEqual([fila.indice for fila in self.catalogo.top_calorias(n)],
+                             [indice for _, indice in descendente[:n]], n)
+
+    def test_igual_a_ordenar_la_lista(self):
+        calorias = [fila['calorias_100g'] for fila in self.catalogo]
+        self.assertIn("sin dato", calorias)
+        self.assertLess(len(self._ordenadas()), len(calorias))
+        self._comparar()
+
+    def test_modificaciones_altas_y_bajas(self):
+        self._comparar() # Arma el índice antes de los cambios, para que se actualice en lugar de rearmarse.
+        filas = list(self.catalogo)
+        self.catalogo.modificar(filas[0].indice, calorias_100g="99999")
+        self.catalogo.modificar(filas[1].indice, calorias_100g="sin dato")
+        self.catalogo.modificar(filas[2].indice, calorias_100g=filas[3]['calorias_100g'])
+        self.catalogo.eliminar(filas[4].indice)
+        self.catalogo.eliminar(self.catalogo.top_calorias(2)[1].indice)
+        self.catalogo.agregar("Kiwi", "61", "frutas", "exóticas", "fresco")
+        self.catalogo.agregar("Agua", "0", "bebidas", "sin alcohol", "envasada")
+        self._comparar()
+        self.assertEqual(self.catalogo.top_calorias(1)[0].indice, filas[0].indice)
+
+
+class InstantaneaBinaria(unittest.TestCase):
+    """
+    La instantánea devuelve el mismo catálogo que leer los CSV, y deja de
+    usarse en cuanto una hoja cambia, aparece o desaparece.
+    """
+
+    def setUp(self):
+        self.ruta_base = os.path.abspath(tempfile.mkdtemp(prefix="alimentos_instantanea_"))
+        self.addCleanup(shutil.rmtree, self.ruta_base, ignore_errors=True)
+        self.arbol = arbol_de_prueba(self.ruta_base, semilla=11, hojas=12)
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.catalogo = crear_catalogo_desde_csv(self.ruta_base)
+
+    def _guardar_y_cargar(self, catalogo):
+        self.assertTrue(guardar_instantanea(catalogo, self.ruta_base))
+        cargado = cargar_instantanea(self.ruta_base)
+        self.assertIsNotNone(cargado)
+        return cargado
+
+    def test_ida_y_vuelta(self):
+        cargado = self._guardar_y_cargar(self.catalogo)
+        self.assertEqual([fila.copy() for fila in cargado], [fila.copy() for fila in self.catalogo])
+        self.assertEqual(cargado.lista_categorias(), self.catalogo.lista_categorias())
+        nombre = next(iter(self.catalogo))['nombre']
+        self.assertEqual([fila.copy() for fila in cargado.buscar_por_nombre(nombre)],
+                         [fila.copy() for fila in self.catalogo.buscar_por_nombre(nombre)])
+        self.assertEqual([fila.indice for fila in cargado.top_calorias(10)],
+                         [fila.indice for fila in self.catalogo.top_calorias(10)])
+
+    def test_catalogo_con_bajas(self):
+        # Con filas eliminadas se guardan solo las vivas, renumeradas.
+        for fila in list(self.catalogo)[::3]:
+            self.catalogo.eliminar(fila.indice)
+        cargado = self._guardar_y_cargar(self.catalogo)
+        self.assertEqual(len(cargado), len(self.catalogo))
+        self.assertEqual([fila.copy() for fila in cargado], [fila.copy() for fila in self.catalogo])
+
+    def test_invalidacion(self):
+        self._guardar_y_cargar(self.catalogo)
+        ruta_hoja = next(iter(self.arbol))
+        with open(ruta_hoja, 'a', encoding='utf-8', newline='') as f:
+            f.write("Agregado a mano,10\n")
+        self.assertIsNone(cargar_instantanea(self.ruta_base))
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            catalogo = crear_catalogo_desde_csv(self.ruta_base)
+        self.assertIn("Agregado a mano", [fila['nombre'] for fila in self._guardar_y_cargar(catalogo)])
+
+        # Una hoja nueva.
+        ruta_nueva = os.path.join(self.ruta_base, "bebidas", "jugos", "envasado", "items.csv")
+        os.makedirs(os.path.dirname(ruta_nueva))
+        with open(ruta_nueva, 'w', encoding='utf-8', newline='') as f:
+            f.write("nombre,calorias_100g\nJugo,45\n")
+        self.assertIsNone(cargar_instantanea(self.ruta_base))
+
+        # Una hoja que desaparece.
+        with contextlib.redirect_stdout(io.StringIO()):
+            catalogo = crear_catalogo_desde_csv(self.ruta_base)
+        self._guardar_y_cargar(catalogo)
+        os.remove(ruta_nueva)
+        self.assertIsNone(cargar_instantanea(self.ruta_base))
+
+    def test_archivo_danado(self):
+        self._guardar_y_cargar(self.catalogo)
+        ruta_instantanea = os.path.join(self.ruta_base, NOMBRE_INSTANTANEA)
+        with open(ruta_instantanea, 'r+b') as f:
+            f.write(b"OTRACOSA")
+        self.assertIsNone(cargar_instantanea(self.ruta_base))
+        with open(ruta_instantanea, 'wb'):
+            pass
+        self.assertIsNone(cargar_instantanea(self.ruta_base))
+
+
+def _parecido(a: str, b: str) -> float:
+    """Parecido por trigramas calculado a mano, con los mismos bordes que IndiceBusqueda."""
+    trigramas_a = {f"  {a} "[i:i + 3] for i in range(len(a) + 1)}
+    trigramas_b = {f"  {b} "[i:i + 3] for i in range(len(b) + 1)}
+    return len(trigramas_a & trigramas_b) / len(trigramas_a | trigramas_b)
+
+
+class BusquedaAproximada(unittest.TestCase):
+    """
+    IndiceBusqueda da los mismos prefijos y parecidos que recorrer todas las
+    claves, y buscar_aproximado encuentra los nombres mal escritos.
+    """
+
+    def setUp(self):
+        self.ruta_base = tempfile.mkdtemp(prefix="alimentos_catalogo_")
+        self.addCleanup(shutil.rmtree, self.ruta_base, ignore_errors=True)
+        arbol_de_prueba(self.ruta_base, semilla=18, hojas=15)
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.catalogo = crear_catalogo_desde_csv(self.ruta_base)
+        self.claves = sorted({normalizar_texto_para_ruta(fila['nombre']) for fila in self.catalogo})
+
+    def _comparar(self, indice: IndiceBusqueda, claves: list):
+        for prefijo in ("", "p", "pollo", "pollo 1", "queso 3", "creme", "zzz", "limon 10"):
+            for limite in (3, 1000):
+                self.assertEqual(indice.por_prefijo(prefijo, limite),
+                                 [clave for clave in claves if clave.startswith(prefijo)][:limite], (prefijo, limite))
+        for texto in ("polo 12", "quseo 3", "naranaj", "sandia 1", "12 pollo", "x"):
+            esperado = sorted(((_parecido(texto, clave), clave) for clave in claves), key=lambda par: (-par[0], par[1]))
+            esperado = [par for par in esperado if par[0] >= SIMILITUD_MINIMA][:10]
+            obtenido = indice.parecidas(texto, 10)
+            self.assertEqual([clave for _, clave in obtenido], [clave for _, clave in esperado], texto)
+            for (parecido, _), (calculado, _) in zip(obtenido, esperado):
+                self.assertAlmostEqual(parecido, calculado)
+
+    def test_indice_igual_al_recorrido(self):
+        indice = IndiceBusqueda(self.claves)
+        self.assertEqual(len(indice), len(self.claves))
+        self._comparar(indice, self.claves)
+
+        claves = list(self.claves)
+        for clave in claves[::4]:
+            indice.quitar(clave)
+        indice.quitar("no existe")
+        del claves[::4]
+        for clave in ("pollo al horno", "queso crema", claves[0]):
+            indice.agregar(clave)
+        claves = sorted(set(claves) | {"pollo al horno", "queso crema"})
+        self.assertEqual(len(indice), len(claves))
+        self._comparar(indice, claves)
+
+    def test_buscar_aproximado(self):
+        nombre = next(fila['nombre'] for fila in self.catalogo
+                      if normalizar_texto_para_ruta(fila['nombre']).startswith("pollo"))
+        clave = normalizar_texto_para_ruta(nombre)
+        # Primero las coincidencias exactas, con cualquier forma de escribir el nombre.
+        exactas = [fila.indice for fila in self.catalogo.buscar_por_nombre(nombre)]
+        self.assertEqual([fila.indice for fila in self.catalogo.buscar_aproximado(nombre.upper(), 100)][:len(exactas)],
+                         exactas)
+        # Un error de tipeo.
+        con_error = clave.replace("pollo", "polo")
+        self.assertIn(clave, [normalizar_texto_para_ruta(fila['nombre'])
+                              for fila in self.catalogo.buscar_aproximado(con_error)])
+        # Un prefijo: todas empiezan con él y se respeta el límite.
+        filas = self.catalogo.buscar_aproximado("pollo", 5)
+        self.assertEqual(len(filas), 5)
+        self.assertTrue(all(normalizar_texto_para_ruta(fila['nombre']).startswith("pollo") for fila in filas))
+        self.assertEqual(self.catalogo.buscar_aproximado("  "), [])
+
+    def test_sigue_al_dia_con_los_cambios(self):
+        self.catalogo.buscar_aproximado("pollo") # Arma el índice antes de los cambios.
+        fila = next(iter(self.catalogo))
+        self.catalogo.modificar(fila.indice, nombre="Mandarina criolla")
+        indice = self.catalogo.agregar("Mandarina común", "53", "frutas", "cítricos", "fresco")
+        self.assertEqual(sorted(f.indice for f in self.catalogo.buscar_aproximado("mandarna")),
+                         sorted([fila.indice, indice]))
+        self.catalogo.eliminar(fila.indice)
+        self.assertEqual([f.indice for f in self.catalogo.buscar_aproximado("mandarina criola")], [indice])
+
+
+def _contenido(filas) -> list:
+    """Las filas como lista ordenada, para comparar sin depender del orden."""
+    return sorted(repr(sorted(fila.items())) for fila in filas)
+
+
+class CatalogoAlDia(unittest.TestCase):
+    """
+    actualizar_catalogo deja el catálogo igual a leer la base de nuevo, pero
+    releyendo solo las hojas nuevas o cambiadas, y sin cambiar el índice de las
+    filas que siguen igual.
+    """
+
+    def setUp(self):
+        self.ruta_base = os.path.abspath(tempfile.mkdtemp(prefix="alimentos_catalogo_"))
+        self.addCleanup(shutil.rmtree, self.ruta_base, ignore_errors=True)
+        self.arbol = arbol_de_prueba(self.ruta_base, semilla=23, hojas=15)
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.catalogo = crear_catalogo_desde_csv(self.ruta_base)
+        # Las hojas con filas, en el orden del árbol: cada prueba cambia algunas y deja el resto como estaba.
+        self.hojas = [ruta for ruta, (_, filas) in self.arbol.items() if len(filas) > 2]
+
+    def _actualizar(self) -> tuple:
+        """Devuelve (lo que informa actualizar_catalogo, hojas que se leyeron)."""
+        with mock.patch.object(Catalogo, '_leer_hoja_cruda', wraps=Catalogo._leer_hoja_cruda) as leer:
+            cambios = actualizar_catalogo(self.catalogo, self.ruta_base)
+        return cambios, {llamada.args[0] for llamada in leer.call_args_list}
+
+    def _comparar(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            lista = crear_lista_desde_csv(self.ruta_base)
+        self.assertEqual(len(self.catalogo), len(lista))
+        self.assertEqual(_contenido(fila.copy() for fila in self.catalogo), _contenido(lista))
+
+    def test_solo_las_hojas_cambiadas(self):
+        agregada, reescrita, borrada, con_baja, intacta = self.hojas[:5]
+        indices_intacta = [fila.indice for fila in self.catalogo if fila.ruta_hoja == intacta]
+
+        with open(agregada, 'a', encoding='utf-8', newline='') as f:
+            f.write("Agregado a mano,99999\n")
+        encabezados, filas, _ = leer_hoja(reescrita)
+        filas = [dict(fila) for _, fila in filas[1:]]
+        filas[0]['calorias_100g'] = "1.5"
+        self.assertTrue(sobrescribir_csv(reescrita, encabezados, filas))
+        os.remove(borrada)
+        self.assertTrue(registrar_baja(con_baja, 0))
+        nueva = os.path.join(self.ruta_base, "bebidas", "jugos", "envasado", "items.csv")
+        os.makedirs(os.path.dirname(nueva))
+        with open(nueva, 'w', encoding='utf-8', newline='') as f:
+            f.write("nombre,calorias_100g\nJugo de naranja,45\n")
+
+        cambios, leidas = self._actualizar()
+        self.assertEqual(leidas, {agregada, reescrita, con_baja, nueva})
+        self.assertEqual(cambios, 5)
+        self._comparar()
+        self.assertEqual([fila.indice for fila in self.catalogo if fila.ruta_hoja == intacta], indices_intacta)
+        # Los índices de nombres y de calorías también quedan al día.
+        self.assertEqual([fila['nombre'] for fila in self.catalogo.buscar_por_nombre("jugo de naranja")],
+                         ["Jugo de naranja"])
+        self.assertEqual(self.catalogo.top_calorias(1)[0]['nombre'], "Agregado a mano")
+
+        # Sin cambios nuevos no se lee nada.
+        self.assertEqual(self._actualizar(), (0, set()))
+
+    def test_obtener_catalogo_con_refrescar(self):
+        catalogo = obtener_catalogo(self.ruta_base, recargar=True)
+        with open(self.hojas[0], 'a', encoding='utf-8', newline='') as f:
+            f.write("Agregado a mano,10\n")
+        self.assertIs(obtener_catalogo(self.ruta_base, refrescar=True), catalogo)
+        self.assertEqual(len(catalogo.buscar_por_nombre("agregado a mano")), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+import contextlib
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from tests import arbol_de_prueba
+from Manejo_archivo import crear_lista_desde_csv, normalizar_texto_para_ruta, resumen_calorias
+import Comandos
+from Comandos import ejecutar_comando, CAMPOS_CONSULTA
+
+
+def _calorias(item: dict):
+    """Calorías de un ítem como float, o None si no son numéricas."""
+    try:
+        return float(item['calorias_100g'])
+    except ValueError:
+        return None
+
+
+class ComandosNoInteractivos(unittest.TestCase):
+    """
+    'query', 'stats' y 'batch' contra una base armada con arbol_de_prueba: las
+    salidas coinciden con filtrar la lista de crear_lista_desde_csv, y 'batch'
+    carga el catálogo una sola vez para todos los comandos.
+    """
+
+    def setUp(self):
+        # Una base aparte, fuera de RUTA_BASE_PRUEBAS, para que cada hoja tenga un solo manifiesto.
+        self.ruta_base = os.path.abspath(tempfile.mkdtemp(prefix="alimentos_comandos_"))
+        self.addCleanup(shutil.rmtree, self.ruta_base, ignore_errors=True)
+        arbol_de_prueba(self.ruta_base, semilla=13, hojas=15)
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.lista = crear_lista_desde_csv(self.ruta_base)
+
+    def _ejecutar(self, *argumentos, entrada="") -> tuple:
+        """Devuelve (código de salida, salida, errores)."""
+        salida, errores = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stderr(errores):
+            codigo = ejecutar_comando(['--base', self.ruta_base, *argumentos], io.StringIO(entrada), salida)
+        return codigo, salida.getvalue(), errores.getvalue()
+
+    def _jsonl(self, *argumentos) -> list:
+        codigo, salida, errores = self._ejecutar(*argumentos, '--format', 'jsonl')
+        self.assertEqual(codigo, 0, errores)
+        return [json.loads(linea) for linea in salida.splitlines()]
+
+    def _esperado(self, items) -> list:
+        return [{campo: item[campo] for campo in CAMPOS_CONSULTA} for item in items]
+
+    def test_query(self):
+        self.assertEqual(self._jsonl('query'), self._esperado(self.lista))
+        self.assertEqual(self._jsonl('query', '--categoria', "CARNE", '--tipo', "ave"),
+                         self._esperado(item for item in self.lista
+                                        if item['categoria'] == "carne" and item['tipo'] == "ave"))
+
+        # Con rango de calorías, de menor a mayor y a igual calorías en el orden de la lista.
+        en_rango = [item for item in self.lista if item['categoria'] == "frutas"
+                    and _calorias(item) is not None and 100 <= _calorias(item) <= 500]
+        self.assertEqual(self._jsonl('query', '--categoria', "frutas", '--min-cal', "100", '--max-cal', "500"),
+                         self._esperado(sorted(en_rango, key=_calorias)))
+
+        numericos = [item for item in self.lista if _calorias(item) is not None]
+        self.assertEqual(self._jsonl('query', '--top', "7"),
+                         self._esperado(sorted(numericos, key=lambda item: -_calorias(item))[:7]))
+
+        nombre = self.lista[0]['nombre']
+        self.assertEqual(self._jsonl('query', '--nombre', nombre.upper()),
+                         self._esperado(item for item in self.lista if normalizar_texto_para_ruta(item['nombre'])
+                                        == normalizar_texto_para_ruta(nombre)))
+        self.assertEqual(self._jsonl('query', '--categoria', "no existe"), [])
+
+    def test_query_csv(self):
+        codigo, salida, _ = self._ejecutar('query', '--categoria', "carne", '--format', 'csv')
+        self.assertEqual(codigo, 0)
+        self.assertEqual(list(csv.DictReader(io.StringIO(salida))),
+                         self._esperado(item for item in self.lista if item['categoria'] == "carne"))
+
+    def test_stats(self):
+        resumen = resumen_calorias(self.ruta_base)
+        filas = self._jsonl('stats')
+        self.assertEqual([(fila['categoria'], fila['cantidad']) for fila in filas],
+                         [(None, len(self.lista))] + [(categoria, datos['cantidad'])
+                                                      for categoria, datos in resumen['categorias'].items()])
+        total = filas[0]
+        numericos = [_calorias(item) for item in self.lista if _calorias(item) is not None]
+        self.assertEqual(total['con_calorias'], len(numericos))
+        self.assertAlmostEqual(total['promedio'], sum(numericos) / len(numericos))
+        self.assertEqual((total['max_calorias'], total['min_calorias']), (max(numericos), min(numericos)))
+
+        filas = self._jsonl('stats', '--categoria', "carne")
+        self.assertEqual(filas[0]['cantidad'], sum(item['categoria'] == "carne" for item in self.lista))
+        self.assertEqual({fila['tipo'] for fila in filas[1:]},
+                         {item['tipo'] for item in self.lista if item['categoria'] == "carne"})
+        self.assertEqual(self._jsonl('stats', '--categoria', "no existe"), [])
+
+    def test_batch(self):
+        comandos = "\n".join([
+            "# Un comentario",
+            "query --categoria carne --format jsonl",
+            "",
+            "query --no-existe",
+            "stats --format jsonl",
+            "serve",
+            "query --top 3 --format jsonl",
+        ])
+        with mock.patch.object(Comandos, 'obtener_catalogo', wraps=Comandos.obtener_catalogo) as cargar:
+            codigo, salida, errores = self._ejecutar('batch', entrada=comandos)
+        self.assertEqual(cargar.call_count, 1)
+        self.assertEqual(codigo, 1)
+        self.assertIn("línea 4", errores)
+        self.assertIn("línea 6", errores)
+
+        # Cada comando termina con una línea vacía, también los que fallaron,
+        # y responde lo mismo que si se lo ejecutara solo.
+        por_separado = [self._ejecutar(*linea.split())[1].splitlines()
+                        for linea in ("query --categoria carne --format jsonl", "stats --format jsonl",
+                                      "query --top 3 --format jsonl")]
+        self.assertEqual(len(por_separado[2]), 3)
+        self.assertEqual(salida.splitlines(),
+                         por_separado[0] + [""] + [""] + por_separado[1] + [""] + [""] + por_separado[2] + [""])
+
+    def test_errores_de_uso(self):
+        codigo, salida, errores = self._ejecutar('query', '--min-cal', "mucho")
+        self.assertEqual((codigo, salida), (2, ""))
+        self.assertIn("ERROR", errores)
+        self.assertEqual(self._ejecutar()[0], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+import contextlib
+import io
+import math
+import shutil
+import statistics
+import tempfile
+import unittest
+from unittest import mock
+
+from tests import arbol_de_prueba
+from Catalogo import crear_catalogo_desde_csv
+from Estadisticas import estadisticas_calorias, NIVELES_ESTADISTICAS, PERCENTILES_ESTADISTICAS
+import Estadisticas
+
+NIVELES_GRUPO = {'total': (), 'categoria': ('categoria',), 'tipo': ('categoria', 'tipo'),
+                 'procesamiento': ('categoria', 'tipo', 'procesamiento')}
+
+
+class EstadisticasDeCalorias(unittest.TestCase):
+    """
+    estadisticas_calorias da lo mismo que calcular cada grupo por separado con
+    el módulo statistics, y los motores de NumPy y de array coinciden.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        # Una base aparte, fuera de RUTA_BASE_PRUEBAS, para que cada hoja tenga un solo manifiesto.
+        cls.ruta_base = tempfile.mkdtemp(prefix="alimentos_estadisticas_")
+        arbol_de_prueba(cls.ruta_base, semilla=25, hojas=20)
+        with contextlib.redirect_stdout(io.StringIO()):
+            cls.catalogo = crear_catalogo_desde_csv(cls.ruta_base)
+        # Algunas filas dadas de baja: no pueden contar.
+        for fila in list(cls.catalogo)[::7]:
+            cls.catalogo.eliminar(fila.indice)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.ruta_base, ignore_errors=True)
+
+    def _esperado(self, nivel: str, categoria: str = None) -> dict:
+        """Grupo -> (cantidad, [(calorías, índice)] de menor a mayor), recorriendo el catálogo."""
+        grupos = {}
+        for fila in self.catalogo:
+            if categoria is not None and fila['categoria'] != categoria:
+                continue
+            grupo = grupos.setdefault(tuple(fila[campo] for campo in NIVELES_GRUPO[nivel]), [0, []])
+            grupo[0] += 1
+            try:
+                calorias = float(fila['calorias_100g'])
+            except ValueError:
+                continue
+            if not math.isnan(calorias):
+                grupo[1].append((calorias, fila.indice))
+        return {clave: (cantidad, sorted(valores)) for clave, (cantidad, valores) in sorted(grupos.items())}
+
+    def _comparar_con_statistics(self, resultado: dict, nivel: str, categoria: str = None):
+        esperado = self._esperado(nivel, categoria)
+        self.assertEqual(list(resultado['grupos']), list(esperado))
+        for clave, (cantidad, pares) in esperado.items():
+            grupo = resultado['grupos'][clave]
+            valores = [calorias for calorias, _ in pares]
+            self.assertEqual((grupo['cantidad'], grupo['con_calorias']), (cantidad, len(valores)), clave)
+            if not valores:
+                self.assertIsNone(grupo['media'])
+                continue
+            self.assertAlmostEqual(grupo['media'], statistics.fmean(valores), places=6)
+            self.assertAlmostEqual(grupo['desvio'], statistics.pstdev(valores), places=6)
+            self.assertEqual((grupo['minimo'], grupo['maximo']), (valores[0], valores[-1]))
+            self.assertEqual(grupo['mediana'], statistics.median(valores))
+            cortes = statistics.quantiles(valores, n=100, method='inclusive') if len(valores) > 1 else None
+            for p in PERCENTILES_ESTADISTICAS:
+                self.assertAlmostEqual(grupo['percentiles'][p], cortes[p - 1] if cortes else valores[0], places=6)
+            self.assertEqual(sum(grupo['histograma']), len(valores))
+            # A igual calorías, los menores van en el orden del catálogo y los mayores al revés.
+            self.assertEqual(grupo['menores'], [indice for _, indice in pares[:3]])
+            self.assertEqual(grupo['mayores'], [indice for _, indice in pares[::-1][:3]])
+
+    def test_igual_a_statistics(self):
+        for nivel in NIVELES_ESTADISTICAS:
+            with self.subTest(nivel):
+                self._comparar_con_statistics(estadisticas_calorias(self.catalogo, nivel, usar_numpy=False), nivel)
+        for categoria in self.catalogo.lista_categorias():
+            with self.subTest(categoria=categoria):
+                resultado = estadisticas_calorias(self.catalogo, 'tipo', categoria, usar_numpy=False)
+                self._comparar_con_statistics(resultado, 'tipo', categoria)
+
+    def test_histograma(self):
+        resultado = estadisticas_calorias(self.catalogo, 'categoria', cubetas=4, usar_numpy=False)
+        bordes = resultado['bordes']
+        self.assertEqual(len(bordes), 5)
+        for clave, (_, pares) in self._esperado('categoria').items():
+            # Cada valor va a la cubeta [borde, borde siguiente), y el máximo a la última.
+            esperado = [sum(bordes[k] <= calorias < bordes[k + 1] for calorias, _ in pares) for k in range(4)]
+            esperado[-1] += sum(calorias == bordes[-1] for calorias, _ in pares)
+            self.assertEqual(resultado['grupos'][clave]['histograma'], esperado, clave)
+
+    @unittest.skipUnless(Estadisticas.numpy is not None, "NumPy no está instalado")
+    def test_numpy_igual_a_array(self):
+        for nivel in NIVELES_ESTADISTICAS:
+            for categoria in (None, "frutas"):
+                with self.subTest(nivel, categoria=categoria):
+                    con_numpy = estadisticas_calorias(self.catalogo, nivel, categoria, usar_numpy=True)
+                    con_array = estadisticas_calorias(self.catalogo, nivel, categoria, usar_numpy=False)
+                    self.assertEqual((con_numpy['motor'], con_array['motor']), ('numpy', 'array'))
+                    self.assertEqual(con_numpy['bordes'], con_array['bordes'])
+                    self.assertEqual(list(con_numpy['grupos']), list(con_array['grupos']))
+                    for clave, grupo in con_array['grupos'].items():
+                        otro = con_numpy['grupos'][clave]
+                        # Media y desvío pueden diferir en el último decimal.
+                        for medida in ('media', 'desvio'):
+                            if grupo[medida] is None:
+                                self.assertIsNone(otro[medida])
+                            else:
+                                self.assertAlmostEqual(otro[medida], grupo[medida], places=9)
+                        for p, valor in grupo['percentiles'].items():
+                            if valor is not None:
+                                self.assertAlmostEqual(otro['percentiles'][p], valor, places=9)
+                        for medida in ('cantidad', 'con_calorias', 'minimo', 'maximo', 'histograma',
+                                       'menores', 'mayores'):
+                            self.assertEqual(otro[medida], grupo[medida], (clave, medida))
+
+    def test_errores(self):
+        with self.assertRaises(ValueError):
+            estadisticas_calorias(self.catalogo, 'marca')
+        with self.assertRaises(ValueError):
+            estadisticas_calorias(self.catalogo, cubetas=0)
+        with mock.patch.object(Estadisticas, 'numpy', None):
+            with self.assertRaises(ValueError):
+                estadisticas_calorias(self.catalogo, usar_numpy=True)
+            self.assertEqual(estadisticas_calorias(self.catalogo)['motor'], 'array')
+        self.assertEqual(estadisticas_calorias(self.catalogo, categoria="no existe")['grupos'], {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import errno
+import multiprocessing
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import tests  # noqa: F401  (prepara la base temporal antes de importar la aplicación)
+from Manejo_archivo import (sobrescribir_csv, leer_hoja, registrar_baja, compactar_hoja, durabilidad,
+                            SUFIJO_REGISTRO_CAMBIOS, SUFIJO_TEMPORAL)
+
+ENCABEZADOS = ['nombre', 'calorias_100g']
+FILAS = 500
+
+
+def _filas(version: str, cantidad: int = FILAS) -> list:
+    """Filas cuyos nombres dicen a qué versión pertenecen."""
+    return [{'nombre': f"{version} {i}", 'calorias_100g': str(i % 900 + 1)} for i in range(cantidad)]
+
+
+def _contenido(ruta_hoja: str) -> list:
+    """Las filas vivas de la hoja, como las ve la aplicación."""
+    _, filas, _ = leer_hoja(ruta_hoja)
+    return [dict(fila) for _, fila in filas]
+
+
+def _temporales(ruta_hoja: str) -> list:
+    directorio, nombre = os.path.split(ruta_hoja)
+    return [e for e in os.listdir(directorio) if e.startswith(nombre + ".") and e.endswith(SUFIJO_TEMPORAL)]
+
+
+# --- Procesos que se cortan --- #
+
+def _cortar_antes_de_reemplazar(ruta_hoja: str):
+    """Escribe el temporal completo y se corta justo antes de os.replace."""
+    os.replace = lambda *_: os._exit(1)
+    sobrescribir_csv(ruta_hoja, ENCABEZADOS, _filas("B"))
+    os._exit(2) # No debería llegar acá.
+
+
+def _cortar_antes_de_borrar_registro(ruta_hoja: str):
+    """Compacta la hoja y se corta después de reemplazar items.csv, antes de borrar el registro."""
+    remove = os.remove
+
+    def remove_con_corte(ruta, *args, **kwargs):
+        if ruta.endswith(SUFIJO_REGISTRO_CAMBIOS):
+            os._exit(1)
+        return remove(ruta, *args, **kwargs)
+    os.remove = remove_con_corte
+    compactar_hoja(ruta_hoja)
+    os._exit(2)
+
+
+class CortesYErroresDeDisco(unittest.TestCase):
+    """
+    Después de un corte o de un error de disco en medio de una reescritura,
+    la hoja se lee completa: con el contenido anterior o con el nuevo, nunca a
+    medias ni con cambios aplicados dos veces. Los cortes al azar y la medición
+    de cada política de durabilidad quedan en Prueba_fallos.py.
+    """
+
+    def setUp(self):
+        # Una base aparte, fuera de RUTA_BASE_PRUEBAS, para que la hoja tenga un solo manifiesto.
+        ruta_base = tempfile.mkdtemp(prefix="alimentos_fallos_")
+        self.addCleanup(shutil.rmtree, ruta_base, ignore_errors=True)
+        self.ruta_hoja = os.path.join(ruta_base, "prueba", "fallos", "fresco", "items.csv")
+        os.makedirs(os.path.dirname(self.ruta_hoja))
+
+    def _correr_hasta_el_corte(self, objetivo):
+        proceso = multiprocessing.Process(target=objetivo, args=(self.ruta_hoja,))
+        proceso.start()
+        proceso.join()
+        self.assertEqual(proceso.exitcode, 1, "el proceso no se cortó donde se esperaba")
+
+    def test_corte_antes_de_reemplazar(self):
+        anterior = _filas("A")
+        self.assertTrue(sobrescribir_csv(self.ruta_hoja, ENCABEZADOS, anterior))
+        self._correr_hasta_el_corte(_cortar_antes_de_reemplazar)
+        self.assertEqual(_contenido(self.ruta_hoja), anterior)
+        self.assertEqual(len(_temporales(self.ruta_hoja)), 1)
+
+        # La próxima reescritura borra el temporal que dejó el corte.
+        self.assertTrue(sobrescribir_csv(self.ruta_hoja, ENCABEZADOS, _filas("B")))
+        self.assertEqual(_contenido(self.ruta_hoja), _filas("B"))
+        self.assertEqual(_temporales(self.ruta_hoja), [])
+
+    def test_corte_entre_el_reemplazo_y_el_borrado_del_registro(self):
+        filas = _filas("A")
+        self.assertTrue(sobrescribir_csv(self.ruta_hoja, ENCABEZADOS, filas))
+        # Dos bajas en el registro: si se aplicaran de nuevo sobre el CSV compactado, desaparecerían otras filas.
+        self.assertTrue(registrar_baja(self.ruta_hoja, 0))
+        self.assertTrue(registrar_baja(self.ruta_hoja, 1))
+        self._correr_hasta_el_corte(_cortar_antes_de_borrar_registro)
+        self.assertTrue(os.path.exists(self.ruta_hoja + SUFIJO_REGISTRO_CAMBIOS))
+        self.assertEqual(_contenido(self.ruta_hoja), filas[2:])
+
+        # Una baja nueva va a un registro nuevo, no se suma al viejo.
+        self.assertTrue(registrar_baja(self.ruta_hoja, 0))
+        self.assertEqual(_contenido(self.ruta_hoja), filas[3:])
+
+    def test_error_de_fsync(self):
+        anterior = _filas("A")
+        self.assertTrue(sobrescribir_csv(self.ruta_hoja, ENCABEZADOS, anterior))
+        with mock.patch.object(os, 'fsync', side_effect=OSError(errno.EIO, "error de entrada/salida simulado")), \
+                mock.patch('builtins.print'), durabilidad('siempre'):
+            self.assertFalse(sobrescribir_csv(self.ruta_hoja, ENCABEZADOS, _filas("B")))
+        self.assertEqual(_contenido(self.ruta_hoja), anterior)
+        self.assertEqual(_temporales(self.ruta_hoja), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
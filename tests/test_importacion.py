@@ -0,0 +1,142 @@
+import contextlib
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from tests import RUTA_BASE_PRUEBAS, respuestas
+from Manejo_archivo import sobrescribir_csv, leer_hoja, obtener_rutas_csv, _manifiestos
+from Catalogo import obtener_catalogo, crear_catalogo_desde_csv
+from Importacion import importar_masivo
+from Utilidades import eliminar_item_por_nombre
+
+
+def _escribir_origen(ruta: str, filas: list):
+    """Archivo CSV a importar con las columnas de importar_masivo."""
+    with open(ruta, 'w', encoding='utf-8', newline='') as f:
+        escritor = csv.writer(f)
+        escritor.writerow(("categoria", "tipo", "procesamiento", "nombre", "calorias_100g"))
+        escritor.writerows(filas)
+
+
+class ImportacionConHojaModificadaPorFuera(unittest.TestCase):
+
+    def test_lote_y_baja(self):
+        # Otro programa agrega una fila antes de la importación: las filas
+        # importadas no pueden quedar en la posición de la ajena.
+        ruta_hoja = os.path.join(RUTA_BASE_PRUEBAS, "prueba", "importacion", "lote", "items.csv")
+        os.makedirs(os.path.dirname(ruta_hoja), exist_ok=True)
+        self.assertTrue(sobrescribir_csv(ruta_hoja, ['nombre', 'calorias_100g'],
+                                         [{'nombre': "A lote", 'calorias_100g': "10"},
+                                          {'nombre': "B lote", 'calorias_100g': "20"}]))
+        catalogo = obtener_catalogo(RUTA_BASE_PRUEBAS, recargar=True)
+        with open(ruta_hoja, 'a', encoding='utf-8', newline='') as f:
+            csv.writer(f).writerow(("C lote", "30"))
+
+        origen = os.path.join(RUTA_BASE_PRUEBAS, "lote.csv")
+        _escribir_origen(origen, [("prueba", "importacion", "lote", "D lote", "40")])
+        with contextlib.redirect_stdout(io.StringIO()):
+            resumen = importar_masivo(origen, ruta_base=RUTA_BASE_PRUEBAS, catalogo=catalogo)
+        self.assertEqual(resumen['importadas'], 1)
+
+        with respuestas("s"):
+            self.assertTrue(eliminar_item_por_nombre("D lote"))
+        _, filas, _ = leer_hoja(ruta_hoja)
+        self.assertEqual([fila['nombre'] for _, fila in filas], ["A lote", "B lote", "C lote"])
+        self.assertEqual(sorted(fila['nombre'] for fila in catalogo.filtrar("prueba", "importacion", "lote")),
+                         ["A lote", "B lote", "C lote"])
+
+
+class ImportacionMasiva(unittest.TestCase):
+    """Validación de las filas, rechazo de duplicados y hojas escritas por importar_masivo."""
+
+    def setUp(self):
+        # Una base aparte, fuera de RUTA_BASE_PRUEBAS, para que cada hoja tenga un solo manifiesto.
+        self.ruta_base = os.path.abspath(tempfile.mkdtemp(prefix="alimentos_importacion_"))
+        self.addCleanup(shutil.rmtree, self.ruta_base, ignore_errors=True)
+        self.hoja_existente = os.path.join(self.ruta_base, "frutas", "citricos", "fresco", "items.csv")
+        os.makedirs(os.path.dirname(self.hoja_existente))
+        self.assertTrue(sobrescribir_csv(self.hoja_existente, ['nombre', 'calorias_100g', 'marca'],
+                                         [{'nombre': "Limón", 'calorias_100g': "29", 'marca': "Ñandú"}]))
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.catalogo = crear_catalogo_desde_csv(self.ruta_base)
+
+    def _importar(self, nombre_origen: str, formato: str = None) -> dict:
+        with contextlib.redirect_stdout(io.StringIO()):
+            return importar_masivo(os.path.join(self.ruta_base, nombre_origen), formato,
+                                   ruta_base=self.ruta_base, catalogo=self.catalogo)
+
+    def _nombres(self, *jerarquia) -> list:
+        _, filas, _ = leer_hoja(os.path.join(self.ruta_base, *jerarquia, "items.csv"))
+        return [fila['nombre'] for _, fila in filas]
+
+    def test_validacion_y_duplicados(self):
+        _escribir_origen(os.path.join(self.ruta_base, "origen.csv"), [
+            (" Frutas ", "Cítricos", "FRESCO", "Naranja", "47"),       # 2: a la hoja existente
+            ("frutas", "citricos", "fresco", "LIMON", "30"),            # 3: ya existe en la hoja
+            ("Lácteos", "Quesos", "Duros", "Reggianito", "392.5"),      # 4: hoja nueva
+            ("lacteos", "quesos", "duros", "reggianito", "390"),        # 5: repetido en el archivo
+            ("lacteos", "quesos", "duros", "Sardo", ""),                # 6: falta un campo
+            ("lacteos", "quesos", "duros", "Cremoso", "mucho"),         # 7: calorías no numéricas
+            ("lacteos", "quesos", "duros", "Light", "0"),               # 8: calorías no positivas
+            ("\u0301", "quesos", "duros", "Raro", "100"),               # 9: la jerarquía queda vacía
+            ("lacteos", "quesos", "duros", "Pategrás", "350"),          # 10
+        ])
+        resumen = self._importar("origen.csv")
+        self.assertEqual((resumen['leidas'], resumen['importadas'], resumen['hojas']), (9, 3, 2))
+        motivos = dict(resumen['rechazadas'])
+        self.assertEqual(sorted(motivos), [3, 5, 6, 7, 8, 9])
+        self.assertIn("ya existe", motivos[3])
+        self.assertIn("ya existe", motivos[5])
+        self.assertIn("calorias_100g", motivos[6])
+        self.assertIn("no numéricas", motivos[7])
+        self.assertIn("positivo", motivos[8])
+        self.assertIn("jerarquía", motivos[9])
+
+        # La hoja existente conserva sus columnas; la nueva se crea con la jerarquía normalizada.
+        encabezados, filas, _ = leer_hoja(self.hoja_existente)
+        self.assertEqual(encabezados, ['nombre', 'calorias_100g', 'marca'])
+        self.assertEqual([dict(fila) for _, fila in filas],
+                         [{'nombre': "Limón", 'calorias_100g': "29", 'marca': "Ñandú"},
+                          {'nombre': "Naranja", 'calorias_100g': "47.0", 'marca': ""}])
+        self.assertEqual(self._nombres("lacteos", "quesos", "duros"), ["Reggianito", "Pategrás"])
+
+        # El catálogo y el manifiesto quedan al día sin volver a leer las hojas.
+        self.assertEqual(sorted(fila['nombre'] for fila in self.catalogo),
+                         ["Limón", "Naranja", "Pategrás", "Reggianito"])
+        obtener_rutas_csv(self.ruta_base)
+        hojas = _manifiestos[self.ruta_base]['hojas']
+        self.assertEqual({relativa: hoja['filas'] for relativa, hoja in hojas.items()},
+                         {os.path.join("frutas", "citricos", "fresco", "items.csv"): 2,
+                          os.path.join("lacteos", "quesos", "duros", "items.csv"): 2})
+
+    def test_jsonl(self):
+        with open(os.path.join(self.ruta_base, "origen.jsonl"), 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'categoria': "frutas", 'tipo': "citricos", 'procesamiento': "fresco",
+                                'nombre': "Pomelo", 'calorias_100g': 42}, ensure_ascii=False) + "\n")
+            f.write("{no es json\n\n")
+            f.write("[1, 2]\n")
+            f.write(json.dumps({'categoria': "frutas", 'tipo': "citricos", 'procesamiento': "fresco",
+                                'nombre': "Limón", 'calorias_100g': 29}, ensure_ascii=False) + "\n")
+        resumen = self._importar("origen.jsonl")
+        self.assertEqual((resumen['leidas'], resumen['importadas']), (4, 1))
+        self.assertEqual([numero for numero, _ in resumen['rechazadas']], [2, 4, 5])
+        self.assertEqual(self._nombres("frutas", "citricos", "fresco"), ["Limón", "Pomelo"])
+
+    def test_varios_lotes(self):
+        filas = [("verduras", "hojas", f"proc{i % 3}", f"Acelga {i}", str(i + 1)) for i in range(50)]
+        _escribir_origen(os.path.join(self.ruta_base, "origen.csv"), filas + filas[:5])
+        with mock.patch('Importacion.TAMANO_LOTE_IMPORTACION', 7):
+            resumen = self._importar("origen.csv")
+        self.assertEqual((resumen['importadas'], len(resumen['rechazadas'])), (50, 5))
+        for i in range(3):
+            self.assertEqual(self._nombres("verduras", "hojas", f"proc{i}"),
+                             [f"Acelga {n}" for n in range(i, 50, 3)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,469 @@
+import io
+import contextlib
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from tests import arbol_de_prueba
+from Manejo_archivo import (obtener_rutas_csv, guardar_manifiesto, sobrescribir_csv, crear_lista_desde_csv,
+                            iter_alimentos, normalizar_texto_para_ruta, resumen_calorias, leer_hoja,
+                            agregar_fila_agrupada, registrar_baja, registrar_modificacion, leer_columnas_hoja,
+                            nombre_existe_en_hoja, arbol_jerarquia, nodo_jerarquia,
+                            _leer_hoja_como_lista, _manifiestos)
+from Catalogo import crear_catalogo_desde_csv
+
+
+class ManifiestoEntreHilos(unittest.TestCase):
+    """
+    Guardar el manifiesto mientras otro hilo registra hojas nuevas no puede
+    cortar el guardado ni perder hojas.
+    """
+
+    def test_guardar_mientras_se_registran_hojas(self):
+        # Una base aparte, fuera de RUTA_BASE_PRUEBAS, para que cada hoja tenga un solo manifiesto.
+        ruta_base = os.path.abspath(tempfile.mkdtemp(prefix="alimentos_manifiesto_"))
+        self.addCleanup(shutil.rmtree, ruta_base, ignore_errors=True)
+        obtener_rutas_csv(ruta_base)
+        terminado = threading.Event()
+        salida = io.StringIO()
+
+        errores = []
+
+        def guardar():
+            try:
+                while not terminado.is_set():
+                    _manifiestos[ruta_base]['sucio'] = True
+                    guardar_manifiesto(ruta_base)
+            except Exception as e:
+                errores.append(e)
+
+        guardador = threading.Thread(target=guardar)
+        with contextlib.redirect_stdout(salida):
+            guardador.start()
+            try:
+                for i in range(300):
+                    ruta_hoja = os.path.join(ruta_base, f"cat{i % 5}", f"tipo{i}", "proc", "items.csv")
+                    os.makedirs(os.path.dirname(ruta_hoja))
+                    self.assertTrue(sobrescribir_csv(ruta_hoja, ['nombre', 'calorias_100g'],
+                                                     [{'nombre': f"alimento {i}", 'calorias_100g': i}]))
+            finally:
+                terminado.set()
+                guardador.join()
+            guardar_manifiesto(ruta_base)
+
+        self.assertEqual(errores, [])
+        self.assertNotIn("ADVERTENCIA", salida.getvalue())
+        self.assertEqual(len(_manifiestos[ruta_base]['hojas']), 300)
+        self.assertEqual(len(obtener_rutas_csv(ruta_base)), 300)
+
+
+class CargaEnParalelo(unittest.TestCase):
+    """
+    Leer las hojas con hilos, o parseando las grandes en otros procesos, da
+    el mismo resultado y en el mismo orden que leerlas de a una, y avisa igual
+    por cada hoja que no se puede leer.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.ruta_base = tempfile.mkdtemp(prefix="alimentos_paralelo_")
+        arbol_de_prueba(cls.ruta_base, semilla=6, hojas=30)
+        # Una hoja que no se puede decodificar.
+        cls.hoja_rota = os.path.join(cls.ruta_base, "rota", "rota", "rota", "items.csv")
+        os.makedirs(os.path.dirname(cls.hoja_rota))
+        with open(cls.hoja_rota, 'wb') as f:
+            f.write(b"nombre,calorias_100g\n\xff\xfe,10\n")
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.ruta_base, ignore_errors=True)
+
+    def _cargar(self, funcion, hilos, procesos) -> tuple:
+        salida = io.StringIO()
+        with contextlib.redirect_stdout(salida):
+            resultado = funcion(self.ruta_base, hilos=hilos, procesos=procesos)
+        return resultado, salida.getvalue()
+
+    def _comparar(self, funcion, copiar):
+        esperado, avisos = self._cargar(funcion, 1, 0)
+        self.assertEqual(avisos.count("ADVERTENCIA"), 1)
+        self.assertIn(self.hoja_rota, avisos)
+        # Con UMBRAL_HOJA_GRANDE_BYTES en 0 todas las hojas se parsean en otro proceso.
+        for hilos, procesos, umbral in ((4, 0, None), (8, 0, None), (3, 2, 0)):
+            with self.subTest(hilos=hilos, procesos=procesos), \
+                    mock.patch('Manejo_archivo.UMBRAL_HOJA_GRANDE_BYTES', umbral if umbral is not None else 32 << 20):
+                resultado, avisos_paralelo = self._cargar(funcion, hilos, procesos)
+                self.assertEqual(copiar(resultado), copiar(esperado))
+                self.assertEqual(avisos_paralelo, avisos)
+
+    def test_lista(self):
+        self._comparar(crear_lista_desde_csv, list)
+
+    def test_catalogo(self):
+        self._comparar(crear_catalogo_desde_csv, lambda catalogo: [(fila.copy(), fila.ruta_hoja, fila.posicion)
+                                                                  for fila in catalogo])
+
+
+class RecorridoPerezoso(unittest.TestCase):
+    """
+    iter_alimentos entrega lo mismo que filtrar la lista completa, pero solo
+    abre las hojas de las carpetas que coinciden y de a una, a medida que se
+    le piden filas.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.ruta_base = tempfile.mkdtemp(prefix="alimentos_recorrido_")
+        arbol_de_prueba(cls.ruta_base, semilla=7, hojas=25)
+        with contextlib.redirect_stdout(io.StringIO()):
+            cls.lista = crear_lista_desde_csv(cls.ruta_base)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.ruta_base, ignore_errors=True)
+
+    def _recorrer(self, *jerarquia, predicate=None) -> tuple:
+        """Filas de iter_alimentos y las hojas que se leyeron para entregarlas."""
+        leidas = []
+
+        def leer(ruta_archivo):
+            leidas.append(ruta_archivo)
+            return _leer_hoja_como_lista(ruta_archivo)
+        with mock.patch('Manejo_archivo._leer_hoja_como_lista', leer):
+            filas = list(iter_alimentos(*jerarquia, predicate=predicate, ruta_base=self.ruta_base))
+        return filas, leidas
+
+    def test_igual_a_filtrar_la_lista(self):
+        niveles = {(item['categoria'], item['tipo'], item['procesamiento']) for item in self.lista}
+        consultas = {(categoria.upper(), None, None) for categoria, _, _ in niveles}
+        consultas |= {(categoria, tipo, None) for categoria, tipo, _ in niveles} | niveles
+        consultas |= {(None, None, None), ("no existe", None, None)}
+        for jerarquia in consultas:
+            buscados = [normalizar_texto_para_ruta(valor) if valor is not None else None for valor in jerarquia]
+            esperado = [item for item in self.lista
+                        if all(valor is None or normalizar_texto_para_ruta(item[clave]) == valor
+                               for clave, valor in zip(('categoria', 'tipo', 'procesamiento'), buscados))]
+            filas, leidas = self._recorrer(*jerarquia)
+            self.assertEqual(filas, esperado, jerarquia)
+            # Se abrieron las hojas de la jerarquía pedida (vacías incluidas) y ninguna otra.
+            hojas = [ruta_archivo for ruta_archivo in obtener_rutas_csv(self.ruta_base)
+                     if all(valor is None or normalizar_texto_para_ruta(parte) == valor for parte, valor in
+                            zip(os.path.relpath(ruta_archivo, self.ruta_base).split(os.sep), buscados))]
+            self.assertEqual(leidas, hojas, jerarquia)
+
+    def test_predicate(self):
+        def predicate(item):
+            return item['calorias_100g'] in ("47", "47.0")
+        filas, _ = self._recorrer(predicate=predicate)
+        self.assertEqual(filas, [item for item in self.lista if predicate(item)])
+        self.assertTrue(filas)
+
+    def test_perezoso(self):
+        leidas = []
+
+        def leer(ruta_archivo):
+            leidas.append(ruta_archivo)
+            return _leer_hoja_como_lista(ruta_archivo)
+        with mock.patch('Manejo_archivo._leer_hoja_como_lista', leer):
+            recorrido = iter_alimentos(ruta_base=self.ruta_base)
+            self.assertEqual(leidas, [])
+            self.assertEqual(next(recorrido), self.lista[0])
+            self.assertEqual(len(leidas), 1)
+            recorrido.close()
+
+
+def _resumen_desde_cero(ruta_base: str) -> dict:
+    """Lo que debe dar resumen_calorias, calculado leyendo todas las hojas."""
+    def resumir(filas):
+        numericas = []
+        for fila in filas:
+            try:
+                numericas.append((fila['nombre'], float(fila['calorias_100g'])))
+            except ValueError:
+                pass
+        return {'cantidad': len(filas), 'con_calorias': len(numericas), 'suma': sum(c for _, c in numericas),
+                'max': list(max(numericas, key=lambda par: par[1])) if numericas else None,
+                'min': list(min(numericas, key=lambda par: par[1])) if numericas else None}
+
+    todas, por_categoria, por_tipo = [], {}, {}
+    for ruta_archivo in obtener_rutas_csv(ruta_base):
+        _, filas, _ = leer_hoja(ruta_archivo)
+        filas = [fila for _, fila in filas]
+        categoria, tipo, _ = os.path.relpath(os.path.dirname(ruta_archivo), ruta_base).split(os.sep)
+        todas += filas
+        por_categoria.setdefault(categoria, []).extend(filas)
+        por_tipo.setdefault((categoria, tipo), []).extend(filas)
+    return {'total': resumir(todas),
+            'categorias': {categoria: resumir(filas) for categoria, filas in por_categoria.items()},
+            'tipos': {clave: resumir(filas) for clave, filas in por_tipo.items()}}
+
+
+class ResumenesPorHoja(unittest.TestCase):
+    """
+    resumen_calorias da lo mismo que calcular las estadísticas leyendo toda
+    la base, y después de altas, bajas y modificaciones sigue dando lo mismo
+    sin volver a leer ninguna hoja.
+    """
+
+    def setUp(self):
+        self.ruta_base = os.path.abspath(tempfile.mkdtemp(prefix="alimentos_resumen_"))
+        self.addCleanup(shutil.rmtree, self.ruta_base, ignore_errors=True)
+        self.arbol = arbol_de_prueba(self.ruta_base, semilla=8, hojas=15)
+
+    def _comparar(self, resumen: dict):
+        esperado = _resumen_desde_cero(self.ruta_base)
+        for nivel in ('categorias', 'tipos'):
+            self.assertEqual(list(resumen[nivel]), list(esperado[nivel]))
+        pares = [(resumen['total'], esperado['total'])]
+        pares += [(resumen[nivel][clave], esperado[nivel][clave]) for nivel in ('categorias', 'tipos')
+                  for clave in esperado[nivel]]
+        for obtenido, calculado in pares:
+            self.assertAlmostEqual(obtenido.pop('suma'), calculado.pop('suma'), places=6)
+            obtenido.pop('firma', None)
+            self.assertEqual(obtenido, calculado)
+
+    def _sin_leer_hojas(self):
+        return mock.patch('Manejo_archivo._calcular_resumen_hoja',
+                          side_effect=AssertionError("se volvió a leer una hoja"))
+
+    @staticmethod
+    def _extremo(filas: list, funcion) -> dict:
+        numericas = []
+        for _, fila in filas:
+            try:
+                numericas.append((float(fila['calorias_100g']), fila))
+            except ValueError:
+                pass
+        return funcion(numericas, key=lambda par: par[0])[1]
+
+    def test_igual_al_calculo_completo(self):
+        self._comparar(resumen_calorias(self.ruta_base))
+        with self._sin_leer_hojas():
+            self._comparar(resumen_calorias(self.ruta_base))
+
+    def test_altas_bajas_y_modificaciones(self):
+        resumen_calorias(self.ruta_base)
+        ruta_hoja = next(ruta for ruta, (_, filas) in self.arbol.items() if len(filas) > 5)
+        with self._sin_leer_hojas():
+            agregar_fila_agrupada(ruta_hoja, {'nombre': "Nuevo mínimo", 'calorias_100g': "-1"})
+            _, filas, _ = leer_hoja(ruta_hoja)
+            # Ni la modificación ni la baja tocan un extremo de la hoja: esos sí obligan a volver a leerla.
+            extremos = {fila['calorias_100g'] for fila in (self._extremo(filas, max), self._extremo(filas, min))}
+            (posicion, fila), (posicion_baja, fila_baja) = [(posicion, fila) for posicion, fila in filas
+                                                            if fila['calorias_100g'] not in extremos][:2]
+            self.assertTrue(registrar_modificacion(ruta_hoja, posicion, {'calorias_100g': "12345.6"}, dict(fila)))
+            self.assertTrue(registrar_baja(ruta_hoja, posicion_baja, dict(fila_baja)))
+            resumen = resumen_calorias(self.ruta_base)
+        self.assertEqual(resumen['total']['max'], [fila['nombre'], 12345.6])
+        self.assertEqual(resumen['total']['min'], ["Nuevo mínimo", -1.0])
+        self._comparar(resumen)
+
+    def test_hoja_editada_por_fuera(self):
+        resumen_calorias(self.ruta_base)
+        ruta_hoja = next(iter(self.arbol))
+        with open(ruta_hoja, 'a', encoding='utf-8', newline='') as f:
+            f.write("Agregado a mano,99999\n")
+        resumen = resumen_calorias(self.ruta_base)
+        self.assertEqual(resumen['total']['max'], ["Agregado a mano", 99999.0])
+        self._comparar(resumen)
+
+
+# Contenidos de hoja para comparar leer_columnas_hoja con leer_hoja.
+_HOJAS_CRUDAS = {
+    'simple': "nombre,calorias_100g\nLimón,29\nNaranja,47\nPomelo,42\n",
+    'crlf_sin_salto_final': "nombre,calorias_100g\r\nLimón,29\r\nNaranja,47",
+    'comillas': 'nombre,calorias_100g,marca\nLimón,29,Ñandú\n"Queso, duro",392,"La ""Vaca"""\n'
+                '"Pan\nde campo",250,\nKiwi,61,Sol\n',
+    'filas_irregulares': "nombre,calorias_100g,marca\nLimón,29\nNaranja,47,Sol,extra\n\nPomelo,42,Sol\n\r\n",
+    'solo_encabezado': "nombre,calorias_100g\n",
+    'vacia': "",
+    'bloques': "nombre,calorias_100g\n" + "".join(f"Ítem {i},{i}\n" for i in range(200)) + '"Al final, con coma",1\n',
+}
+
+
+class LecturaPorColumnas(unittest.TestCase):
+    """
+    leer_columnas_hoja devuelve las mismas filas que leer_hoja (csv.DictReader)
+    con comillas, filas cortas o largas, líneas vacías y registro de cambios,
+    también cuando la hoja se recorre en muchos bloques.
+    """
+
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp(prefix="alimentos_columnas_")
+        self.addCleanup(shutil.rmtree, self.directorio, ignore_errors=True)
+
+    def _hoja(self, nombre: str, contenido: str) -> str:
+        ruta_hoja = os.path.join(self.directorio, nombre, "items.csv")
+        os.makedirs(os.path.dirname(ruta_hoja))
+        with open(ruta_hoja, 'w', encoding='utf-8', newline='') as f:
+            f.write(contenido)
+        return ruta_hoja
+
+    def _comparar(self, ruta_hoja: str):
+        for campos in (None, ['nombre'], ['calorias_100g', 'nombre'], ['marca', 'no existe']):
+            encabezados, filas, total = leer_hoja(ruta_hoja)
+            esperado = [[fila.get(campo) for _, fila in filas] for campo in campos or encabezados or ()]
+            obtenido = leer_columnas_hoja(ruta_hoja, campos)
+            self.assertEqual((obtenido[0], list(obtenido[1]), obtenido[2], obtenido[3]),
+                             (encabezados, [posicion for posicion, _ in filas], esperado, total), campos)
+
+    def test_igual_a_leer_hoja(self):
+        for nombre, contenido in _HOJAS_CRUDAS.items():
+            ruta_hoja = self._hoja(nombre, contenido)
+            with self.subTest(nombre):
+                self._comparar(ruta_hoja)
+            with self.subTest(nombre, bloque=16), mock.patch('Manejo_archivo.TAMANO_BLOQUE_MMAP', 16):
+                self._comparar(ruta_hoja)
+
+    def test_registro_de_cambios(self):
+        ruta_hoja = self._hoja("cambios", _HOJAS_CRUDAS['bloques'])
+        self.assertTrue(registrar_baja(ruta_hoja, 0))
+        self.assertTrue(registrar_modificacion(ruta_hoja, 3, {'nombre': "Cambiado, con coma", 'calorias_100g': 5}))
+        self.assertTrue(registrar_baja(ruta_hoja, 200))
+        self.assertTrue(registrar_modificacion(ruta_hoja, 5, {'marca': "no es columna"}))
+        self._comparar(ruta_hoja)
+        _, posiciones, (nombres,), total = leer_columnas_hoja(ruta_hoja, ['nombre'])
+        self.assertEqual((len(posiciones), total), (199, 201))
+        self.assertEqual(nombres[2], "Cambiado, con coma")
+
+
+class NombresPorHoja(unittest.TestCase):
+    """
+    nombre_existe_en_hoja responde lo mismo que recorrer la hoja, sin volver a
+    leerla después de las altas de este proceso, y la vuelve a leer si otro
+    programa la cambió.
+    """
+
+    def setUp(self):
+        directorio = tempfile.mkdtemp(prefix="alimentos_nombres_")
+        self.addCleanup(shutil.rmtree, directorio, ignore_errors=True)
+        self.ruta_hoja = os.path.join(directorio, "frutas", "citricos", "fresco", "items.csv")
+        os.makedirs(os.path.dirname(self.ruta_hoja))
+        self.assertTrue(sobrescribir_csv(self.ruta_hoja, ['nombre', 'calorias_100g'],
+                                         [{'nombre': nombre, 'calorias_100g': "40"}
+                                          for nombre in ("Limón", "Naranja", "Pomelo rosado")]))
+
+    def _por_recorrido(self, nombre: str) -> bool:
+        _, filas, _ = leer_hoja(self.ruta_hoja)
+        return any(normalizar_texto_para_ruta(fila['nombre']) == normalizar_texto_para_ruta(nombre)
+                   for _, fila in filas)
+
+    def _comparar(self, *nombres):
+        for nombre in nombres:
+            self.assertEqual(nombre_existe_en_hoja(self.ruta_hoja, nombre), self._por_recorrido(nombre), nombre)
+
+    def _sin_leer_la_hoja(self):
+        return mock.patch('Manejo_archivo.leer_columnas_hoja', side_effect=AssertionError("se volvió a leer la hoja"))
+
+    def test_igual_al_recorrido(self):
+        self._comparar("Limón", "LIMON", " limon ", "pomelo rosado", "Pomelo", "Mandarina", "")
+        with self._sin_leer_la_hoja():
+            self._comparar("limón", "Naranja")
+
+    def test_altas_sin_releer(self):
+        self.assertFalse(nombre_existe_en_hoja(self.ruta_hoja, "Mandarina"))
+        with self._sin_leer_la_hoja():
+            for i in range(20):
+                agregar_fila_agrupada(self.ruta_hoja, {'nombre': f"Mandarina {i}", 'calorias_100g': "53"})
+                self.assertTrue(nombre_existe_en_hoja(self.ruta_hoja, f"MANDARINA {i}"))
+            self.assertFalse(nombre_existe_en_hoja(self.ruta_hoja, "Mandarina 20"))
+
+    def test_cambios_que_obligan_a_releer(self):
+        self.assertTrue(nombre_existe_en_hoja(self.ruta_hoja, "Naranja"))
+        # Otro programa reescribe la hoja.
+        with open(self.ruta_hoja, 'w', encoding='utf-8', newline='') as f:
+            f.write("nombre,calorias_100g\nLimón,29\nKinoto,71\n")
+        self._comparar("Naranja", "Kinoto", "Limón")
+        # Bajas y modificaciones por el registro de cambios.
+        self.assertTrue(registrar_baja(self.ruta_hoja, 0))
+        self.assertTrue(registrar_modificacion(self.ruta_hoja, 1, {'nombre': "Quinoto"}))
+        self._comparar("Limón", "Kinoto", "Quinoto")
+        os.remove(self.ruta_hoja)
+        self.assertFalse(nombre_existe_en_hoja(self.ruta_hoja, "Quinoto"))
+
+
+class ArbolDeJerarquia(unittest.TestCase):
+    """
+    Las cantidades del árbol de la jerarquía coinciden con las filas de las
+    hojas, se mantienen con altas y bajas sin leer ninguna hoja y se ponen al
+    día con los cambios hechos por fuera en cuanto se vuelve a recorrer la base.
+    """
+
+    def setUp(self):
+        self.ruta_base = os.path.abspath(tempfile.mkdtemp(prefix="alimentos_arbol_"))
+        self.addCleanup(shutil.rmtree, self.ruta_base, ignore_errors=True)
+        self.arbol = arbol_de_prueba(self.ruta_base, semilla=21, hojas=15)
+
+    def _esperado(self) -> dict:
+        """{(categoria, tipo, procesamiento): filas vivas} de todas las hojas, leyéndolas."""
+        cantidades = {}
+        for ruta_archivo in obtener_rutas_csv(self.ruta_base):
+            jerarquia = tuple(os.path.relpath(os.path.dirname(ruta_archivo), self.ruta_base).split(os.sep))
+            cantidades[jerarquia] = len(leer_hoja(ruta_archivo)[1])
+        return cantidades
+
+    def _comparar(self, arbol: dict):
+        cantidades = self._esperado()
+        self.assertEqual(arbol['cantidad'], sum(cantidades.values()))
+        self.assertEqual(sorted(arbol['hijos']), sorted({categoria for categoria, _, _ in cantidades}))
+        for categoria, nodo in arbol['hijos'].items():
+            self.assertEqual(nodo['cantidad'], sum(n for (c, _, _), n in cantidades.items() if c == categoria))
+            for tipo, nodo_tipo in nodo['hijos'].items():
+                self.assertEqual(nodo_tipo['cantidad'],
+                                 sum(n for (c, t, _), n in cantidades.items() if (c, t) == (categoria, tipo)))
+                for procesamiento, hoja in nodo_tipo['hijos'].items():
+                    filas = cantidades[categoria, tipo, procesamiento]
+                    self.assertEqual((hoja['cantidad'], hoja['propias'], hoja['hijos']), (filas, filas, {}))
+
+    def _sin_leer_hojas(self):
+        return mock.patch('Manejo_archivo.leer_columnas_hoja', side_effect=AssertionError("se leyó una hoja"))
+
+    def test_igual_a_las_hojas(self):
+        arbol = arbol_jerarquia(self.ruta_base)
+        self._comparar(arbol)
+        with self._sin_leer_hojas():
+            self.assertIs(arbol_jerarquia(self.ruta_base), arbol)
+        ruta_hoja = next(iter(self.arbol))
+        categoria, tipo, procesamiento = os.path.relpath(os.path.dirname(ruta_hoja), self.ruta_base).split(os.sep)
+        self.assertIs(nodo_jerarquia(self.ruta_base, normalizar_texto_para_ruta(categoria).upper(), tipo),
+                      arbol['hijos'][categoria]['hijos'][tipo])
+        self.assertIs(nodo_jerarquia(self.ruta_base, categoria, tipo, procesamiento),
+                      arbol['hijos'][categoria]['hijos'][tipo]['hijos'][procesamiento])
+        self.assertIs(nodo_jerarquia(self.ruta_base), arbol)
+        self.assertIsNone(nodo_jerarquia(self.ruta_base, categoria, "no existe"))
+
+    def test_altas_y_bajas(self):
+        arbol_jerarquia(self.ruta_base)
+        ruta_hoja = next(ruta for ruta, (_, filas) in self.arbol.items() if len(filas) > 2)
+        with self._sin_leer_hojas():
+            agregar_fila_agrupada(ruta_hoja, {'nombre': "Nuevo", 'calorias_100g': "10"})
+            self.assertTrue(registrar_baja(ruta_hoja, 0))
+            self.assertTrue(registrar_baja(ruta_hoja, 1))
+            arbol = arbol_jerarquia(self.ruta_base)
+        self._comparar(arbol)
+
+        # Una hoja nueva se cuenta al armar el árbol otra vez.
+        ruta_nueva = os.path.join(self.ruta_base, "bebidas", "jugos", "envasado", "items.csv")
+        os.makedirs(os.path.dirname(ruta_nueva))
+        agregar_fila_agrupada(ruta_nueva, {'nombre': "Jugo", 'calorias_100g': "45"})
+        self._comparar(arbol_jerarquia(self.ruta_base))
+
+    def test_cambios_por_fuera(self):
+        arbol_jerarquia(self.ruta_base)
+        ruta_hoja = next(iter(self.arbol))
+        with open(ruta_hoja, 'a', encoding='utf-8', newline='') as f:
+            f.write("Agregado a mano,10\nOtro más,20\n")
+        os.remove(list(self.arbol)[1])
+        ruta_nueva = os.path.join(self.ruta_base, "bebidas", "jugos", "envasado", "items.csv")
+        os.makedirs(os.path.dirname(ruta_nueva))
+        with open(ruta_nueva, 'w', encoding='utf-8', newline='') as f:
+            f.write("nombre,calorias_100g\nJugo,45\n")
+        obtener_rutas_csv(self.ruta_base) # Como al entrar a un menú.
+        self._comparar(arbol_jerarquia(self.ruta_base))
+
+
+if __name__ == "__main__":
+    unittest.main()
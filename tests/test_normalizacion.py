@@ -0,0 +1,83 @@
+import random
+import unicodedata
+import unittest
+
+import tests  # noqa: F401  (prepara la base temporal antes de importar la aplicación)
+from Manejo_archivo import _normalizar_texto, _normalizar_memo, normalizar_texto_para_ruta
+
+
+def _normalizar_original(texto) -> str:
+    """La versión de normalizar_texto_para_ruta anterior al atajo ASCII y al memo."""
+    if not isinstance(texto, str):
+        return ""
+    texto = texto.strip().lower()
+    return unicodedata.normalize('NFD', texto).encode('ascii', 'ignore').decode('utf-8')
+
+
+# Caracteres con los que se arman los textos al azar, por grupo.
+ASCII = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-_.,()'/"
+LATINOS = "áéíóúàèìòùâêîôûäëïöüãõçñÁÉÍÓÚÀÈÌÒÙÂÊÎÔÛÄËÏÖÜÃÕÇÑåøæœßẞİıĳﬁǅ"
+MARCAS_COMBINANTES = "\u0300\u0301\u0302\u0303\u0308\u0327\u0331\u20dd"  # grave, agudo, circunflejo, tilde, diéresis, cedilla, macrón abajo, círculo
+NO_LATINOS = "αβγΔΣωЖжЯяקשعربي中文字ひらがなカタカナ한글ⅫⅣ①²½"
+ESPACIOS = " \t\n\r\u00a0\u2003\u3000\u200b"  # incluye el espacio duro, el em, el ideográfico y el de ancho cero
+TODOS = ASCII + LATINOS + MARCAS_COMBINANTES + NO_LATINOS + ESPACIOS
+
+
+def _texto_al_azar(azar: random.Random, alfabeto: str) -> str:
+    return "".join(azar.choice(alfabeto) for _ in range(azar.randint(0, 24)))
+
+
+class NormalizacionIgualALaOriginal(unittest.TestCase):
+    """
+    _normalizar_texto, el memo y normalizar_texto_para_ruta tienen que dar
+    exactamente lo mismo que la normalización original con NFD, tanto por el
+    atajo para textos ASCII como por el camino completo y el memo.
+    """
+
+    CASOS = 3000
+
+    def _comparar(self, textos):
+        for texto in textos:
+            esperado = _normalizar_original(texto)
+            self.assertEqual(_normalizar_texto(texto), esperado, repr(texto))
+            self.assertEqual(normalizar_texto_para_ruta(texto), esperado, repr(texto))
+            # La segunda vez sale del memo.
+            self.assertEqual(normalizar_texto_para_ruta(texto), esperado, repr(texto))
+            self.assertEqual(_normalizar_memo(texto), esperado, repr(texto))
+
+    def test_textos_ascii(self):
+        azar = random.Random(20)
+        textos = [_texto_al_azar(azar, ASCII + " \t\n") for _ in range(self.CASOS)]
+        self.assertTrue(all(texto.strip().lower().isascii() for texto in textos))
+        self._comparar(textos)
+
+    def test_textos_unicode(self):
+        azar = random.Random(21)
+        self._comparar(_texto_al_azar(azar, TODOS) for _ in range(self.CASOS))
+
+    def test_acentos_sobre_ascii(self):
+        # Casi todo ASCII con algún acento o marca suelta: el caso típico de los nombres de carpeta.
+        azar = random.Random(22)
+        alfabeto = ASCII * 4 + LATINOS + MARCAS_COMBINANTES
+        self._comparar(_texto_al_azar(azar, alfabeto) for _ in range(self.CASOS))
+
+    def test_casos_conocidos(self):
+        self._comparar(["Cítricos", "  ÑANDÚ  ", "Straße", "İstanbul", "é", "́", "", "   ",
+                        "ﬁdeos", "Crème Brûlée", "Ⅻ", "中文"])
+        self.assertEqual(normalizar_texto_para_ruta("  Cítricos "), "citricos")
+
+    def test_memo_acierta(self):
+        texto = "Lácteos Fermentados"
+        normalizar_texto_para_ruta(texto)
+        aciertos = _normalizar_memo.cache_info().hits
+        self.assertEqual(normalizar_texto_para_ruta(texto), _normalizar_original(texto))
+        self.assertEqual(_normalizar_memo.cache_info().hits, aciertos + 1)
+
+    def test_no_texto(self):
+        for valor in (None, 3, 2.5, b"bytes", ["lista"]):
+            self.assertEqual(normalizar_texto_para_ruta(valor), "")
+            self.assertEqual(_normalizar_texto(valor), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import asyncio
+import csv
+import os
+import unittest
+
+from tests import RUTA_BASE_PRUEBAS
+from Manejo_archivo import sobrescribir_csv, leer_hoja
+from Catalogo import obtener_catalogo
+from Servidor import ServidorAlimentos
+
+
+class CambiosConHojaModificadaPorFuera(unittest.TestCase):
+    """
+    Lo mismo que en test_utilidades, pero con los pedidos 'modificar' y
+    'eliminar' del servidor: si la hoja cambió por fuera, el catálogo del
+    servidor tiene que volver a leerla en lugar de anotar la firma nueva.
+    """
+
+    def _preparar_hoja(self, procesamiento: str) -> tuple:
+        """Hoja con A, B y C (con 'procesamiento' en el nombre) que otro programa reescribe como C, B, A."""
+        ruta_hoja = os.path.join(RUTA_BASE_PRUEBAS, "prueba", "servidor", procesamiento, "items.csv")
+        os.makedirs(os.path.dirname(ruta_hoja), exist_ok=True)
+        filas = [{'nombre': f"{nombre} {procesamiento}", 'calorias_100g': calorias}
+                 for nombre, calorias in (("A", "10"), ("B", "20"), ("C", "30"))]
+        self.assertTrue(sobrescribir_csv(ruta_hoja, ['nombre', 'calorias_100g'], filas))
+        servidor = ServidorAlimentos()
+        servidor.catalogo = obtener_catalogo(RUTA_BASE_PRUEBAS, recargar=True)
+        with open(ruta_hoja, 'w', encoding='utf-8', newline='') as f:
+            csv.writer(f).writerows([("nombre", "calorias_100g")] + [(fila['nombre'], fila['calorias_100g']) for fila in reversed(filas)])
+        return servidor, ruta_hoja
+
+    def _pedir(self, servidor: ServidorAlimentos, pedido: dict) -> dict:
+        respuesta = asyncio.run(servidor.responder(pedido))
+        self.assertTrue(respuesta['ok'], respuesta)
+        return respuesta
+
+    def _nombres(self, ruta_hoja: str) -> list:
+        _, filas, _ = leer_hoja(ruta_hoja)
+        return [fila['nombre'] for _, fila in filas]
+
+    def _nombres_en_catalogo(self, servidor: ServidorAlimentos, procesamiento: str) -> list:
+        return sorted(fila['nombre'] for fila in servidor.catalogo.filtrar("prueba", "servidor", procesamiento))
+
+    def test_bajas_seguidas(self):
+        servidor, ruta_hoja = self._preparar_hoja("bajas")
+        self._pedir(servidor, {'op': 'eliminar', 'nombre': "B bajas"})
+        self._pedir(servidor, {'op': 'eliminar', 'nombre': "C bajas"})
+        self.assertEqual(self._nombres(ruta_hoja), ["A bajas"])
+        self.assertEqual(self._nombres_en_catalogo(servidor, "bajas"), ["A bajas"])
+
+    def test_modificacion_y_baja(self):
+        servidor, ruta_hoja = self._preparar_hoja("modificaciones")
+        respuesta = self._pedir(servidor, {'op': 'modificar', 'nombre': "B modificaciones", 'nuevo_nombre': "B2"})
+        self.assertEqual(respuesta['resultado']['nombre'], "B2")
+        self._pedir(servidor, {'op': 'modificar', 'nombre': "C modificaciones", 'nuevo_nombre': "C2", 'nuevas_calorias': 35})
+        self._pedir(servidor, {'op': 'eliminar', 'nombre': "A modificaciones"})
+        self.assertEqual(self._nombres(ruta_hoja), ["C2", "B2"])
+        self.assertEqual(self._nombres_en_catalogo(servidor, "modificaciones"), ["B2", "C2"])
+
+    def test_alta_y_baja(self):
+        # Otro programa agrega una fila antes del alta: la fila nueva no puede
+        # quedar en la posición de la ajena.
+        servidor, ruta_hoja = self._preparar_hoja("altas")
+        with open(ruta_hoja, 'a', encoding='utf-8', newline='') as f:
+            csv.writer(f).writerow(("D altas", "40"))
+        respuesta = self._pedir(servidor, {'op': 'alta', 'nombre': "E altas", 'calorias_100g': 50,
+                                           'categoria': "prueba", 'tipo': "servidor", 'procesamiento': "altas"})
+        self.assertEqual(respuesta['resultado']['nombre'], "E altas")
+        self._pedir(servidor, {'op': 'eliminar', 'nombre': "E altas"})
+        self.assertEqual(self._nombres(ruta_hoja), ["C altas", "B altas", "A altas", "D altas"])
+        self.assertEqual(self._nombres_en_catalogo(servidor, "altas"), ["A altas", "B altas", "C altas", "D altas"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,182 @@
+import csv
+import io
+import os
+import sys
+import unittest
+from unittest import mock
+
+from tests import RUTA_BASE_PRUEBAS, respuestas
+from Manejo_archivo import sobrescribir_csv, leer_hoja
+from Catalogo import obtener_catalogo
+from Sub_Menus import opcion_1_alta
+from Utilidades import eliminar_item_por_nombre, modificar_item_por_nombre, mostrar_tabla_alimentos, FILAS_POR_BLOQUE
+
+
+class CambiosConHojaModificadaPorFuera(unittest.TestCase):
+    """
+    Si la hoja se reescribió por fuera de la aplicación, la fila se vuelve a
+    buscar leyendo el archivo, y el catálogo no puede seguir confiando en las
+    posiciones viejas del resto de la hoja.
+    """
+
+    def _preparar_hoja(self, procesamiento: str) -> str:
+        """Hoja con A, B y C (con 'procesamiento' en el nombre) que otro programa reescribe como C, B, A."""
+        ruta_hoja = os.path.join(RUTA_BASE_PRUEBAS, "prueba", "utilidades", procesamiento, "items.csv")
+        os.makedirs(os.path.dirname(ruta_hoja), exist_ok=True)
+        filas = [{'nombre': f"{nombre} {procesamiento}", 'calorias_100g': calorias}
+                 for nombre, calorias in (("A", "10"), ("B", "20"), ("C", "30"))]
+        self.assertTrue(sobrescribir_csv(ruta_hoja, ['nombre', 'calorias_100g'], filas))
+        obtener_catalogo(RUTA_BASE_PRUEBAS, recargar=True)
+        with open(ruta_hoja, 'w', encoding='utf-8', newline='') as f:
+            csv.writer(f).writerows([("nombre", "calorias_100g")] + [(fila['nombre'], fila['calorias_100g']) for fila in reversed(filas)])
+        return ruta_hoja
+
+    def _nombres(self, ruta_hoja: str) -> list:
+        _, filas, _ = leer_hoja(ruta_hoja)
+        return [fila['nombre'] for _, fila in filas]
+
+    def test_bajas_seguidas(self):
+        ruta_hoja = self._preparar_hoja("bajas")
+        with respuestas("s"):
+            self.assertTrue(eliminar_item_por_nombre("B bajas"))
+        with respuestas("s"):
+            self.assertTrue(eliminar_item_por_nombre("C bajas"))
+        self.assertEqual(self._nombres(ruta_hoja), ["A bajas"])
+        catalogo = obtener_catalogo(RUTA_BASE_PRUEBAS)
+        self.assertEqual([fila['nombre'] for fila in catalogo.filtrar("prueba", "utilidades", "bajas")], ["A bajas"])
+
+    def test_modificacion_y_baja(self):
+        ruta_hoja = self._preparar_hoja("modificaciones")
+        with respuestas("s", "B2", ""):
+            self.assertTrue(modificar_item_por_nombre("B modificaciones"))
+        with respuestas("s", "C2", "35"):
+            self.assertTrue(modificar_item_por_nombre("C modificaciones"))
+        with respuestas("s"):
+            self.assertTrue(eliminar_item_por_nombre("A modificaciones"))
+        self.assertEqual(self._nombres(ruta_hoja), ["C2", "B2"])
+        catalogo = obtener_catalogo(RUTA_BASE_PRUEBAS)
+        self.assertEqual(sorted(fila['nombre'] for fila in catalogo.filtrar("prueba", "utilidades", "modificaciones")),
+                         ["B2", "C2"])
+
+    def test_alta_y_baja(self):
+        # Otro programa agrega una fila mientras el operador carga el alta: la
+        # fila nueva no puede quedar en la posición de la ajena.
+        ruta_hoja = os.path.join(RUTA_BASE_PRUEBAS, "prueba", "utilidades", "altas", "items.csv")
+        os.makedirs(os.path.dirname(ruta_hoja), exist_ok=True)
+        self.assertTrue(sobrescribir_csv(ruta_hoja, ['nombre', 'calorias_100g'],
+                                         [{'nombre': "Manzana altas", 'calorias_100g': "52"},
+                                          {'nombre': "Pera altas", 'calorias_100g': "57"}]))
+        obtener_catalogo(RUTA_BASE_PRUEBAS, recargar=True)
+
+        def agregar_por_fuera():
+            with open(ruta_hoja, 'a', encoding='utf-8', newline='') as f:
+                csv.writer(f).writerow(("Banana altas", "89"))
+            return "61"
+
+        with respuestas("1", "prueba", "utilidades", "altas", "Kiwi altas", agregar_por_fuera):
+            opcion_1_alta()
+        self.assertEqual(self._nombres(ruta_hoja), ["Manzana altas", "Pera altas", "Banana altas", "Kiwi altas"])
+        with respuestas("s"):
+            self.assertTrue(eliminar_item_por_nombre("Kiwi altas"))
+        self.assertEqual(self._nombres(ruta_hoja), ["Manzana altas", "Pera altas", "Banana altas"])
+        catalogo = obtener_catalogo(RUTA_BASE_PRUEBAS)
+        self.assertEqual(sorted(fila['nombre'] for fila in catalogo.filtrar("prueba", "utilidades", "altas")),
+                         ["Banana altas", "Manzana altas", "Pera altas"])
+
+
+class _Terminal(io.StringIO):
+    """Salida en memoria que se hace pasar por una terminal, para que la tabla pagine."""
+
+    def isatty(self):
+        return True
+
+
+class _SalidaQueCuenta(io.StringIO):
+    """Anota cuántos ítems se habían consumido del generador en cada write."""
+
+    def __init__(self, consumidos: list):
+        super().__init__()
+        self.consumidos = consumidos
+        self.al_escribir = []
+
+    def write(self, texto):
+        self.al_escribir.append(len(self.consumidos))
+        return super().write(texto)
+
+
+def _items(cantidad: int, largo: int = None, consumidos: list = None):
+    """Genera ítems de a uno; el de la posición 'largo' tiene un nombre de 70 caracteres."""
+    for i in range(cantidad):
+        if consumidos is not None:
+            consumidos.append(i)
+        yield {'nombre': "x" * 70 if i == largo else f"alimento {i}", 'calorias_100g': str(i),
+               'categoria': "frutas", 'tipo': "citricos"}
+
+
+def _primer_separador(linea: str) -> int:
+    return linea.index("|")
+
+
+class TablaDeAlimentos(unittest.TestCase):
+
+    def test_anchos_por_bloque(self):
+        # Un nombre largo en el último bloque ensancha la columna solo en ese bloque.
+        cantidad = 2 * FILAS_POR_BLOQUE + 10
+        salida = io.StringIO()
+        mostrar_tabla_alimentos(list(_items(cantidad, largo=cantidad - 1)), salida=salida)
+        lineas = salida.getvalue().splitlines()
+        self.assertEqual({_primer_separador(linea) for linea in lineas[:2 * FILAS_POR_BLOQUE + 1]}, {31})
+        self.assertEqual({_primer_separador(linea) for linea in lineas[2 * FILAS_POR_BLOQUE + 1:cantidad + 1]}, {71})
+        self.assertEqual(lineas[cantidad + 1], "-" * (85 + 70 - 30))
+        self.assertEqual(lineas[cantidad + 2], f"Total de ítems mostrados: {cantidad}")
+
+    def test_generador_en_streaming(self):
+        # Cada bloque se escribe apenas se formatea, sin consumir el generador completo antes.
+        consumidos = []
+        salida = _SalidaQueCuenta(consumidos)
+        cantidad = 2 * FILAS_POR_BLOQUE + 10
+        mostrar_tabla_alimentos(_items(cantidad, consumidos=consumidos), salida=salida)
+        self.assertEqual(salida.al_escribir, [FILAS_POR_BLOQUE, 2 * FILAS_POR_BLOQUE, cantidad, cantidad])
+        self.assertIn(f"Total de ítems mostrados: {cantidad}", salida.getvalue())
+
+    def test_anchos_por_pagina(self):
+        # Paginando, el ancho sale de la página visible y solo se leen las filas mostradas.
+        consumidos = []
+        pantalla = _Terminal()
+        with mock.patch.object(sys, 'stdout', pantalla), mock.patch.object(sys, 'stdin', _Terminal()), \
+                mock.patch('builtins.input', side_effect=["", "q"]):
+            mostrar_tabla_alimentos(_items(1000, largo=15, consumidos=consumidos), filas_por_pagina=10)
+        paginas = [[linea for linea in pagina.splitlines() if "|" in linea]
+                   for pagina in pantalla.getvalue().split("--- Página")[:2]]
+        self.assertEqual([len(pagina) for pagina in paginas], [11, 11])
+        self.assertEqual({_primer_separador(linea) for linea in paginas[0]}, {31})
+        self.assertEqual({_primer_separador(linea) for linea in paginas[1]}, {71})
+        self.assertEqual(len(consumidos), 20)
+
+
+class BusquedaEnLosMenus(unittest.TestCase):
+    """Sin coincidencia exacta, los menús de baja y modificación ofrecen los nombres parecidos."""
+
+    def test_nombre_mal_escrito(self):
+        ruta_hoja = os.path.join(RUTA_BASE_PRUEBAS, "prueba", "utilidades", "aproximada", "items.csv")
+        os.makedirs(os.path.dirname(ruta_hoja), exist_ok=True)
+        self.assertTrue(sobrescribir_csv(ruta_hoja, ['nombre', 'calorias_100g'],
+                                         [{'nombre': "Mandarina criolla", 'calorias_100g': "53"},
+                                          {'nombre': "Mandarina común", 'calorias_100g': "50"},
+                                          {'nombre': "Pomelo rosado", 'calorias_100g': "42"}]))
+        obtener_catalogo(RUTA_BASE_PRUEBAS, recargar=True)
+
+        # La más parecida queda primera en el menú.
+        with respuestas("1"):
+            self.assertTrue(eliminar_item_por_nombre("mandarna criola"))
+        with respuestas("1", "Pomelo blanco", ""):
+            self.assertTrue(modificar_item_por_nombre("pomelo rosao"))
+        # Cancelar en el menú no cambia nada.
+        with respuestas("0"):
+            self.assertFalse(eliminar_item_por_nombre("mandarin"))
+        _, filas, _ = leer_hoja(ruta_hoja)
+        self.assertEqual([fila['nombre'] for _, fila in filas], ["Mandarina común", "Pomelo blanco"])
+
+
+if __name__ == "__main__":
+    unittest.main()